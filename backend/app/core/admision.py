@@ -0,0 +1,356 @@
+"""
+🚦 CONTROL DE ADMISIÓN: LÍMITE DE TASA Y CONCURRENCIA PONDERADA
+📁 RUTA: backend/app/core/admision.py
+
+Unos pocos usuarios subiendo juegos de planos a la vez (OCR, RAG, render)
+ocupan el pool de hilos del worker y el CRUD interactivo (listar clientes,
+autocompletado, abrir una cotización) queda esperando detrás. Cada request
+a /api se clasifica por método y ruta en una clase:
+
+- archivos:    /api/chat/pili/procesar-archivos, /api/documentos/upload...
+- generacion:  generar-informe-*, generar-word/pdf, /api/generar-documento-directo
+- ia:          rutas de chat y análisis que llaman al LLM
+- crud:        todo lo demás
+
+y pasa por dos controles:
+
+1. Límite de tasa (token bucket) por cliente y clase: ADMISION_POR_MINUTO_*
+   requests por minuto, con ráfagas de hasta un tercio de eso. El cliente
+   es el X-API-Key, el token Bearer o la IP (X-Real-IP detrás de nginx si
+   ADMISION_CONFIAR_PROXY). Con REDIS_URL los buckets viven en Redis (un
+   script Lua atómico, con redis.asyncio: no bloquea el event loop) y el
+   límite es global entre workers; sin Redis, o si no responde en
+   ADMISION_REDIS_TIMEOUT_MS, cada worker lleva los suyos en memoria.
+2. Compuerta de concurrencia por worker: cada clase pesa unidades y hay
+   ADMISION_CAPACIDAD unidades; las clases pesadas solo pueden ocupar
+   CAPACIDAD - ADMISION_RESERVA_INTERACTIVA, el resto queda para el CRUD.
+   Es por worker a propósito: lo que se protege son los hilos y la CPU de
+   cada proceso.
+
+Si un control no admite el request se responde 429 con Retry-After (lo que
+falta para el próximo token, o la duración media de esa clase si la
+compuerta está llena). /health, /metrics, la documentación y los
+preflight CORS no pasan por aquí.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.estado_compartido import get_redis_async, redis_async_activo, reportar_fallo_redis
+from app.core.metricas import admision_en_uso, admision_rechazos
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "pili:limite:"
+
+# Buckets locales a partir de los cuales se descartan los que ya están llenos
+MAX_LOCAL = 10000
+
+# Unidades de la compuerta que ocupa un request de cada clase
+PESOS = {
+    "crud": 1,
+    "ia": 2,
+    "generacion": 4,
+    "archivos": 6,
+}
+
+# (método, ruta) → clase; la primera regla que coincide decide
+REGLAS = tuple((metodo, re.compile(patron), clase) for metodo, patron, clase in (
+    ("POST", r"^/api/chat/pili/procesar-archivos/?$", "archivos"),
+    ("POST", r"^/api/documentos/upload/?$", "archivos"),
+    ("POST", r"^/api/documentos/[^/]+/reprocesar/?$", "archivos"),
+    ("POST", r"^/api/upload/?$", "archivos"),
+    ("POST", r"^/api/generar-documento-directo/?$", "generacion"),
+    ("POST", r"^/api/[a-z_]+/[^/]+/generar-(word|pdf|informe-[a-z-]+)/?$", "generacion"),
+    ("POST", r"^/api/chat/pili/generar-json-preview/?$", "generacion"),
+    ("POST", r"^/api/chat/(conversacional|chat-contextualizado|iniciar-flujo-inteligente"
+             r"|generar-rapida|analizar-proyecto|sugerir-mejoras/[^/]+)/?$", "ia"),
+    ("POST", r"^/api/documentos/([^/]+/analizar-con-ia|buscar-semantica)/?$", "ia"),
+))
+
+# Fuera del control aunque empiecen por /api
+EXENTAS = ("/api/system/health",)
+
+# Token bucket atómico en Redis. ARGV: capacidad, tokens/s, ahora (epoch)
+# Devuelve los segundos a esperar (0 = admitido) como texto: Lua trunca los
+# números que devuelve a entero
+SCRIPT_BUCKET = """
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidad
+local ts = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ts) * tasa)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / tasa
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', ahora)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / tasa * 1000) + 1000)
+return tostring(espera)
+"""
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🏷️ CLASIFICACIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def clasificar(metodo: str, ruta: str) -> Optional[str]:
+    """Clase del request, o None si no pasa por el control de admisión"""
+    if metodo == "OPTIONS" or not ruta.startswith("/api/") or ruta in EXENTAS:
+        return None
+    for metodo_regla, patron, clase in REGLAS:
+        if metodo == metodo_regla and patron.match(ruta):
+            return clase
+    return "crud"
+
+
+def identificar_cliente(scope) -> str:
+    """API key, token Bearer o IP del cliente (sin guardar credenciales en claro)"""
+    headers = dict(scope.get("headers") or ())
+    api_key = headers.get(b"x-api-key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key).hexdigest()[:16]
+    autorizacion = headers.get(b"authorization", b"")
+    if autorizacion[:7].lower() == b"bearer " and autorizacion[7:].strip():
+        return "token:" + hashlib.sha256(autorizacion[7:].strip()).hexdigest()[:16]
+    if settings.ADMISION_CONFIAR_PROXY:
+        # X-Real-IP lo fija nginx; de X-Forwarded-For solo vale la última
+        # entrada (la que añade el proxy): las anteriores las manda el cliente
+        ip = (headers.get(b"x-real-ip") or headers.get(b"x-forwarded-for", b"").split(b",")[-1]).strip()
+        if ip:
+            return "ip:" + ip.decode("latin-1")
+    cliente = scope.get("client")
+    return f"ip:{cliente[0]}" if cliente else "ip:desconocida"
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🪣 LÍMITE DE TASA (TOKEN BUCKET)
+# ═══════════════════════════════════════════════════════════════
+
+class LimitadorTokens:
+    """
+    🪣 Token bucket por (cliente, clase), en Redis o en memoria
+
+    Cada bucket se llena a `por_minuto / 60` tokens por segundo hasta su
+    capacidad (la ráfaga: un tercio del límite por minuto) y cada request
+    consume uno.
+    """
+
+    def __init__(self, por_minuto: Dict[str, int] = None):
+        self.por_minuto = por_minuto
+        self._local: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._script = None
+        self._script_cliente = None
+
+    def parametros(self, clase: str) -> Tuple[float, float]:
+        """(capacidad, tokens por segundo) de la clase"""
+        if self.por_minuto is not None:
+            por_minuto = self.por_minuto[clase]
+        else:
+            por_minuto = getattr(settings, f"ADMISION_POR_MINUTO_{clase.upper()}")
+        por_minuto = max(1, por_minuto)
+        return float(max(1, math.ceil(por_minuto / 3))), por_minuto / 60.0
+
+    async def consumir(self, cliente: str, clase: str) -> float:
+        """Consume un token: 0 si hay, si no los segundos hasta el próximo"""
+        capacidad, tasa = self.parametros(clase)
+        clave = f"{clase}:{cliente}"
+
+        redis_cliente = get_redis_async()
+        if redis_cliente is not None:
+            try:
+                if self._script_cliente is not redis_cliente:
+                    self._script = redis_cliente.register_script(SCRIPT_BUCKET)
+                    self._script_cliente = redis_cliente
+                # Epoch: los workers no comparten reloj monotónico
+                espera = await asyncio.wait_for(
+                    self._script(keys=[PREFIJO + clave], args=[capacidad, tasa, time.time()]),
+                    timeout=settings.ADMISION_REDIS_TIMEOUT_MS / 1000,
+                )
+                return float(espera)
+            # Lento o caído: bucket local (y el resto del estado compartido,
+            # local hasta el próximo reintento)
+            except asyncio.TimeoutError:
+                reportar_fallo_redis(TimeoutError(f"sin respuesta en {settings.ADMISION_REDIS_TIMEOUT_MS} ms"))
+            except Exception as e:
+                reportar_fallo_redis(e)
+
+        return self._consumir_local(clave, capacidad, tasa)
+
+    def _consumir_local(self, clave: str, capacidad: float, tasa: float) -> float:
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ts = self._local.get(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ts) * tasa)
+            if tokens >= 1:
+                self._local[clave] = (tokens - 1, ahora)
+                espera = 0.0
+            else:
+                self._local[clave] = (tokens, ahora)
+                espera = (1 - tokens) / tasa
+            if len(self._local) > MAX_LOCAL:
+                self._purgar(ahora)
+        return espera
+
+    def _purgar(self, ahora: float):
+        """Un bucket que ya se habría llenado equivale a no tenerlo"""
+        llenos = []
+        for clave, (tokens, ts) in self._local.items():
+            capacidad, tasa = self.parametros(clave.split(":", 1)[0])
+            if tokens + (ahora - ts) * tasa >= capacidad:
+                llenos.append(clave)
+        for clave in llenos:
+            del self._local[clave]
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if redis_async_activo() else "local",
+            "buckets_locales": len(self._local),
+            "limites": {
+                clase: {"rafaga": int(capacidad), "por_minuto": round(tasa * 60)}
+                for clase in PESOS for capacidad, tasa in [self.parametros(clase)]
+            },
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🚧 COMPUERTA DE CONCURRENCIA PONDERADA
+# ═══════════════════════════════════════════════════════════════
+
+class CompuertaConcurrencia:
+    """
+    🚧 Unidades de trabajo en curso en este worker
+
+    El CRUD puede usar toda la capacidad; las clases pesadas, solo la que
+    no está reservada. Un request más pesado que su límite entra solo si
+    la compuerta está vacía (si no, no entraría nunca).
+    """
+
+    # Suavizado de la duración media por clase (para Retry-After)
+    ALFA = 0.2
+
+    def __init__(self, capacidad: int = None, reserva: int = None):
+        self.capacidad = settings.ADMISION_CAPACIDAD if capacidad is None else capacidad
+        self.reserva = settings.ADMISION_RESERVA_INTERACTIVA if reserva is None else reserva
+        self.en_uso = 0
+        self.por_clase = {clase: 0 for clase in PESOS}
+        self.duracion_media = {clase: 1.0 for clase in PESOS}
+        self._lock = threading.Lock()
+
+    def limite(self, clase: str) -> int:
+        return self.capacidad if clase == "crud" else max(1, self.capacidad - self.reserva)
+
+    def entrar(self, clase: str) -> Optional[int]:
+        """Reserva las unidades de la clase; None si no caben"""
+        peso = PESOS[clase]
+        with self._lock:
+            if self.en_uso + peso > self.limite(clase) and self.en_uso > 0:
+                return None
+            self.en_uso += peso
+            self.por_clase[clase] += 1
+        admision_en_uso.inc(peso)
+        return peso
+
+    def salir(self, clase: str, peso: int, segundos: float):
+        with self._lock:
+            self.en_uso -= peso
+            self.por_clase[clase] -= 1
+            self.duracion_media[clase] += self.ALFA * (segundos - self.duracion_media[clase])
+        admision_en_uso.dec(peso)
+
+    def reintentar_en(self, clase: str) -> float:
+        """Estimación de cuándo habrá sitio: lo que suele tardar esa clase"""
+        return self.duracion_media[clase]
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "capacidad": self.capacidad,
+                "reserva_interactiva": self.reserva,
+                "en_uso": self.en_uso,
+                "requests_en_curso": dict(self.por_clase),
+                "duracion_media_s": {c: round(d, 3) for c, d in self.duracion_media.items()},
+            }
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌐 MIDDLEWARE ASGI
+# ═══════════════════════════════════════════════════════════════
+
+class MiddlewareAdmision:
+    """
+    Límite de tasa y compuerta antes de atender el request; 429 con
+    Retry-After si no se admite. ASGI puro, como MiddlewareTrazas.
+    """
+
+    def __init__(self, app, limitador: LimitadorTokens = None, compuerta: CompuertaConcurrencia = None):
+        self.app = app
+        self.limitador = limitador or limitador_tokens
+        self.compuerta = compuerta or compuerta_concurrencia
+
+    async def __call__(self, scope, receive, send):
+        clase = clasificar(scope.get("method", "GET"), scope.get("path", "")) if scope["type"] == "http" else None
+        if clase is None:
+            await self.app(scope, receive, send)
+            return
+
+        espera = await self.limitador.consumir(identificar_cliente(scope), clase)
+        if espera > 0:
+            await self._rechazar(send, clase, "limite_tasa", espera)
+            return
+
+        peso = self.compuerta.entrar(clase)
+        if peso is None:
+            await self._rechazar(send, clase, "saturado", self.compuerta.reintentar_en(clase))
+            return
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.compuerta.salir(clase, peso, time.perf_counter() - inicio)
+
+    @staticmethod
+    async def _rechazar(send, clase: str, motivo: str, espera_s: float):
+        admision_rechazos.labels(clase, motivo).inc()
+        reintentar = max(1, math.ceil(espera_s))
+        mensaje = ("Demasiadas solicitudes, intenta de nuevo en unos segundos" if motivo == "limite_tasa"
+                   else "Servidor ocupado con otras solicitudes, intenta de nuevo en unos segundos")
+        cuerpo = json.dumps({"error": mensaje, "clase": clase, "motivo": motivo,
+                             "reintentar_en_s": reintentar}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"retry-after", str(reintentar).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
+
+
+# Instancias globales (la compuerta es por worker; los buckets, globales con Redis)
+limitador_tokens = LimitadorTokens()
+compuerta_concurrencia = CompuertaConcurrencia()
+
+def get_estado_admision() -> Dict[str, Any]:
+    """Límites, backend y ocupación de la compuerta de este worker"""
+    return {
+        "habilitada": settings.ADMISION_HABILITADA,
+        "limites": limitador_tokens.estado(),
+        "compuerta": compuerta_concurrencia.estado(),
+    }
@@ -0,0 +1,220 @@
+"""
+⚡ ARRANQUE RÁPIDO: ROUTERS DIFERIDOS Y PRECALENTAMIENTO
+📁 RUTA: backend/app/core/arranque.py
+
+Importar los routers arrastra google.generativeai, reportlab, python-docx,
+plotly, chromadb, spaCy... y sus singletons: el proceso tarda segundos en
+aceptar conexiones (perfil: backend/perfil_importacion.py). Con
+ARRANQUE_DIFERIDO=true:
+
+- app.main solo registra la tabla de routers; el servidor escucha y
+  responde /health enseguida
+- Al arrancar, una tarea en segundo plano importa los routers uno por uno
+  (en un hilo, sin bloquear el event loop) y después corre el
+  precalentamiento (autocompletado, modelos de app/core/servidor.py)
+- Un request que llega antes a un router pendiente espera solo a ese
+  router (`MiddlewareCargaDiferida`), no a todo el precalentamiento
+
+Las rutas de cada router se insertan en la posición que tendrían con carga
+inmediata: los routers siguen teniendo prioridad sobre los endpoints de
+compatibilidad de app.main (mismo orden de coincidencia en ambos modos).
+
+Sin ARRANQUE_DIFERIDO (por defecto) todo se carga al importar app.main,
+como antes; gunicorn con preload lo hace en el maestro antes del fork.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Rutas que necesitan todos los routers (el esquema OpenAPI completo)
+RUTAS_ESQUEMA = ("/openapi.json", "/docs", "/redoc")
+
+
+class CargadorRouters:
+    """
+    ⚡ Carga inmediata o diferida de los routers de la API
+    """
+
+    def __init__(self):
+        self.app = None
+        self.diferido = False
+        # nombre → {"modulo", "prefix", "tags", "descripcion"}
+        self.specs: Dict[str, Dict[str, Any]] = {}
+        # Mismo formato que usaba app.main (router, prefix, tags, descripcion)
+        self.routers_info: Dict[str, Dict[str, Any]] = {}
+        self.errores: Dict[str, str] = {}
+        self.tiempos_ms: Dict[str, float] = {}
+        self._rutas: Dict[str, list] = {}
+        self._posicion = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._precalentamiento: List[Tuple[str, Callable[[], Any]]] = []
+        self._tarea: Optional[asyncio.Task] = None
+        self._inicio = time.perf_counter()
+        self.listo = False
+
+    def registrar(self, nombre: str, prefix: str, tags: List[str], descripcion: str, modulo: str = None):
+        self.specs[nombre] = {
+            "modulo": modulo or f"app.routers.{nombre}",
+            "prefix": prefix,
+            "tags": tags,
+            "descripcion": descripcion,
+        }
+
+    @property
+    def pendientes(self) -> List[str]:
+        return [n for n in self.specs if n not in self.routers_info and n not in self.errores]
+
+    # ──────────────────────────────────────────────────────────────
+    # 🔗 INCLUSIÓN EN LA APP
+    # ──────────────────────────────────────────────────────────────
+
+    def montar(self, app, diferido: bool):
+        """
+        Fija la app y el punto donde van las rutas de los routers (el
+        momento de la llamada, como el include_router de antes)
+        """
+        self.app = app
+        self.diferido = diferido
+        self._posicion = len(app.router.routes)
+        if not diferido:
+            self.cargar_todos()
+
+    def _importar(self, nombre: str):
+        spec = self.specs[nombre]
+        inicio = time.perf_counter()
+        modulo = importlib.import_module(spec["modulo"])
+        self.tiempos_ms[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+        return modulo.router
+
+    def _incluir(self, nombre: str, router):
+        spec = self.specs[nombre]
+        rutas = self.app.router.routes
+        antes = len(rutas)
+        self.app.include_router(router, prefix=spec["prefix"], tags=spec["tags"])
+        self._rutas[nombre] = rutas[antes:]
+        del rutas[antes:]
+
+        # Rutas de los routers, en el orden de la tabla, en la posición de montar()
+        propias = {id(r) for lista in self._rutas.values() for r in lista}
+        resto = [r for r in rutas if id(r) not in propias]
+        ordenadas = [r for n in self.specs if n in self._rutas for r in self._rutas[n]]
+        rutas[:] = resto[:self._posicion] + ordenadas + resto[self._posicion:]
+
+        self.app.openapi_schema = None
+        self.routers_info[nombre] = {"router": router, **{k: spec[k] for k in ("prefix", "tags", "descripcion")}}
+        logger.info(f"✅ Router {nombre}: {spec['descripcion']} ({self.tiempos_ms.get(nombre, 0)} ms)")
+
+    def cargar_todos(self):
+        """Carga inmediata (en el hilo actual) de todos los routers pendientes"""
+        for nombre in self.pendientes:
+            try:
+                self._incluir(nombre, self._importar(nombre))
+            except Exception as e:
+                self.errores[nombre] = str(e)
+                logger.warning(f"⚠️ Router {nombre} no disponible: {e}")
+
+    async def cargar(self, nombre: str):
+        """Carga un router pendiente; requests simultáneos esperan la misma carga"""
+        if nombre not in self.pendientes:
+            return
+        lock = self._locks.setdefault(nombre, asyncio.Lock())
+        async with lock:
+            if nombre not in self.pendientes:
+                return
+            try:
+                # El import corre en un hilo; la inclusión, en el event loop
+                router = await run_in_threadpool(self._importar, nombre)
+            except Exception as e:
+                self.errores[nombre] = str(e)
+                logger.warning(f"⚠️ Router {nombre} no disponible: {e}")
+                return
+            self._incluir(nombre, router)
+
+    def pendientes_para(self, ruta: str) -> List[str]:
+        """Routers pendientes que necesita un request a `ruta`"""
+        if ruta in RUTAS_ESQUEMA:
+            return self.pendientes
+        # El prefijo más largo que coincide decide (/api/chat gana a /api)
+        candidatos = [
+            (len(spec["prefix"]), nombre) for nombre, spec in self.specs.items()
+            if ruta == spec["prefix"] or ruta.startswith(spec["prefix"].rstrip("/") + "/")
+        ]
+        if not candidatos:
+            return []
+        nombre = max(candidatos)[1]
+        return [nombre] if nombre in self.pendientes else []
+
+    # ──────────────────────────────────────────────────────────────
+    # 🔥 PRECALENTAMIENTO
+    # ──────────────────────────────────────────────────────────────
+
+    def agregar_precalentamiento(self, nombre: str, funcion: Callable[[], Any]):
+        """Tarea síncrona que corre (en un hilo) después de cargar los routers"""
+        self._precalentamiento.append((nombre, funcion))
+
+    def iniciar_precalentamiento(self):
+        """Lanza la carga en segundo plano (llamar desde un evento startup)"""
+        if not self.diferido:
+            self.listo = True
+            return
+        self._tarea = asyncio.get_running_loop().create_task(self._precalentar())
+
+    async def _precalentar(self):
+        for nombre in self.pendientes:
+            await self.cargar(nombre)
+        for nombre, funcion in self._precalentamiento:
+            inicio = time.perf_counter()
+            try:
+                await run_in_threadpool(funcion)
+            except Exception as e:
+                logger.warning(f"⚠️ Precalentamiento '{nombre}' fallido: {e}")
+            self.tiempos_ms[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+        self.listo = True
+        logger.info(f"🔥 Precalentamiento completo en {time.perf_counter() - self._inicio:.1f} s "
+                    f"({len(self.routers_info)}/{len(self.specs)} routers)")
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "modo": "diferido" if self.diferido else "inmediato",
+            "listo": self.listo,
+            "routers_cargados": list(self.routers_info),
+            "routers_pendientes": self.pendientes,
+            "errores": self.errores,
+            "tiempos_ms": self.tiempos_ms,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌐 MIDDLEWARE ASGI
+# ═══════════════════════════════════════════════════════════════
+
+class MiddlewareCargaDiferida:
+    """
+    Antes de enrutar, carga el router pendiente que corresponde a la ruta
+    del request (si el precalentamiento aún no llegó a él). ASGI puro.
+    """
+
+    def __init__(self, app, cargador: CargadorRouters):
+        self.app = app
+        self.cargador = cargador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.cargador.pendientes:
+            for nombre in self.cargador.pendientes_para(scope["path"]):
+                await self.cargador.cargar(nombre)
+        await self.app(scope, receive, send)
+
+
+# Instancia global
+cargador_routers = CargadorRouters()
+
+def get_cargador_routers() -> CargadorRouters:
+    """Obtiene el cargador de routers de la app"""
+    return cargador_routers
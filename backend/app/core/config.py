@@ -111,6 +111,102 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = None
     DATABASE_ECHO: bool = False
 
+    # Perfil SQLite (instalaciones de una sola máquina)
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(default=10000, env="SQLITE_BUSY_TIMEOUT_MS")
+    SQLITE_SYNCHRONOUS: str = Field(default="NORMAL", env="SQLITE_SYNCHRONOUS")
+    SQLITE_MMAP_SIZE_MB: int = Field(default=256, env="SQLITE_MMAP_SIZE_MB")
+    SQLITE_CACHE_SIZE_MB: int = Field(default=32, env="SQLITE_CACHE_SIZE_MB")
+
+    # Perfil PostgreSQL (pool por proceso)
+    DB_POOL_SIZE: int = Field(default=5, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(default=10, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: int = Field(default=30, env="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(default=1800, env="DB_POOL_RECYCLE")
+    DB_STATEMENT_TIMEOUT_MS: int = Field(default=30000, env="DB_STATEMENT_TIMEOUT_MS")
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = Field(default=256, env="DB_PREPARED_STATEMENT_CACHE_SIZE")
+
+    # Búsqueda de texto completo (app/services/busqueda.py): texto indexado
+    # por entidad y, en SQLite, coincidencias rankeadas con bm25 por
+    # consulta (las más recientes; 0 = todas)
+    BUSQUEDA_MAX_CARACTERES: int = Field(default=200000, env="BUSQUEDA_MAX_CARACTERES")
+    BUSQUEDA_MAX_CANDIDATOS: int = Field(default=5000, env="BUSQUEDA_MAX_CANDIDATOS")
+
+    # Cachés por proceso que otro worker puede dejar viejas: cada cuántos
+    # segundos se mira si cambiaron clientes (autocompletado) o la versión
+    # del catálogo de precios; TTL de las estadísticas de proyectos
+    AUTOCOMPLETADO_CHECK_S: float = Field(default=2.0, env="AUTOCOMPLETADO_CHECK_S")
+    PRICE_CATALOG_CHECK_S: float = Field(default=5.0, env="PRICE_CATALOG_CHECK_S")
+    PROJECT_STATS_TTL_S: float = Field(default=10.0, env="PROJECT_STATS_TTL_S")
+
+    # Numeración de cotizaciones (app/services/sequence_allocator.py):
+    # números que reserva cada worker por UPDATE de la secuencia
+    NUMERACION_BLOQUE: int = Field(default=10, env="NUMERACION_BLOQUE")
+
+    # Generación de documentos profesionales: segundos tras los cuales se
+    # omiten las etapas opcionales (RAG, gráficas)
+    DOCUMENT_STAGE_DEADLINE_S: float = Field(default=30.0, env="DOCUMENT_STAGE_DEADLINE_S")
+
+    # Redis (opcional): sesiones de chat y cachés compartidas entre workers
+    # (app/core/estado_compartido.py). Si no responde, cada worker usa
+    # memoria local y se reintenta cada REDIS_REINTENTO_S segundos
+    REDIS_URL: str = Field(default="", env="REDIS_URL")
+    REDIS_REINTENTO_S: float = Field(default=30.0, env="REDIS_REINTENTO_S")
+
+    # Servidor de producción (backend/gunicorn.conf.py): workers (0 = según
+    # CPUs y memoria del contenedor, ver app/core/servidor.py), memoria
+    # estimada por worker para ese cálculo, precarga de modelos en el
+    # maestro antes del fork y timeout por request (las llamadas LLM tardan)
+    WEB_CONCURRENCY: int = Field(default=0, env="WEB_CONCURRENCY")
+    SERVIDOR_MB_POR_WORKER: int = Field(default=700, env="SERVIDOR_MB_POR_WORKER")
+    SERVIDOR_PRECARGA_MODELOS: bool = Field(default=True, env="SERVIDOR_PRECARGA_MODELOS")
+    SERVIDOR_TIMEOUT_S: int = Field(default=120, env="SERVIDOR_TIMEOUT_S")
+
+    # Arranque diferido (app/core/arranque.py): el proceso acepta conexiones
+    # antes de importar routers y servicios pesados, que se cargan en segundo
+    # plano o con el primer request que los necesita
+    ARRANQUE_DIFERIDO: bool = Field(default=False, env="ARRANQUE_DIFERIDO")
+
+    # Procesos de render de gráficas por worker (chart_engine; 0 = en el
+    # proceso actual). Sin definir: min(4, CPUs), o con gunicorn las CPUs
+    # repartidas entre los workers (gunicorn.conf.py)
+    CHART_RENDER_WORKERS: Optional[int] = Field(None, env="CHART_RENDER_WORKERS")
+
+    # Control de admisión (app/core/admision.py): requests por minuto por
+    # cliente y clase de endpoint (token bucket, global con REDIS_URL) y
+    # compuerta de concurrencia por worker en unidades (crud 1, ia 2,
+    # generacion 4, archivos 6) con una reserva que solo usa el CRUD.
+    # ADMISION_CONFIAR_PROXY: tomar la IP de X-Real-IP (o la última entrada
+    # de X-Forwarded-For); solo si el backend no es accesible sin pasar por
+    # nginx (docker/nginx.conf fija ambas cabeceras)
+    ADMISION_HABILITADA: bool = Field(default=True, env="ADMISION_HABILITADA")
+    ADMISION_POR_MINUTO_CRUD: int = Field(default=600, env="ADMISION_POR_MINUTO_CRUD")
+    ADMISION_POR_MINUTO_IA: int = Field(default=30, env="ADMISION_POR_MINUTO_IA")
+    ADMISION_POR_MINUTO_GENERACION: int = Field(default=20, env="ADMISION_POR_MINUTO_GENERACION")
+    ADMISION_POR_MINUTO_ARCHIVOS: int = Field(default=10, env="ADMISION_POR_MINUTO_ARCHIVOS")
+    ADMISION_CAPACIDAD: int = Field(default=32, env="ADMISION_CAPACIDAD")
+    ADMISION_RESERVA_INTERACTIVA: int = Field(default=8, env="ADMISION_RESERVA_INTERACTIVA")
+    ADMISION_CONFIAR_PROXY: bool = Field(default=False, env="ADMISION_CONFIAR_PROXY")
+    # Espera máxima del bucket en Redis; pasado esto se usa el bucket local
+    ADMISION_REDIS_TIMEOUT_MS: int = Field(default=100, env="ADMISION_REDIS_TIMEOUT_MS")
+
+    # Trazas de rendimiento por request (app/core/tracing.py): fracción de
+    # requests trazados (0 = apagado; "X-PILI-Trace: 1" fuerza la traza),
+    # desde cuántos ms una traza es lenta (log INFO + /api/system/traces).
+    # Server-Timing solo en los requests forzados, salvo TRACING_SERVER_TIMING
+    # (lo agrega a todos los trazados: expone tiempos internos al cliente)
+    TRACING_MUESTREO: float = Field(default=0.01, env="TRACING_MUESTREO")
+    TRACING_SERVER_TIMING: bool = Field(default=False, env="TRACING_SERVER_TIMING")
+    TRACING_UMBRAL_LENTO_MS: float = Field(default=500.0, env="TRACING_UMBRAL_LENTO_MS")
+    TRACING_MAX_TRAZAS: int = Field(default=200, env="TRACING_MAX_TRAZAS")
+
+    # Métricas Prometheus (GET /metrics, app/core/metricas.py): directorio
+    # compartido por los workers en despliegues multiproceso (vacío = un proceso)
+    PROMETHEUS_MULTIPROC_DIR: str = Field(default="", env="PROMETHEUS_MULTIPROC_DIR")
+
+    # Sesiones de chat de PILI
+    CHAT_SESIONES_MEMORIA: int = Field(default=500, env="CHAT_SESIONES_MEMORIA")
+    CHAT_SESIONES_TTL_HORAS: int = Field(default=24, env="CHAT_SESIONES_TTL_HORAS")
+
     @validator("DATABASE_URL", pre=False, always=True)
     def set_database_url(cls, v, values):
         """
@@ -143,6 +239,12 @@ class Settings(BaseSettings):
     GENERATED_DIR: Path = PROJECT_ROOT / "storage" / "generados"
     TEMPLATES_DIR: Path = PROJECT_ROOT / "storage" / "templates"
     CHROMA_PERSIST_DIRECTORY: Path = PROJECT_ROOT / "storage" / "chroma_db"
+    # Texto extraído de documentos (gzip por hash de contenido, fuera de la BD)
+    CONTENIDO_DIR: Path = PROJECT_ROOT / "storage" / "contenido"
+    # Textos de adjuntos de sesiones de chat: aparte, caducan con las sesiones
+    CONTENIDO_SESIONES_DIR: Path = PROJECT_ROOT / "storage" / "contenido_sesiones"
+    # Cachés regenerables (bytecode de plantillas Jinja2, ...)
+    CACHE_DIR: Path = PROJECT_ROOT / "storage" / "cache"
     
     ALLOWED_EXTENSIONS: str = Field(default="pdf,docx,xlsx,png,jpg,jpeg", env="ALLOWED_EXTENSIONS")
     MAX_UPLOAD_SIZE_MB: int = Field(default=10, env="MAX_UPLOAD_SIZE_MB")
@@ -165,7 +267,14 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = Field(default="models/embedding-001", env="EMBEDDING_MODEL")
     TEMPERATURE: float = Field(default=0.3, env="TEMPERATURE")
     MAX_TOKENS: int = Field(default=4000, env="MAX_TOKENS")
-    
+
+    # Caché de contexto de Gemini para los prefijos de sistema de los agentes
+    # PILI: solo prefijos con al menos GEMINI_CACHE_MIN_TOKENS (mínimo del
+    # modelo para CachedContent); los demás van como system_instruction
+    GEMINI_CACHE_CONTEXTO: bool = Field(default=True, env="GEMINI_CACHE_CONTEXTO")
+    GEMINI_CACHE_MIN_TOKENS: int = Field(default=4096, env="GEMINI_CACHE_MIN_TOKENS")
+    GEMINI_CACHE_TTL_MINUTOS: int = Field(default=60, env="GEMINI_CACHE_TTL_MINUTOS")
+
     # =======================================
     # MÓDULOS DE SERVICIO
     # =======================================
@@ -22,6 +22,7 @@ import os
 # Importar los generadores de documentos
 from app.services.word_generator import word_generator
 from app.services.pdf_generator import pdf_generator
+from app.services.sequence_allocator import generar_numero_cotizacion
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -31,30 +32,6 @@ router = APIRouter()
 # ============================================\n# FUNCIONES AUXILIARES
 # ============================================
 
-def generar_numero_cotizacion(db: Session) -> str:
-    """
-    Generar número único de cotización
-    Formato: COT-YYYYMM-XXXX
-    """
-    fecha = datetime.now()
-    prefijo = f"COT-{fecha.strftime('%Y%m')}"
-    
-    # Buscar última cotización del mes
-    ultima = db.query(Cotizacion).filter(
-        Cotizacion.numero.like(f"{prefijo}%")
-    ).order_by(Cotizacion.numero.desc()).first()
-    
-    if ultima:
-        try:
-            ultimo_num = int(ultima.numero.split('-')[-1])
-            nuevo_num = ultimo_num + 1
-        except:
-            nuevo_num = 1
-    else:
-        nuevo_num = 1
-    
-    return f"{prefijo}-{nuevo_num:04d}"
-
 def _preparar_datos_documento(cotizacion: Cotizacion) -> Dict[str, Any]:
     """
     Helper para convertir un modelo de Cotizacion a un diccionario 
@@ -1,32 +1,128 @@
 """
 Configuración de base de datos con SQLAlchemy - VERSIÓN CORREGIDA
 """
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import create_engine, event, text, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
+from app.core.metricas import instrumentar_pool
+from app.core.tracing import instrumentar_engine
 import logging
+import os
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    ASYNC_DB_AVAILABLE = True
+except ImportError:  # greenlet no instalado
+    ASYNC_DB_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-# Preparamos los argumentos de conexión
-connect_args = {}
+# ============================================
+# PERFILES DE ENGINE (según la URL)
+# ============================================
+# SQLite: una sola máquina, sin pool de servidor. WAL permite lectores
+# concurrentes mientras otro proceso escribe, y busy_timeout hace esperar
+# al escritor en lugar de fallar con "database is locked".
+# PostgreSQL: pool por proceso, statement_timeout y caché de prepared
+# statements desde settings.
+
+DRIVERS_ASYNC = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+NIVELES_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+def url_sync(url: str) -> str:
+    """postgresql+asyncpg://… -> postgresql://… (driver por defecto del motor)"""
+    url_obj = make_url(url)
+    if url_obj.get_driver_name() in DRIVERS_ASYNC.values():
+        return url_obj.set(drivername=url_obj.get_backend_name()).render_as_string(hide_password=False)
+    return url
+
+def _es_sqlite_memoria(url_obj) -> bool:
+    return url_obj.database in (None, "", ":memory:") or url_obj.query.get("mode") == "memory"
+
+def perfil_engine(url: str, asincrono: bool = False) -> dict:
+    """Argumentos de create_engine / create_async_engine para el motor de la URL"""
+    url_obj = make_url(url)
+    motor = url_obj.get_backend_name()
+
+    if motor == "sqlite":
+        kwargs = {
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            }
+        }
+        if asincrono and not _es_sqlite_memoria(url_obj):
+            # aiosqlite usa NullPool por defecto (una conexión + hilo por sesión)
+            kwargs["poolclass"] = AsyncAdaptedQueuePool
+        return kwargs
 
-# Configuración específica para SQLite
-if settings.DATABASE_URL.startswith("sqlite"):
-    connect_args["check_same_thread"] = False
-    logger.info("Configurando SQLite con check_same_thread=False.")
+    kwargs = {
+        "pool_pre_ping": True,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if motor == "postgresql":
+        if asincrono:
+            kwargs["connect_args"] = {
+                # 0 desactiva la caché (necesario detrás de PgBouncer en modo transaction)
+                "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+                "server_settings": {
+                    "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+                    "application_name": "tesla-cotizador",
+                },
+            }
+        else:
+            kwargs["connect_args"] = {
+                "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}",
+                "application_name": "tesla-cotizador",
+            }
+    return kwargs
+
+def _pragmas_sqlite(dbapi_connection, connection_record):
+    """PRAGMAs por conexión (journal_mode=WAL persiste en el archivo; el resto no)"""
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if synchronous not in NIVELES_SYNCHRONOUS:
+        synchronous = "NORMAL"
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # NORMAL en WAL: sin fsync por commit, la BD nunca queda corrupta
+    # (tras un corte de luz se pueden perder las últimas transacciones)
+    cursor.execute(f"PRAGMA synchronous={synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_MB) * 1024 * 1024}")
+    # Negativo = KiB
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_MB) * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def _configurar_engine(engine_sync):
+    """Registra los eventos por conexión según el motor"""
+    if engine_sync.dialect.name == "sqlite":
+        event.listen(engine_sync, "connect", _pragmas_sqlite)
+    # Tiempo de cada consulta sumado a la traza del request (app/core/tracing.py)
+    instrumentar_engine(engine_sync)
+    # Checkouts y conexiones prestadas para /metrics (app/core/metricas.py)
+    instrumentar_pool(engine_sync)
 
 # Creamos el engine
+DATABASE_URL_SYNC = url_sync(settings.DATABASE_URL)
 engine = create_engine(
-    settings.DATABASE_URL,
+    DATABASE_URL_SYNC,
     echo=settings.DATABASE_ECHO,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=3600,
-    connect_args=connect_args
+    **perfil_engine(DATABASE_URL_SYNC)
 )
+_configurar_engine(engine)
+logger.info(f"Engine {engine.dialect.name} ({type(engine.pool).__name__})")
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -36,6 +132,72 @@ SessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+# ============================================
+# MOTOR ASÍNCRONO (routers async def)
+# ============================================
+# Driver async por motor: aiosqlite en local, asyncpg en PostgreSQL.
+# La sesión síncrona (SessionLocal) se mantiene para scripts y servicios
+# que aún no son async (generadores, PILI, estadísticas vía run_sync).
+
+def url_async(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://… -> postgresql+asyncpg://…"""
+    url_obj = make_url(url)
+    motor = url_obj.get_backend_name()
+    driver = DRIVERS_ASYNC.get(motor)
+    if not driver:
+        raise ValueError(f"Sin driver async para '{motor}'")
+    return url_obj.set(drivername=f"{motor}+{driver}").render_as_string(hide_password=False)
+
+class SesionBaseAsync(Session):
+    """
+    Sesión síncrona interna de AsyncSession (clase propia para poder
+    registrar eventos solo sobre las sesiones async)
+    """
+
+async_engine = None
+AsyncSessionLocal = None
+
+# Los routers CRUD (cotizaciones, clientes, proyectos, documentos,
+# búsqueda) dependen de get_async_db: sin driver async responderían 500 en
+# cada request, así que el proceso no arranca
+MENSAJE_SIN_ASYNC = "instalar aiosqlite (SQLite) o asyncpg (PostgreSQL), y greenlet"
+
+if not ASYNC_DB_AVAILABLE:
+    raise RuntimeError(f"Motor async no disponible: {MENSAJE_SIN_ASYNC}")
+try:
+    async_engine = create_async_engine(
+        url_async(settings.DATABASE_URL),
+        echo=settings.DATABASE_ECHO,
+        **perfil_engine(settings.DATABASE_URL, asincrono=True)
+    )
+    _configurar_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        sync_session_class=SesionBaseAsync,
+        autoflush=False,
+        # Los objetos siguen legibles tras el commit sin otra ida a la BD
+        # (en async no hay carga perezosa implícita)
+        expire_on_commit=False
+    )
+except (ImportError, ValueError) as e:
+    raise RuntimeError(f"Motor async no disponible ({e}): {MENSAJE_SIN_ASYNC}") from e
+
+# ============================================
+# FORK (gunicorn con preload_app)
+# ============================================
+# Los workers heredan los engines del maestro: sus conexiones abiertas no
+# deben usarse en dos procesos. dispose(close=False) deja al hijo con un
+# pool nuevo sin cerrar los sockets que sigue usando el padre.
+
+def _engines_tras_fork():
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_engines_tras_fork)
+
 def get_db() -> Session:
     """Dependency que proporciona una sesión de base de datos"""
     db = SessionLocal()
@@ -44,15 +206,60 @@ def get_db() -> Session:
     finally:
         db.close()
 
+async def get_async_db() -> "AsyncSession":
+    """Dependency que proporciona una sesión async (no bloquea el event loop)"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError(f"Motor async no disponible: {MENSAJE_SIN_ASYNC}")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Índices reemplazados por otros (mismo uso, distinto orden): se borran al iniciar
+INDICES_REEMPLAZADOS = (
+    "ix_cotizaciones_fecha_creacion_id",
+    "ix_proyectos_fecha_creacion_id",
+    "ix_documentos_fecha_subida_id",
+)
+
 def init_db():
     """Crear todas las tablas en la base de datos"""
     try:
         Base.metadata.create_all(bind=engine)
+        _agregar_columnas_faltantes()
+        # create_all no agrega índices nuevos a tablas que ya existían
+        for tabla in Base.metadata.sorted_tables:
+            for indice in tabla.indexes:
+                indice.create(bind=engine, checkfirst=True)
+        with engine.begin() as conn:
+            for nombre in INDICES_REEMPLAZADOS:
+                conn.execute(text(f"DROP INDEX IF EXISTS {nombre}"))
+        # Índice de texto completo (FTS5 / tsvector); importarlo registra
+        # además los eventos que lo mantienen sincronizado
+        from app.services.busqueda import busqueda_service
+        busqueda_service.asegurar_indice()
         logger.info("Base de datos inicializada con éxito.")
     except Exception as e:
         logger.error(f"Error al inicializar la base de datos: {str(e)}")
         raise
 
+def _agregar_columnas_faltantes():
+    """
+    create_all no altera tablas existentes: agrega las columnas nuevas
+    (nullable, sin valor por defecto) que falten en la BD
+    """
+    inspector = inspect(engine)
+    tablas_existentes = set(inspector.get_table_names())
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas_existentes:
+            continue
+        presentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name in presentes or not columna.nullable:
+                continue
+            tipo = columna.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}'))
+            logger.info(f"Columna agregada: {tabla.name}.{columna.name} ({tipo})")
+
 def drop_db():
     """CUIDADO: Elimina todas las tablas"""
     if settings.ENVIRONMENT == "production":
@@ -70,6 +277,33 @@ def check_db_connection() -> bool:
         logger.error(f"Error de conexión a base de datos: {str(e)}")
         return False
 
+def estado_pool(engine_sync) -> dict:
+    """Uso del pool de conexiones (QueuePool: tamaño, prestadas, libres, overflow)"""
+    pool = engine_sync.pool
+    estado = {"motor": engine_sync.dialect.name, "pool": type(pool).__name__}
+    if not hasattr(pool, "checkedout"):
+        # StaticPool / NullPool / SingletonThreadPool: sin contadores
+        return estado
+
+    capacidad = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    prestadas = pool.checkedout()
+    estado.update({
+        "tamano": pool.size(),
+        "capacidad": capacidad,
+        "prestadas": prestadas,
+        "libres": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "utilizacion": round(prestadas / capacidad, 3) if capacidad else None,
+    })
+    return estado
+
+def metricas_pools() -> dict:
+    """Estado de los pools síncrono y async (para /health)"""
+    return {
+        "sync": estado_pool(engine),
+        "async": estado_pool(async_engine.sync_engine) if async_engine is not None else None,
+    }
+
 class DatabaseSession:
     """Context manager para manejar sesiones de base de datos"""
     
@@ -0,0 +1,204 @@
+"""
+🔗 ESTADO COMPARTIDO ENTRE WORKERS (REDIS CON RESPALDO LOCAL)
+📁 RUTA: backend/app/core/estado_compartido.py
+
+Con varios workers (backend/gunicorn.conf.py) cada proceso tiene su propia
+memoria: lo que un worker cachea o invalida, los demás no lo ven. Si
+REDIS_URL está definida, las cachés de este módulo viven en Redis y todos
+los workers ven los mismos valores e invalidaciones; sin Redis (o mientras
+no responde) cada proceso usa un diccionario local con el mismo TTL.
+
+- get_redis(): cliente compartido, None sin Redis. Tras un fallo no se
+  reintenta hasta pasados REDIS_REINTENTO_S (un Redis caído no suma
+  timeouts a cada request)
+- get_redis_async(): lo mismo con redis.asyncio, para el código que corre
+  en el event loop en cada request (un Redis lento no congela el worker)
+- CacheCompartida: clave → valor JSON con TTL, agrupadas por espacio
+  (un hash de Redis por espacio: invalidar = un DEL)
+
+Las sesiones de chat (app/services/sesiones_chat.py) tienen su propio
+backend Redis/BD porque necesitan persistencia, no solo caché.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    import redis.asyncio as redis_async
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+PREFIJO = "pili:cache:"
+
+# Entradas locales a partir de las cuales se purgan las expiradas al guardar
+MAX_LOCAL = 1024
+
+_cliente = None
+_reintentar_desde = 0.0
+# El cliente async es del event loop que lo creó (uno por worker)
+_cliente_async = None
+_loop_async = None
+_lock = threading.Lock()
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔌 CLIENTE REDIS
+# ═══════════════════════════════════════════════════════════════
+
+def get_redis():
+    """Cliente Redis compartido por el proceso, o None si no hay/no responde"""
+    global _cliente, _reintentar_desde
+    if not settings.REDIS_URL or not REDIS_AVAILABLE:
+        return None
+    if _cliente is not None:
+        return _cliente
+
+    with _lock:
+        if _cliente is None and time.monotonic() >= _reintentar_desde:
+            try:
+                cliente = redis.Redis.from_url(
+                    settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+                cliente.ping()
+                _cliente = cliente
+                logger.info("✅ Estado compartido en Redis")
+            except Exception as e:
+                _reintentar_desde = time.monotonic() + settings.REDIS_REINTENTO_S
+                logger.warning(f"⚠️ Redis no disponible ({e}), estado local por worker")
+    return _cliente
+
+
+def get_redis_async():
+    """
+    Cliente redis.asyncio del event loop actual, o None si no hay Redis o
+    está en espera de reintento (comparte ese estado con get_redis). No
+    hace I/O: si Redis no responde, falla el primer comando y quien lo usa
+    llama a reportar_fallo_redis.
+    """
+    global _cliente_async, _loop_async
+    if not settings.REDIS_URL or not REDIS_AVAILABLE:
+        return None
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _cliente_async is None or _loop_async is not loop:
+            if time.monotonic() < _reintentar_desde:
+                return None
+            _cliente_async = redis_async.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+            _loop_async = loop
+        return _cliente_async
+
+
+def redis_async_activo() -> bool:
+    """Si get_redis_async() tiene un cliente en uso (para /api/system)"""
+    return _cliente_async is not None
+
+
+def reportar_fallo_redis(error: Exception):
+    """Descarta los clientes tras un error: respaldo local hasta el próximo reintento"""
+    global _cliente, _cliente_async, _reintentar_desde
+    with _lock:
+        if _cliente is not None or _cliente_async is not None:
+            logger.warning(f"⚠️ Error de Redis ({error}), estado local durante {settings.REDIS_REINTENTO_S}s")
+        viejo, loop = _cliente_async, _loop_async
+        _cliente = _cliente_async = None
+        _reintentar_desde = time.monotonic() + settings.REDIS_REINTENTO_S
+    # Las conexiones del cliente async se cierran en su propio event loop
+    if viejo is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(lambda: loop.create_task(viejo.aclose()))
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🗃️ CACHÉ COMPARTIDA
+# ═══════════════════════════════════════════════════════════════
+
+class CacheCompartida:
+    """
+    🗃️ Caché TTL compartida entre workers
+
+    Los valores deben ser serializables a JSON (se guardan igual en Redis
+    y en local, así ningún worker ve tipos distintos según el backend).
+    None no se cachea: `obtener` devuelve None en un fallo.
+    """
+
+    def __init__(self, espacio: str, ttl_s: float):
+        self.espacio = espacio
+        self.ttl_s = ttl_s
+        self._clave_redis = f"{PREFIJO}{espacio}"
+        self._local: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _campo(clave) -> str:
+        return json.dumps(clave, default=str, separators=(",", ":"))
+
+    def obtener(self, clave) -> Optional[Any]:
+        campo = self._campo(clave)
+        cliente = get_redis()
+        if cliente is not None:
+            try:
+                guardado = cliente.hget(self._clave_redis, campo)
+                if guardado is None:
+                    return None
+                expira, valor = json.loads(guardado)
+                # Epoch: los workers no comparten reloj monotónico
+                return valor if expira > time.time() else None
+            except Exception as e:
+                reportar_fallo_redis(e)
+
+        with self._lock:
+            entrada = self._local.get(campo)
+        if entrada and entrada[0] > time.monotonic():
+            return json.loads(entrada[1])
+        return None
+
+    def guardar(self, clave, valor: Any, ttl_s: float = None):
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        campo = self._campo(clave)
+        cliente = get_redis()
+        if cliente is not None:
+            try:
+                with cliente.pipeline() as pipe:
+                    pipe.hset(self._clave_redis, campo, json.dumps([time.time() + ttl, valor], default=str))
+                    # El hash entero caduca si nadie escribe: no acumula claves viejas
+                    pipe.expire(self._clave_redis, max(1, int(ttl) + 1))
+                    pipe.execute()
+                return
+            except Exception as e:
+                reportar_fallo_redis(e)
+
+        ahora = time.monotonic()
+        with self._lock:
+            if len(self._local) >= MAX_LOCAL:
+                self._local = {c: e for c, e in self._local.items() if e[0] > ahora}
+            self._local[campo] = (ahora + ttl, json.dumps(valor, default=str))
+
+    def invalidar(self):
+        """Descarta todo el espacio, en todos los workers si hay Redis"""
+        with self._lock:
+            self._local.clear()
+        cliente = get_redis()
+        if cliente is not None:
+            try:
+                cliente.delete(self._clave_redis)
+            except Exception as e:
+                reportar_fallo_redis(e)
+
+    def estado(self) -> Dict[str, Any]:
+        cliente = get_redis()
+        if cliente is not None:
+            try:
+                return {"backend": "redis", "entradas": cliente.hlen(self._clave_redis), "ttl_s": self.ttl_s}
+            except Exception as e:
+                reportar_fallo_redis(e)
+        with self._lock:
+            return {"backend": "local", "entradas": len(self._local), "ttl_s": self.ttl_s}
@@ -0,0 +1,300 @@
+"""
+📈 MÉTRICAS OPERATIVAS (PROMETHEUS)
+📁 RUTA: backend/app/core/metricas.py
+
+/health solo hace ping a la BD y las estadísticas de PILI son estimadas.
+Para dimensionar los límites de producción (2 CPU / 4 GB del backend en
+docker-compose.production.yml) hacen falta números reales, expuestos en
+formato de texto Prometheus en GET /metrics:
+
+- HTTP: latencia por ruta (plantilla de FastAPI, no la URL), requests por
+  estado y requests en curso (`MiddlewareMetricas`)
+- LLM: latencia y errores por proveedor
+- RAG: latencia de búsqueda, embeddings y Chroma
+- Render: latencia de gráficas/docx/pdf y profundidad de la cola del pool
+  de gráficas
+- OCR: páginas procesadas y segundos por página (páginas/s = rate())
+- Cachés: consultas por resultado (acierto/fallo) → ratio de aciertos
+- BD: checkouts del pool y conexiones prestadas
+- Admisión: rechazos 429 por clase/motivo y unidades de la compuerta en uso
+
+Las latencias de LLM, RAG, OCR y render salen de los spans que ya mide
+app/core/tracing.py (`observar_span`), aunque el request no esté trazado.
+
+Multiproceso (uvicorn --workers / gunicorn): con PROMETHEUS_MULTIPROC_DIR
+cada worker escribe sus valores en ese directorio y /metrics los agrega
+todos. El directorio debe vaciarse antes de arrancar los workers.
+
+Sin prometheus_client las métricas son no-ops y /metrics responde 503.
+"""
+
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.tracing import observar_span
+
+logger = logging.getLogger(__name__)
+
+# El modo multiproceso de prometheus_client se decide al importarlo
+if settings.PROMETHEUS_MULTIPROC_DIR and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    if "prometheus_client" in sys.modules:
+        logger.warning("⚠️ prometheus_client ya importado: PROMETHEUS_MULTIPROC_DIR no tendrá efecto")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(settings.PROMETHEUS_MULTIPROC_DIR)
+
+MULTIPROCESO = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+if MULTIPROCESO:
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+        disable_created_metrics, generate_latest, multiprocess,
+    )
+    # Sin series *_created: solo duplican el tamaño del scrape
+    disable_created_metrics()
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    logger.warning("⚠️ prometheus_client no instalado: /metrics deshabilitado")
+
+# Ruta para requests que no coinciden con ninguna (404): no explota la cardinalidad
+RUTA_SIN_COINCIDENCIA = "sin_ruta"
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_LLM = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+BUCKETS_OPERACION = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧱 DEFINICIÓN DE MÉTRICAS
+# ═══════════════════════════════════════════════════════════════
+
+class _MetricaNula:
+    """Métrica vacía cuando prometheus_client no está instalado"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def observe(self, *args, **kwargs):
+        pass
+
+
+def _contador(nombre: str, ayuda: str, etiquetas=()):
+    return Counter(nombre, ayuda, etiquetas) if PROMETHEUS_AVAILABLE else _MetricaNula()
+
+
+def _histograma(nombre: str, ayuda: str, etiquetas=(), buckets=BUCKETS_OPERACION):
+    return Histogram(nombre, ayuda, etiquetas, buckets=buckets) if PROMETHEUS_AVAILABLE else _MetricaNula()
+
+
+def _gauge(nombre: str, ayuda: str, etiquetas=()):
+    if not PROMETHEUS_AVAILABLE:
+        return _MetricaNula()
+    # livesum: suma de los workers vivos (los muertos no cuentan)
+    return Gauge(nombre, ayuda, etiquetas, multiprocess_mode="livesum")
+
+
+# HTTP
+http_requests = _contador(
+    "pili_http_requests_total", "Requests HTTP atendidos", ("metodo", "ruta", "estado"))
+http_duracion = _histograma(
+    "pili_http_request_duration_seconds", "Latencia de los requests HTTP por ruta",
+    ("metodo", "ruta"), BUCKETS_HTTP)
+http_en_curso = _gauge(
+    "pili_http_requests_en_curso", "Requests HTTP en curso")
+
+# LLM
+llm_duracion = _histograma(
+    "pili_llm_request_duration_seconds", "Latencia de las llamadas a proveedores LLM",
+    ("proveedor",), BUCKETS_LLM)
+llm_errores = _contador(
+    "pili_llm_errores_total", "Llamadas a proveedores LLM que fallaron", ("proveedor", "error"))
+
+# RAG
+rag_duracion = _histograma(
+    "pili_rag_duration_seconds", "Latencia de las operaciones RAG (búsqueda, embeddings, Chroma)",
+    ("operacion",))
+
+# Render de documentos y gráficas
+render_duracion = _histograma(
+    "pili_render_duration_seconds", "Latencia de render (gráficas, docx, pdf)", ("tipo",))
+render_cola = _gauge(
+    "pili_render_cola", "Renders enviados al pool y aún sin terminar", ("tipo",))
+
+# OCR
+ocr_paginas = _contador(
+    "pili_ocr_paginas_total", "Páginas/imágenes procesadas con OCR", ("origen",))
+ocr_duracion = _histograma(
+    "pili_ocr_pagina_duration_seconds", "Segundos de OCR por página", ("origen",))
+
+# Cachés
+cache_consultas = _contador(
+    "pili_cache_consultas_total", "Consultas a cachés en memoria por resultado", ("cache", "resultado"))
+
+# Base de datos
+bd_checkouts = _contador(
+    "pili_bd_pool_checkouts_total", "Conexiones tomadas del pool de la BD", ("driver",))
+bd_prestadas = _gauge(
+    "pili_bd_pool_conexiones_prestadas", "Conexiones del pool de la BD en uso", ("driver",))
+
+# Control de admisión (app/core/admision.py)
+admision_rechazos = _contador(
+    "pili_admision_rechazos_total", "Requests rechazados con 429 por clase y motivo", ("clase", "motivo"))
+admision_en_uso = _gauge(
+    "pili_admision_unidades_en_uso", "Unidades de la compuerta de concurrencia ocupadas")
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔭 SPANS → MÉTRICAS
+# ═══════════════════════════════════════════════════════════════
+
+PROVEEDORES_LLM = ("gemini", "openai", "anthropic", "groq", "together", "cohere")
+
+# RAG: la etiqueta es el nombre del span; render: span → tipo de render
+SPANS_RAG = ("rag.search", "rag.add_document", "rag.add_chunks", "rag.encode", "chroma.query", "chroma.add")
+SPANS_RENDER = {"chart.render": "grafica", "docx.save": "docx", "pdf.build": "pdf"}
+
+
+def _observar_llm(proveedor: str):
+    def observador(segundos: float, error: Optional[str], atributos: Dict[str, Any]):
+        llm_duracion.labels(proveedor).observe(segundos)
+        if error:
+            llm_errores.labels(proveedor, error).inc()
+    return observador
+
+
+def _observar_histograma(histograma, etiqueta: str):
+    def observador(segundos: float, error: Optional[str], atributos: Dict[str, Any]):
+        histograma.labels(etiqueta).observe(segundos)
+    return observador
+
+
+def _observar_ocr(segundos: float, error: Optional[str], atributos: Dict[str, Any]):
+    origen = atributos.get("origen", "desconocido")
+    ocr_paginas.labels(origen).inc()
+    ocr_duracion.labels(origen).observe(segundos)
+
+
+if PROMETHEUS_AVAILABLE:
+    # gemini_service mide "gemini.generate"; multi_ia_service, "llm.<proveedor>"
+    observar_span("gemini.generate", _observar_llm("gemini"))
+    for _proveedor in PROVEEDORES_LLM:
+        observar_span(f"llm.{_proveedor}", _observar_llm(_proveedor))
+    for _nombre in SPANS_RAG:
+        observar_span(_nombre, _observar_histograma(rag_duracion, _nombre))
+    for _nombre, _tipo in SPANS_RENDER.items():
+        observar_span(_nombre, _observar_histograma(render_duracion, _tipo))
+    observar_span("ocr.tesseract", _observar_ocr)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧰 AYUDANTES PARA LOS SERVICIOS
+# ═══════════════════════════════════════════════════════════════
+
+def contar_cache(cache: str, acierto: bool):
+    """Suma una consulta a la caché `cache` (ratio = aciertos / total)"""
+    cache_consultas.labels(cache, "acierto" if acierto else "fallo").inc()
+
+
+@contextmanager
+def en_cola_render(tipo: str):
+    """Cuenta un render como pendiente mientras espera/corre en el pool"""
+    gauge = render_cola.labels(tipo)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def instrumentar_pool(engine_sync):
+    """Checkouts y conexiones prestadas del pool de `engine_sync`"""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    from sqlalchemy import event
+
+    driver = engine_sync.dialect.driver
+    checkouts = bd_checkouts.labels(driver)
+    prestadas = bd_prestadas.labels(driver)
+
+    @event.listens_for(engine_sync, "checkout")
+    def _checkout(conexion_dbapi, registro, proxy):
+        checkouts.inc()
+        prestadas.inc()
+
+    @event.listens_for(engine_sync, "checkin")
+    def _checkin(conexion_dbapi, registro):
+        prestadas.dec()
+
+
+def marcar_proceso_terminado(pid: int):
+    """Descarta los gauges de un worker muerto (hook child_exit de gunicorn)"""
+    if PROMETHEUS_AVAILABLE and MULTIPROCESO:
+        multiprocess.mark_process_dead(pid)
+
+
+def exportar() -> Tuple[bytes, str]:
+    """Texto Prometheus de este proceso o, en multiproceso, de todos los workers"""
+    if MULTIPROCESO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌐 MIDDLEWARE ASGI
+# ═══════════════════════════════════════════════════════════════
+
+class MiddlewareMetricas:
+    """
+    Latencia, estado y requests en curso por ruta.
+
+    La ruta es la plantilla que resolvió FastAPI (/api/documentos/{id}),
+    que el router deja en scope["route"] después de atender el request.
+    ASGI puro, como MiddlewareTrazas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROMETHEUS_AVAILABLE:
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        http_en_curso.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            http_en_curso.dec()
+            duracion = time.perf_counter() - inicio
+            ruta = getattr(scope.get("route"), "path", None) or RUTA_SIN_COINCIDENCIA
+            metodo = scope.get("method", "GET")
+            http_requests.labels(metodo, ruta, str(estado)).inc()
+            http_duracion.labels(metodo, ruta).observe(duracion)
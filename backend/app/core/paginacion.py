@@ -0,0 +1,211 @@
+"""
+Paginación por cursor (keyset) y selección de campos para listados
+
+- Orden estable por (fecha, id) descendente, apoyado en índices compuestos
+  con ese mismo orden (`indice_keyset`); las filas sin fecha van al final
+  (NULLS LAST en todos los motores)
+- Cada página es un rango del índice: sin OR en el WHERE (con OR PostgreSQL
+  filtra y ordena en vez de recorrer el índice); las filas sin fecha se
+  leen con una segunda consulta solo cuando se acaban las fechadas
+- El cursor es opaco (base64 de la última clave de la página): la página
+  500 cuesta lo mismo que la primera, a diferencia de OFFSET
+- Solo se leen las columnas pedidas (`?fields=`); las columnas pesadas
+  (JSON, textos extraídos) nunca se cargan si no se piden
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Index, String, select, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+HEADER_CURSOR = "X-Next-Cursor"
+
+
+def resolver_campos(
+    fields: Optional[str],
+    disponibles: Sequence[str],
+    por_defecto: Sequence[str]
+) -> List[str]:
+    """
+    Campos a devolver a partir de `?fields=a,b,c`
+
+    Raises:
+        ValueError: si se pide un campo que no existe
+    """
+    if not fields:
+        return list(por_defecto)
+
+    campos = [c.strip() for c in fields.split(",") if c.strip()]
+    desconocidos = [c for c in campos if c not in disponibles]
+    if desconocidos:
+        raise ValueError(
+            f"Campos no válidos: {', '.join(desconocidos)}. Disponibles: {', '.join(disponibles)}"
+        )
+    if "id" not in campos:
+        campos.insert(0, "id")
+    return campos
+
+
+def codificar_cursor(valor: Any, id_: int) -> str:
+    """Cursor opaco con la clave (fecha, id) de la última fila"""
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, id_], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    """
+    Clave (fecha ISO o None, id) del cursor
+
+    Raises:
+        ValueError: cursor mal formado o manipulado
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valor, id_ = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if valor is not None:
+            # Solo fechas ISO: cualquier otro tipo fallaría después en la consulta
+            datetime.fromisoformat(valor)
+        if isinstance(id_, bool) or not isinstance(id_, int):
+            raise TypeError(id_)
+        return valor, id_
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def _fecha_como_texto(dialecto: str) -> bool:
+    """
+    SQLite guarda las fechas como texto y `server_default=now()` no incluye
+    microsegundos; comparar contra un datetime formateado por SQLAlchemy
+    (con microsegundos) daría saltos o repetidos. Allí se compara el texto
+    tal como está guardado (type_coerce no emite CAST: el índice se usa).
+    """
+    return dialecto == "sqlite"
+
+
+def _no_postgresql(ddl, target, bind, **kw) -> bool:
+    return bind.dialect.name != "postgresql"
+
+
+def indice_keyset(nombre: str, columna_fecha, columna_id) -> Tuple[Index, Index]:
+    """
+    Índice compuesto con el orden exacto de los listados: (fecha DESC NULLS
+    LAST, id DESC). Un índice (fecha, id) ascendente recorrido hacia atrás
+    da DESC NULLS FIRST en PostgreSQL, y la página pasa a filtrar y ordenar.
+
+    SQLite no admite NULLS LAST en CREATE INDEX; allí NULL es el menor valor
+    y con DESC ya queda al final. Se declara una variante por motor con el
+    mismo nombre (solo se crea la que corresponde).
+    """
+    return (
+        Index(nombre, columna_fecha.desc().nulls_last(), columna_id.desc()).ddl_if(dialect="postgresql"),
+        Index(nombre, columna_fecha.desc(), columna_id.desc()).ddl_if(callable_=_no_postgresql),
+    )
+
+
+def _consulta_keyset(dialecto, modelo, campos, columna_fecha, filtros, cursor, limit, skip, expresiones=None):
+    """
+    SELECT de la página (limit + 1 filas para saber si hay siguiente) y,
+    si la página empieza en el tramo con fecha, el SELECT de las filas sin
+    fecha que la completan (sin LIMIT: lo pone quien la ejecuta)
+    """
+    como_texto = _fecha_como_texto(dialecto)
+    fecha = type_coerce(columna_fecha, String) if como_texto else columna_fecha
+    expresiones = expresiones or {}
+    columnas = [
+        expresiones[c].label(c) if c in expresiones else getattr(modelo, c)
+        for c in campos
+    ]
+    base = select(*columnas, fecha.label("_clave_fecha"), modelo.id.label("_clave_id")).where(*filtros)
+    orden = (fecha.desc().nulls_last(), modelo.id.desc())
+    # Tramo final: filas sin fecha, por id. Con el orden completo (no solo id)
+    # es el rango `fecha IS NULL` del índice compuesto
+    sin_fecha = base.where(columna_fecha.is_(None)).order_by(*orden)
+
+    if not cursor:
+        consulta = base.order_by(*orden)
+        if skip:
+            consulta = consulta.offset(skip)
+        return consulta.limit(limit + 1), None
+
+    valor, id_ = decodificar_cursor(cursor)
+    if valor is None:
+        # Ya en el tramo final sin fecha: solo quedan esas
+        return sin_fecha.where(modelo.id < id_).limit(limit + 1), None
+
+    if not como_texto:
+        valor = datetime.fromisoformat(valor)
+    # La comparación de tuplas descarta los NULL: van en la segunda consulta
+    consulta = base.where(tuple_(fecha, modelo.id) < tuple_(valor, id_))
+    consulta = consulta.order_by(*orden).limit(limit + 1)
+    return consulta, sin_fecha
+
+
+def _pagina(filas, campos, limit) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ultima._clave_fecha, ultima._clave_id)
+
+    return [{c: getattr(fila, c) for c in campos} for fila in filas], siguiente
+
+
+def listar_keyset(
+    db: Session,
+    modelo,
+    campos: Sequence[str],
+    columna_fecha,
+    filtros: Sequence = (),
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    skip: int = 0,
+    expresiones: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Página de `modelo` ordenada por (columna_fecha, id) descendente
+
+    Args:
+        campos: columnas a proyectar (solo esas se leen de la BD)
+        cursor: cursor devuelto por la página anterior
+        expresiones: campos calculados en SQL {nombre: expresión} (ej: subconsultas)
+        skip: OFFSET clásico, solo si no hay cursor (compatibilidad)
+
+    Returns:
+        (filas como dicts, cursor de la página siguiente o None)
+
+    Raises:
+        ValueError: cursor inválido
+    """
+    consulta, sin_fecha = _consulta_keyset(
+        db.get_bind().dialect.name, modelo, campos, columna_fecha, filtros, cursor, limit, skip, expresiones
+    )
+    filas = db.execute(consulta).all()
+    if sin_fecha is not None and len(filas) <= limit:
+        filas += db.execute(sin_fecha.limit(limit + 1 - len(filas))).all()
+    return _pagina(filas, campos, limit)
+
+
+async def listar_keyset_async(
+    db: AsyncSession,
+    modelo,
+    campos: Sequence[str],
+    columna_fecha,
+    filtros: Sequence = (),
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    skip: int = 0,
+    expresiones: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Igual que listar_keyset, con AsyncSession"""
+    consulta, sin_fecha = _consulta_keyset(
+        db.bind.dialect.name, modelo, campos, columna_fecha, filtros, cursor, limit, skip, expresiones
+    )
+    filas = (await db.execute(consulta)).all()
+    if sin_fecha is not None and len(filas) <= limit:
+        filas += (await db.execute(sin_fecha.limit(limit + 1 - len(filas)))).all()
+    return _pagina(filas, campos, limit)
@@ -0,0 +1,158 @@
+"""
+🚀 SERVIDOR DE PRODUCCIÓN: WORKERS, PRECARGA Y DIMENSIONAMIENTO
+📁 RUTA: backend/app/core/servidor.py
+
+Apoyo a backend/gunicorn.conf.py (gunicorn + UvicornWorker con
+preload_app). El maestro importa la app y los modelos una sola vez y los
+workers se crean con fork: las páginas de solo lectura (pesos de
+sentence-transformers y spaCy, catálogos, plantillas compiladas) quedan
+compartidas por copy-on-write en vez de cargarse una vez por worker.
+
+- recursos_disponibles(): CPUs y memoria del contenedor (límites de
+  cgroup; os.cpu_count() devuelve las del host)
+- calcular_workers(): cuántos workers caben en esos recursos
+- precargar_modelos(): importa los singletons pesados en el maestro
+
+Lo que no sobrevive a un fork se suelta en el hijo con un hook de
+os.register_at_fork en el módulo que lo crea: pools de conexiones
+(app/core/database.py), pool de render (chart_engine) y clientes de Chroma
+(rag_engine y app/services/rag_service.py, que se reabren al primer uso).
+"""
+
+import importlib
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Fracción de la memoria del contenedor para los workers: el resto queda
+# para el maestro, los procesos de render de gráficas y picos
+FRACCION_MEMORIA = 0.8
+
+# Singletons pesados (modelos, motores) que conviene cargar antes del fork
+MODULOS_PRECARGA = (
+    "app.services.pili_brain",
+    "app.services.gemini_service",
+    "app.services.professional.rag.rag_engine",
+    "app.services.professional.ml.ml_engine",
+    "app.services.professional.charts.chart_engine",
+    "app.services.professional.processors.file_processor_pro",
+)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📏 RECURSOS DEL CONTENEDOR
+# ═══════════════════════════════════════════════════════════════
+
+def _leer(ruta: str) -> Optional[str]:
+    try:
+        return Path(ruta).read_text().strip()
+    except OSError:
+        return None
+
+
+def cpus_disponibles() -> float:
+    """CPUs asignadas: cuota de cgroup (v2 o v1) o afinidad del proceso"""
+    cpu_max = _leer("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        cuota, periodo = cpu_max.split()[:2]
+        if cuota != "max":
+            return max(1.0, int(cuota) / int(periodo))
+
+    cuota, periodo = _leer("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _leer("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if cuota and periodo and int(cuota) > 0:
+        return max(1.0, int(cuota) / int(periodo))
+
+    if hasattr(os, "sched_getaffinity"):
+        return float(len(os.sched_getaffinity(0)))
+    return float(os.cpu_count() or 1)
+
+
+def memoria_disponible_mb() -> Optional[int]:
+    """Límite de memoria del cgroup, o la memoria física si no hay límite"""
+    for ruta in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        valor = _leer(ruta)
+        # cgroup v1 sin límite reporta un número enorme (~2^63)
+        if valor and valor != "max" and int(valor) < 1 << 60:
+            return int(valor) // MB
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // MB
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def recursos_disponibles() -> Tuple[float, Optional[int]]:
+    return cpus_disponibles(), memoria_disponible_mb()
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧮 WORKERS
+# ═══════════════════════════════════════════════════════════════
+
+def workers_por_cpu(cpus: float) -> int:
+    """2 × CPUs + 1: mientras un worker espera al LLM o a la BD otro usa la CPU"""
+    return 2 * max(1, math.ceil(cpus)) + 1
+
+
+def workers_por_memoria(memoria_mb: Optional[int], mb_por_worker: float, mb_compartidos: float = 0) -> Optional[int]:
+    """Workers que caben en la memoria (None si no se conoce)"""
+    if not memoria_mb or mb_por_worker <= 0:
+        return None
+    return int((memoria_mb * FRACCION_MEMORIA - mb_compartidos) // mb_por_worker)
+
+
+def calcular_workers(cpus: float = None, memoria_mb: Optional[int] = None,
+                     mb_por_worker: float = None, mb_compartidos: float = 0) -> Dict[str, Optional[int]]:
+    """
+    Workers recomendados: el menor entre el límite por CPU y el de memoria
+    (al menos 1). `mb_compartidos` es lo que el maestro comparte por
+    copy-on-write y no se multiplica por worker.
+    """
+    if cpus is None or memoria_mb is None:
+        cpus_detectadas, memoria_detectada = recursos_disponibles()
+        cpus = cpus if cpus is not None else cpus_detectadas
+        memoria_mb = memoria_mb if memoria_mb is not None else memoria_detectada
+    if mb_por_worker is None:
+        mb_por_worker = settings.SERVIDOR_MB_POR_WORKER
+
+    por_cpu = workers_por_cpu(cpus)
+    por_memoria = workers_por_memoria(memoria_mb, mb_por_worker, mb_compartidos)
+    workers = por_cpu if por_memoria is None else min(por_cpu, por_memoria)
+    return {
+        "workers": max(1, workers),
+        "por_cpu": por_cpu,
+        "por_memoria": por_memoria,
+        "cpus": cpus,
+        "memoria_mb": memoria_mb,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📦 PRECARGA ANTES DEL FORK
+# ═══════════════════════════════════════════════════════════════
+
+def precargar_modelos() -> Dict[str, float]:
+    """
+    Importa los singletons pesados en el proceso actual (el maestro de
+    gunicorn). Un módulo que falla no impide arrancar: el worker lo
+    intentará cargar al usarlo, como sin precarga. Devuelve ms por módulo.
+    """
+    tiempos = {}
+    for modulo in MODULOS_PRECARGA:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(modulo)
+        except Exception as e:
+            logger.warning(f"⚠️ Precarga de {modulo} fallida: {e}")
+            continue
+        tiempos[modulo] = round((time.perf_counter() - inicio) * 1000, 1)
+        logger.info(f"📦 {modulo} precargado ({tiempos[modulo]} ms)")
+    return tiempos
@@ -0,0 +1,449 @@
+"""
+⏱️ TRAZAS DE RENDIMIENTO POR REQUEST
+📁 RUTA: backend/app/core/tracing.py
+
+Para saber dónde se va el tiempo de un request lento (PILIBrain, Gemini,
+RAG, Chroma, gráficas, docx/pdf, BD) sin dependencias externas:
+
+- `span("gemini.generate", agente=...)`: context manager que cuelga un
+  span del span activo (ContextVar: funciona igual en async, en
+  asyncio.to_thread y en hilos lanzados con copy_context)
+- `@trazado("rag.search")`: lo mismo como decorador (sync o async)
+- `MiddlewareTrazas` (main.py): abre la traza del request (una fracción
+  TRACING_MUESTREO, o los que mandan `X-PILI-Trace: 1`) y al terminar
+  registra el árbol de spans en el log (DEBUG, o INFO si es lento). El
+  header `Server-Timing` solo va en los requests forzados (o en todos los
+  trazados con TRACING_SERVER_TIMING): expone tiempos internos
+- Las trazas lentas quedan en un ring buffer en memoria
+  (GET /api/system/traces)
+- Las consultas SQL se suman a la traza con eventos de SQLAlchemy
+
+Sin traza activa (request no muestreado, scripts, tests) `span()` es un
+ContextVar.get() y devuelve un context manager vacío, salvo para los spans
+con observador (`observar_span`, p. ej. app/core/metricas.py), que se
+miden igual para alimentar sus histogramas.
+"""
+
+import functools
+import inspect
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_traza_actual: ContextVar[Optional["Traza"]] = ContextVar("pili_traza", default=None)
+_span_actual: ContextVar[Optional["Span"]] = ContextVar("pili_span", default=None)
+
+# Header para trazar un request aunque el muestreo no lo elija
+HEADER_FORZAR = b"x-pili-trace"
+# Server-Timing: como mucho estas métricas (las de más duración)
+MAX_METRICAS_SERVER_TIMING = 15
+
+# nombre de span → función(segundos, error, atributos) llamada al cerrarlo
+_observadores: Dict[str, Callable[[float, Optional[str], Dict[str, Any]], None]] = {}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌳 SPANS
+# ═══════════════════════════════════════════════════════════════
+
+class Span:
+    """Tramo medido de un request (con sus hijos)"""
+
+    __slots__ = ("nombre", "atributos", "inicio", "fin", "hijos", "error")
+
+    def __init__(self, nombre: str, atributos: Optional[Dict[str, Any]] = None):
+        self.nombre = nombre
+        self.atributos = atributos or {}
+        self.inicio = time.perf_counter()
+        self.fin: Optional[float] = None
+        self.hijos: List["Span"] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duracion_ms(self) -> float:
+        return ((self.fin or time.perf_counter()) - self.inicio) * 1000
+
+    def a_dict(self, origen: float) -> Dict[str, Any]:
+        resultado = {
+            "nombre": self.nombre,
+            "inicio_ms": round((self.inicio - origen) * 1000, 2),
+            "duracion_ms": round(self.duracion_ms, 2),
+        }
+        if self.atributos:
+            resultado["atributos"] = self.atributos
+        if self.error:
+            resultado["error"] = self.error
+        if self.hijos:
+            resultado["hijos"] = [hijo.a_dict(origen) for hijo in list(self.hijos)]
+        return resultado
+
+
+class _SpanNulo:
+    """Context manager vacío cuando no hay traza activa"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+def _notificar(observador: Callable, segundos: float, tipo_exc, atributos: Dict[str, Any]):
+    try:
+        observador(segundos, tipo_exc.__name__ if tipo_exc is not None else None, atributos)
+    except Exception as e:
+        logger.debug(f"Observador de span falló: {e}")
+
+
+class _SpanMedido:
+    """Sin traza activa pero con observador: solo se mide la duración"""
+
+    __slots__ = ("atributos", "observador", "inicio")
+
+    def __init__(self, atributos: Dict[str, Any], observador: Callable):
+        self.atributos = atributos
+        self.observador = observador
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return None
+
+    def __exit__(self, tipo_exc, exc, tb):
+        _notificar(self.observador, time.perf_counter() - self.inicio, tipo_exc, self.atributos)
+        return False
+
+
+class _SpanActivo:
+    __slots__ = ("span", "padre", "observador", "_token")
+
+    def __init__(self, span: Span, padre: Span, observador: Optional[Callable] = None):
+        self.span = span
+        self.padre = padre
+        self.observador = observador
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self.span.inicio = time.perf_counter()
+        # list.append es atómico: hilos hermanos pueden colgar spans a la vez
+        self.padre.hijos.append(self.span)
+        self._token = _span_actual.set(self.span)
+        return self.span
+
+    def __exit__(self, tipo_exc, exc, tb):
+        self.span.fin = time.perf_counter()
+        if tipo_exc is not None:
+            self.span.error = tipo_exc.__name__
+        try:
+            _span_actual.reset(self._token)
+        except ValueError:
+            # Cerrado desde otro contexto (generador consumido en otra tarea)
+            _span_actual.set(self.padre)
+        if self.observador is not None:
+            _notificar(self.observador, self.span.fin - self.span.inicio, tipo_exc, self.span.atributos)
+        return False
+
+
+def span(nombre: str, **atributos):
+    """
+    Mide un tramo dentro de la traza activa
+
+        with span("chroma.query", k=5):
+            ...
+    """
+    padre = _span_actual.get()
+    observador = _observadores.get(nombre)
+    if padre is None:
+        return _SPAN_NULO if observador is None else _SpanMedido(atributos, observador)
+    return _SpanActivo(Span(nombre, atributos), padre, observador)
+
+
+def observar_span(nombre: str, observador: Callable[[float, Optional[str], Dict[str, Any]], None]):
+    """
+    Llama a `observador(segundos, error, atributos)` cada vez que se cierra
+    un span `nombre`, haya o no traza activa (error: nombre de la excepción)
+    """
+    _observadores[nombre] = observador
+
+
+def trazado(nombre: Optional[str] = None):
+    """Decorador: la llamada completa es un span (funciones sync o async)"""
+
+    def decorador(fn: Callable):
+        nombre_span = nombre or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def envoltura_async(*args, **kwargs):
+                with span(nombre_span):
+                    return await fn(*args, **kwargs)
+            return envoltura_async
+
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            with span(nombre_span):
+                return fn(*args, **kwargs)
+        return envoltura
+
+    return decorador
+
+
+def anotar(**atributos):
+    """Agrega atributos al span activo (p. ej. aciertos de caché)"""
+    actual = _span_actual.get()
+    if actual is not None:
+        actual.atributos.update(atributos)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧵 TRAZA DEL REQUEST
+# ═══════════════════════════════════════════════════════════════
+
+class Traza:
+    """Árbol de spans de un request + tiempo de BD acumulado"""
+
+    __slots__ = ("id", "metodo", "ruta", "estado", "raiz", "fecha", "consultas_bd", "ms_bd")
+
+    def __init__(self, metodo: str, ruta: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.metodo = metodo
+        self.ruta = ruta
+        self.estado: Optional[int] = None
+        self.raiz = Span(f"{metodo} {ruta}")
+        self.fecha = datetime.now(timezone.utc)
+        self.consultas_bd = 0
+        self.ms_bd = 0.0
+
+    @property
+    def duracion_ms(self) -> float:
+        return self.raiz.duracion_ms
+
+    def metricas(self) -> Dict[str, float]:
+        """Milisegundos por nombre de span (sumados si se repite)"""
+        totales: Dict[str, float] = {}
+        pendientes = list(self.raiz.hijos)
+        while pendientes:
+            actual = pendientes.pop()
+            totales[actual.nombre] = totales.get(actual.nombre, 0.0) + actual.duracion_ms
+            pendientes.extend(actual.hijos)
+        return totales
+
+    def server_timing(self) -> str:
+        metricas = sorted(self.metricas().items(), key=lambda par: -par[1])[:MAX_METRICAS_SERVER_TIMING]
+        partes = [f"{_token_server_timing(nombre)};dur={ms:.1f}" for nombre, ms in metricas]
+        if self.consultas_bd:
+            partes.append(f'bd;dur={self.ms_bd:.1f};desc="{self.consultas_bd} consultas"')
+        partes.append(f"total;dur={self.duracion_ms:.1f}")
+        partes.append(f'traza;desc="{self.id}"')
+        return ", ".join(partes)
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "metodo": self.metodo,
+            "ruta": self.ruta,
+            "estado": self.estado,
+            "fecha": self.fecha.isoformat(),
+            "duracion_ms": round(self.duracion_ms, 2),
+            "bd": {"consultas": self.consultas_bd, "ms": round(self.ms_bd, 2)},
+            "metricas_ms": {nombre: round(ms, 2) for nombre, ms in self.metricas().items()},
+            "spans": [hijo.a_dict(self.raiz.inicio) for hijo in list(self.raiz.hijos)],
+        }
+
+    def arbol(self) -> str:
+        """Árbol legible para el log"""
+        lineas = [
+            f"⏱️ {self.metodo} {self.ruta} → {self.estado} en {self.duracion_ms:.1f} ms"
+            f" (bd: {self.consultas_bd} consultas, {self.ms_bd:.1f} ms) [traza {self.id}]"
+        ]
+
+        def agregar(actual: Span, nivel: int):
+            atributos = " ".join(f"{k}={v}" for k, v in actual.atributos.items())
+            error = f" ❌ {actual.error}" if actual.error else ""
+            lineas.append(f"{'   ' * nivel}└─ {actual.nombre} {actual.duracion_ms:.1f} ms {atributos}{error}".rstrip())
+            for hijo in list(actual.hijos):
+                agregar(hijo, nivel + 1)
+
+        for hijo in list(self.raiz.hijos):
+            agregar(hijo, 1)
+        return "\n".join(lineas)
+
+
+def _token_server_timing(nombre: str) -> str:
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]", "_", nombre) or "span"
+
+
+def traza_actual() -> Optional[Traza]:
+    return _traza_actual.get()
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🗃️ RING BUFFER DE TRAZAS LENTAS
+# ═══════════════════════════════════════════════════════════════
+
+class RegistroTrazas:
+    """
+    🗃️ Últimas trazas lentas del proceso (cada worker tiene las suyas)
+    """
+
+    def __init__(self, max_trazas: int = None, umbral_lento_ms: float = None):
+        self.max_trazas = max_trazas or settings.TRACING_MAX_TRAZAS
+        self.umbral_lento_ms = umbral_lento_ms if umbral_lento_ms is not None else settings.TRACING_UMBRAL_LENTO_MS
+        self._lentas: "deque[Dict[str, Any]]" = deque(maxlen=self.max_trazas)
+        self._lock = threading.Lock()
+        self.trazadas = 0
+        self.lentas = 0
+
+    def terminar(self, traza: Traza):
+        """Cierra la traza: log del árbol y, si fue lenta, al ring buffer"""
+        self.trazadas += 1
+        if traza.duracion_ms >= self.umbral_lento_ms:
+            self.lentas += 1
+            with self._lock:
+                self._lentas.append(traza.a_dict())
+            logger.info(traza.arbol())
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(traza.arbol())
+
+    def listar(self, limite: int = 20, min_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """Trazas lentas, la más reciente primero"""
+        with self._lock:
+            trazas = list(self._lentas)
+        trazas = [t for t in reversed(trazas) if t["duracion_ms"] >= min_ms]
+        return trazas[:limite]
+
+    def limpiar(self):
+        with self._lock:
+            self._lentas.clear()
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            guardadas = len(self._lentas)
+        return {
+            "muestreo": settings.TRACING_MUESTREO,
+            "server_timing": settings.TRACING_SERVER_TIMING,
+            "umbral_lento_ms": self.umbral_lento_ms,
+            "max_trazas": self.max_trazas,
+            "guardadas": guardadas,
+            "requests_trazados": self.trazadas,
+            "requests_lentos": self.lentas,
+        }
+
+
+# Instancia global
+registro_trazas = RegistroTrazas()
+
+
+def get_registro_trazas() -> RegistroTrazas:
+    """Obtiene el registro de trazas lentas"""
+    return registro_trazas
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌐 MIDDLEWARE ASGI
+# ═══════════════════════════════════════════════════════════════
+
+class MiddlewareTrazas:
+    """
+    Abre una traza por request HTTP muestreado (TRACING_MUESTREO, o
+    header `X-PILI-Trace: 1`). `Server-Timing` se agrega a la respuesta de
+    los requests forzados, o de todos los trazados con TRACING_SERVER_TIMING.
+
+    ASGI puro: sin la tarea extra por request de BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app, muestreo: float = None, registro: RegistroTrazas = None, server_timing: bool = None):
+        self.app = app
+        self.muestreo = settings.TRACING_MUESTREO if muestreo is None else muestreo
+        self.registro = registro or registro_trazas
+        self.server_timing = settings.TRACING_SERVER_TIMING if server_timing is None else server_timing
+
+    @staticmethod
+    def _forzado(scope) -> bool:
+        return any(nombre == HEADER_FORZAR and valor not in (b"", b"0") for nombre, valor in scope.get("headers", ()))
+
+    def _muestrear(self) -> bool:
+        return self.muestreo >= 1 or (self.muestreo > 0 and random.random() < self.muestreo)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        forzado = self._forzado(scope)
+        if not forzado and not self._muestrear():
+            await self.app(scope, receive, send)
+            return
+        con_header = forzado or self.server_timing
+
+        traza = Traza(scope.get("method", "GET"), scope.get("path", ""))
+        token_traza = _traza_actual.set(traza)
+        token_span = _span_actual.set(traza.raiz)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                traza.estado = mensaje["status"]
+                if con_header:
+                    headers = list(mensaje.get("headers", []))
+                    headers.append((b"server-timing", traza.server_timing().encode("latin-1", "replace")))
+                    mensaje = {**mensaje, "headers": headers}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        except Exception as e:
+            traza.raiz.error = type(e).__name__
+            traza.estado = traza.estado or 500
+            raise
+        finally:
+            traza.raiz.fin = time.perf_counter()
+            _span_actual.reset(token_span)
+            _traza_actual.reset(token_traza)
+            try:
+                self.registro.terminar(traza)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo registrar la traza {traza.id}: {e}")
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🗄️ TIEMPO DE BASE DE DATOS
+# ═══════════════════════════════════════════════════════════════
+
+def instrumentar_engine(engine):
+    """Suma cada consulta SQL (número y ms) a la traza activa"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if _traza_actual.get() is not None:
+            conn.info.setdefault("pili_inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        traza = _traza_actual.get()
+        inicios = conn.info.get("pili_inicio_consulta")
+        if traza is None or not inicios:
+            return
+        traza.consultas_bd += 1
+        traza.ms_bd += (time.perf_counter() - inicios.pop()) * 1000
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto_error):
+        conexion = contexto_error.connection
+        if conexion is not None and conexion.info.get("pili_inicio_consulta"):
+            conexion.info["pili_inicio_consulta"].pop()
@@ -21,9 +21,10 @@ ARQUITECTURA HÍBRIDA:
 """
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Body, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from pathlib import Path
 import uvicorn
 from typing import List, Optional, Dict, Any
@@ -35,20 +36,19 @@ from datetime import datetime
 import sys
 sys.path.append(str(Path(__file__).parent))
 
+from app.services.pricing_engine import pricing_engine
+
 # ═══════════════════════════════════════════════════════════════
 # 🔄 CONFIGURACIÓN ROBUSTA CONSERVADA
 # ═══════════════════════════════════════════════════════════════
 
 try:
     from app.core.config import settings, validate_gemini_key, get_gemini_api_key
-    from app.services.gemini_service import gemini_service
-    TIENE_GEMINI_SERVICE = True
     logger = logging.getLogger(__name__)
     logger.info("✅ Servicios existentes cargados correctamente")
 except ImportError as e:
     logger = logging.getLogger(__name__)
     logger.warning(f"⚠️ No se pudieron cargar servicios existentes: {e}")
-    TIENE_GEMINI_SERVICE = False
     
     # Configuración básica si no existe (CONSERVADO)
     class MockSettings:
@@ -63,125 +63,59 @@ except ImportError as e:
     def validate_gemini_key():
         return False
 
-# ═══════════════════════════════════════════════════════════════
-# 🔧 IMPORTACIÓN INTELIGENTE DE ROUTERS AVANZADOS (REPARADO)
-# ═══════════════════════════════════════════════════════════════
+# Con ARRANQUE_DIFERIDO el servidor escucha antes de importar los routers y
+# los servicios pesados; se cargan en segundo plano (app/core/arranque.py)
+ARRANQUE_DIFERIDO = getattr(settings, "ARRANQUE_DIFERIDO", False)
 
-ROUTERS_AVANZADOS_DISPONIBLES = False
-routers_info = {}
+# gemini_service arrastra google.generativeai: se importa aquí o, en
+# arranque diferido, al primer uso / en el precalentamiento
+gemini_service = None
+TIENE_GEMINI_SERVICE = None  # None: aún no se intentó importar
 
-try:
-    logger.info("🔄 Intentando cargar routers avanzados...")
-    
-    # Importar routers uno por uno con manejo individual de errores
-    try:
-        from app.routers import chat
-        routers_info["chat"] = {
-            "router": chat.router,
-            "prefix": "/api/chat",
-            "tags": ["Chat PILI"],
-            "descripcion": "Chat conversacional con PILI IA"
-        }
-        logger.info("✅ Router Chat PILI cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router chat no disponible: {e}")
-    
-    try:
-        from app.routers import cotizaciones
-        routers_info["cotizaciones"] = {
-            "router": cotizaciones.router,
-            "prefix": "/api/cotizaciones",
-            "tags": ["Cotizaciones"],
-            "descripcion": "CRUD completo cotizaciones"
-        }
-        logger.info("✅ Router Cotizaciones cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router cotizaciones no disponible: {e}")
-    
-    try:
-        from app.routers import proyectos
-        routers_info["proyectos"] = {
-            "router": proyectos.router,
-            "prefix": "/api/proyectos",
-            "tags": ["Proyectos"],
-            "descripcion": "Gestión completa de proyectos"
-        }
-        logger.info("✅ Router Proyectos cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router proyectos no disponible: {e}")
-    
-    try:
-        from app.routers import informes
-        routers_info["informes"] = {
-            "router": informes.router,
-            "prefix": "/api/informes",
-            "tags": ["Informes"],
-            "descripcion": "Generación de informes técnicos"
-        }
-        logger.info("✅ Router Informes cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router informes no disponible: {e}")
-    
-    try:
-        from app.routers import documentos
-        routers_info["documentos"] = {
-            "router": documentos.router,
-            "prefix": "/api/documentos",
-            "tags": ["Documentos"],
-            "descripcion": "Gestión y análisis de documentos"
-        }
-        logger.info("✅ Router Documentos cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router documentos no disponible: {e}")
+def cargar_gemini_service() -> bool:
+    """Importa gemini_service una sola vez; True si está disponible"""
+    global gemini_service, TIENE_GEMINI_SERVICE
+    if TIENE_GEMINI_SERVICE is None:
+        try:
+            from app.services.gemini_service import gemini_service as servicio
+            gemini_service = servicio
+            TIENE_GEMINI_SERVICE = True
+        except ImportError as e:
+            logger.warning(f"⚠️ gemini_service no disponible: {e}")
+            TIENE_GEMINI_SERVICE = False
+    return TIENE_GEMINI_SERVICE
 
-    try:
-        from app.routers import clientes
-        routers_info["clientes"] = {
-            "router": clientes.router,
-            "prefix": "/api/clientes",
-            "tags": ["Clientes"],
-            "descripcion": "Gestión de base de datos de clientes"
-        }
-        logger.info("✅ Router Clientes cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router clientes no disponible: {e}")
+if not ARRANQUE_DIFERIDO:
+    cargar_gemini_service()
 
-    try:
-        from app.routers import system
-        routers_info["system"] = {
-            "router": system.router,
-            "prefix": "/api/system",
-            "tags": ["Sistema"],
-            "descripcion": "Health checks y configuración"
-        }
-        logger.info("✅ Router System cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router system no disponible: {e}")
+# ═══════════════════════════════════════════════════════════════
+# 🔧 ROUTERS AVANZADOS (carga inmediata o diferida: app/core/arranque.py)
+# ═══════════════════════════════════════════════════════════════
 
-    try:
-        from app.routers import generar_directo
-        routers_info["generar_directo"] = {
-            "router": generar_directo.router,
-            "prefix": "/api",
-            "tags": ["Generación Directa"],
-            "descripcion": "Generación de documentos sin BD"
-        }
-        logger.info("✅ Router Generación Directa cargado")
-    except Exception as e:
-        logger.warning(f"⚠️ Router generar_directo no disponible: {e}")
-    
-    # Verificar si tenemos suficientes routers para modo completo
-    if len(routers_info) >= 1:  # Al menos uno disponible (especialmente chat)
-        ROUTERS_AVANZADOS_DISPONIBLES = True
-        logger.info(f"🎉 ROUTERS AVANZADOS ACTIVADOS: {len(routers_info)}/6 disponibles")
-        logger.info(f"📋 Routers cargados: {list(routers_info.keys())}")
-    else:
-        logger.warning("⚠️ Ningún router avanzado disponible, manteniendo modo básico")
-        
-except Exception as e:
-    logger.warning(f"⚠️ Error general cargando routers avanzados: {e}")
-    logger.info("🔄 Continuando en modo básico/demo")
-    ROUTERS_AVANZADOS_DISPONIBLES = False
+from app.core.arranque import cargador_routers, MiddlewareCargaDiferida
+
+# app.routers.<nombre> → prefix, tags, descripción. El orden es el de
+# registro: decide qué ruta coincide primero
+for _nombre, _prefix, _tags, _descripcion in (
+    ("chat", "/api/chat", ["Chat PILI"], "Chat conversacional con PILI IA"),
+    ("cotizaciones", "/api/cotizaciones", ["Cotizaciones"], "CRUD completo cotizaciones"),
+    ("proyectos", "/api/proyectos", ["Proyectos"], "Gestión completa de proyectos"),
+    ("informes", "/api/informes", ["Informes"], "Generación de informes técnicos"),
+    ("documentos", "/api/documentos", ["Documentos"], "Gestión y análisis de documentos"),
+    ("clientes", "/api/clientes", ["Clientes"], "Gestión de base de datos de clientes"),
+    ("system", "/api/system", ["Sistema"], "Health checks y configuración"),
+    ("precios", "/api/precios", ["Precios"], "Catálogo de precios (BD + hot reload)"),
+    ("busqueda", "/api/buscar", ["Búsqueda"], "Búsqueda de texto completo (FTS5 / tsvector)"),
+    ("generar_directo", "/api", ["Generación Directa"], "Generación de documentos sin BD"),
+):
+    cargador_routers.registrar(_nombre, _prefix, _tags, _descripcion)
+
+# Routers incluidos en la app (en arranque diferido se va completando)
+routers_info = cargador_routers.routers_info
+
+def routers_avanzados_disponibles() -> bool:
+    """Al menos un router avanzado cargado (especialmente chat)"""
+    return len(routers_info) >= 1
 
 from pydantic import BaseModel
 
@@ -205,6 +139,18 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# ═══════════════════════════════════════════════════════════════
+# 🚦 CONTROL DE ADMISIÓN (límite de tasa + concurrencia, 429)
+# ═══════════════════════════════════════════════════════════════
+
+try:
+    from app.core.admision import MiddlewareAdmision
+    # Agregado antes que CORS: las respuestas 429 también llevan sus headers
+    if getattr(settings, "ADMISION_HABILITADA", False):
+        app.add_middleware(MiddlewareAdmision)
+except Exception as e:
+    logger.warning(f"⚠️ Control de admisión no disponible: {e}")
+
 # ═══════════════════════════════════════════════════════════════
 # CONFIGURACIÓN DE CORS (CONSERVADO)
 # ═══════════════════════════════════════════════════════════════
@@ -224,29 +170,54 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# ═══════════════════════════════════════════════════════════════
+# ⏱️ TRAZAS DE RENDIMIENTO (/api/system/traces; Server-Timing con X-PILI-Trace)
+# ═══════════════════════════════════════════════════════════════
+
+try:
+    from app.core.tracing import MiddlewareTrazas
+    # Agregado después de CORS: es el más externo y mide el request completo
+    app.add_middleware(MiddlewareTrazas)
+except Exception as e:
+    logger.warning(f"⚠️ Trazas de rendimiento no disponibles: {e}")
+
+# ═══════════════════════════════════════════════════════════════
+# 📈 MÉTRICAS PROMETHEUS (GET /metrics)
+# ═══════════════════════════════════════════════════════════════
+
+try:
+    from app.core.metricas import MiddlewareMetricas
+    # El más externo: la latencia incluye trazas y CORS
+    app.add_middleware(MiddlewareMetricas)
+except Exception as e:
+    logger.warning(f"⚠️ Métricas Prometheus no disponibles: {e}")
+
+# ═══════════════════════════════════════════════════════════════
+# 💰 CATÁLOGO DE PRECIOS (BD compartida por todos los workers)
+# ═══════════════════════════════════════════════════════════════
+
+try:
+    from app.services.price_catalog import price_catalog
+    price_catalog.activar()
+except Exception as e:
+    logger.warning(f"⚠️ Catálogo de precios en BD no disponible: {e}")
+
 # ═══════════════════════════════════════════════════════════════
 # 🔧 REGISTRO DE ROUTERS AVANZADOS (REPARADO)
 # ═══════════════════════════════════════════════════════════════
 
-if ROUTERS_AVANZADOS_DISPONIBLES:
-    logger.info("🔗 Registrando routers avanzados...")
-    routers_registrados = []
-    
+# Las rutas de los routers van aquí: antes que los endpoints de
+# compatibilidad de más abajo, también si se cargan después de arrancar
+cargador_routers.montar(app, diferido=ARRANQUE_DIFERIDO)
+
+if ARRANQUE_DIFERIDO:
+    # El más externo: un request a un router pendiente espera su carga
+    app.add_middleware(MiddlewareCargaDiferida, cargador=cargador_routers)
+    logger.info(f"⚡ Arranque diferido: {len(cargador_routers.specs)} routers se cargan después de escuchar")
+elif routers_avanzados_disponibles():
+    logger.info(f"🎉 ROUTERS REGISTRADOS: {len(routers_info)}/{len(cargador_routers.specs)}")
     for nombre, info in routers_info.items():
-        try:
-            app.include_router(
-                info["router"], 
-                prefix=info["prefix"], 
-                tags=info["tags"]
-            )
-            routers_registrados.append(f"{nombre} -> {info['prefix']}")
-            logger.info(f"✅ Router {nombre}: {info['descripcion']}")
-        except Exception as e:
-            logger.error(f"❌ Error registrando router {nombre}: {e}")
-    
-    logger.info(f"🎉 ROUTERS REGISTRADOS: {len(routers_registrados)}/{len(routers_info)}")
-    for router_info in routers_registrados:
-        logger.info(f"   - {router_info}")
+        logger.info(f"   - {nombre} -> {info['prefix']}")
 else:
     logger.info("🔄 Usando endpoints básicos/mock (compatibilidad frontend)")
 
@@ -274,7 +245,7 @@ except Exception as e:
 async def generar_respuesta_ia(mensaje: str, contexto: str, historial: List[Dict], tipo_flujo: str) -> Dict:
     """Genera respuesta usando Gemini existente o modo demo (CONSERVADO)"""
     
-    if TIENE_GEMINI_SERVICE and validate_gemini_key():
+    if validate_gemini_key() and await run_in_threadpool(cargar_gemini_service):
         # Usar servicio Gemini existente
         try:
             logger.info("🤖 Usando Gemini AI real")
@@ -365,52 +336,32 @@ def generar_cotizacion_demo(mensaje: str, contexto: str) -> Dict:
     
     items = []
     
+    def item_catalogo(codigo: str, cantidad: float) -> Dict:
+        """Item demo con precio del catálogo"""
+        fila = pricing_engine.fila(codigo)
+        return {
+            "codigo": codigo,
+            "descripcion": fila["descripcion"],
+            "cantidad": cantidad,
+            "unidad": fila["unidad"],
+            "precio_unitario": fila["precio"],
+            "subtotal": round(cantidad * fila["precio"], 2)
+        }
+    
     # Generar items inteligentes basados en el mensaje
     if tiene_m2 or 'casa' in mensaje.lower():
         items.extend([
-            {
-                "descripcion": "Punto de luz LED 18W empotrado en techo",
-                "cantidad": 8,
-                "unidad": "pto", 
-                "precio_unitario": 32.00,
-                "subtotal": 256.00
-            },
-            {
-                "descripcion": "Tomacorriente doble con línea a tierra",
-                "cantidad": 6,
-                "unidad": "pto",
-                "precio_unitario": 38.00,
-                "subtotal": 228.00
-            },
-            {
-                "descripcion": "Cable THW 2.5mm² para circuitos de tomacorrientes",
-                "cantidad": 50,
-                "unidad": "m",
-                "precio_unitario": 4.20,
-                "subtotal": 210.00
-            }
+            item_catalogo("MAT-LUZ-01", 8),
+            item_catalogo("MAT-TOM-01", 6),
+            item_catalogo("MAT-THW-25", 50)
         ])
     
     if 'tablero' in mensaje.lower() or len(items) > 2:
-        items.append({
-            "descripcion": "Tablero eléctrico monofásico 12 polos",
-            "cantidad": 1,
-            "unidad": "und",
-            "precio_unitario": 420.00,
-            "subtotal": 420.00
-        })
+        items.append(item_catalogo("MAT-TAB-12", 1))
     
     # Si no hay items específicos, usar items básicos
     if not items:
-        items = [
-            {
-                "descripcion": "Análisis técnico y cotización personalizada",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 150.00,
-                "subtotal": 150.00
-            }
-        ]
+        items = [item_catalogo("SRV-ANA-01", 1)]
     
     # Calcular totales
     subtotal = sum(item["subtotal"] for item in items)
@@ -472,10 +423,11 @@ async def root():
         "message": "Tesla Cotizador API v3.0",
         "status": "running",
         "timestamp": datetime.now().isoformat(),
-        "modo": "COMPLETO" if ROUTERS_AVANZADOS_DISPONIBLES else "BÁSICO",
-        "routers_avanzados": ROUTERS_AVANZADOS_DISPONIBLES,
-        "routers_cargados": list(routers_info.keys()) if ROUTERS_AVANZADOS_DISPONIBLES else [],
-        "gemini_configurado": TIENE_GEMINI_SERVICE and validate_gemini_key(),
+        "modo": "COMPLETO" if routers_avanzados_disponibles() else "BÁSICO",
+        "routers_avanzados": routers_avanzados_disponibles(),
+        "routers_cargados": list(routers_info.keys()),
+        "gemini_configurado": bool(TIENE_GEMINI_SERVICE) and validate_gemini_key(),
+        "arranque": cargador_routers.estado(),
         "endpoints_disponibles": {
             "docs": "/docs",
             "chat": "/api/chat/conversacional",
@@ -507,8 +459,8 @@ async def chat_conversacional(request: ChatRequest):
             "respuesta": respuesta_data.get("respuesta", ""),
             "tipo_flujo": request.tipo_flujo,
             "timestamp": datetime.now().isoformat(),
-            "routers_avanzados_activos": ROUTERS_AVANZADOS_DISPONIBLES,
-            "modo_funcionamiento": "COMPLETO" if ROUTERS_AVANZADOS_DISPONIBLES else "BÁSICO"
+            "routers_avanzados_activos": routers_avanzados_disponibles(),
+            "modo_funcionamiento": "COMPLETO" if routers_avanzados_disponibles() else "BÁSICO"
         }
         
         # Agregar vista HTML si se solicitó y se generó estructura
@@ -534,7 +486,7 @@ async def chat_conversacional(request: ChatRequest):
             "success": False,
             "respuesta": f"Error: {str(e)}. Intenta de nuevo.",
             "html_preview": None,
-            "routers_avanzados_activos": ROUTERS_AVANZADOS_DISPONIBLES
+            "routers_avanzados_activos": routers_avanzados_disponibles()
         }
 
 def generar_html_cotizacion(datos: Dict) -> str:
@@ -729,6 +681,70 @@ async def guardar_informe(data: dict):
         logger.error(f"❌ Error guardando informe: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", include_in_schema=False)
+async def metricas_prometheus():
+    """📈 Métricas operativas en formato de texto Prometheus (todos los workers)"""
+    from app.core.metricas import PROMETHEUS_AVAILABLE, exportar
+
+    if not PROMETHEUS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="prometheus_client no instalado")
+    contenido, tipo = exportar()
+    return Response(content=contenido, media_type=tipo)
+
+# ═══════════════════════════════════════════════════════════════
+# ⌨️ PRECARGA DEL AUTOCOMPLETADO DE CLIENTES
+# ═══════════════════════════════════════════════════════════════
+
+def _precargar_autocompletado():
+    from app.core.database import SessionLocal
+    from app.services.autocompletado_clientes import autocompletado_clientes
+
+    with SessionLocal() as db:
+        autocompletado_clientes.refrescar(db)
+
+@app.on_event("startup")
+async def precargar_autocompletado():
+    """Construye el índice de prefijos al arrancar (no en la primera tecla)"""
+    if ARRANQUE_DIFERIDO:
+        # Después de aceptar conexiones, con el resto del precalentamiento
+        cargador_routers.agregar_precalentamiento("autocompletado", _precargar_autocompletado)
+        return
+    try:
+        await run_in_threadpool(_precargar_autocompletado)
+    except Exception as e:
+        logger.warning(f"⚠️ Autocompletado de clientes sin precargar: {e}")
+
+# ═══════════════════════════════════════════════════════════════
+# ⚡ PRECALENTAMIENTO EN SEGUNDO PLANO (ARRANQUE_DIFERIDO)
+# ═══════════════════════════════════════════════════════════════
+
+@app.on_event("startup")
+async def iniciar_precalentamiento():
+    """Routers, gemini_service y modelos pesados sin retrasar /health"""
+    if ARRANQUE_DIFERIDO:
+        from app.core.servidor import precargar_modelos
+
+        cargador_routers.agregar_precalentamiento("gemini_service", cargar_gemini_service)
+        if getattr(settings, "SERVIDOR_PRECARGA_MODELOS", False):
+            cargador_routers.agregar_precalentamiento("modelos", precargar_modelos)
+    cargador_routers.iniciar_precalentamiento()
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    """Liveness sin dependencias: responde en cuanto el proceso escucha"""
+    return {"status": "ok", "arranque": cargador_routers.estado()}
+
+# ═══════════════════════════════════════════════════════════════
+# 🛑 CIERRE ORDENADO
+# ═══════════════════════════════════════════════════════════════
+
+@app.on_event("shutdown")
+async def cerrar_conexiones():
+    """Cierra las conexiones del pool async (aiosqlite usa un hilo por conexión)"""
+    from app.core.database import async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+
 # ═══════════════════════════════════════════════════════════════
 # 🔄 MANEJO DE ERRORES CONSERVADO
 # ═══════════════════════════════════════════════════════════════
@@ -781,15 +797,17 @@ if __name__ == "__main__":
     logger.info(f"🏠 Root: http://{host}:{puerto}/")
     
     # Estado de servicios
+    if ARRANQUE_DIFERIDO:
+        logger.info("⚡ Arranque diferido: routers y servicios se cargan en segundo plano (GET /health)")
     logger.info(f"🤖 Gemini IA: {'✅ ACTIVADO' if (TIENE_GEMINI_SERVICE and validate_gemini_key()) else '🎭 MODO DEMO'}")
     logger.info(f"🔧 Servicios básicos: {'✅ CARGADOS' if TIENE_GEMINI_SERVICE else '⚠️ MOCK'}")
-    logger.info(f"🚀 Routers avanzados: {'✅ ACTIVOS (PILI completa)' if ROUTERS_AVANZADOS_DISPONIBLES else '⚠️ NO DISPONIBLES'}")
+    logger.info(f"🚀 Routers avanzados: {'✅ ACTIVOS (PILI completa)' if routers_avanzados_disponibles() else '⚠️ NO DISPONIBLES'}")
     
     # Modo de funcionamiento
-    modo = "COMPLETO" if ROUTERS_AVANZADOS_DISPONIBLES else "BÁSICO"
+    modo = "COMPLETO" if routers_avanzados_disponibles() else "BÁSICO"
     logger.info(f"🎯 MODO DE FUNCIONAMIENTO: {modo}")
     
-    if ROUTERS_AVANZADOS_DISPONIBLES:
+    if routers_avanzados_disponibles():
         logger.info("🎉 SISTEMA COMPLETO:")
         logger.info("   - ✅ PILI Agente IA avanzada")
         logger.info("   - ✅ CRUD completo cotizaciones")
@@ -806,6 +824,7 @@ if __name__ == "__main__":
     if not validate_gemini_key():
         logger.info("💡 Para activar IA real, configura GEMINI_API_KEY en tu archivo .env")
     
+    logger.info("💡 Producción multi-worker: gunicorn -c gunicorn.conf.py app.main:app")
     logger.info("=" * 60)
     
     uvicorn.run(
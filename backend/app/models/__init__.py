@@ -7,6 +7,9 @@ from app.models.cotizacion import Cotizacion
 from app.models.documento import Documento
 from app.models.item import Item
 from app.models.informe import Informe
+from app.models.precio import PrecioCatalogo, CatalogoVersion
+from app.models.secuencia import Secuencia
+from app.models.chat_sesion import ChatSesion
 
 __all__ = [
     "Cliente",
@@ -14,5 +17,9 @@ __all__ = [
     "Cotizacion",
     "Documento",
     "Item",
-    "Informe"
+    "Informe",
+    "PrecioCatalogo",
+    "CatalogoVersion",
+    "Secuencia",
+    "ChatSesion"
 ]
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Modelo: ChatSesion (estado de conversaciones de PILI en el servidor)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ChatSesion(Base):
+    """
+    Modelo de Sesión de chat
+    Persistencia de las sesiones cuando no hay Redis: historial, entidades
+    extraídas, adjuntos (referencias al content store) y borrador actual.
+    `version` se incrementa en cada escritura para validar la copia en memoria.
+    """
+    __tablename__ = "chat_sesiones"
+
+    id = Column(String(32), primary_key=True)
+    tipo_flujo = Column(String(100), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    estado = Column(JSON, nullable=False)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    expira_en = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ChatSesion(id='{self.id}', tipo_flujo='{self.tipo_flujo}', version={self.version})>"
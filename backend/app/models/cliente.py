@@ -43,6 +43,8 @@ class Cliente(Base):
     # Metadata
     fecha_registro = Column(DateTime, default=datetime.utcnow)
     fecha_ultima_cotizacion = Column(DateTime, nullable=True)
+    # Huella de cambios para el autocompletado (max() por índice)
+    fecha_modificacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True, index=True)
 
     # Relaciones
     cotizaciones = relationship("Cotizacion", back_populates="cliente_rel")
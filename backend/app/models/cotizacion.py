@@ -4,7 +4,9 @@ Modelo: Cotizacion
 from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from typing import List, Optional
 from app.core.database import Base
+from app.core.paginacion import indice_keyset
 
 class Cotizacion(Base):
     """
@@ -33,7 +35,10 @@ class Cotizacion(Base):
     estado = Column(String(50), default="borrador", index=True)
     
     # Datos estructurados
-    items = Column(JSON, nullable=True)
+    # Los items viven en la tabla `items` (items_rel). La columna JSON
+    # `items` solo conserva datos antiguos hasta migrarlos
+    # (services/cotizacion_items.migrar_items_legacy)
+    items_legacy = Column("items", JSON(none_as_null=True), nullable=True)
     metadata_adicional = Column(JSON, nullable=True)
     
     # Timestamps
@@ -49,32 +54,44 @@ class Cotizacion(Base):
     proyecto_rel = relationship("Proyecto", back_populates="cotizaciones")
 
     # Relación con cliente (nuevo - gestión de clientes)
-    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="SET NULL"), nullable=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="SET NULL"), nullable=True, index=True)
     cliente_rel = relationship("Cliente", back_populates="cotizaciones")
     
-    # Relación con items
+    # Relación con items (selectin: una sola consulta para todos los items
+    # de las cotizaciones cargadas, también en sesiones async)
     items_rel = relationship(
         "Item",
         back_populates="cotizacion",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="[Item.orden, Item.id]",
+        lazy="selectin"
     )
     
     def __repr__(self):
         return f"<Cotizacion(id={self.id}, numero='{self.numero}', cliente='{self.cliente}', total={self.total})>"
     
+    @property
+    def items(self) -> List[dict]:
+        """Items como lista de dicts (formato de la API y los generadores)"""
+        if self.items_rel:
+            return [item.como_item() for item in self.items_rel]
+        return self.items_legacy or []
+    
+    @items.setter
+    def items(self, valores: Optional[List[dict]]):
+        """Reemplaza los items (filas de la tabla `items`)"""
+        from app.models.item import Item
+        self.items_rel = [
+            Item(**Item.fila_desde_dict(datos, orden))
+            for orden, datos in enumerate(valores or [])
+        ]
+        self.items_legacy = None
+    
     def calcular_totales(self):
         """
         Calcular subtotal, IGV y total desde los items
         """
-        if self.items_rel:
-            self.subtotal = sum(item.total for item in self.items_rel)
-        elif self.items and isinstance(self.items, list):
-            self.subtotal = sum(
-                float(item.get("cantidad", 0)) * float(item.get("precio_unitario", 0))
-                for item in self.items
-            )
-        else:
-            self.subtotal = 0.00
+        self.subtotal = sum(float(item.total) for item in self.items_rel) if self.items_rel else 0.00
         
         self.igv = round(self.subtotal * 0.18, 2)
         self.total = round(self.subtotal + self.igv, 2)
@@ -98,4 +115,8 @@ class Cotizacion(Base):
             "proyecto_id": self.proyecto_id,
             "observaciones": self.observaciones,
             "vigencia": self.vigencia,
-        }
\ No newline at end of file
+        }
+
+
+# Paginación por cursor: ORDER BY fecha_creacion DESC NULLS LAST, id DESC
+indice_keyset("ix_cotizaciones_fecha_creacion_id_desc", Cotizacion.fecha_creacion, Cotizacion.id)
@@ -2,9 +2,10 @@
 Modelo: Documento
 """
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, SmallInteger
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.paginacion import indice_keyset
 
 class Documento(Base):
     """
@@ -21,8 +22,13 @@ class Documento(Base):
     tipo_mime = Column(String(100), nullable=False)
     tamano = Column(Integer, nullable=False)
     
-    # Contenido extraído
-    contenido_texto = Column(Text, nullable=True)
+    # Contenido extraído: el texto vive en el content store (gzip por hash),
+    # aquí solo su referencia. Se accede con la propiedad `contenido_texto`.
+    contenido_hash = Column(String(64), nullable=True, index=True)
+    contenido_longitud = Column(Integer, nullable=True)
+    # Columna antigua con el texto en línea: solo filas aún no migradas
+    # (migrar_contenido_documentos.py). Diferida: nunca se carga sin pedirla.
+    contenido_legacy = deferred(Column("contenido_texto", Text, nullable=True))
     metadata_extraida = Column(JSON, nullable=True)
     
     # Estado de procesamiento
@@ -46,6 +52,40 @@ class Documento(Base):
     def __repr__(self):
         return f"<Documento(id={self.id}, nombre='{self.nombre}', procesado={self.procesado})>"
     
+    @property
+    def contenido_texto(self):
+        """Texto extraído completo (se lee del content store al pedirlo)"""
+        if not self.contenido_hash:
+            return self.contenido_legacy
+        cache = self.__dict__.get("_contenido_cache")
+        if cache is None or cache[0] != self.contenido_hash:
+            from app.services.content_store import content_store
+            cache = (self.contenido_hash, content_store.leer(self.contenido_hash))
+            self.__dict__["_contenido_cache"] = cache
+        return cache[1]
+    
+    @contenido_texto.setter
+    def contenido_texto(self, texto):
+        if not texto:
+            self.contenido_hash = None
+            self.contenido_longitud = 0 if texto == "" else None
+        else:
+            from app.services.content_store import content_store
+            self.contenido_hash, self.contenido_longitud = content_store.guardar(texto)
+            self.__dict__["_contenido_cache"] = (self.contenido_hash, texto)
+        # Sin leer la columna antigua (diferida): basta con vaciarla
+        self.contenido_legacy = None
+    
+    def leer_contenido(self, inicio: int = 0, longitud: int = None):
+        """Fragmento del texto extraído (vistas previas) sin cargarlo entero"""
+        if not self.contenido_hash:
+            texto = self.contenido_legacy
+            if texto is None:
+                return None
+            return texto[inicio:] if longitud is None else texto[inicio:inicio + longitud]
+        from app.services.content_store import content_store
+        return content_store.leer_rango(self.contenido_hash, inicio, longitud)
+    
     def marcar_como_procesado(self, contenido: str = None):
         """Marcar documento como procesado"""
         self.procesado = 1
@@ -59,8 +99,11 @@ class Documento(Base):
         self.mensaje_error = mensaje
         self.fecha_procesamiento = func.now()
     
-    def to_dict(self):
-        """Convertir a diccionario"""
+    def to_dict(self, incluir_contenido: bool = False):
+        """
+        Convertir a diccionario
+        El texto extraído solo se incluye (y se lee) con incluir_contenido=True
+        """
         return {
             "id": self.id,
             "nombre": self.nombre,
@@ -68,11 +111,16 @@ class Documento(Base):
             "ruta_archivo": self.ruta_archivo,
             "tipo_mime": self.tipo_mime,
             "tamano": self.tamano,
-            "contenido_texto": self.contenido_texto,
+            "contenido_texto": self.contenido_texto if incluir_contenido else None,
+            "contenido_longitud": self.contenido_longitud,
             "metadata_extraida": self.metadata_extraida,
             "procesado": self.procesado,
             "mensaje_error": self.mensaje_error,
             "fecha_subida": self.fecha_subida.isoformat() if self.fecha_subida else None,
             "fecha_procesamiento": self.fecha_procesamiento.isoformat() if self.fecha_procesamiento else None,
             "proyecto_id": self.proyecto_id,
-        }
\ No newline at end of file
+        }
+
+
+# Paginación por cursor: ORDER BY fecha_subida DESC NULLS LAST, id DESC
+indice_keyset("ix_documentos_fecha_subida_id_desc", Documento.fecha_subida, Documento.id)
@@ -1,24 +1,40 @@
 """
 Modelo: Item (items de cotización)
 """
-from sqlalchemy import Column, Integer, Text, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Numeric, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+# Claves de un item que tienen columna propia (el resto va a datos_extra)
+CAMPOS_ITEM = ("descripcion", "cantidad", "unidad", "precio_unitario", "total", "codigo")
+
 class Item(Base):
     """
     Modelo de Item
     Representa un item individual dentro de una cotización
+    (única fuente de los items: la cotización ya no guarda copia en JSON)
     """
     __tablename__ = "items"
+    __table_args__ = (
+        # Items de una cotización en su orden original, sin ordenar en memoria
+        Index("ix_items_cotizacion_id_orden", "cotizacion_id", "orden"),
+    )
     
     # Campos principales
     id = Column(Integer, primary_key=True, index=True)
     descripcion = Column(Text, nullable=False)
     cantidad = Column(Numeric(10, 2), nullable=False, default=1.0)
+    unidad = Column(String(20), nullable=True, default="und")
     precio_unitario = Column(Numeric(10, 2), nullable=False)
     total = Column(Numeric(10, 2), nullable=False)
     
+    # Código del catálogo de precios (MAT-LUZ-01, ...) para analítica entre cotizaciones
+    codigo = Column(String(50), nullable=True, index=True)
+    # Posición dentro de la cotización
+    orden = Column(Integer, nullable=True, default=0)
+    # Claves adicionales del item original (subtotal, categoria, ...)
+    datos_extra = Column(JSON, nullable=True)
+    
     # Relación con cotización
     cotizacion_id = Column(
         Integer,
@@ -35,13 +51,54 @@ class Item(Base):
         """Calcular el total del item"""
         self.total = round(float(self.cantidad) * float(self.precio_unitario), 2)
     
+    @staticmethod
+    def fila_desde_dict(datos: dict, orden: int = 0, cotizacion_id: int = None) -> dict:
+        """
+        Fila para INSERT a partir de un item en formato dict (API, PILI, Gemini)
+
+        El total se toma de `total`, luego de `subtotal`, y si no viene se
+        calcula como cantidad × precio_unitario.
+        """
+        cantidad = float(datos.get("cantidad") or 1)
+        precio = float(datos.get("precio_unitario") or 0)
+        total = datos.get("total", datos.get("subtotal"))
+        extra = {k: v for k, v in datos.items() if k not in CAMPOS_ITEM}
+        return {
+            "cotizacion_id": cotizacion_id,
+            "descripcion": str(datos.get("descripcion") or ""),
+            "cantidad": cantidad,
+            "unidad": datos.get("unidad") or "und",
+            "precio_unitario": precio,
+            "total": round(float(total) if total is not None else cantidad * precio, 2),
+            "codigo": datos.get("codigo"),
+            "orden": orden,
+            "datos_extra": extra or None,
+        }
+    
+    def como_item(self) -> dict:
+        """Item en el formato dict que usan la API y los generadores Word/PDF"""
+        item = dict(self.datos_extra or {})
+        item.update({
+            "descripcion": self.descripcion,
+            "cantidad": float(self.cantidad) if self.cantidad is not None else 0.00,
+            "unidad": self.unidad or "und",
+            "precio_unitario": float(self.precio_unitario) if self.precio_unitario is not None else 0.00,
+            "total": float(self.total) if self.total is not None else 0.00,
+        })
+        if self.codigo:
+            item["codigo"] = self.codigo
+        return item
+    
     def to_dict(self):
         """Convertir a diccionario"""
         return {
             "id": self.id,
             "descripcion": self.descripcion,
             "cantidad": float(self.cantidad) if self.cantidad else 0.00,
+            "unidad": self.unidad,
             "precio_unitario": float(self.precio_unitario) if self.precio_unitario else 0.00,
             "total": float(self.total) if self.total else 0.00,
+            "codigo": self.codigo,
+            "orden": self.orden,
             "cotizacion_id": self.cotizacion_id,
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,85 @@
+"""
+Modelo: PrecioCatalogo (catálogo de precios unitarios)
+"""
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Numeric, Boolean, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class PrecioCatalogo(Base):
+    """
+    Modelo de Precio de Catálogo
+    Una fila por (código, región, inicio de vigencia) con la regla de
+    cantidad del item. Lo consume PricingEngine.
+    """
+    __tablename__ = "precios_catalogo"
+    __table_args__ = (
+        UniqueConstraint("codigo", "region", "vigente_desde", name="uq_precio_codigo_region_desde"),
+        Index("ix_precio_servicio_codigo", "servicio", "codigo"),
+    )
+
+    # Identificación
+    id = Column(Integer, primary_key=True, index=True)
+    servicio = Column(String(50), nullable=False, index=True)
+    codigo = Column(String(30), nullable=False, index=True)
+    descripcion = Column(Text, nullable=False)
+    unidad = Column(String(20), nullable=False, default="und")
+    precio = Column(Numeric(12, 2), nullable=False)
+
+    # Regla de cantidad (ver pricing_engine._item)
+    fijo = Column(Numeric(10, 2), nullable=True)
+    variable = Column(String(30), nullable=True)
+    divisor = Column(Numeric(10, 4), nullable=False, default=1)
+    factor = Column(Numeric(10, 4), nullable=False, default=1)
+    minimo = Column(Numeric(10, 2), nullable=False, default=0)
+    complejidad = Column(String(20), nullable=False, default="simple")
+    precio_en_cantidad = Column(Boolean, nullable=False, default=False)
+    multiplos = Column(JSON, nullable=True)
+
+    # Región y vigencia
+    region = Column(String(50), nullable=False, default="*")
+    vigente_desde = Column(Date, nullable=True)
+    vigente_hasta = Column(Date, nullable=True)
+
+    # Timestamps
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PrecioCatalogo(codigo='{self.codigo}', region='{self.region}', precio={self.precio})>"
+
+    def to_dict(self):
+        """Convertir a fila de catálogo (formato de pricing_engine)"""
+        return {
+            "id": self.id,
+            "servicio": self.servicio,
+            "codigo": self.codigo,
+            "descripcion": self.descripcion,
+            "unidad": self.unidad,
+            "precio": float(self.precio),
+            "fijo": float(self.fijo) if self.fijo is not None else None,
+            "variable": self.variable,
+            "divisor": float(self.divisor) if self.divisor is not None else 1,
+            "factor": float(self.factor) if self.factor is not None else 1,
+            "minimo": float(self.minimo) if self.minimo is not None else 0,
+            "complejidad": self.complejidad or "simple",
+            "precio_en_cantidad": bool(self.precio_en_cantidad),
+            "multiplos": self.multiplos or {},
+            "region": self.region or "*",
+            "vigente_desde": self.vigente_desde,
+            "vigente_hasta": self.vigente_hasta,
+        }
+
+
+class CatalogoVersion(Base):
+    """
+    Contador de versión del catálogo (una sola fila)
+    Cada escritura lo incrementa; los procesos comparan su versión en
+    memoria para saber si deben recargar.
+    """
+    __tablename__ = "catalogo_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<CatalogoVersion(version={self.version})>"
@@ -5,6 +5,7 @@ from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON, Fore
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.paginacion import indice_keyset
 import enum
 
 class EstadoProyecto(str, enum.Enum):
@@ -77,4 +78,8 @@ class Proyecto(Base):
             "fecha_modificacion": self.fecha_modificacion.isoformat() if self.fecha_modificacion else None,
             "fecha_inicio": self.fecha_inicio.isoformat() if self.fecha_inicio else None,
             "fecha_fin": self.fecha_fin.isoformat() if self.fecha_fin else None,
-        }
\ No newline at end of file
+        }
+
+
+# Paginación por cursor: ORDER BY fecha_creacion DESC NULLS LAST, id DESC
+indice_keyset("ix_proyectos_fecha_creacion_id_desc", Proyecto.fecha_creacion, Proyecto.id)
@@ -0,0 +1,21 @@
+"""
+Modelo: Secuencia (contadores de numeración)
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class Secuencia(Base):
+    """
+    Modelo de Secuencia
+    Un contador por prefijo (ej: COT-202510). `ultimo` es el último número
+    reservado; se incrementa de forma atómica por bloques.
+    """
+    __tablename__ = "secuencias"
+
+    prefijo = Column(String(50), primary_key=True)
+    ultimo = Column(Integer, nullable=False, default=0)
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<Secuencia(prefijo='{self.prefijo}', ultimo={self.ultimo})>"
@@ -1,21 +1,27 @@
 """
 Routers de la API
+
+Los routers se importan al pedirlos (`from app.routers import chat_router`):
+importar el paquete no arrastra las dependencias de todos ellos
+(app/core/arranque.py).
 """
 
-from app.routers.cotizaciones import router as cotizaciones_router
-from app.routers.proyectos import router as proyectos_router
-from app.routers.chat import router as chat_router
-from app.routers.documentos import router as documentos_router
-from app.routers.informes import router as informes_router
-from app.routers.system import router as system_router
-from app.routers.auth import router as auth_router
+import importlib
+
+_ROUTERS = {
+    "cotizaciones_router": "app.routers.cotizaciones",
+    "proyectos_router": "app.routers.proyectos",
+    "chat_router": "app.routers.chat",
+    "documentos_router": "app.routers.documentos",
+    "informes_router": "app.routers.informes",
+    "system_router": "app.routers.system",
+    "auth_router": "app.routers.auth",
+}
+
+__all__ = list(_ROUTERS)
+
 
-__all__ = [
-    "cotizaciones_router",
-    "proyectos_router",
-    "chat_router",
-    "documentos_router",
-    "informes_router",
-    "system_router",
-    "auth_router",
-]
\ No newline at end of file
+def __getattr__(nombre):
+    if nombre in _ROUTERS:
+        return importlib.import_module(_ROUTERS[nombre]).router
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,57 @@
+"""
+Router: Búsqueda
+Búsqueda de texto completo sobre cotizaciones, proyectos, documentos y clientes
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+import time
+
+from app.core.database import get_async_db
+from app.services.busqueda import busqueda_service, TIPOS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# ============================================
+# ENDPOINTS DE BÚSQUEDA
+# ============================================
+
+@router.get("/")
+async def buscar(
+    q: str = Query(..., min_length=2, description="Texto a buscar (cada palabra busca por prefijo)"),
+    tipos: Optional[str] = Query(None, description=f"Tipos separados por coma: {','.join(TIPOS)}"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Búsqueda unificada con ranking por relevancia
+
+    Cada resultado trae `tipo` e `id` de la entidad, el título y un
+    fragmento del texto con las coincidencias entre `<mark>…</mark>`.
+    """
+    lista_tipos = [t.strip() for t in tipos.split(",") if t.strip()] if tipos else None
+    inicio = time.perf_counter()
+    try:
+        resultados = await db.run_sync(
+            lambda sesion: busqueda_service.buscar(sesion.connection(), q, lista_tipos, limit)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return {
+        "consulta": q,
+        "total": len(resultados),
+        "tiempo_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        "resultados": resultados
+    }
+
+@router.get("/estado")
+async def estado_indice():
+    """Motor del índice y número de entradas"""
+    return busqueda_service.estado()
@@ -32,8 +32,9 @@ y Google Bard, pero especializada 100% en servicios eléctricos peruanos.
 - Sugerencias de mejoras ✅
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Body, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from app.core.database import get_db
@@ -44,7 +45,15 @@ from app.schemas.cotizacion import (
     CotizacionResponse
 )
 from app.services.gemini_service import gemini_service
-from app.services.pili_brain import PILIBrain
+from app.services.pili_brain import PILIBrain, complejidad_flujo
+from app.services.sequence_allocator import generar_numero_cotizacion
+from app.services import cotizacion_items
+from app.services.cotizacion_items import insertar_items
+from app.services.busqueda import marcar_pendiente
+from app.services.sesiones_chat import sesiones_chat
+from app.services.contextos_agentes import registro_contextos
+from app.core.tracing import span
+from app.services import vista_previa
 from app.models.cotizacion import Cotizacion
 from app.models.item import Item
 from app.models.proyecto import Proyecto
@@ -65,27 +74,6 @@ pili_brain = PILIBrain()
 
 router = APIRouter()
 
-# Helper para generar número de cotizacion
-def generar_numero_cotizacion(db: Session) -> str:
-    """Generar número único de cotización - Formato: COT-YYYYMM-XXXX"""
-    fecha = datetime.now()
-    prefijo = f"COT-{fecha.strftime('%Y%m')}"
-
-    ultima = db.query(Cotizacion).filter(
-        Cotizacion.numero.like(f"{prefijo}%")
-    ).order_by(Cotizacion.numero.desc()).first()
-
-    if ultima:
-        try:
-            ultimo_num = int(ultima.numero.split('-')[-1])
-            nuevo_num = ultimo_num + 1
-        except:
-            nuevo_num = 1
-    else:
-        nuevo_num = 1
-
-    return f"{prefijo}-{nuevo_num:04d}"
-
 # ═══════════════════════════════════════════════════════════════
 # 🤖 PILI - CONTEXTOS DE SERVICIOS INTELIGENTES v3.0
 # ═══════════════════════════════════════════════════════════════
@@ -539,6 +527,23 @@ CONTEXTOS_SERVICIOS = {
     }
 }
 
+
+def construir_prefijo_sistema(contexto: Dict[str, Any]) -> str:
+    """Parte estática del prompt de un agente (personalidad + rol + prompt especializado)"""
+    partes = [
+        f"Eres {contexto.get('nombre_pili', 'PILI')}.",
+        contexto.get('personalidad', ''),
+        contexto.get('rol_ia', ''),
+        contexto.get('prompt_especializado', ''),
+    ]
+    return "\n\n".join(parte.strip() for parte in partes if parte)
+
+
+# Prefijos precalculados una vez al importar (ver app/services/contextos_agentes.py)
+for _tipo_flujo, _contexto in CONTEXTOS_SERVICIOS.items():
+    registro_contextos.registrar("chat", _tipo_flujo, _contexto.get("nombre_pili", "PILI"),
+                                 construir_prefijo_sistema(_contexto))
+
 # ═══════════════════════════════════════════════════════════════
 # 🛠️ FUNCIONES AUXILIARES PILI
 # ═══════════════════════════════════════════════════════════════
@@ -569,227 +574,118 @@ def obtener_botones_para_etapa(tipo_flujo: str, etapa: str) -> List[str]:
     
     return botones_config.get(etapa, [])
 
-def generar_preview_html_editable(datos: Dict[str, Any], agente: str) -> str:
+def generar_documento_pili(tipo_flujo: str, texto: str, servicio: str) -> Dict[str, Any]:
+    """Genera el documento con el método de PILIBrain que corresponde al flujo"""
+    complejidad = complejidad_flujo(tipo_flujo)
+
+    if "proyecto" in tipo_flujo:
+        return pili_brain.generar_proyecto(texto, servicio, complejidad)
+    if "informe" in tipo_flujo:
+        return pili_brain.generar_informe(texto, servicio, complejidad)
+    return pili_brain.generar_cotizacion(texto, servicio, complejidad)
+
+def guardar_documento_pili(
+    db: Session,
+    tipo_flujo: str,
+    datos: Dict[str, Any],
+    mensaje: str,
+    documento_id: Optional[int] = None
+) -> Optional[int]:
+    """
+    Guarda el borrador de la sesión en BD. Si la sesión ya tiene documento
+    se actualiza esa fila (cotizaciones: DELETE + INSERT de items) en lugar
+    de crear un documento nuevo por turno.
+    """
+    if "cotizacion" in tipo_flujo:
+        cotizacion = db.get(Cotizacion, documento_id) if documento_id else None
+        if cotizacion is None:
+            cotizacion = Cotizacion(
+                numero=generar_numero_cotizacion(db),
+                estado="borrador",
+                fecha_creacion=datetime.now()
+            )
+            db.add(cotizacion)
+        cotizacion.cliente = datos.get('cliente', 'Cliente generado por PILI')
+        cotizacion.proyecto = datos.get('proyecto', 'Proyecto PILI')
+        cotizacion.descripcion = datos.get('descripcion', mensaje[:200])
+        cotizacion.observaciones = datos.get('observaciones', '')
+        cotizacion.subtotal = float(datos.get('subtotal', 0))
+        cotizacion.igv = float(datos.get('igv', 0))
+        cotizacion.total = float(datos.get('total', 0))
+        db.flush()
+
+        # Items: un DELETE + un INSERT multi-fila
+        borrar, insertar, filas = cotizacion_items.sentencias_reemplazo(cotizacion.id, datos.get('items', []))
+        db.execute(borrar)
+        if filas:
+            db.execute(insertar, filas)
+        marcar_pendiente(db, "cotizacion", cotizacion.id)
+        db.commit()
+
+        logger.info(f"✅ Cotización guardada en BD: {cotizacion.numero} (ID: {cotizacion.id})")
+        return cotizacion.id
+
+    if "proyecto" in tipo_flujo:
+        proyecto = db.get(Proyecto, documento_id) if documento_id else None
+        if proyecto is None:
+            proyecto = Proyecto(
+                estado="planificacion",
+                fecha_inicio=datetime.now(),
+                fecha_creacion=datetime.now()
+            )
+            db.add(proyecto)
+        proyecto.nombre = datos.get('nombre', 'Proyecto generado por PILI')
+        proyecto.cliente = datos.get('cliente', 'Cliente PILI')
+        proyecto.descripcion = datos.get('descripcion', mensaje[:500])
+        proyecto.presupuesto_estimado = float(datos.get('presupuesto_estimado', 0))
+        proyecto.duracion_meses = int(datos.get('duracion_meses', 1))
+        db.commit()
+
+        logger.info(f"✅ Proyecto guardado en BD: {proyecto.nombre} (ID: {proyecto.id})")
+        return proyecto.id
+
+    if "informe" in tipo_flujo:
+        from app.models.informe import Informe, TipoInforme, FormatoInforme
+
+        informe = db.get(Informe, documento_id) if documento_id else None
+        if informe is None:
+            informe = Informe(
+                tipo=TipoInforme.EJECUTIVO if "ejecutivo" in tipo_flujo else TipoInforme.SIMPLE,
+                formato=FormatoInforme.WORD,
+                estado="borrador"
+            )
+            db.add(informe)
+        informe.titulo = datos.get('titulo', 'Informe Técnico')
+        informe.contenido = datos.get('contenido', '')
+        informe.resumen_ejecutivo = datos.get('resumen_ejecutivo', '')
+        informe.conclusiones = datos.get('conclusiones', '')
+        informe.recomendaciones = datos.get('recomendaciones', '')
+        informe.proyecto_id = datos.get('proyecto_id')
+        informe.incluir_graficos = datos.get('incluir_graficos', False)
+        informe.incluir_tablas = datos.get('incluir_tablas', True)
+        informe.metadata_adicional = datos.get('metadata_adicional')
+        db.commit()
+
+        logger.info(f"✅ Informe guardado en BD: {informe.titulo} (ID: {informe.id})")
+        return informe.id
+
+    return None
+
+def generar_preview_html_editable(datos: Dict[str, Any], agente: str, formato: str = "documento") -> str:
     """
     🆕 NUEVO PILI v3.0 - Genera vista previa HTML editable
     
     Esta función crea HTML que el frontend puede mostrar y editar,
     permitiendo al usuario modificar la cotización antes de generar el Word final.
+    Plantilla compilada: app/templates/vista_previa/cotizacion.html
     """
-    
-    items = datos.get('items', [])
-    cliente = datos.get('cliente', 'Cliente')
-    proyecto = datos.get('proyecto', 'Proyecto Eléctrico')
-    total = datos.get('total', 0)
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Vista Previa - {agente}</title>
-        <style>
-            body {{ font-family: 'Segoe UI', Arial, sans-serif; margin: 20px; background: #fef2f2; }}
-            .container {{ background: white; padding: 30px; border-radius: 10px; box-shadow: 0 4px 20px rgba(220, 38, 38, 0.15); border: 2px solid #fecaca; }}
-            .header {{ border-bottom: 4px solid #dc2626; padding-bottom: 20px; margin-bottom: 30px; background: linear-gradient(135deg, #fee2e2 0%, #ffffff 100%); padding: 20px; border-radius: 8px; }}
-            .company {{ color: #b91c1c; font-size: 26px; font-weight: 900; text-shadow: 1px 1px 2px rgba(0,0,0,0.1); letter-spacing: -0.5px; }}
-            .agent {{ color: #1f2937; font-size: 14px; margin-top: 8px; font-weight: 600; }}
-            .title {{ color: #1f2937; font-size: 22px; margin: 20px 0; font-weight: 800; border-left: 5px solid #dc2626; padding-left: 15px; }}
-            .info-grid {{ display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin: 20px 0; }}
-            .info-item {{ background: #fef2f2; padding: 15px; border-radius: 8px; border: 1px solid #fecaca; }}
-            .info-label {{ font-weight: 800; color: #1f2937; font-size: 14px; }}
-            .info-value {{ color: #dc2626; font-size: 17px; font-weight: 700; margin-top: 5px; }}
-            .items-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; box-shadow: 0 2px 8px rgba(0,0,0,0.1); }}
-            .items-table th {{ background: linear-gradient(135deg, #dc2626 0%, #b91c1c 100%); color: white; padding: 14px; text-align: left; font-weight: 800; font-size: 15px; }}
-            .items-table td {{ padding: 12px; border-bottom: 2px solid #fecaca; color: #1f2937; font-weight: 600; }}
-            .items-table tr:hover {{ background: #fef2f2; }}
-            .items-table td:nth-child(4), .items-table td:nth-child(5) {{ color: #dc2626; font-weight: 700; }}
-            .total-section {{ background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%); padding: 25px; border-radius: 8px; margin-top: 20px; border: 2px solid #dc2626; box-shadow: 0 4px 12px rgba(220, 38, 38, 0.2); }}
-            .total-row {{ display: flex; justify-content: space-between; margin: 8px 0; font-size: 16px; font-weight: 700; color: #1f2937; }}
-            .total-final {{ font-size: 24px; font-weight: 900; color: #b91c1c; background: white; padding: 15px; border-radius: 6px; margin-top: 10px; border: 2px solid #dc2626; }}
-            .edit-note {{ background: #fffbeb; border: 2px solid #fbbf24; padding: 15px; border-radius: 5px; margin-top: 20px; font-weight: 600; color: #78350f; }}
-            .agent-signature {{ text-align: right; margin-top: 30px; padding-top: 20px; border-top: 2px solid #fecaca; font-weight: 700; color: #dc2626; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <div class="company">⚡ TESLA ELECTRICIDAD Y AUTOMATIZACIÓN S.A.C.</div>
-                <div class="agent">🤖 Generado por {agente}</div>
-            </div>
-            
-            <h2 class="title">💰 COTIZACIÓN ELÉCTRICA</h2>
-            
-            <div class="info-grid">
-                <div class="info-item">
-                    <div class="info-label">👤 Cliente:</div>
-                    <div class="info-value">{cliente}</div>
-                </div>
-                <div class="info-item">
-                    <div class="info-label">📋 Proyecto:</div>
-                    <div class="info-value">{proyecto}</div>
-                </div>
-                <div class="info-item">
-                    <div class="info-label">📅 Fecha:</div>
-                    <div class="info-value">{datetime.now().strftime('%d/%m/%Y')}</div>
-                </div>
-                <div class="info-item">
-                    <div class="info-label">🤖 Especialista:</div>
-                    <div class="info-value">{agente}</div>
-                </div>
-            </div>
-            
-            <table class="items-table">
-                <thead>
-                    <tr>
-                        <th>📋 Descripción</th>
-                        <th>🔢 Cantidad</th>
-                        <th>📏 Unidad</th>
-                        <th>💰 Precio Unit.</th>
-                        <th>💰 Subtotal</th>
-                    </tr>
-                </thead>
-                <tbody>
-    """
-    
-    subtotal = 0
-    for item in items:
-        cantidad = item.get('cantidad', 0)
-        precio = item.get('precio_unitario', 0)
-        item_total = cantidad * precio
-        subtotal += item_total
-        
-        html += f"""
-                    <tr>
-                        <td>{item.get('descripcion', '')}</td>
-                        <td>{cantidad}</td>
-                        <td>{item.get('unidad', 'und')}</td>
-                        <td>S/ {precio:.2f}</td>
-                        <td>S/ {item_total:.2f}</td>
-                    </tr>
-        """
-    
-    igv = subtotal * 0.18
-    total_final = subtotal + igv
-    
-    html += f"""
-                </tbody>
-            </table>
-            
-            <div class="total-section">
-                <div class="total-row">
-                    <span>💰 Subtotal:</span>
-                    <span>S/ {subtotal:.2f}</span>
-                </div>
-                <div class="total-row">
-                    <span>📋 IGV (18%):</span>
-                    <span>S/ {igv:.2f}</span>
-                </div>
-                <div class="total-row total-final">
-                    <span>🏆 TOTAL:</span>
-                    <span>S/ {total_final:.2f}</span>
-                </div>
-            </div>
-            
-            <div class="edit-note">
-                ✏️ <strong>Edición Disponible:</strong> Puedes modificar cantidades, precios y descripciones desde el panel izquierdo. 
-                Los cambios se reflejarán instantáneamente en esta vista previa.
-            </div>
-            
-            <div class="agent-signature">
-                <div style="color: #6c757d; font-size: 12px;">
-                    Documento generado por {agente} v3.0<br>
-                    {datetime.now().strftime('%d/%m/%Y %H:%M')}
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html
-
-def generar_preview_informe(datos: Dict[str, Any], agente: str) -> str:
-    """Genera vista previa HTML para informes"""
-    
-    titulo = datos.get('titulo', 'Informe Técnico')
-    cliente = datos.get('cliente', 'Cliente')
-    fecha = datetime.now().strftime('%d/%m/%Y')
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Vista Previa Informe - {agente}</title>
-        <style>
-            body {{ font-family: 'Times New Roman', serif; margin: 40px; line-height: 1.6; }}
-            .header {{ text-align: center; border-bottom: 2px solid #333; padding-bottom: 20px; }}
-            .title {{ font-size: 24px; font-weight: bold; color: #333; margin: 20px 0; }}
-            .info {{ margin: 20px 0; }}
-            .section {{ margin: 30px 0; }}
-            .section h3 {{ color: #007bff; border-bottom: 1px solid #007bff; padding-bottom: 5px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>⚡ TESLA ELECTRICIDAD Y AUTOMATIZACIÓN S.A.C.</h1>
-            <p>🤖 {agente} - Sistema de Informes Técnicos</p>
-        </div>
-        
-        <h2 class="title">📋 {titulo}</h2>
-        
-        <div class="info">
-            <p><strong>Cliente:</strong> {cliente}</p>
-            <p><strong>Fecha:</strong> {fecha}</p>
-            <p><strong>Elaborado por:</strong> {agente}</p>
-        </div>
-        
-        <div class="section">
-            <h3>1. RESUMEN EJECUTIVO</h3>
-            <p>Este informe presenta el análisis técnico realizado por {agente}, 
-            especialista en {agente.lower().replace('pili ', '')}...</p>
-        </div>
-        
-        <div class="section">
-            <h3>2. METODOLOGÍA</h3>
-            <p>El análisis se realizó aplicando normativas técnicas peruanas...</p>
-        </div>
-        
-        <div class="section">
-            <h3>3. HALLAZGOS</h3>
-            <p>Los principales hallazgos identificados son...</p>
-        </div>
-        
-        <div class="section">
-            <h3>4. RECOMENDACIONES</h3>
-            <p>Se recomienda implementar las siguientes acciones...</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html
+    modelo = vista_previa.modelo_cotizacion(datos, agente)
+    return vista_previa.renderizar_modelo("cotizacion", modelo, agente, formato)
 
-def generar_numero_cotizacion(db: Session) -> str:
-    """Generar número único de cotización"""
-    fecha = datetime.now()
-    prefijo = f"COT-{fecha.strftime('%Y%m')}"
-    
-    ultima = db.query(Cotizacion).filter(
-        Cotizacion.numero.like(f"{prefijo}%")
-    ).order_by(Cotizacion.numero.desc()).first()
-    
-    if ultima:
-        try:
-            ultimo_num = int(ultima.numero.split('-')[-1])
-            nuevo_num = ultimo_num + 1
-        except:
-            nuevo_num = 1
-    else:
-        nuevo_num = 1
-    
-    return f"{prefijo}-{nuevo_num:04d}"
+def generar_preview_informe(datos: Dict[str, Any], agente: str, formato: str = "documento") -> str:
+    """Genera vista previa HTML para informes (app/templates/vista_previa/informe.html)"""
+    modelo = vista_previa.modelo_informe(datos, agente)
+    return vista_previa.renderizar_modelo("informe", modelo, agente, formato)
 
 # ═══════════════════════════════════════════════════════════════
 # 🤖 ENDPOINTS PILI CORE (RESTAURADOS)
@@ -1303,11 +1199,13 @@ async def obtener_botones_contextuales(
 async def chat_contextualizado(
     tipo_flujo: str = Body(...),
     mensaje: str = Body(...),
+    sesion_id: Optional[str] = Body(None),
     historial: Optional[List[Dict]] = Body([]),
     contexto_adicional: Optional[str] = Body(""),
     cotizacion_id: Optional[int] = Body(None),
     archivos_procesados: Optional[List[Dict]] = Body([]),
     generar_html: Optional[bool] = Body(False),
+    formato_preview: Optional[str] = Body("documento"),
     db: Session = Depends(get_db)
 ):
     """
@@ -1317,9 +1215,48 @@ async def chat_contextualizado(
     PILI ahora responde con su personalidad específica por agente.
 
     NUEVO: Genera vista previa HTML editable si generar_html=True
+
+    💬 SESIONES: el historial, contexto, adjuntos y borrador viven en el
+    servidor. Basta con enviar `sesion_id` + `mensaje` (contexto y archivos
+    solo cuando son nuevos). Sin `sesion_id` se crea una sesión sembrada con
+    `historial` / `contexto_adicional` / `archivos_procesados` y su id vuelve
+    en la respuesta. El borrador solo se regenera si cambian las entidades
+    extraídas (servicio, cliente, datos técnicos), y solo las secciones
+    afectadas (PILIBrain.actualizar_borrador).
+
+    🖼️ formato_preview (con generar_html=True):
+    - "documento": HTML completo con CSS en línea (por defecto)
+    - "fragmento": solo el fragmento; el CSS está en `preview_css` (cacheable)
+    - "patch": `preview_patch` con las operaciones JSON Patch sobre la vista
+      previa del turno anterior (el primer turno devuelve el fragmento)
     """
+    if formato_preview not in vista_previa.FORMATOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"formato_preview debe ser uno de: {', '.join(vista_previa.FORMATOS)}"
+        )
+
+    # Sesiones (Redis/BD), almacén de contenido y BD son E/S síncrona: en
+    # el pool de hilos, no en el event loop
+    if sesion_id:
+        with span("sesion.obtener"):
+            sesion = await run_in_threadpool(sesiones_chat.obtener, sesion_id)
+        if sesion is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sesión de chat '{sesion_id}' no encontrada o expirada"
+            )
+        if contexto_adicional:
+            sesion["contexto_adicional"] = contexto_adicional
+        await run_in_threadpool(sesiones_chat.agregar_archivos, sesion, archivos_procesados or [])
+    else:
+        with span("sesion.crear"):
+            sesion = await run_in_threadpool(
+                sesiones_chat.crear, tipo_flujo, contexto_adicional, historial, archivos_procesados
+            )
+
     try:
-        logger.info(f"🤖 PILI chat contextualizado para {tipo_flujo}")
+        logger.info(f"🤖 PILI chat contextualizado para {tipo_flujo} (sesión {sesion['id']})")
 
         # Obtener contexto del servicio
         contexto = obtener_contexto_servicio(tipo_flujo)
@@ -1330,88 +1267,79 @@ async def chat_contextualizado(
                 detail=f"Tipo de flujo '{tipo_flujo}' no soportado por PILI"
             )
 
-        # Construir prompt especializado PILI
+        # Prompt del turno: solo la parte dinámica; el prefijo del agente
+        # (personalidad, rol, prompt especializado) está precalculado
         nombre_pili = contexto.get("nombre_pili", "PILI")
-        prompt_especializado = f"""
-        Eres {nombre_pili}.
-
-        {contexto.get('personalidad', '')}
-
-        {contexto.get('rol_ia', '')}
-
-        {contexto.get('prompt_especializado', '')}
+        contexto_agente = registro_contextos.obtener("chat", tipo_flujo)
+        prompt_turno = f"""CONTEXTO DEL PROYECTO:
+{sesion['contexto_adicional']}
 
-        CONTEXTO DEL PROYECTO:
-        {contexto_adicional}
-
-        HISTORIAL DE CONVERSACIÓN:
-        """
+HISTORIAL DE CONVERSACIÓN:"""
 
         # Agregar historial al prompt
-        for i, msg in enumerate(historial[-5:]):  # Últimos 5 mensajes
-            role = msg.get('role', 'user')
-            content = msg.get('content', msg.get('mensaje', ''))
-            prompt_especializado += f"\n{role.upper()}: {content}"
+        for msg in sesion["historial"][-5:]:  # Últimos 5 mensajes
+            prompt_turno += f"\n{msg['role'].upper()}: {msg['content']}"
+
+        prompt_turno += f"\n\nUSUARIO: {mensaje}\n\nRESPUESTA DE {nombre_pili}:"
 
-        prompt_especializado += f"\n\nUSUARIO: {mensaje}\n\nRESPUESTA DE {nombre_pili}:"
+        sesiones_chat.agregar_mensaje(sesion, "user", mensaje)
 
         # ✅ GENERACIÓN DE DATOS ESTRUCTURADOS CON PILI BRAIN
         datos_generados = None
         html_preview = None
+        preview_patch = None
         documento_data = None  # ✅ Scope más amplio para usar en fallback
+        borrador_actualizado = False
 
         # ✅ GENERACIÓN ESPECÍFICA POR TIPO DE DOCUMENTO (6 TIPOS)
         # Siempre intentar generar estructura si es flujo de cotización/proyecto/informe
         if any(keyword in tipo_flujo for keyword in ["cotizacion", "proyecto", "informe"]):
             try:
-                logger.info(f"🧠 Generando estructura con PILIBrain para {tipo_flujo}...")
-                servicio_detectado = pili_brain.detectar_servicio(mensaje)
-                complejidad = "compleja" if "complejo" in tipo_flujo or "compleja" in tipo_flujo else "simple"
-
-                # ✅ LLAMAR AL MÉTODO CORRECTO SEGÚN EL TIPO
-                if "cotizacion" in tipo_flujo:
-                    # 1. COTIZACIÓN SIMPLE o 2. COTIZACIÓN COMPLEJA
-                    documento_data = pili_brain.generar_cotizacion(mensaje, servicio_detectado, complejidad)
-                    logger.info(f"✅ Cotización {complejidad} generada")
-
-                elif "proyecto" in tipo_flujo:
-                    # 3. PROYECTO SIMPLE o 4. PROYECTO COMPLEJO
-                    documento_data = pili_brain.generar_proyecto(mensaje, servicio_detectado, complejidad)
-                    logger.info(f"✅ Proyecto {complejidad} generado")
-
-                elif "informe" in tipo_flujo:
-                    # 5. INFORME SIMPLE o 6. INFORME EJECUTIVO
-                    documento_data = pili_brain.generar_informe(mensaje, servicio_detectado, complejidad)
-                    logger.info(f"✅ Informe {complejidad} generado")
-
-                else:
-                    # Fallback por si acaso
-                    documento_data = pili_brain.generar_cotizacion(mensaje, servicio_detectado, complejidad)
-                    logger.warning(f"⚠️ Tipo no reconocido, usando generar_cotizacion como fallback")
+                # Solo se recalculan las secciones cuyas entradas cambiaron
+                with span("pili_brain.borrador", tipo_flujo=tipo_flujo):
+                    borrador, documento_data, cambiadas = pili_brain.actualizar_borrador(
+                        sesion["borrador"], mensaje, tipo_flujo
+                    )
+                sesion["borrador"] = borrador
+                sesion["entidades"] = borrador["entidades"]
+                borrador_actualizado = bool(cambiadas)
 
                 # ✅ EXTRAER DATOS ESTRUCTURADOS
                 datos_generados = documento_data.get('datos', {})
-                logger.info(f"✅ Datos estructurados generados: {len(datos_generados.get('items', []))} items")
+                logger.info(f"✅ Datos estructurados: {len(datos_generados.get('items', []))} items")
 
                 # ✅ GENERAR HTML PREVIEW CON DATOS REALES
                 if generar_html:
-                    if "cotizacion" in tipo_flujo or "proyecto" in tipo_flujo:
-                        html_preview = generar_preview_html_editable(datos_generados, nombre_pili)
-                    elif "informe" in tipo_flujo:
-                        html_preview = generar_preview_informe(datos_generados, nombre_pili)
+                    plantilla = "informe" if "informe" in tipo_flujo else "cotizacion"
+                    anterior = sesion.get("vista_previa")
+                    base_patch = formato_preview == "patch" and anterior and anterior["plantilla"] == plantilla
+
+                    if base_patch and not borrador_actualizado:
+                        # Borrador sin cambios: no hay nada que renderizar
+                        preview_patch = []
+                    else:
+                        with span("vista_previa", formato=formato_preview):
+                            if plantilla == "informe":
+                                modelo = vista_previa.modelo_informe(datos_generados, nombre_pili)
+                            else:
+                                modelo = vista_previa.modelo_cotizacion(datos_generados, nombre_pili)
+
+                            if base_patch:
+                                preview_patch = vista_previa.patch_vista_previa(plantilla, anterior["modelo"], modelo)
+                            else:
+                                formato_html = "documento" if formato_preview == "documento" else "fragmento"
+                                html_preview = vista_previa.renderizar_modelo(plantilla, modelo, nombre_pili, formato_html)
+                        sesion["vista_previa"] = {"plantilla": plantilla, "modelo": modelo}
 
             except Exception as e_pili:
                 logger.warning(f"⚠️ No se pudo generar estructura con PILIBrain: {e_pili}")
                 datos_generados = None
                 documento_data = None
+                borrador_actualizado = False
 
         # Enviar a Gemini con contexto especializado, con fallback a PILIBrain
         try:
-            respuesta = gemini_service.chat(
-                mensaje=prompt_especializado,
-                contexto=f"Agente: {nombre_pili}. Servicio: {tipo_flujo}. {contexto_adicional}",
-                cotizacion_id=cotizacion_id
-            )
+            respuesta = await gemini_service.chat_agente(contexto_agente, prompt_turno)
 
             # 🚨 DETECTAR MODO DEMO DE GEMINI Y FORZAR FALLBACK A PILIBRAIN
             if isinstance(respuesta, dict) and "PILI en modo demo" in str(respuesta.get("mensaje", "")):
@@ -1426,119 +1354,43 @@ async def chat_contextualizado(
                 respuesta = {'mensaje': documento_data['conversacion']['mensaje_pili']}
             else:
                 # ✅ GENERAR AHORA CON EL MÉTODO CORRECTO SEGÚN TIPO
-                servicio_detectado = pili_brain.detectar_servicio(mensaje)
-                complejidad_fallback = "compleja" if "complejo" in tipo_flujo or "compleja" in tipo_flujo else "simple"
-
-                if "cotizacion" in tipo_flujo:
-                    documento_data = pili_brain.generar_cotizacion(mensaje, servicio_detectado, complejidad_fallback)
-                elif "proyecto" in tipo_flujo:
-                    documento_data = pili_brain.generar_proyecto(mensaje, servicio_detectado, complejidad_fallback)
-                elif "informe" in tipo_flujo:
-                    documento_data = pili_brain.generar_informe(mensaje, servicio_detectado, complejidad_fallback)
-                else:
-                    documento_data = pili_brain.generar_cotizacion(mensaje, servicio_detectado, complejidad_fallback)
-
+                with span("pili_brain.generar", tipo_flujo=tipo_flujo):
+                    documento_data = generar_documento_pili(tipo_flujo, mensaje, pili_brain.detectar_servicio(mensaje))
                 datos_generados = documento_data.get('datos', {})
                 respuesta = {'mensaje': documento_data['conversacion']['mensaje_pili']}
+                borrador_actualizado = True
 
-        # 🆕 GUARDAR EN BASE DE DATOS Y OBTENER ID
-        documento_id = None
-        if datos_generados:
+        # 🆕 GUARDAR EN BASE DE DATOS Y OBTENER ID (un documento por sesión)
+        documento_id = sesion["documento_id"]
+        if datos_generados and (borrador_actualizado or documento_id is None):
             try:
-                if "cotizacion" in tipo_flujo:
-                    # Guardar cotización en BD
-                    nueva_cotizacion = Cotizacion(
-                        numero=generar_numero_cotizacion(db),
-                        cliente=datos_generados.get('cliente', 'Cliente generado por PILI'),
-                        proyecto=datos_generados.get('proyecto', 'Proyecto PILI'),
-                        descripcion=datos_generados.get('descripcion', mensaje[:200]),
-                        observaciones=datos_generados.get('observaciones', ''),
-                        subtotal=float(datos_generados.get('subtotal', 0)),
-                        igv=float(datos_generados.get('igv', 0)),
-                        total=float(datos_generados.get('total', 0)),
-                        estado="borrador",
-                        fecha_creacion=datetime.now()
+                with span("bd.guardar_documento", tipo_flujo=tipo_flujo):
+                    documento_id = await run_in_threadpool(
+                        guardar_documento_pili, db, tipo_flujo, datos_generados, mensaje, documento_id
                     )
-                    db.add(nueva_cotizacion)
-                    db.commit()
-                    db.refresh(nueva_cotizacion)
-                    documento_id = nueva_cotizacion.id
-
-                    # Agregar items
-                    if 'items' in datos_generados:
-                        for item_data in datos_generados['items']:
-                            item = Item(
-                                cotizacion_id=nueva_cotizacion.id,
-                                descripcion=item_data.get('descripcion', ''),
-                                cantidad=float(item_data.get('cantidad', 1)),
-                                unidad=item_data.get('unidad', 'und'),
-                                precio_unitario=float(item_data.get('precio_unitario', 0))
-                            )
-                            db.add(item)
-                        db.commit()
-
-                    logger.info(f"✅ Cotización guardada en BD: {nueva_cotizacion.numero} (ID: {documento_id})")
-
-                elif "proyecto" in tipo_flujo:
-                    # Guardar proyecto en BD
-                    nuevo_proyecto = Proyecto(
-                        nombre=datos_generados.get('nombre', 'Proyecto generado por PILI'),
-                        cliente=datos_generados.get('cliente', 'Cliente PILI'),
-                        descripcion=datos_generados.get('descripcion', mensaje[:500]),
-                        presupuesto_estimado=float(datos_generados.get('presupuesto_estimado', 0)),
-                        duracion_meses=int(datos_generados.get('duracion_meses', 1)),
-                        estado="planificacion",
-                        fecha_inicio=datetime.now(),
-                        fecha_creacion=datetime.now()
-                    )
-                    db.add(nuevo_proyecto)
-                    db.commit()
-                    db.refresh(nuevo_proyecto)
-                    documento_id = nuevo_proyecto.id
-
-                    logger.info(f"✅ Proyecto guardado en BD: {nuevo_proyecto.nombre} (ID: {documento_id})")
-
-                elif "informe" in tipo_flujo:
-                    # Guardar informe en BD
-                    from app.models.informe import Informe, TipoInforme, FormatoInforme
-
-                    tipo_informe = TipoInforme.EJECUTIVO if "ejecutivo" in tipo_flujo else TipoInforme.SIMPLE
-
-                    nuevo_informe = Informe(
-                        titulo=datos_generados.get('titulo', 'Informe Técnico'),
-                        tipo=tipo_informe,
-                        formato=FormatoInforme.WORD,
-                        contenido=datos_generados.get('contenido', ''),
-                        resumen_ejecutivo=datos_generados.get('resumen_ejecutivo', ''),
-                        conclusiones=datos_generados.get('conclusiones', ''),
-                        recomendaciones=datos_generados.get('recomendaciones', ''),
-                        proyecto_id=datos_generados.get('proyecto_id'),
-                        incluir_graficos=datos_generados.get('incluir_graficos', False),
-                        incluir_tablas=datos_generados.get('incluir_tablas', True),
-                        metadata_adicional=datos_generados.get('metadata_adicional'),
-                        estado="borrador"
-                    )
-                    db.add(nuevo_informe)
-                    db.commit()
-                    db.refresh(nuevo_informe)
-                    documento_id = nuevo_informe.id
-
-                    logger.info(f"✅ Informe guardado en BD: {nuevo_informe.titulo} (ID: {documento_id})")
-
             except Exception as e_bd:
+                await run_in_threadpool(db.rollback)
                 logger.warning(f"⚠️ No se pudo guardar en BD: {e_bd}")
-                documento_id = None
 
         # Determinar etapa y botones sugeridos
         tiene_cotizacion = cotizacion_id is not None or documento_id is not None
-        etapa_actual = determinar_etapa_conversacion(historial, tiene_cotizacion)
+        etapa_actual = determinar_etapa_conversacion(sesion["historial"][:-1], tiene_cotizacion)
         botones_sugeridos = obtener_botones_para_etapa(tipo_flujo, etapa_actual)
+        texto_respuesta = respuesta.get('mensaje', '') if isinstance(respuesta, dict) else str(respuesta)
+
+        # 💬 ESTADO DE LA SESIÓN PARA EL PRÓXIMO TURNO
+        sesiones_chat.agregar_mensaje(sesion, "assistant", texto_respuesta)
+        sesion["documento_id"] = documento_id
+        with span("sesion.guardar"):
+            await run_in_threadpool(sesiones_chat.guardar, sesion)
 
         # ✅ RESPUESTA CON CAMPOS RESTAURADOS + ID DEL DOCUMENTO
         return {
             "success": True,
+            "sesion_id": sesion["id"],
+            "borrador_actualizado": borrador_actualizado,
             "agente_activo": nombre_pili,
-            "respuesta": respuesta.get('mensaje', '') if isinstance(respuesta, dict) else str(respuesta),
+            "respuesta": texto_respuesta,
             "tipo_flujo": tipo_flujo,
             "etapa_actual": etapa_actual,
             "botones_sugeridos": botones_sugeridos,
@@ -1549,6 +1401,12 @@ async def chat_contextualizado(
             },
             "html_preview": html_preview,
             "generar_html": generar_html,
+            "formato_preview": formato_preview,
+            "preview_patch": preview_patch,
+            "preview_css": (
+                vista_previa.url_estilos("informe" if "informe" in tipo_flujo else "cotizacion")
+                if generar_html and formato_preview != "documento" else None
+            ),
             # ✅ CAMPOS CRÍTICOS RESTAURADOS
             "cotizacion_generada": datos_generados if "cotizacion" in tipo_flujo else None,
             "proyecto_generado": datos_generados if "proyecto" in tipo_flujo else None,
@@ -1572,6 +1430,51 @@ async def chat_contextualizado(
             detail=f"Error en PILI: {str(e)}"
         )
 
+@router.get("/vista-previa/estilos/{nombre}.css")
+async def estilos_vista_previa(
+    nombre: str,
+    v: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    🎨 CSS de las vistas previas (formato "fragmento" / "patch")
+
+    Con ?v=<versión actual> se cachea como inmutable; el ETag permite
+    revalidar con 304 sin volver a descargarlo.
+    """
+    hoja = vista_previa.ESTILOS.get(nombre)
+    if hoja is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Hoja de estilos '{nombre}' no encontrada"
+        )
+
+    etag = f'"{hoja.version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if v == hoja.version else "public, max-age=300",
+    }
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=hoja.contenido, media_type="text/css", headers=headers)
+
+@router.get("/sesiones/{sesion_id}")
+async def obtener_sesion_chat(sesion_id: str):
+    """💬 Resumen de una sesión de chat (historial, entidades, documento)"""
+    sesion = await run_in_threadpool(sesiones_chat.obtener, sesion_id)
+    if sesion is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sesión de chat '{sesion_id}' no encontrada o expirada"
+        )
+    return {**sesiones_chat.resumen(sesion), "historial": sesion["historial"]}
+
+@router.delete("/sesiones/{sesion_id}")
+async def eliminar_sesion_chat(sesion_id: str):
+    """💬 Cierra una sesión de chat (el documento guardado en BD se conserva)"""
+    await run_in_threadpool(sesiones_chat.eliminar, sesion_id)
+    return {"success": True, "sesion_id": sesion_id}
+
 @router.post("/iniciar-flujo-inteligente")
 async def iniciar_flujo_inteligente(
     tipo_flujo: str = Body(...),
@@ -1773,7 +1676,7 @@ async def generar_cotizacion_con_plantilla(
             )
         
         # Obtener items de la cotización
-        items_db = db.query(Item).filter(Item.cotizacion_id == cotizacion_id).all()
+        items_db = db.query(Item).filter(Item.cotizacion_id == cotizacion_id).order_by(Item.orden, Item.id).all()
         
         items = []
         for item in items_db:
@@ -2051,18 +1954,9 @@ async def generar_cotizacion_rapida(
         db.commit()
         db.refresh(nueva_cotizacion)
         
-        # Agregar items si los hay
+        # Agregar items si los hay (un solo INSERT multi-fila)
         if 'items' in resultado:
-            for item_data in resultado['items']:
-                item = Item(
-                    cotizacion_id=nueva_cotizacion.id,
-                    descripcion=item_data.get('descripcion', ''),
-                    cantidad=item_data.get('cantidad', 1),
-                    unidad=item_data.get('unidad', 'und'),
-                    precio_unitario=item_data.get('precio_unitario', 0)
-                )
-                db.add(item)
-            
+            insertar_items(db, nueva_cotizacion.id, resultado['items'])
             db.commit()
         
         logger.info(f"✅ Cotización creada: {nueva_cotizacion.numero}")
@@ -2199,4 +2093,13 @@ def health_check_ia():
         "agentes_disponibles": len(CONTEXTOS_SERVICIOS),
         "servicios_inteligentes": list(CONTEXTOS_SERVICIOS.keys()),
         "version": "3.0 - PILI Multifunción"
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/contextos")
+def estado_contextos_agentes():
+    """
+    🧠 Prefijos de sistema precalculados por agente (tokens estimados,
+    versión) y su estado en la caché de contexto de Gemini
+    """
+    return gemini_service.estado_contextos()
\ No newline at end of file
@@ -2,13 +2,14 @@
 Router de Clientes - Gestión de base de datos de clientes
 """
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from typing import List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.cliente import Cliente
 from app.models.cotizacion import Cotizacion
 from app.schemas.cliente import (
@@ -17,6 +18,7 @@ from app.schemas.cliente import (
     ClienteResponse,
     ClienteResumen
 )
+from app.services.autocompletado_clientes import autocompletado_clientes
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -29,47 +31,60 @@ router = APIRouter(
 )
 
 
+async def _estadisticas_clientes(db: AsyncSession, cliente_ids: List[int]) -> Dict[int, Tuple[int, float]]:
+    """
+    Cantidad y monto total de cotizaciones por cliente en UNA consulta
+    agrupada (COUNT/SUM por cliente_id), sin cargar las cotizaciones.
+
+    Returns:
+        {cliente_id: (total_cotizaciones, monto_total)}; los clientes sin
+        cotizaciones no aparecen.
+    """
+    if not cliente_ids:
+        return {}
+
+    filas = (await db.execute(
+        select(
+            Cotizacion.cliente_id,
+            func.count(Cotizacion.id),
+            func.coalesce(func.sum(Cotizacion.total), 0)
+        ).where(
+            Cotizacion.cliente_id.in_(cliente_ids)
+        ).group_by(Cotizacion.cliente_id)
+    )).all()
+
+    return {cliente_id: (int(total), float(monto)) for cliente_id, total, monto in filas}
+
+
+async def _cliente_con_stats(db: AsyncSession, cliente: Cliente) -> ClienteResponse:
+    """ClienteResponse con estadísticas calculadas en SQL"""
+    total_cots, monto_total = (await _estadisticas_clientes(db, [cliente.id])).get(cliente.id, (0, 0.0))
+    return ClienteResponse(
+        **cliente.__dict__,
+        total_cotizaciones=total_cots,
+        monto_total_cotizaciones=monto_total
+    )
+
+
 @router.get("/search", response_model=List[ClienteResumen])
 async def buscar_clientes(
     q: str = Query(..., min_length=2, description="Texto de búsqueda (mínimo 2 caracteres)"),
     limit: int = Query(10, le=50, description="Límite de resultados"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Buscar clientes por nombre o RUC (autocompletado).
 
-    - **q**: Texto de búsqueda (nombre o RUC)
+    - **q**: Inicio del nombre, de una palabra del nombre o del RUC (sin distinguir tildes)
     - **limit**: Número máximo de resultados (default: 10, max: 50)
 
-    Retorna lista de clientes que coinciden con la búsqueda.
+    Retorna lista de clientes que coinciden con la búsqueda. Se resuelve
+    con el índice de prefijos en memoria: solo consulta la BD si hubo
+    cambios en clientes.
     """
     try:
-        logger.info(f"Buscando clientes con query: {q}")
-
-        # Buscar por nombre o RUC (case-insensitive)
-        clientes = db.query(Cliente).filter(
-            or_(
-                Cliente.nombre.ilike(f"%{q}%"),
-                Cliente.ruc.ilike(f"%{q}%")
-            )
-        ).limit(limit).all()
-
-        # Agregar conteo de cotizaciones
-        resultados = []
-        for cliente in clientes:
-            cliente_dict = {
-                "id": cliente.id,
-                "nombre": cliente.nombre,
-                "ruc": cliente.ruc,
-                "telefono": cliente.telefono,
-                "email": cliente.email,
-                "industria": cliente.industria,
-                "total_cotizaciones": len(cliente.cotizaciones) if cliente.cotizaciones else 0
-            }
-            resultados.append(cliente_dict)
-
-        logger.info(f"Se encontraron {len(resultados)} clientes")
-        return resultados
+        await db.run_sync(autocompletado_clientes.refrescar)
+        return autocompletado_clientes.buscar(q, limit)
 
     except Exception as e:
         logger.error(f"Error en búsqueda de clientes: {e}")
@@ -82,7 +97,7 @@ async def buscar_clientes(
 @router.post("/", response_model=ClienteResponse, status_code=status.HTTP_201_CREATED)
 async def crear_cliente(
     cliente: ClienteCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Registrar un nuevo cliente en la base de datos.
@@ -97,7 +112,9 @@ async def crear_cliente(
     """
     try:
         # Verificar que no exista un cliente con el mismo RUC
-        existe = db.query(Cliente).filter(Cliente.ruc == cliente.ruc).first()
+        existe = (await db.execute(
+            select(Cliente.id).where(Cliente.ruc == cliente.ruc).limit(1)
+        )).first()
         if existe:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -107,8 +124,8 @@ async def crear_cliente(
         # Crear nuevo cliente
         nuevo_cliente = Cliente(**cliente.dict())
         db.add(nuevo_cliente)
-        db.commit()
-        db.refresh(nuevo_cliente)
+        await db.commit()
+        await db.refresh(nuevo_cliente)
 
         logger.info(f"Cliente creado: {nuevo_cliente.nombre} (ID: {nuevo_cliente.id})")
 
@@ -124,7 +141,7 @@ async def crear_cliente(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error al crear cliente: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -138,7 +155,7 @@ async def listar_clientes(
     limit: int = Query(50, ge=1, le=100, description="Número de registros a retornar"),
     industria: Optional[str] = Query(None, description="Filtrar por industria"),
     tipo_cliente: Optional[str] = Query(None, description="Filtrar por tipo de cliente"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Listar todos los clientes con paginación.
@@ -151,26 +168,28 @@ async def listar_clientes(
     Retorna lista de clientes y total de registros.
     """
     try:
-        # Query base
-        query = db.query(Cliente)
-
         # Aplicar filtros si existen
+        filtros = []
         if industria:
-            query = query.filter(Cliente.industria == industria)
+            filtros.append(Cliente.industria == industria)
         if tipo_cliente:
-            query = query.filter(Cliente.tipo_cliente == tipo_cliente)
+            filtros.append(Cliente.tipo_cliente == tipo_cliente)
 
         # Total de registros
-        total = query.count()
+        total = (await db.execute(
+            select(func.count(Cliente.id)).where(*filtros)
+        )).scalar_one()
 
         # Obtener clientes con paginación
-        clientes = query.offset(skip).limit(limit).all()
+        clientes = (await db.execute(
+            select(Cliente).where(*filtros).order_by(Cliente.id).offset(skip).limit(limit)
+        )).scalars().all()
 
-        # Agregar estadísticas
+        # Agregar estadísticas (una sola consulta agrupada para la página)
+        stats = await _estadisticas_clientes(db, [c.id for c in clientes])
         clientes_con_stats = []
         for cliente in clientes:
-            total_cots = len(cliente.cotizaciones) if cliente.cotizaciones else 0
-            monto_total = sum(float(c.total) if c.total else 0 for c in cliente.cotizaciones) if cliente.cotizaciones else 0
+            total_cots, monto_total = stats.get(cliente.id, (0, 0.0))
 
             cliente_dict = ClienteResponse(
                 **cliente.__dict__,
@@ -197,7 +216,7 @@ async def listar_clientes(
 @router.get("/{cliente_id}", response_model=ClienteResponse)
 async def obtener_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtener datos completos de un cliente específico.
@@ -207,7 +226,7 @@ async def obtener_cliente(
     Retorna todos los datos del cliente incluyendo estadísticas.
     """
     try:
-        cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+        cliente = await db.get(Cliente, cliente_id)
 
         if not cliente:
             raise HTTPException(
@@ -216,16 +235,7 @@ async def obtener_cliente(
             )
 
         # Calcular estadísticas
-        total_cots = len(cliente.cotizaciones) if cliente.cotizaciones else 0
-        monto_total = sum(float(c.total) if c.total else 0 for c in cliente.cotizaciones) if cliente.cotizaciones else 0
-
-        respuesta = ClienteResponse(
-            **cliente.__dict__,
-            total_cotizaciones=total_cots,
-            monto_total_cotizaciones=monto_total
-        )
-
-        return respuesta
+        return await _cliente_con_stats(db, cliente)
 
     except HTTPException:
         raise
@@ -241,7 +251,7 @@ async def obtener_cliente(
 async def actualizar_cliente(
     cliente_id: int,
     cliente_update: ClienteUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualizar datos de un cliente existente.
@@ -252,7 +262,7 @@ async def actualizar_cliente(
     Retorna el cliente actualizado.
     """
     try:
-        cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+        cliente = await db.get(Cliente, cliente_id)
 
         if not cliente:
             raise HTTPException(
@@ -265,27 +275,18 @@ async def actualizar_cliente(
         for campo, valor in update_data.items():
             setattr(cliente, campo, valor)
 
-        db.commit()
-        db.refresh(cliente)
+        await db.commit()
+        await db.refresh(cliente)
 
         logger.info(f"Cliente actualizado: {cliente.nombre} (ID: {cliente.id})")
 
         # Calcular estadísticas
-        total_cots = len(cliente.cotizaciones) if cliente.cotizaciones else 0
-        monto_total = sum(float(c.total) if c.total else 0 for c in cliente.cotizaciones) if cliente.cotizaciones else 0
-
-        respuesta = ClienteResponse(
-            **cliente.__dict__,
-            total_cotizaciones=total_cots,
-            monto_total_cotizaciones=monto_total
-        )
-
-        return respuesta
+        return await _cliente_con_stats(db, cliente)
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error al actualizar cliente: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -296,7 +297,7 @@ async def actualizar_cliente(
 @router.delete("/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Eliminar un cliente de la base de datos.
@@ -306,7 +307,14 @@ async def eliminar_cliente(
     NOTA: Las cotizaciones asociadas NO se eliminan, solo se desvinculan (cliente_id = NULL).
     """
     try:
-        cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+        # Relaciones cargadas de antemano: el ORM las desvincula al borrar
+        # y en una sesión async no puede cargarlas de forma perezosa
+        cliente = (await db.execute(
+            select(Cliente).options(
+                selectinload(Cliente.cotizaciones),
+                selectinload(Cliente.proyectos)
+            ).where(Cliente.id == cliente_id)
+        )).scalar_one_or_none()
 
         if not cliente:
             raise HTTPException(
@@ -315,8 +323,8 @@ async def eliminar_cliente(
             )
 
         # Eliminar cliente (las cotizaciones quedan con cliente_id=NULL por ondelete="SET NULL")
-        db.delete(cliente)
-        db.commit()
+        await db.delete(cliente)
+        await db.commit()
 
         logger.info(f"Cliente eliminado: {cliente.nombre} (ID: {cliente.id})")
 
@@ -325,7 +333,7 @@ async def eliminar_cliente(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error al eliminar cliente: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -336,7 +344,7 @@ async def eliminar_cliente(
 @router.get("/{cliente_id}/cotizaciones", response_model=dict)
 async def listar_cotizaciones_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Listar todas las cotizaciones de un cliente específico.
@@ -346,7 +354,9 @@ async def listar_cotizaciones_cliente(
     Retorna información del cliente y todas sus cotizaciones con estadísticas.
     """
     try:
-        cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+        cliente = (await db.execute(
+            select(Cliente).options(selectinload(Cliente.cotizaciones)).where(Cliente.id == cliente_id)
+        )).scalar_one_or_none()
 
         if not cliente:
             raise HTTPException(
@@ -3,17 +3,25 @@ Router: Cotizaciones
 Endpoints para CRUD de cotizaciones Y GENERACIÓN DE DOCUMENTOS
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.cotizacion import Cotizacion
 from app.models.item import Item
 from app.schemas.cotizacion import (
     CotizacionCreate,
     CotizacionUpdate,
-    CotizacionResponse
+    CotizacionResponse,
+    SimulacionPreciosRequest,
+    CotizacionListItem
 )
+from app.core.paginacion import resolver_campos, listar_keyset_async, HEADER_CURSOR
+from app.services import cotizacion_items
+from app.services.busqueda import marcar_pendiente
 from datetime import datetime
 from pathlib import Path
 import logging
@@ -21,58 +29,35 @@ import os
 
 from app.services.word_generator import word_generator
 from app.services.pdf_generator import pdf_generator
+from app.services.pricing_engine import pricing_engine
+from app.services.sequence_allocator import generar_numero_cotizacion
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Campos de listado: los pesados (JSON) solo si se piden con ?fields=
+CAMPOS_LISTA_COTIZACION = list(CotizacionListItem.model_fields)
+CAMPOS_LISTA_COTIZACION_DEFECTO = [
+    c for c in CAMPOS_LISTA_COTIZACION if c not in ("items", "subtotal_items", "metadata_adicional")
+]
+# Campos calculados en SQL sobre la tabla items
+EXPRESIONES_LISTA_COTIZACION = {
+    "num_items": cotizacion_items.num_items_expr(),
+    "subtotal_items": cotizacion_items.subtotal_items_expr(),
+}
+
 # ============================================
 # FUNCIONES AUXILIARES
 # ============================================
 
-def generar_numero_cotizacion(db: Session) -> str:
-    """
-    Generar número único de cotización
-    Formato: COT-YYYYMM-XXXX
-    """
-    fecha = datetime.now()
-    prefijo = f"COT-{fecha.strftime('%Y%m')}"
-    
-    # Buscar última cotización del mes
-    ultima = db.query(Cotizacion).filter(
-        Cotizacion.numero.like(f"{prefijo}%")
-    ).order_by(Cotizacion.numero.desc()).first()
-    
-    if ultima:
-        try:
-            ultimo_num = int(ultima.numero.split('-')[-1])
-            nuevo_num = ultimo_num + 1
-        except:
-            nuevo_num = 1
-    else:
-        nuevo_num = 1
-    
-    return f"{prefijo}-{nuevo_num:04d}"
-
 def _preparar_datos_documento(cotizacion: Cotizacion) -> Dict[str, Any]:
     """
     Helper para convertir un modelo de Cotizacion a un diccionario 
     para los generadores de Word/PDF.
     """
-    items_list = []
-    if cotizacion.items_rel:
-        items_list = [
-            {
-                "descripcion": item.descripcion,
-                "cantidad": float(item.cantidad),
-                "precio_unitario": float(item.precio_unitario),
-                "total": float(item.total)
-            }
-            for item in cotizacion.items_rel
-        ]
-    elif cotizacion.items:
-        items_list = cotizacion.items
+    items_list = cotizacion.items
 
     datos = {
         "numero": cotizacion.numero,
@@ -96,15 +81,15 @@ def _preparar_datos_documento(cotizacion: Cotizacion) -> Dict[str, Any]:
 @router.post("/", response_model=CotizacionResponse, status_code=status.HTTP_201_CREATED)
 async def crear_cotizacion(
     cotizacion: CotizacionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Crear una nueva cotización
     """
     
     try:
-        # Generar número de cotización
-        numero_cot = generar_numero_cotizacion(db)
+        # Generar número de cotización (reserva síncrona, fuera del event loop)
+        numero_cot = await run_in_threadpool(generar_numero_cotizacion)
         
         # ✅ CORRECCIÓN: Crear cotización con los campos correctos
         db_cotizacion = Cotizacion(
@@ -118,70 +103,130 @@ async def crear_cotizacion(
             observaciones=cotizacion.observaciones,
             vigencia=cotizacion.vigencia,
             estado=cotizacion.estado or "borrador",
-            items=cotizacion.items,  # Guardar items en JSON
             proyecto_id=cotizacion.proyecto_id,
             metadata_adicional=cotizacion.metadata_adicional
         )
         
         db.add(db_cotizacion)
-        db.commit()
-        db.refresh(db_cotizacion)
+        await db.flush()
+        
+        # Items en la tabla items: un solo INSERT multi-fila
+        filas = cotizacion_items.filas_items(cotizacion.items, db_cotizacion.id)
+        if filas:
+            await db.execute(insert(Item), filas)
         
-        # ✅ CORRECCIÓN: Crear items relacionados si existen
-        if cotizacion.items:
-            for item_data in cotizacion.items:
-                # item_data es un dict, no tiene .dict()
-                db_item = Item(
-                    descripcion=item_data.get("descripcion"),
-                    cantidad=item_data.get("cantidad"),
-                    precio_unitario=item_data.get("precio_unitario"),
-                    total=item_data.get("total", item_data.get("cantidad") * item_data.get("precio_unitario")),
-                    cotizacion_id=db_cotizacion.id
-                )
-                db.add(db_item)
-            
-            db.commit()
-            db.refresh(db_cotizacion)
+        await db.commit()
+        await db.refresh(db_cotizacion)
         
         logger.info(f"✅ Cotización creada: {numero_cot}")
         return db_cotizacion
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"❌ Error al crear cotización: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear cotización: {str(e)}"
         )
 
-@router.get("/", response_model=List[CotizacionResponse])
+@router.get("/", response_model=List[CotizacionListItem], response_model_exclude_unset=True)
 async def listar_cotizaciones(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     proyecto_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por coma (ej: id,numero,total,items)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Listar todas las cotizaciones
-    """
-    query = db.query(Cotizacion)
+    Listar cotizaciones (más recientes primero)
     
-    if proyecto_id:
-        query = query.filter(Cotizacion.proyecto_id == proyecto_id)
+    Paginación por cursor: la respuesta trae el header X-Next-Cursor con el
+    cursor de la página siguiente. `skip` se mantiene por compatibilidad.
+    items, subtotal_items y metadata_adicional solo se devuelven si se piden
+    en `fields`; num_items y subtotal_items se calculan en SQL.
+    """
+    try:
+        campos = resolver_campos(fields, CAMPOS_LISTA_COTIZACION, CAMPOS_LISTA_COTIZACION_DEFECTO)
+        filtros = [Cotizacion.proyecto_id == proyecto_id] if proyecto_id else []
         
-    cotizaciones = query.order_by(Cotizacion.fecha_creacion.desc()).offset(skip).limit(limit).all()
+        cotizaciones, siguiente = await listar_keyset_async(
+            db, Cotizacion, [c for c in campos if c != "items"], Cotizacion.fecha_creacion,
+            filtros=filtros, cursor=cursor, limit=limit, skip=skip,
+            expresiones=EXPRESIONES_LISTA_COTIZACION
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if "items" in campos and cotizaciones:
+        # Items de toda la página en una consulta
+        items = (await db.execute(
+            cotizacion_items.consulta_items_de(c["id"] for c in cotizaciones)
+        )).scalars().all()
+        por_cotizacion = cotizacion_items.agrupar_por_cotizacion(items)
+        for c in cotizaciones:
+            c["items"] = por_cotizacion.get(c["id"], [])
+    
+    if siguiente:
+        response.headers[HEADER_CURSOR] = siguiente
     
     return cotizaciones
 
+@router.post("/simular-precios")
+async def simular_precios(request: SimulacionPreciosRequest):
+    """
+    Calcula totales para muchos valores de una variable en una sola llamada
+    (ej: 50 áreas × complejidades) para los sliders del frontend
+    """
+    try:
+        return pricing_engine.simular(
+            servicio=request.servicio,
+            valores=request.valores,
+            variable=request.variable,
+            complejidades=request.complejidades,
+            datos=request.datos,
+            region=request.region
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/analitica/precios-items")
+async def analitica_precios_items(
+    codigo: Optional[str] = Query(None, description="Código del catálogo (ej: MAT-LUZ-01)"),
+    texto: Optional[str] = Query(None, min_length=2, description="Texto en la descripción (ej: punto de luz)"),
+    unidad: Optional[str] = None,
+    desde: Optional[datetime] = Query(None, description="Cotizaciones creadas desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="Cotizaciones creadas hasta (exclusive)"),
+    estado: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Precio unitario promedio, mínimo y máximo de los items cotizados,
+    agrupado por código, descripción y unidad (GROUP BY sobre la tabla items)
+    """
+    consulta = cotizacion_items.consulta_precios(
+        codigo=codigo, texto=texto, unidad=unidad,
+        desde=desde, hasta=hasta, estado=estado, limite=limite
+    )
+    return cotizacion_items.filas_precios((await db.execute(consulta)).all())
+
 @router.get("/{cotizacion_id}", response_model=CotizacionResponse)
 async def obtener_cotizacion(
     cotizacion_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtener una cotización por ID
     """
-    cotizacion = db.query(Cotizacion).filter(Cotizacion.id == cotizacion_id).first()
+    cotizacion = await db.get(Cotizacion, cotizacion_id)
     
     if not cotizacion:
         raise HTTPException(
@@ -195,13 +240,13 @@ async def obtener_cotizacion(
 async def actualizar_cotizacion(
     cotizacion_id: int,
     cotizacion_update: CotizacionUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualizar una cotización
     """
     
-    db_cotizacion = db.query(Cotizacion).filter(Cotizacion.id == cotizacion_id).first()
+    db_cotizacion = await db.get(Cotizacion, cotizacion_id)
     
     if not db_cotizacion:
         raise HTTPException(
@@ -215,36 +260,36 @@ async def actualizar_cotizacion(
         if key != "items":
             setattr(db_cotizacion, key, value)
     
-    # Actualizar items si vienen
+    # Actualizar items si vienen: DELETE + un INSERT multi-fila
     if cotizacion_update.items is not None:
-        # Eliminar items antiguos
-        db.query(Item).filter(Item.cotizacion_id == cotizacion_id).delete()
+        borrar, insertar, filas = cotizacion_items.sentencias_reemplazo(cotizacion_id, cotizacion_update.items)
+        await db.execute(borrar)
+        if filas:
+            await db.execute(insertar, filas)
+        db_cotizacion.items_legacy = None
+        marcar_pendiente(db.sync_session, "cotizacion", cotizacion_id)
         
-        # Agregar items nuevos
-        for item_data in cotizacion_update.items:
-            db_item = Item(
-                descripcion=item_data.get("descripcion"),
-                cantidad=item_data.get("cantidad"),
-                precio_unitario=item_data.get("precio_unitario"),
-                total=item_data.get("total", item_data.get("cantidad") * item_data.get("precio_unitario")),
-                cotizacion_id=cotizacion_id
-            )
-            db.add(db_item)
+        # Sin totales explícitos, se recalculan con SUM sobre los items nuevos
+        if not {"subtotal", "igv", "total"} & update_data.keys():
+            subtotal = (await db.execute(cotizacion_items.consulta_totales(cotizacion_id))).scalar()
+            for campo, valor in cotizacion_items.totales_desde_subtotal(subtotal).items():
+                setattr(db_cotizacion, campo, valor)
     
-    db.commit()
-    db.refresh(db_cotizacion)
+    await db.commit()
+    await db.refresh(db_cotizacion)
     
     return db_cotizacion
 
 @router.delete("/{cotizacion_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_cotizacion(
     cotizacion_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Eliminar una cotización
     """
-    db_cotizacion = db.query(Cotizacion).filter(Cotizacion.id == cotizacion_id).first()
+    # items_rel se carga con selectin junto a la cotización (cascada del ORM)
+    db_cotizacion = await db.get(Cotizacion, cotizacion_id)
     
     if not db_cotizacion:
         raise HTTPException(
@@ -252,12 +297,9 @@ async def eliminar_cotizacion(
             detail="Cotización no encontrada"
         )
     
-    # Eliminar items asociados
-    db.query(Item).filter(Item.cotizacion_id == cotizacion_id).delete()
-    
-    # Eliminar cotización
-    db.delete(db_cotizacion)
-    db.commit()
+    # Eliminar cotización (y sus items por cascada)
+    await db.delete(db_cotizacion)
+    await db.commit()
     
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
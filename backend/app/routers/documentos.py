@@ -4,14 +4,18 @@ Endpoints para upload, procesamiento y búsqueda de documentos
 
 🔧 VERSIÓN CORREGIDA - Restaurado código faltante en subir_documento
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Body, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
 from typing import List, Optional, Dict
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.documento import Documento
 from app.schemas.documento import (
     DocumentoResponse,
+    DocumentoListItem,
     DocumentoUploadResponse,
     BusquedaSemanticaRequest,
     ResultadoBusqueda
@@ -19,7 +23,9 @@ from app.schemas.documento import (
 from app.services.file_processor import file_processor
 from app.services.rag_service import rag_service
 from app.services.gemini_service import gemini_service
+from app.services.content_store import content_store
 from app.core.config import settings
+from app.core.paginacion import resolver_campos, listar_keyset_async, HEADER_CURSOR
 from pathlib import Path
 from datetime import datetime
 import shutil
@@ -32,6 +38,34 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Campos de listado: los pesados (texto extraído, JSON) solo si se piden con ?fields=
+CAMPOS_LISTA_DOCUMENTO = list(DocumentoListItem.model_fields)
+CAMPOS_LISTA_DOCUMENTO_DEFECTO = [
+    c for c in CAMPOS_LISTA_DOCUMENTO if c not in ("contenido_texto", "metadata_extraida", "mensaje_error")
+]
+
+# ============================================
+# FUNCIONES AUXILIARES
+# ============================================
+
+async def _obtener_documento_async(db: AsyncSession, documento_id: int, con_legacy: bool = False):
+    """
+    Documento por ID. con_legacy=True carga también la columna antigua del
+    texto (filas sin migrar): en async no hay carga perezosa de diferidas.
+    """
+    consulta = select(Documento).where(Documento.id == documento_id)
+    if con_legacy:
+        consulta = consulta.options(undefer(Documento.contenido_legacy))
+    return (await db.execute(consulta)).scalar_one_or_none()
+
+
+def _eliminar_archivo_y_rag(ruta: str, documento_id: int):
+    ruta_archivo = Path(ruta)
+    if ruta_archivo.exists():
+        ruta_archivo.unlink()
+    rag_service.eliminar_documento(documento_id)
+
+
 # ============================================
 # ENDPOINTS DE DOCUMENTOS
 # ============================================
@@ -138,8 +172,8 @@ async def subir_documento(
             return DocumentoUploadResponse(
                 success=True,
                 message="Documento subido y procesado exitosamente",
-                documento=documento,
-                contenido_extraido=documento.contenido_texto[:500] if documento.contenido_texto else None
+                documento=documento.to_dict(),
+                contenido_extraido=documento.leer_contenido(0, 500)
             )
             
         except Exception as e:
@@ -153,7 +187,7 @@ async def subir_documento(
             return DocumentoUploadResponse(
                 success=True,
                 message=f"Documento subido pero hubo un error al procesarlo: {str(e)}",
-                documento=documento,
+                documento=documento.to_dict(),
                 contenido_extraido=None
             )
         
@@ -166,30 +200,61 @@ async def subir_documento(
             detail=f"Error al subir documento: {str(e)}"
         )
 
-@router.get("/", response_model=List[DocumentoResponse])
-def listar_documentos(
+@router.get("/", response_model=List[DocumentoListItem], response_model_exclude_unset=True)
+async def listar_documentos(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     proyecto_id: Optional[int] = Query(None),
     procesado: Optional[int] = Query(None, ge=0, le=2),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por coma (ej: id,nombre,contenido_texto)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Listar documentos con filtros
+    
+    Paginación por cursor (header X-Next-Cursor). contenido_texto,
+    metadata_extraida y mensaje_error solo se devuelven si se piden en `fields`
+    (el texto se lee del content store solo en ese caso).
     """
     try:
-        query = db.query(Documento)
+        campos = resolver_campos(fields, CAMPOS_LISTA_DOCUMENTO, CAMPOS_LISTA_DOCUMENTO_DEFECTO)
+        con_texto = "contenido_texto" in campos
+        if con_texto:
+            campos = [c for c in campos if c != "contenido_texto"] + ["contenido_hash", "contenido_legacy"]
         
+        filtros = []
         if proyecto_id:
-            query = query.filter(Documento.proyecto_id == proyecto_id)
+            filtros.append(Documento.proyecto_id == proyecto_id)
         
         if procesado is not None:
-            query = query.filter(Documento.procesado == procesado)
+            filtros.append(Documento.procesado == procesado)
+        
+        documentos, siguiente = await listar_keyset_async(
+            db, Documento, campos, Documento.fecha_subida,
+            filtros=filtros, cursor=cursor, limit=limit, skip=skip
+        )
         
-        documentos = query.order_by(Documento.fecha_subida.desc()).offset(skip).limit(limit).all()
+        if con_texto:
+            def _leer_textos():
+                for doc in documentos:
+                    hash_contenido = doc.pop("contenido_hash")
+                    legacy = doc.pop("contenido_legacy")
+                    doc["contenido_texto"] = content_store.leer(hash_contenido) if hash_contenido else legacy
+            
+            await run_in_threadpool(_leer_textos)
+        
+        if siguiente:
+            response.headers[HEADER_CURSOR] = siguiente
         
         return documentos
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error al listar documentos: {str(e)}")
         raise HTTPException(
@@ -198,14 +263,18 @@ def listar_documentos(
         )
 
 @router.get("/{documento_id}", response_model=DocumentoResponse)
-def obtener_documento(
+async def obtener_documento(
     documento_id: int,
-    db: Session = Depends(get_db)
+    incluir_contenido: bool = Query(False, description="Incluir el texto extraído completo"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtener documento por ID
+    
+    El texto extraído no se incluye por defecto; usar incluir_contenido=true
+    o GET /{documento_id}/contenido para leer un fragmento.
     """
-    documento = db.query(Documento).filter(Documento.id == documento_id).first()
+    documento = await _obtener_documento_async(db, documento_id, con_legacy=incluir_contenido)
     
     if not documento:
         raise HTTPException(
@@ -213,17 +282,60 @@ def obtener_documento(
             detail=f"Documento con ID {documento_id} no encontrado"
         )
     
-    return documento
+    if not incluir_contenido:
+        return documento.to_dict()
+    # Lectura/descompresión del content store fuera del event loop
+    return await run_in_threadpool(documento.to_dict, True)
+
+@router.get("/{documento_id}/contenido")
+async def obtener_contenido_documento(
+    documento_id: int,
+    inicio: int = Query(0, ge=0, description="Primer carácter"),
+    longitud: Optional[int] = Query(None, ge=1, description="Caracteres a devolver (todo si se omite)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Texto extraído de un documento, completo o por rangos (vistas previas)
+    
+    Solo se descomprime hasta el final del rango pedido.
+    """
+    documento = await _obtener_documento_async(db, documento_id, con_legacy=True)
+    
+    if not documento:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Documento con ID {documento_id} no encontrado"
+        )
+    
+    contenido = await run_in_threadpool(documento.leer_contenido, inicio, longitud)
+    if contenido is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="El documento no tiene contenido extraído"
+        )
+    
+    total = documento.contenido_longitud
+    if total is None:
+        total = len(documento.contenido_legacy or "")
+    
+    return {
+        "documento_id": documento_id,
+        "inicio": inicio,
+        "longitud": len(contenido),
+        "total": total,
+        "completo": inicio + len(contenido) >= total,
+        "contenido": contenido
+    }
 
 @router.delete("/{documento_id}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_documento(
+async def eliminar_documento(
     documento_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Eliminar documento
     """
-    documento = db.query(Documento).filter(Documento.id == documento_id).first()
+    documento = await db.get(Documento, documento_id)
     
     if not documento:
         raise HTTPException(
@@ -232,24 +344,21 @@ def eliminar_documento(
         )
     
     try:
-        # Eliminar archivo físico
-        ruta_archivo = Path(documento.ruta_archivo)
-        if ruta_archivo.exists():
-            ruta_archivo.unlink()
-        
-        # Eliminar de RAG
-        rag_service.eliminar_documento(documento_id)
+        # Eliminar archivo físico y de RAG (bloqueantes: fuera del event loop)
+        await run_in_threadpool(_eliminar_archivo_y_rag, documento.ruta_archivo, documento_id)
         
         # Eliminar de base de datos
-        db.delete(documento)
-        db.commit()
+        hash_contenido = documento.contenido_hash
+        await db.delete(documento)
+        await db.commit()
+        await db.run_sync(content_store.eliminar_si_huerfano, hash_contenido)
         
         logger.info(f"Documento eliminado: {documento.nombre_original}")
         
         return None
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error al eliminar documento: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -331,6 +440,7 @@ def reprocesar_documento(
         resultado = file_processor.procesar_archivo(documento.ruta_archivo)
         
         # Actualizar contenido
+        hash_anterior = documento.contenido_hash
         documento.contenido_texto = resultado.get('contenido', '')
         documento.metadata_extraida = resultado.get('metadata', {})
         documento.procesado = 1
@@ -353,13 +463,15 @@ def reprocesar_documento(
             )
         
         db.commit()
+        if hash_anterior != documento.contenido_hash:
+            content_store.eliminar_si_huerfano(db, hash_anterior)
         
         logger.info(f"Documento reprocesado exitosamente: {documento.nombre_original}")
         
         return {
             "success": True,
             "message": "Documento reprocesado exitosamente",
-            "contenido_extraido": documento.contenido_texto[:500] if documento.contenido_texto else None
+            "contenido_extraido": documento.leer_contenido(0, 500)
         }
         
     except Exception as e:
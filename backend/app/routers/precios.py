@@ -0,0 +1,104 @@
+"""
+Router de Precios - Catálogo de precios unitarios (BD + hot reload)
+"""
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query, Body
+from sqlalchemy.orm import Session
+from typing import Optional
+from pathlib import Path
+import tempfile
+import logging
+
+from app.core.database import get_db
+from app.services.price_catalog import price_catalog
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+EXTENSIONES_IMPORTACION = {".xlsx", ".xls", ".csv"}
+
+
+@router.get("/")
+async def listar_precios(
+    servicio: Optional[str] = Query(None, description="Filtrar por servicio"),
+    region: Optional[str] = Query(None, description="Filtrar por región"),
+    db: Session = Depends(get_db)
+):
+    """Listar filas del catálogo de precios"""
+    precios = price_catalog.listar(db, servicio=servicio, region=region)
+    return {"total": len(precios), "version": price_catalog.version_cargada, "precios": precios}
+
+
+@router.get("/estado")
+async def estado_catalogo():
+    """Versión del catálogo cargada en este proceso"""
+    return price_catalog.estado()
+
+
+@router.post("/recargar")
+async def recargar_catalogo():
+    """Fuerza la recarga del catálogo en este worker (los demás recargan solos al ver la nueva versión)"""
+    return price_catalog.recargar()
+
+
+@router.post("/importar")
+async def importar_precios(
+    archivo: UploadFile = File(..., description="Excel (.xlsx/.xls) o CSV con columnas codigo, precio, ..."),
+    db: Session = Depends(get_db)
+):
+    """
+    Importar precios en bloque desde Excel/CSV
+
+    Inserta o actualiza por (codigo, region, vigente_desde) y publica una
+    nueva versión del catálogo.
+    """
+    extension = Path(archivo.filename or "").suffix.lower()
+    if extension not in EXTENSIONES_IMPORTACION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado: {extension or 'sin extensión'}"
+        )
+
+    with tempfile.NamedTemporaryFile(suffix=extension) as tmp:
+        tmp.write(await archivo.read())
+        tmp.flush()
+        try:
+            resultado = price_catalog.importar_archivo(db, tmp.name)
+        except (ValueError, RuntimeError) as e:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    logger.info(f"Precios importados desde {archivo.filename}: {resultado['insertados']} nuevos, {resultado['actualizados']} actualizados")
+    return {"success": True, "archivo": archivo.filename, **resultado}
+
+
+@router.get("/{codigo}")
+async def obtener_precio(
+    codigo: str,
+    region: Optional[str] = Query(None, description="Región (por defecto la genérica)")
+):
+    """Precio vigente de un código (desde la caché en memoria)"""
+    fila = price_catalog.pricing.fila(codigo, region=region)
+    if fila is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Código {codigo} no encontrado"
+        )
+    return fila
+
+
+@router.put("/{codigo}")
+async def actualizar_precio(
+    codigo: str,
+    precio: float = Body(..., gt=0, embed=True),
+    region: str = Body("*", embed=True),
+    db: Session = Depends(get_db)
+):
+    """Cambiar el precio vigente de un código"""
+    try:
+        return price_catalog.actualizar_precio(db, codigo, precio, region=region)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Código {codigo} no encontrado en la región {region}"
+        )
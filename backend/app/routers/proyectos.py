@@ -1,29 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Response
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional, Dict
 from datetime import datetime
 from pathlib import Path
 import logging
 import os
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models import Proyecto, Cotizacion, Documento
 from app.models.proyecto import EstadoProyecto
 from app.schemas.proyecto import (
     ProyectoCreate,
     ProyectoUpdate,
-    ProyectoResponse
+    ProyectoResponse,
+    ProyectoListItem
 )
+from app.core.paginacion import resolver_campos, listar_keyset_async, HEADER_CURSOR
+from app.services.project_stats import project_stats
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Campos de listado: metadata_adicional (JSON) solo si se pide con ?fields=
+CAMPOS_LISTA_PROYECTO = list(ProyectoListItem.model_fields)
+CAMPOS_LISTA_PROYECTO_DEFECTO = [c for c in CAMPOS_LISTA_PROYECTO if c != "metadata_adicional"]
+
 @router.post("/", response_model=ProyectoResponse, status_code=status.HTTP_201_CREATED)
 async def crear_proyecto(
     proyecto: ProyectoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Crea un nuevo proyecto
@@ -39,49 +48,66 @@ async def crear_proyecto(
     )
     
     db.add(db_proyecto)
-    db.commit()
-    db.refresh(db_proyecto)
+    await db.commit()
+    await db.refresh(db_proyecto)
     
     return db_proyecto
 
-@router.get("/", response_model=List[ProyectoResponse])
+@router.get("/", response_model=List[ProyectoListItem], response_model_exclude_unset=True)
 async def listar_proyectos(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     estado: Optional[EstadoProyecto] = None,
     cliente: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por coma (ej: id,nombre,metadata_adicional)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista todos los proyectos con filtros opcionales
+    
+    Ordenados por fecha de creación (más recientes primero), con paginación
+    por cursor (header X-Next-Cursor). metadata_adicional solo se devuelve
+    si se pide en `fields`.
     """
     
-    query = db.query(Proyecto)
+    filtros = []
     
     # Aplicar filtros
     if estado:
-        query = query.filter(Proyecto.estado == estado)
+        filtros.append(Proyecto.estado == estado)
     
     if cliente:
-        query = query.filter(Proyecto.cliente.ilike(f"%{cliente}%"))
+        filtros.append(Proyecto.cliente.ilike(f"%{cliente}%"))
     
-    # Ordenar por fecha de creación
-    query = query.order_by(Proyecto.fecha_creacion.desc())
+    try:
+        campos = resolver_campos(fields, CAMPOS_LISTA_PROYECTO, CAMPOS_LISTA_PROYECTO_DEFECTO)
+        proyectos, siguiente = await listar_keyset_async(
+            db, Proyecto, campos, Proyecto.fecha_creacion,
+            filtros=filtros, cursor=cursor, limit=limit, skip=skip
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    proyectos = query.offset(skip).limit(limit).all()
+    if siguiente:
+        response.headers[HEADER_CURSOR] = siguiente
     
     return proyectos
 
 @router.get("/{proyecto_id}", response_model=ProyectoResponse)
 async def obtener_proyecto(
     proyecto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene un proyecto por ID con información completa
     """
     
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     
     if not proyecto:
         raise HTTPException(
@@ -94,13 +120,13 @@ async def obtener_proyecto(
 @router.get("/{proyecto_id}/detalle")
 async def obtener_proyecto_detallado(
     proyecto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene un proyecto con todas sus relaciones (cotizaciones, documentos)
     """
     
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     
     if not proyecto:
         raise HTTPException(
@@ -109,38 +135,36 @@ async def obtener_proyecto_detallado(
         )
     
     # Obtener cotizaciones relacionadas
-    cotizaciones = db.query(Cotizacion).filter(
-        Cotizacion.proyecto_id == proyecto_id
-    ).all()
+    cotizaciones = (await db.execute(
+        select(Cotizacion).where(Cotizacion.proyecto_id == proyecto_id)
+    )).scalars().all()
+    
+    # Obtener documentos relacionados (el texto extraído vive en el content
+    # store y la columna antigua es diferida: no se carga aquí)
+    documentos = (await db.execute(
+        select(Documento).where(Documento.proyecto_id == proyecto_id)
+    )).scalars().all()
     
-    # Obtener documentos relacionados
-    documentos = db.query(Documento).filter(
-        Documento.proyecto_id == proyecto_id
-    ).all()
+    estadisticas = await db.run_sync(project_stats.estadisticas_proyecto, proyecto_id)
     
     return {
         "proyecto": proyecto,
         "cotizaciones": cotizaciones,
         "documentos": documentos,
-        "estadisticas": {
-            "total_cotizaciones": len(cotizaciones),
-            "total_documentos": len(documentos),
-            "cotizaciones_aprobadas": sum(1 for c in cotizaciones if c.estado == "aprobada"),
-            "valor_total": sum(c.total for c in cotizaciones if c.estado == "aprobada")
-        }
+        "estadisticas": estadisticas
     }
 
 @router.put("/{proyecto_id}", response_model=ProyectoResponse)
 async def actualizar_proyecto(
     proyecto_id: int,
     proyecto_update: ProyectoUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualiza un proyecto existente
     """
     
-    db_proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    db_proyecto = await db.get(Proyecto, proyecto_id)
     
     if not db_proyecto:
         raise HTTPException(
@@ -156,22 +180,28 @@ async def actualizar_proyecto(
     
     db_proyecto.fecha_modificacion = datetime.utcnow()
     
-    db.commit()
-    db.refresh(db_proyecto)
+    await db.commit()
+    await db.refresh(db_proyecto)
     
     return db_proyecto
 
 @router.delete("/{proyecto_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_proyecto(
     proyecto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Elimina un proyecto
     NOTA: Esto también eliminará todas las cotizaciones y documentos relacionados
     """
     
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    # Relaciones en cascada cargadas de antemano (en async no hay carga perezosa)
+    proyecto = (await db.execute(
+        select(Proyecto).options(
+            selectinload(Proyecto.cotizaciones).selectinload(Cotizacion.items_rel),
+            selectinload(Proyecto.documentos)
+        ).where(Proyecto.id == proyecto_id)
+    )).scalar_one_or_none()
     
     if not proyecto:
         raise HTTPException(
@@ -179,8 +209,8 @@ async def eliminar_proyecto(
             detail="Proyecto no encontrado"
         )
     
-    db.delete(proyecto)
-    db.commit()
+    await db.delete(proyecto)
+    await db.commit()
     
     return None
 
@@ -188,13 +218,13 @@ async def eliminar_proyecto(
 async def cambiar_estado_proyecto(
     proyecto_id: int,
     nuevo_estado: EstadoProyecto,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cambia el estado de un proyecto
     """
     
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     
     if not proyecto:
         raise HTTPException(
@@ -210,31 +240,33 @@ async def cambiar_estado_proyecto(
         if not proyecto.fecha_fin:
             proyecto.fecha_fin = datetime.utcnow()
     
-    db.commit()
-    db.refresh(proyecto)
+    await db.commit()
+    await db.refresh(proyecto)
     
     return proyecto
 
 @router.get("/stats/resumen")
 async def obtener_estadisticas_proyectos(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene estadísticas generales de proyectos
     """
     
-    total = db.query(Proyecto).count()
-    
-    por_estado = {}
-    for estado in EstadoProyecto:
-        por_estado[estado.value] = db.query(Proyecto).filter(
-            Proyecto.estado == estado
-        ).count()
+    return await db.run_sync(project_stats.resumen)
+
+@router.get("/stats/dashboard")
+async def obtener_dashboard_proyectos(
+    cliente: Optional[str] = None,
+    proyecto_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Dashboard multi-proyecto en una sola consulta: proyectos por estado,
+    cotizaciones y valor aprobado, y backlog de documentos por procesar
+    """
     
-    return {
-        "total_proyectos": total,
-        "por_estado": por_estado
-    }
+    return await db.run_sync(project_stats.dashboard, cliente=cliente, proyecto_ids=proyecto_ids)
 
 # ════════════════════════════════════════════════════════════════
 # ✅ ENDPOINTS MEJORADOS CON ANÁLISIS IA - INTEGRACIÓN report_generator
@@ -1,14 +1,16 @@
 # backend/app/routers/system.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import google.generativeai as genai
 import logging
 
 # Importaciones correctas según la estructura de tu proyecto
-from app.core.database import get_db
+from app.core.database import get_db, metricas_pools
 from app.core.config import settings, get_empresa_info
+from app.core.tracing import registro_trazas
+from app.core.admision import get_estado_admision
 
 # Usar el mismo logger que el resto de la aplicación
 logger = logging.getLogger(__name__)
@@ -28,6 +30,7 @@ async def check_system_health(db: Session = Depends(get_db)):
     Verifica el estado de las conexiones críticas del sistema:
     1.  **Base de Datos**: Realiza una consulta simple para asegurar la conexión.
     2.  **Servicio de IA**: Se comunica con la API de Google Gemini para validar la clave y la conectividad.
+    3.  **Pools de conexiones**: Conexiones prestadas/libres y utilización (sync y async).
     """
     db_status = "disconnected"
     ai_status = "unresponsive"
@@ -60,15 +63,18 @@ async def check_system_health(db: Session = Depends(get_db)):
     except Exception as e:
         logger.error(f"Error de conexión con la IA durante el health check: {e}", exc_info=True)
 
-    # --- 3. Reportar el estado final ---
+    # --- 3. Uso de los pools de conexiones ---
+    pools = metricas_pools()
+
+    # --- 4. Reportar el estado final ---
     if db_status != "connected" or ai_status != "responsive":
         # Si algo falla, el estado general es de error 503 Service Unavailable
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail={"database": db_status, "ai_service": ai_status}
+            detail={"database": db_status, "ai_service": ai_status, "pools": pools}
         )
 
-    return {"status": "ok", "database": db_status, "ai_service": ai_status}
+    return {"status": "ok", "database": db_status, "ai_service": ai_status, "pools": pools}
 
 
 @router.get("/empresa-info",
@@ -102,4 +108,37 @@ async def get_empresa_information():
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error al obtener información de la empresa"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/traces",
+            summary="Trazas de rendimiento de los requests lentos",
+            status_code=status.HTTP_200_OK)
+async def get_slow_traces(
+    limite: int = Query(20, ge=1, le=200),
+    min_ms: float = Query(0.0, ge=0)
+):
+    """
+    Últimas trazas lentas de este worker (ring buffer en memoria), la más
+    reciente primero.
+
+    Cada traza trae el árbol de spans (PILIBrain, Gemini, RAG, Chroma,
+    gráficas, docx/pdf...) con su inicio y duración en ms, y el tiempo total
+    de BD. Solo se guardan los requests que superan TRACING_UMBRAL_LENTO_MS.
+    """
+    return {
+        "estado": registro_trazas.estado(),
+        "trazas": registro_trazas.listar(limite=limite, min_ms=min_ms)
+    }
+
+
+@router.get("/admision",
+            summary="Límites de tasa y ocupación de la compuerta de concurrencia",
+            status_code=status.HTTP_200_OK)
+async def get_admission_status():
+    """
+    Límites por clase de endpoint (ráfaga y requests por minuto), backend de
+    los buckets (redis o local) y unidades ocupadas en la compuerta de este
+    worker, con la duración media por clase que se usa para Retry-After.
+    """
+    return get_estado_admision()
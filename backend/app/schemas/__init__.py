@@ -5,7 +5,8 @@ from app.schemas.proyecto import (
     ProyectoBase,
     ProyectoCreate,
     ProyectoUpdate,
-    ProyectoResponse
+    ProyectoResponse,
+    ProyectoListItem
 )
 from app.schemas.cotizacion import (
     ItemBase,
@@ -13,11 +14,14 @@ from app.schemas.cotizacion import (
     CotizacionBase,
     CotizacionCreate,
     CotizacionUpdate,
-    CotizacionResponse
+    CotizacionResponse,
+    SimulacionPreciosRequest,
+    CotizacionListItem
 )
 from app.schemas.documento import (
     DocumentoBase,
-    DocumentoResponse
+    DocumentoResponse,
+    DocumentoListItem
 )
 
 __all__ = [
@@ -26,6 +30,7 @@ __all__ = [
     "ProyectoCreate",
     "ProyectoUpdate",
     "ProyectoResponse",
+    "ProyectoListItem",
     
     # Cotización
     "ItemBase",
@@ -34,8 +39,11 @@ __all__ = [
     "CotizacionCreate",
     "CotizacionUpdate",
     "CotizacionResponse",
+    "SimulacionPreciosRequest",
+    "CotizacionListItem",
     
     # Documento
     "DocumentoBase",
     "DocumentoResponse",
+    "DocumentoListItem",
 ]
\ No newline at end of file
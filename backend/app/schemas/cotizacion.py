@@ -159,6 +159,32 @@ class CotizacionResponse(CotizacionBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class CotizacionListItem(BaseModel):
+    """
+    Schema ligero para listados de cotizaciones
+    items, subtotal_items y metadata_adicional solo se incluyen si se piden con ?fields=
+    """
+    id: int
+    numero: Optional[str] = None
+    cliente: Optional[str] = None
+    proyecto: Optional[str] = None
+    descripcion: Optional[str] = None
+    estado: Optional[str] = None
+    subtotal: Optional[Decimal] = None
+    igv: Optional[Decimal] = None
+    total: Optional[Decimal] = None
+    vigencia: Optional[str] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_modificacion: Optional[datetime] = None
+    proyecto_id: Optional[int] = None
+    cliente_id: Optional[int] = None
+    observaciones: Optional[str] = None
+    # Calculados en SQL sobre la tabla items
+    num_items: Optional[int] = None
+    subtotal_items: Optional[Decimal] = None
+    items: Optional[List[Dict[str, Any]]] = None
+    metadata_adicional: Optional[Dict[str, Any]] = None
+
 # ============================================
 # SCHEMAS ESPECIALES PARA CHAT IA
 # ============================================
@@ -190,4 +216,16 @@ class ChatResponse(BaseModel):
     """Schema de respuesta del chat"""
     respuesta: str = Field(..., description="Respuesta del asistente")
     cotizacion: Optional[CotizacionResponse] = Field(None, description="Cotización generada/actualizada")
-    sugerencias: Optional[List[str]] = Field(None, description="Sugerencias de seguimiento")
\ No newline at end of file
+    sugerencias: Optional[List[str]] = Field(None, description="Sugerencias de seguimiento")
+# ============================================
+# SCHEMAS DE SIMULACIÓN DE PRECIOS
+# ============================================
+
+class SimulacionPreciosRequest(BaseModel):
+    """Schema para barridos what-if de precios (sliders del frontend)"""
+    servicio: str = Field(..., description="Código del servicio (electrico-residencial, etc.)")
+    valores: List[float] = Field(..., min_length=1, max_length=1000, description="Valores de la variable a barrer")
+    variable: Optional[str] = Field(None, description="area_m2, potencia_hp o cantidad_puntos (por defecto la principal)")
+    complejidades: List[str] = Field(["simple", "complejo"], description="Complejidades a evaluar")
+    datos: Optional[Dict[str, float]] = Field(None, description="Valores fijos del resto de variables")
+    region: Optional[str] = Field(None, description="Región del catálogo de precios")
@@ -18,6 +18,7 @@ class DocumentoResponse(DocumentoBase):
     tipo_mime: str
     tamano: int
     contenido_texto: Optional[str] = None
+    contenido_longitud: Optional[int] = None
     metadata_extraida: Optional[Dict[str, Any]] = None
     procesado: int
     mensaje_error: Optional[str] = None
@@ -26,6 +27,27 @@ class DocumentoResponse(DocumentoBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class DocumentoListItem(BaseModel):
+    """
+    Schema ligero para listados de documentos
+    contenido_texto, metadata_extraida y mensaje_error solo se incluyen si
+    se piden con ?fields=
+    """
+    id: int
+    nombre: Optional[str] = None
+    nombre_original: Optional[str] = None
+    ruta_archivo: Optional[str] = None
+    tipo_mime: Optional[str] = None
+    tamano: Optional[int] = None
+    procesado: Optional[int] = None
+    fecha_subida: Optional[datetime] = None
+    fecha_procesamiento: Optional[datetime] = None
+    proyecto_id: Optional[int] = None
+    contenido_longitud: Optional[int] = None
+    mensaje_error: Optional[str] = None
+    contenido_texto: Optional[str] = None
+    metadata_extraida: Optional[Dict[str, Any]] = None
+
 class DocumentoUploadResponse(BaseModel):
     """Schema de respuesta al subir documento"""
     success: bool
@@ -44,4 +44,21 @@ class ProyectoResponse(ProyectoBase):
     fecha_inicio: Optional[datetime] = None
     fecha_fin: Optional[datetime] = None
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class ProyectoListItem(BaseModel):
+    """
+    Schema ligero para listados de proyectos
+    metadata_adicional solo se incluye si se pide con ?fields=
+    """
+    id: int
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    cliente: Optional[str] = None
+    estado: Optional[EstadoProyecto] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_modificacion: Optional[datetime] = None
+    fecha_inicio: Optional[datetime] = None
+    fecha_fin: Optional[datetime] = None
+    cliente_id: Optional[int] = None
+    metadata_adicional: Optional[Dict[str, Any]] = None
@@ -0,0 +1,333 @@
+"""
+⌨️ AUTOCOMPLETADO DE CLIENTES - ÍNDICE DE PREFIJOS EN MEMORIA
+📁 RUTA: backend/app/services/autocompletado_clientes.py
+
+`/api/clientes/search` se llama en cada tecla. En lugar de un
+`ILIKE '%q%'` (sin índice posible) por pulsación, cada proceso mantiene
+los clientes en listas ordenadas de claves normalizadas y busca por
+prefijo con bisect.
+
+🎯 CÓMO FUNCIONA:
+- Claves por cliente: el nombre completo normalizado (minúsculas, sin
+  tildes ni signos), cada sufijo que empieza en una palabra del nombre
+  ("andina sac" para "Constructora Andina SAC") y el RUC
+- Orden del resultado: primero los nombres/RUC que empiezan por la
+  consulta, luego las coincidencias en palabras internas; alfabético
+- Caché por prefijo (LRU): "cons" → "const" filtra en memoria el
+  resultado de "cons" en lugar de volver a recorrer el índice
+- Escrituras en este proceso (eventos del ORM sobre clientes y sobre el
+  cliente_id de cotizaciones): se reparchean solo esos clientes
+- Escrituras en otros workers: cada AUTOCOMPLETADO_CHECK_S segundos una
+  consulta de huella (conteos y max(fecha_modificacion)); si cambió, se
+  reconstruye el índice
+"""
+
+import re
+import time
+import bisect
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, attributes
+
+from app.core.config import settings
+from app.core.database import SessionLocal, SesionBaseAsync
+from app.core.metricas import contar_cache
+from app.models.cliente import Cliente
+from app.models.cotizacion import Cotizacion
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_RESUMEN = ("id", "nombre", "ruc", "telefono", "email", "industria")
+
+# Coincidencias guardadas por prefijo (más que el `limit` máximo del endpoint
+# para poder seguir filtrando mientras se escribe)
+MAX_COINCIDENCIAS = 200
+MAX_PREFIJOS_CACHE = 1024
+
+CLAVE_PENDIENTES = "autocompletado_clientes_pendientes"
+
+# Rango de la coincidencia: empieza el nombre/RUC, o una palabra interna
+RANGO_INICIO = 0
+RANGO_PALABRA = 1
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sin tildes, solo letras/dígitos separados por un espacio"""
+    if not texto:
+        return ""
+    sin_tildes = unicodedata.normalize("NFKD", texto.lower())
+    sin_tildes = "".join(c for c in sin_tildes if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", sin_tildes))
+
+
+def claves_cliente(nombre: Optional[str], ruc: Optional[str]) -> List[Tuple[str, int]]:
+    """(clave, rango) de un cliente: nombre, sufijos por palabra y RUC"""
+    base = normalizar(nombre)
+    claves = [(base, RANGO_INICIO)] if base else []
+    inicio = base.find(" ")
+    while inicio != -1:
+        claves.append((base[inicio + 1:], RANGO_PALABRA))
+        inicio = base.find(" ", inicio + 1)
+    digitos = re.sub(r"\D", "", ruc or "")
+    if digitos:
+        claves.append((digitos, RANGO_INICIO))
+    return claves
+
+
+class AutocompletadoClientes:
+    """
+    ⌨️ Índice de prefijos de clientes (por proceso) con caché por prefijo
+    """
+
+    def __init__(self, intervalo: float = None):
+        self.intervalo = intervalo if intervalo is not None else settings.AUTOCOMPLETADO_CHECK_S
+        # Por rango, (clave, cliente_id) ordenado: un prefijo es un tramo contiguo
+        self._claves: Tuple[List[Tuple[str, int]], ...] = ([], [])
+        self._clientes: Dict[int, Dict[str, Any]] = {}
+        self._claves_por_cliente: Dict[int, List[Tuple[str, int]]] = {}
+        # prefijo → (ids ordenados, completo); completo=False si se truncó
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, ...], bool]]" = OrderedDict()
+        self._pendientes: Set[int] = set()
+        self._huella: Optional[Tuple] = None
+        self._ultimo_chequeo = 0.0
+        self._cargado = False
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.acotadas = 0
+        self.misses = 0
+        self.reconstrucciones = 0
+
+    # ──────────────────────────────────────────────────────────────
+    # 🔄 SINCRONIZACIÓN CON LA BD
+    # ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _leer_huella(db: Session) -> Tuple:
+        clientes = db.execute(select(
+            func.count(Cliente.id), func.max(Cliente.id), func.max(Cliente.fecha_modificacion)
+        )).one()
+        cotizaciones = db.execute(
+            select(func.count(Cotizacion.id)).where(Cotizacion.cliente_id.isnot(None))
+        ).scalar()
+        return (*clientes, cotizaciones)
+
+    @staticmethod
+    def _leer_clientes(db: Session, ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+        consulta = select(*(getattr(Cliente, c) for c in CAMPOS_RESUMEN))
+        conteos = select(Cotizacion.cliente_id, func.count(Cotizacion.id)).where(Cotizacion.cliente_id.isnot(None))
+        if ids is not None:
+            ids = list(ids)
+            consulta = consulta.where(Cliente.id.in_(ids))
+            conteos = conteos.where(Cotizacion.cliente_id.in_(ids))
+        totales = dict(db.execute(conteos.group_by(Cotizacion.cliente_id)).all())
+        return {
+            fila.id: {**fila._asdict(), "total_cotizaciones": totales.get(fila.id, 0)}
+            for fila in db.execute(consulta)
+        }
+
+    def _reconstruir(self, db: Session):
+        clientes = self._leer_clientes(db)
+        claves_por_cliente = {
+            cliente_id: claves_cliente(datos["nombre"], datos["ruc"])
+            for cliente_id, datos in clientes.items()
+        }
+        claves = ([], [])
+        for cliente_id, lista in claves_por_cliente.items():
+            for clave, rango in lista:
+                claves[rango].append((clave, cliente_id))
+        for lista in claves:
+            lista.sort()
+        self._clientes, self._claves_por_cliente, self._claves = clientes, claves_por_cliente, claves
+        self._cache.clear()
+        self._pendientes.clear()
+        self.reconstrucciones += 1
+        logger.info(f"⌨️ Autocompletado de clientes: {len(clientes)} clientes, {sum(map(len, claves))} claves")
+
+    def _aplicar_pendientes(self, db: Session, ids: Set[int]):
+        """Reemplaza en el índice solo los clientes modificados en este proceso"""
+        nuevos = self._leer_clientes(db, ids)
+        for cliente_id in ids:
+            for clave, rango in self._claves_por_cliente.pop(cliente_id, []):
+                lista = self._claves[rango]
+                posicion = bisect.bisect_left(lista, (clave, cliente_id))
+                if posicion < len(lista) and lista[posicion] == (clave, cliente_id):
+                    del lista[posicion]
+            self._clientes.pop(cliente_id, None)
+            datos = nuevos.get(cliente_id)
+            if datos is None:
+                continue  # eliminado
+            self._clientes[cliente_id] = datos
+            self._claves_por_cliente[cliente_id] = claves_cliente(datos["nombre"], datos["ruc"])
+            for clave, rango in self._claves_por_cliente[cliente_id]:
+                bisect.insort(self._claves[rango], (clave, cliente_id))
+        self._cache.clear()
+
+    def refrescar(self, db: Session, forzar: bool = False):
+        """
+        Deja el índice al día. Barato en el caso normal: no consulta la BD
+        salvo que haya cambios locales pendientes o toque chequear la huella.
+        """
+        def toca_chequeo():
+            return forzar or not self._cargado or time.monotonic() - self._ultimo_chequeo >= self.intervalo
+
+        if not self._pendientes and not toca_chequeo():
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            if self._pendientes and self._cargado:
+                pendientes, self._pendientes = self._pendientes, set()
+                self._aplicar_pendientes(db, pendientes)
+                self._huella = self._leer_huella(db)
+                self._ultimo_chequeo = ahora
+                return
+            if not toca_chequeo():
+                return
+            huella = self._leer_huella(db)
+            self._ultimo_chequeo = ahora
+            if forzar or not self._cargado or huella != self._huella:
+                self._reconstruir(db)
+                self._huella = huella
+                self._cargado = True
+
+    def marcar(self, ids: Iterable[int]):
+        """Clientes a reparchear en la próxima búsqueda (tras un commit local)"""
+        with self._lock:
+            self._pendientes.update(i for i in ids if i is not None)
+
+    # ──────────────────────────────────────────────────────────────
+    # 🔍 BÚSQUEDA
+    # ──────────────────────────────────────────────────────────────
+
+    def _orden(self, cliente_id: int, consulta: str) -> Optional[Tuple[int, str]]:
+        """(rango, clave) de la mejor coincidencia del cliente; None si no coincide"""
+        mejores = [
+            (rango, clave) for clave, rango in self._claves_por_cliente.get(cliente_id, ())
+            if clave.startswith(consulta)
+        ]
+        return min(mejores) if mejores else None
+
+    def _ordenar(self, ids: Iterable[int], consulta: str) -> Tuple[Tuple[int, ...], bool]:
+        ordenados = sorted(
+            (orden, cliente_id) for cliente_id in ids
+            if (orden := self._orden(cliente_id, consulta)) is not None
+        )
+        completo = len(ordenados) <= MAX_COINCIDENCIAS
+        return tuple(cliente_id for _, cliente_id in ordenados[:MAX_COINCIDENCIAS]), completo
+
+    def _desde_indice(self, consulta: str) -> Tuple[Tuple[int, ...], bool]:
+        """
+        Recorre los tramos del prefijo (primero inicios, luego palabras
+        internas): ya vienen en el orden del resultado, así que el coste es
+        O(MAX_COINCIDENCIAS) aunque coincidan miles de clientes
+        """
+        ids: List[int] = []
+        vistos: Set[int] = set()
+        for lista in self._claves:
+            posicion = bisect.bisect_left(lista, (consulta,))
+            while posicion < len(lista):
+                clave, cliente_id = lista[posicion]
+                if not clave.startswith(consulta):
+                    break
+                if cliente_id not in vistos:
+                    if len(ids) == MAX_COINCIDENCIAS:
+                        return tuple(ids), False
+                    vistos.add(cliente_id)
+                    ids.append(cliente_id)
+                posicion += 1
+        return tuple(ids), True
+
+    def _coincidencias(self, consulta: str) -> Tuple[int, ...]:
+        entrada = self._cache.get(consulta)
+        if entrada is not None:
+            self._cache.move_to_end(consulta)
+            self.hits += 1
+            contar_cache("autocompletado_clientes", True)
+            return entrada[0]
+
+        # Un prefijo ya resuelto y completo: filtrar ese resultado
+        padre = None
+        for largo in range(len(consulta) - 1, 1, -1):
+            candidato = self._cache.get(consulta[:largo])
+            if candidato is not None:
+                padre = candidato
+                break
+        if padre is not None and padre[1]:
+            entrada = self._ordenar(padre[0], consulta)
+            self.acotadas += 1
+        else:
+            entrada = self._desde_indice(consulta)
+            self.misses += 1
+
+        contar_cache("autocompletado_clientes", False)
+        self._cache[consulta] = entrada
+        if len(self._cache) > MAX_PREFIJOS_CACHE:
+            self._cache.popitem(last=False)
+        return entrada[0]
+
+    def buscar(self, consulta: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """Clientes cuyo nombre, alguna palabra del nombre o RUC empiezan por `consulta`"""
+        normalizada = normalizar(consulta)
+        if not normalizada:
+            return []
+        with self._lock:
+            ids = self._coincidencias(normalizada)
+            return [dict(self._clientes[i]) for i in ids[:limite]]
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clientes": len(self._clientes),
+                "claves": sum(map(len, self._claves)),
+                "prefijos_en_cache": len(self._cache),
+                "hits": self.hits,
+                "acotadas": self.acotadas,
+                "misses": self.misses,
+                "reconstrucciones": self.reconstrucciones,
+                "intervalo_chequeo_s": self.intervalo,
+            }
+
+
+# Instancia global
+autocompletado_clientes = AutocompletadoClientes()
+
+
+def get_autocompletado_clientes() -> AutocompletadoClientes:
+    """Obtiene la instancia del autocompletado de clientes"""
+    return autocompletado_clientes
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔄 SINCRONIZACIÓN CON EL ORM
+# ═══════════════════════════════════════════════════════════════
+
+def _anotar_cambios(session, flush_context):
+    ids: Set[int] = session.info.setdefault(CLAVE_PENDIENTES, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Cliente):
+            ids.add(obj.id)
+        elif isinstance(obj, Cotizacion):
+            # total_cotizaciones del cliente nuevo y del anterior
+            historial = attributes.get_history(obj, "cliente_id")
+            ids.update(i for i in (obj.cliente_id, *historial.deleted) if i is not None)
+
+
+def _aplicar_tras_commit(session):
+    ids = session.info.pop(CLAVE_PENDIENTES, None)
+    if ids:
+        autocompletado_clientes.marcar(ids)
+
+
+def _limpiar_tras_rollback(session):
+    session.info.pop(CLAVE_PENDIENTES, None)
+
+
+# Sesiones síncronas y las internas de AsyncSession (routers async)
+for _objetivo in (SessionLocal, SesionBaseAsync):
+    event.listen(_objetivo, "after_flush", _anotar_cambios)
+    event.listen(_objetivo, "after_commit", _aplicar_tras_commit)
+    event.listen(_objetivo, "after_rollback", _limpiar_tras_rollback)
@@ -0,0 +1,607 @@
+"""
+🔎 BÚSQUEDA - TEXTO COMPLETO SOBRE COTIZACIONES, PROYECTOS, DOCUMENTOS Y CLIENTES
+📁 RUTA: backend/app/services/busqueda.py
+
+Un solo índice de texto para todo lo buscable, con ranking y resaltado:
+
+- PostgreSQL: tabla `busqueda_indice` con columna `tsvector` e índice GIN.
+  Configuración `es_unaccent` (español + unaccent): "instalación" e
+  "instalacion" encuentran lo mismo, con stemming en español
+- SQLite (local): tabla virtual FTS5 `busqueda_fts` (unicode61 sin
+  diacríticos, índice de prefijos) con ranking bm25
+
+🎯 CÓMO FUNCIONA:
+- Cada entidad es una fila del índice con `titulo` (peso alto) y `cuerpo`.
+  La clave codifica tipo e id: ref_id * 8 + código de tipo, así borrar o
+  reemplazar una entrada es una búsqueda por clave primaria
+- El texto de los documentos se lee del content store (no está en la BD),
+  por eso el índice es una tabla aparte y no columnas en cada tabla
+- Sincronización por eventos del ORM: after_flush anota qué entidades
+  cambiaron y before_commit las reindexa en la MISMA transacción
+  (los items insertados en bloque ya están visibles en ese punto)
+- Escrituras que no pasan por el ORM: marcar_pendiente() o reindexar()
+- La consulta se limpia (solo palabras); la última palabra busca por
+  prefijo (búsqueda mientras se escribe) y el resto como palabra completa
+- El resaltado se calcula solo para las filas de la página (en SQLite, en
+  Python: snippet() de FTS5 recorre otra vez todas las coincidencias)
+- SQLite rankea con bm25 solo las BUSQUEDA_MAX_CANDIDATOS coincidencias más
+  recientes: con términos presentes en media base el coste queda acotado
+"""
+
+import re
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, event, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, SesionBaseAsync, engine as default_engine
+from app.models.cliente import Cliente
+from app.models.cotizacion import Cotizacion
+from app.models.documento import Documento
+from app.models.item import Item
+from app.models.proyecto import Proyecto
+
+logger = logging.getLogger(__name__)
+
+# Código de tipo en los 3 bits bajos de la clave
+TIPOS = {"cotizacion": 1, "proyecto": 2, "documento": 3, "cliente": 4}
+NOMBRES_TIPO = {codigo: nombre for nombre, codigo in TIPOS.items()}
+BITS_TIPO = 3
+MASCARA_TIPO = (1 << BITS_TIPO) - 1
+
+# Texto máximo indexado por entidad (PDFs de cientos de páginas)
+MAX_CARACTERES = settings.BUSQUEDA_MAX_CARACTERES
+LOTE_REINDEXADO = 500
+# SQLite: bm25 recorre todas las coincidencias; con términos muy comunes se
+# rankean solo las N más recientes (0 = sin límite)
+MAX_CANDIDATOS = settings.BUSQUEDA_MAX_CANDIDATOS
+ANCHO_FRAGMENTO = 200
+
+MARCA_INICIO = "<mark>"
+MARCA_FIN = "</mark>"
+
+CLAVE_PENDIENTES = "busqueda_pendientes"
+
+
+def clave(tipo: str, ref_id: int) -> int:
+    return (ref_id << BITS_TIPO) | TIPOS[tipo]
+
+
+def separar_clave(valor: int) -> Tuple[str, int]:
+    return NOMBRES_TIPO[valor & MASCARA_TIPO], valor >> BITS_TIPO
+
+
+def terminos(consulta: str) -> List[str]:
+    """
+    Palabras de la consulta (sin operadores ni comillas del usuario).
+    Se busca mientras se escribe: solo la última palabra se trata como prefijo
+    """
+    return [t for t in re.findall(r"\w+", consulta.lower()) if len(t) >= 2][:8]
+
+
+def _unir(*partes) -> str:
+    return " · ".join(str(p) for p in partes if p)
+
+
+# Latín con tildes → letra base (á → a, Ñ → n): un carácter por carácter
+_SIN_TILDES = {
+    codigo: unicodedata.normalize("NFD", chr(codigo))[0]
+    for codigo in range(0xC0, 0x250)
+    if chr(codigo).isalpha() and len(unicodedata.normalize("NFD", chr(codigo))) > 1
+}
+
+
+def _plegar(texto: str) -> str:
+    """Minúsculas sin tildes con las mismas posiciones que el original"""
+    minusculas = texto.lower()
+    if len(minusculas) != len(texto):  # 'İ' y similares cambian de longitud
+        minusculas = "".join(c.lower() if len(c.lower()) == 1 else c for c in texto)
+    return minusculas.translate(_SIN_TILDES)
+
+
+def _patron(palabras: List[str]):
+    """Palabras completas y la última como prefijo (igual que la consulta)"""
+    *completas, ultima = [re.escape(_plegar(p)) for p in palabras]
+    return re.compile(r"\b(?:" + "".join(f"{p}\\b|" for p in completas) + ultima + r"\w*)")
+
+
+def _coincidencias(texto: str, palabras: List[str]) -> List[Tuple[int, int]]:
+    """Tramos (inicio, fin) de las palabras que coinciden con algún término"""
+    return [m.span() for m in _patron(palabras).finditer(_plegar(texto))]
+
+
+def _marcar(texto: str, tramos: List[Tuple[int, int]]) -> str:
+    partes, ultimo = [], 0
+    for inicio, fin in tramos:
+        partes += [texto[ultimo:inicio], MARCA_INICIO, texto[inicio:fin], MARCA_FIN]
+        ultimo = fin
+    partes.append(texto[ultimo:])
+    return "".join(partes)
+
+
+def resaltar(texto: str, palabras: List[str]) -> str:
+    return _marcar(texto, _coincidencias(texto, palabras)) if texto else ""
+
+
+def fragmento(texto: str, palabras: List[str], ancho: int = ANCHO_FRAGMENTO) -> str:
+    """Ventana de ~`ancho` caracteres alrededor de la primera coincidencia, resaltada"""
+    if not texto:
+        return ""
+    primera = _patron(palabras).search(_plegar(texto))
+    centro = primera.start() if primera else 0
+    inicio = max(0, centro - ancho // 4)
+    fin = min(len(texto), inicio + ancho)
+    # Ajustar a límites de palabra
+    if inicio > 0:
+        espacio = texto.find(" ", inicio, centro)
+        inicio = espacio + 1 if espacio != -1 else inicio
+    if fin < len(texto):
+        espacio = texto.rfind(" ", inicio, fin)
+        fin = espacio if espacio > centro else fin
+    trozo = resaltar(texto[inicio:fin], palabras)
+    return ("…" if inicio > 0 else "") + trozo + ("…" if fin < len(texto) else "")
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🗄️ MOTORES DE ÍNDICE
+# ═══════════════════════════════════════════════════════════════
+
+class IndiceSQLite:
+    """FTS5: tabla virtual con rowid = clave"""
+
+    nombre = "sqlite-fts5"
+
+    def crear(self, conn: Connection):
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5("
+            "titulo, cuerpo, "
+            "tokenize = 'unicode61 remove_diacritics 2', "
+            "prefix = '2 3 4')"
+        )
+        # Ranking: el título pesa 10 veces más que el cuerpo
+        conn.exec_driver_sql(
+            "INSERT INTO busqueda_fts(busqueda_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+        )
+
+    def guardar(self, conn: Connection, filas: List[Dict[str, Any]]):
+        if not filas:
+            return
+        self.borrar(conn, [f["clave"] for f in filas])
+        conn.execute(
+            text("INSERT INTO busqueda_fts(rowid, titulo, cuerpo) VALUES (:clave, :titulo, :cuerpo)"),
+            filas
+        )
+
+    def borrar(self, conn: Connection, claves: Sequence[int]):
+        if claves:
+            conn.execute(
+                text("DELETE FROM busqueda_fts WHERE rowid IN :claves").bindparams(
+                    bindparam("claves", expanding=True)
+                ),
+                {"claves": list(claves)}
+            )
+
+    def vaciar(self, conn: Connection):
+        conn.exec_driver_sql("DELETE FROM busqueda_fts")
+
+    def buscar(self, conn: Connection, palabras: List[str], tipos: List[int], limite: int):
+        *completas, ultima = palabras
+        consulta = " ".join([*(f'"{p}"' for p in completas), f'"{ultima}"*'])
+        filtro_tipo = "AND (rowid & :mascara) IN :tipos" if tipos else ""
+        parametros = {"consulta": consulta, "limite": limite}
+        if tipos:
+            parametros.update({"tipos": tipos, "mascara": MASCARA_TIPO})
+
+        def sql(cuerpo: str):
+            sentencia = text(cuerpo)
+            return sentencia.bindparams(bindparam("tipos", expanding=True)) if tipos else sentencia
+
+        # 1) Ventana de candidatos: ordenar por rowid es barato, bm25 no
+        desde = None
+        if MAX_CANDIDATOS:
+            desde = conn.execute(sql(f"""
+                SELECT rowid FROM busqueda_fts
+                WHERE busqueda_fts MATCH :consulta {filtro_tipo}
+                ORDER BY rowid DESC LIMIT 1 OFFSET :candidatos
+            """), {**parametros, "candidatos": MAX_CANDIDATOS - 1}).scalar()
+        filtro_desde = "AND rowid >= :desde" if desde is not None else ""
+
+        # 2) Ranking bm25 (solo claves)
+        pagina = conn.execute(sql(f"""
+            SELECT rowid AS clave, -rank AS puntaje FROM busqueda_fts
+            WHERE busqueda_fts MATCH :consulta {filtro_tipo} {filtro_desde}
+            ORDER BY rank LIMIT :limite
+        """), {**parametros, "desde": desde}).all()
+        if not pagina:
+            return []
+
+        # 3) Texto de la página por rowid y resaltado en Python: snippet() de
+        # FTS5 vuelve a recorrer la lista de coincidencias por cada fila
+        textos = {
+            f.clave: f for f in conn.execute(
+                text("SELECT rowid AS clave, titulo, cuerpo FROM busqueda_fts WHERE rowid IN :claves")
+                .bindparams(bindparam("claves", expanding=True)),
+                {"claves": [f.clave for f in pagina]}
+            )
+        }
+        return [
+            {
+                "clave": f.clave,
+                "titulo": textos[f.clave].titulo,
+                "titulo_resaltado": resaltar(textos[f.clave].titulo, palabras),
+                "fragmento": fragmento(textos[f.clave].cuerpo, palabras),
+                "puntaje": f.puntaje,
+            }
+            for f in pagina if f.clave in textos
+        ]
+
+    def optimizar(self, conn: Connection):
+        """Fusiona los segmentos del índice (tras cargas masivas)"""
+        conn.exec_driver_sql("INSERT INTO busqueda_fts(busqueda_fts) VALUES ('optimize')")
+
+    def total(self, conn: Connection) -> int:
+        return conn.exec_driver_sql("SELECT count(*) FROM busqueda_fts").scalar()
+
+
+class IndicePostgres:
+    """tsvector + GIN; configuración es_unaccent si la extensión unaccent está disponible"""
+
+    nombre = "postgres-tsvector"
+
+    def __init__(self):
+        self.config = "spanish"
+
+    def crear(self, conn: Connection):
+        try:
+            with conn.begin_nested():
+                conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS unaccent")
+                conn.exec_driver_sql("""
+                    DO $$ BEGIN
+                        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+                            CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+                            ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+                        END IF;
+                    END $$
+                """)
+            self.config = "es_unaccent"
+        except Exception as e:
+            logger.warning(f"⚠️ unaccent no disponible ({e}); búsqueda sensible a tildes")
+
+        conn.exec_driver_sql("""
+            CREATE TABLE IF NOT EXISTS busqueda_indice (
+                clave BIGINT PRIMARY KEY,
+                titulo TEXT NOT NULL,
+                cuerpo TEXT,
+                vector TSVECTOR NOT NULL
+            )
+        """)
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_busqueda_indice_vector ON busqueda_indice USING GIN (vector)"
+        )
+
+    def guardar(self, conn: Connection, filas: List[Dict[str, Any]]):
+        if not filas:
+            return
+        conn.execute(
+            text("""
+                INSERT INTO busqueda_indice (clave, titulo, cuerpo, vector)
+                VALUES (
+                    :clave, :titulo, :cuerpo,
+                    setweight(to_tsvector(CAST(:config AS regconfig), :titulo), 'A') ||
+                    setweight(to_tsvector(CAST(:config AS regconfig), coalesce(:cuerpo, '')), 'B')
+                )
+                ON CONFLICT (clave) DO UPDATE SET
+                    titulo = EXCLUDED.titulo, cuerpo = EXCLUDED.cuerpo, vector = EXCLUDED.vector
+            """),
+            [{**f, "config": self.config} for f in filas]
+        )
+
+    def borrar(self, conn: Connection, claves: Sequence[int]):
+        if claves:
+            conn.execute(
+                text("DELETE FROM busqueda_indice WHERE clave IN :claves").bindparams(
+                    bindparam("claves", expanding=True)
+                ),
+                {"claves": list(claves)}
+            )
+
+    def vaciar(self, conn: Connection):
+        conn.exec_driver_sql("TRUNCATE busqueda_indice")
+
+    def buscar(self, conn: Connection, palabras: List[str], tipos: List[int], limite: int):
+        *completas, ultima = palabras
+        consulta = " & ".join([*completas, f"{ultima}:*"])
+        filtro_tipo = "AND (clave & :mascara) IN :tipos" if tipos else ""
+        # ts_headline es caro: solo sobre las filas de la página
+        sql = text(f"""
+            WITH q AS (SELECT to_tsquery(CAST(:config AS regconfig), :consulta) AS q),
+            pagina AS (
+                SELECT clave, titulo, cuerpo, ts_rank_cd(vector, q.q) AS puntaje
+                FROM busqueda_indice, q
+                WHERE vector @@ q.q {filtro_tipo}
+                ORDER BY puntaje DESC
+                LIMIT :limite
+            )
+            SELECT clave, titulo,
+                   ts_headline(CAST(:config AS regconfig), titulo, q.q, :opciones_titulo) AS titulo_resaltado,
+                   ts_headline(CAST(:config AS regconfig), coalesce(cuerpo, ''), q.q, :opciones) AS fragmento,
+                   puntaje
+            FROM pagina, q
+            ORDER BY puntaje DESC
+        """)
+        opciones = f"StartSel={MARCA_INICIO}, StopSel={MARCA_FIN}"
+        parametros = {
+            "config": self.config, "consulta": consulta, "limite": limite,
+            "opciones_titulo": f"{opciones}, HighlightAll=true",
+            "opciones": f"{opciones}, MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=' … '",
+        }
+        if tipos:
+            sql = sql.bindparams(bindparam("tipos", expanding=True))
+            parametros.update({"tipos": tipos, "mascara": MASCARA_TIPO})
+        return [dict(f) for f in conn.execute(sql, parametros).mappings()]
+
+    def optimizar(self, conn: Connection):
+        conn.exec_driver_sql("ANALYZE busqueda_indice")
+
+    def total(self, conn: Connection) -> int:
+        return conn.exec_driver_sql("SELECT count(*) FROM busqueda_indice").scalar()
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔎 SERVICIO
+# ═══════════════════════════════════════════════════════════════
+
+class BusquedaService:
+    """
+    🔎 Índice de texto completo y búsqueda unificada
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine
+        self.indice = IndicePostgres() if self.engine.dialect.name == "postgresql" else IndiceSQLite()
+        self._listo = False
+        self._lock = threading.Lock()
+
+    def asegurar_indice(self, conn: Connection = None):
+        """Crea la estructura del índice si no existe (una vez por proceso)"""
+        if self._listo:
+            return
+        with self._lock:
+            if self._listo:
+                return
+            if conn is None:
+                with self.engine.begin() as propia:
+                    self.indice.crear(propia)
+            else:
+                self.indice.crear(conn)
+            self._listo = True
+
+    # ──────────────────────────────────────────────────────────────
+    # 📝 DOCUMENTOS DEL ÍNDICE (desde la BD)
+    # ──────────────────────────────────────────────────────────────
+
+    def _cotizaciones(self, conn, ids) -> Dict[int, Tuple[str, str]]:
+        filas = conn.execute(select(
+            Cotizacion.id, Cotizacion.numero, Cotizacion.cliente, Cotizacion.proyecto,
+            Cotizacion.descripcion, Cotizacion.observaciones
+        ).where(Cotizacion.id.in_(ids))).all()
+        items: Dict[int, List[str]] = {}
+        for cotizacion_id, descripcion in conn.execute(
+            select(Item.cotizacion_id, Item.descripcion)
+            .where(Item.cotizacion_id.in_(ids))
+            .order_by(Item.cotizacion_id, Item.orden)
+        ):
+            items.setdefault(cotizacion_id, []).append(descripcion)
+        return {
+            f.id: (
+                _unir(f.numero, f.cliente, f.proyecto),
+                "\n".join(filter(None, [f.descripcion, f.observaciones, *items.get(f.id, [])]))
+            )
+            for f in filas
+        }
+
+    def _proyectos(self, conn, ids) -> Dict[int, Tuple[str, str]]:
+        filas = conn.execute(select(
+            Proyecto.id, Proyecto.nombre, Proyecto.cliente, Proyecto.descripcion
+        ).where(Proyecto.id.in_(ids))).all()
+        return {f.id: (_unir(f.nombre, f.cliente), f.descripcion or "") for f in filas}
+
+    def _documentos(self, conn, ids) -> Dict[int, Tuple[str, str]]:
+        from app.services.content_store import content_store
+
+        filas = conn.execute(select(
+            Documento.id, Documento.nombre_original, Documento.contenido_hash,
+            Documento.contenido_legacy.label("contenido_legacy")
+        ).where(Documento.id.in_(ids))).all()
+        resultado = {}
+        for f in filas:
+            if f.contenido_hash:
+                cuerpo = content_store.leer_rango(f.contenido_hash, 0, MAX_CARACTERES) or ""
+            else:
+                cuerpo = (f.contenido_legacy or "")[:MAX_CARACTERES]
+            resultado[f.id] = (f.nombre_original, cuerpo)
+        return resultado
+
+    def _clientes(self, conn, ids) -> Dict[int, Tuple[str, str]]:
+        filas = conn.execute(select(
+            Cliente.id, Cliente.nombre, Cliente.ruc, Cliente.ciudad, Cliente.direccion,
+            Cliente.email, Cliente.contacto_nombre, Cliente.industria, Cliente.notas
+        ).where(Cliente.id.in_(ids))).all()
+        return {
+            f.id: (
+                _unir(f.nombre, f.ruc),
+                "\n".join(filter(None, [f.ciudad, f.direccion, f.email, f.contacto_nombre, f.industria, f.notas]))
+            )
+            for f in filas
+        }
+
+    def indexar(self, conn: Connection, tipo: str, ids: Iterable[int]) -> int:
+        """
+        Reindexa las entidades `ids` de `tipo` (las que ya no existen se
+        quitan del índice). Devuelve cuántas quedaron indexadas.
+        """
+        ids = sorted(set(i for i in ids if i is not None))
+        if not ids:
+            return 0
+        self.asegurar_indice(conn)
+
+        extractores = {
+            "cotizacion": self._cotizaciones,
+            "proyecto": self._proyectos,
+            "documento": self._documentos,
+            "cliente": self._clientes,
+        }
+        documentos = extractores[tipo](conn, ids)
+        filas = [
+            {"clave": clave(tipo, ref_id), "titulo": titulo or "", "cuerpo": cuerpo[:MAX_CARACTERES]}
+            for ref_id, (titulo, cuerpo) in documentos.items()
+        ]
+        self.indice.guardar(conn, filas)
+        self.indice.borrar(conn, [clave(tipo, i) for i in ids if i not in documentos])
+        return len(filas)
+
+    def reindexar(self, tipos: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Reconstruye el índice completo (o de algunos tipos) por lotes"""
+        modelos = {"cotizacion": Cotizacion, "proyecto": Proyecto, "documento": Documento, "cliente": Cliente}
+        totales = {}
+        with self.engine.begin() as conn:
+            self.asegurar_indice(conn)
+            if not tipos:
+                self.indice.vaciar(conn)
+        for tipo in (tipos or list(TIPOS)):
+            modelo = modelos[tipo]
+            totales[tipo] = 0
+            ultimo = 0
+            while True:
+                with self.engine.begin() as conn:
+                    ids = conn.execute(
+                        select(modelo.id).where(modelo.id > ultimo).order_by(modelo.id).limit(LOTE_REINDEXADO)
+                    ).scalars().all()
+                    if not ids:
+                        break
+                    totales[tipo] += self.indexar(conn, tipo, ids)
+                ultimo = ids[-1]
+            logger.info(f"🔎 Índice de búsqueda - {tipo}: {totales[tipo]} entradas")
+        with self.engine.begin() as conn:
+            self.indice.optimizar(conn)
+        return totales
+
+    # ──────────────────────────────────────────────────────────────
+    # 🔍 CONSULTA
+    # ──────────────────────────────────────────────────────────────
+
+    def buscar(self, conn: Connection, consulta: str, tipos: Optional[Sequence[str]] = None,
+               limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        Resultados ordenados por relevancia
+
+        Raises:
+            ValueError: tipo desconocido
+        """
+        palabras = terminos(consulta)
+        if not palabras:
+            return []
+        desconocidos = [t for t in (tipos or []) if t not in TIPOS]
+        if desconocidos:
+            raise ValueError(f"Tipos no válidos: {', '.join(desconocidos)}. Disponibles: {', '.join(TIPOS)}")
+        self.asegurar_indice(conn)
+
+        resultados = []
+        for fila in self.indice.buscar(conn, palabras, [TIPOS[t] for t in (tipos or [])], limite):
+            tipo, ref_id = separar_clave(fila["clave"])
+            resultados.append({
+                "tipo": tipo,
+                "id": ref_id,
+                "titulo": fila["titulo"],
+                "titulo_resaltado": fila["titulo_resaltado"],
+                "fragmento": fila["fragmento"],
+                "puntaje": round(float(fila["puntaje"]), 6),
+            })
+        return resultados
+
+    def estado(self) -> Dict[str, Any]:
+        with self.engine.begin() as conn:
+            self.asegurar_indice(conn)
+            return {"motor": self.indice.nombre, "entradas": self.indice.total(conn)}
+
+
+# Instancia global
+busqueda_service = BusquedaService()
+
+
+def get_busqueda_service() -> BusquedaService:
+    """Obtiene la instancia del servicio de búsqueda"""
+    return busqueda_service
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔄 SINCRONIZACIÓN CON EL ORM
+# ═══════════════════════════════════════════════════════════════
+
+def marcar_pendiente(session: Session, tipo: str, ref_id: int):
+    """Reindexar `tipo`/`ref_id` al confirmar (cambios hechos sin objetos del ORM)"""
+    session.info.setdefault(CLAVE_PENDIENTES, set()).add((tipo, ref_id))
+
+
+def _entidad(obj) -> Optional[Tuple[str, int]]:
+    if isinstance(obj, Cotizacion):
+        return "cotizacion", obj.id
+    if isinstance(obj, Item):
+        return "cotizacion", obj.cotizacion_id
+    if isinstance(obj, Proyecto):
+        return "proyecto", obj.id
+    if isinstance(obj, Documento):
+        return "documento", obj.id
+    if isinstance(obj, Cliente):
+        return "cliente", obj.id
+    return None
+
+
+def _anotar_cambios(session, flush_context):
+    pendientes: Set[Tuple[str, int]] = session.info.setdefault(CLAVE_PENDIENTES, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        entidad = _entidad(obj)
+        if entidad and entidad[1] is not None:
+            pendientes.add(entidad)
+
+
+def _indexar_antes_de_commit(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    pendientes = session.info.pop(CLAVE_PENDIENTES, None)
+    if not pendientes:
+        return
+
+    por_tipo: Dict[str, Set[int]] = {}
+    for tipo, ref_id in pendientes:
+        por_tipo.setdefault(tipo, set()).add(ref_id)
+
+    conn = session.connection()
+    # En PostgreSQL un error abortaría la transacción del usuario: SAVEPOINT
+    anidada = conn.begin_nested() if conn.dialect.name == "postgresql" else None
+    try:
+        for tipo, ids in por_tipo.items():
+            busqueda_service.indexar(conn, tipo, ids)
+        if anidada is not None:
+            anidada.commit()
+    except Exception as e:
+        if anidada is not None:
+            anidada.rollback()
+        logger.warning(f"⚠️ No se pudo actualizar el índice de búsqueda ({e}); usar reindexar_busqueda.py")
+
+
+def _limpiar_tras_rollback(session):
+    session.info.pop(CLAVE_PENDIENTES, None)
+
+
+# Sesiones síncronas y las internas de AsyncSession (routers async)
+for _objetivo in (SessionLocal, SesionBaseAsync):
+    event.listen(_objetivo, "after_flush", _anotar_cambios)
+    event.listen(_objetivo, "before_commit", _indexar_antes_de_commit)
+    event.listen(_objetivo, "after_rollback", _limpiar_tras_rollback)
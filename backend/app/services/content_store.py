@@ -0,0 +1,216 @@
+"""
+🗄️ CONTENT STORE - TEXTO EXTRAÍDO DE DOCUMENTOS FUERA DE LA BD
+📁 RUTA: backend/app/services/content_store.py
+
+El texto completo de un PDF largo ocupa varios MB. Guardado dentro de la
+fila de `documentos` viajaba en cada listado, en el detalle de proyecto y
+en cada backup de la base de datos.
+
+🎯 CÓMO FUNCIONA:
+- Cada texto se guarda comprimido (gzip) en CONTENIDO_DIR, con nombre igual
+  a su hash SHA-256: storage/contenido/ab/abcd….txt.gz
+- Textos idénticos comparten archivo (deduplicación por hash)
+- La fila del documento solo guarda `contenido_hash` y `contenido_longitud`
+- Lectura perezosa: el texto se descomprime solo cuando se pide
+- `leer_rango()` descomprime en streaming hasta donde hace falta: una vista
+  previa de 500 caracteres no lee el resto del archivo
+- Escritura atómica (archivo temporal + rename): un lector concurrente
+  nunca ve un archivo a medias
+
+Los adjuntos de las sesiones de chat usan otra instancia
+(`contenido_sesiones`, CONTENIDO_SESIONES_DIR): sus referencias viven en
+las sesiones (Redis/BD), no en `documentos.contenido_hash`, así que
+borrar un documento nunca toca un archivo que una sesión sigue usando. Se
+limpian por antigüedad: cada sesión renueva el mtime de sus adjuntos al
+guardarse (`tocar`) y `purgar_antiguos` borra los que ninguna sesión viva
+renovó dentro del TTL.
+"""
+
+import os
+import gzip
+import hashlib
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Compresión: 6 es el punto dulce tamaño/CPU para texto
+NIVEL_COMPRESION = 6
+# Caracteres por lectura al saltar hasta el inicio de un rango
+BLOQUE_LECTURA = 64 * 1024
+
+
+class ContentStore:
+    """
+    🗄️ Almacén de textos direccionado por contenido
+    """
+
+    def __init__(self, directorio: Path = None):
+        self.directorio = Path(directorio or settings.CONTENIDO_DIR)
+
+    # ═══════════════════════════════════════════════════════════════
+    # 📝 ESCRITURA
+    # ═══════════════════════════════════════════════════════════════
+
+    @staticmethod
+    def calcular_hash(texto: str) -> str:
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    def ruta(self, hash_contenido: str) -> Path:
+        return self.directorio / hash_contenido[:2] / f"{hash_contenido}.txt.gz"
+
+    def guardar(self, texto: str) -> Tuple[str, int]:
+        """
+        Guarda el texto (si no existe ya) y devuelve (hash, longitud en caracteres)
+        """
+        hash_contenido = self.calcular_hash(texto)
+        destino = self.ruta(hash_contenido)
+
+        if not destino.exists():
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            fd, temporal = tempfile.mkstemp(dir=destino.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as crudo:
+                    # mtime=0: mismo texto -> mismos bytes (backups incrementales)
+                    with gzip.GzipFile(fileobj=crudo, mode="wb", compresslevel=NIVEL_COMPRESION, mtime=0) as gz:
+                        gz.write(texto.encode("utf-8"))
+                os.replace(temporal, destino)
+            except Exception:
+                if os.path.exists(temporal):
+                    os.unlink(temporal)
+                raise
+
+        return hash_contenido, len(texto)
+
+    # ═══════════════════════════════════════════════════════════════
+    # 📖 LECTURA
+    # ═══════════════════════════════════════════════════════════════
+
+    def existe(self, hash_contenido: str) -> bool:
+        return self.ruta(hash_contenido).exists()
+
+    def leer(self, hash_contenido: str) -> Optional[str]:
+        """Texto completo (None si el archivo no existe)"""
+        try:
+            with gzip.open(self.ruta(hash_contenido), "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Contenido {hash_contenido[:12]}… no encontrado en {self.directorio}")
+            return None
+
+    def leer_rango(self, hash_contenido: str, inicio: int = 0, longitud: Optional[int] = None) -> Optional[str]:
+        """
+        Caracteres [inicio, inicio + longitud) del texto
+
+        Solo se descomprime hasta el final del rango pedido.
+        """
+        try:
+            with gzip.open(self.ruta(hash_contenido), "rt", encoding="utf-8") as f:
+                restante = inicio
+                while restante > 0:
+                    leido = len(f.read(min(restante, BLOQUE_LECTURA)))
+                    if not leido:
+                        return ""
+                    restante -= leido
+                return f.read() if longitud is None else f.read(longitud)
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Contenido {hash_contenido[:12]}… no encontrado en {self.directorio}")
+            return None
+
+    # ═══════════════════════════════════════════════════════════════
+    # 🧹 LIMPIEZA
+    # ═══════════════════════════════════════════════════════════════
+
+    def eliminar_si_huerfano(self, db, hash_contenido: Optional[str]) -> bool:
+        """
+        Borra el archivo si ningún documento lo referencia ya (solo
+        documentos: los adjuntos de sesiones están en `contenido_sesiones`)
+
+        Llamar después del commit que eliminó/reemplazó la referencia.
+        """
+        if not hash_contenido:
+            return False
+
+        from app.models.documento import Documento
+
+        en_uso = db.query(Documento.id).filter(Documento.contenido_hash == hash_contenido).first()
+        if en_uso:
+            return False
+
+        ruta = self.ruta(hash_contenido)
+        if ruta.exists():
+            ruta.unlink()
+            return True
+        return False
+
+    def tocar(self, hash_contenido: str):
+        """Renueva el mtime del archivo (sigue en uso para purgar_antiguos)"""
+        try:
+            os.utime(self.ruta(hash_contenido))
+        except FileNotFoundError:
+            pass
+
+    def purgar_antiguos(self, max_edad_s: float) -> int:
+        """Borra los archivos no renovados en `max_edad_s` segundos"""
+        if not self.directorio.exists():
+            return 0
+        limite = time.time() - max_edad_s
+        borrados = 0
+        for archivo in self.directorio.glob("*/*.txt.gz"):
+            try:
+                if archivo.stat().st_mtime < limite:
+                    archivo.unlink()
+                    borrados += 1
+            except FileNotFoundError:
+                pass
+        return borrados
+
+    def migrar_legacy(self, db, lote: int = 200) -> int:
+        """
+        Mueve al store el texto de las filas que aún lo tienen en línea
+        (columna antigua `documentos.contenido_texto`) y la vacía
+
+        Returns:
+            Documentos migrados
+        """
+        from sqlalchemy.orm import undefer
+        from app.models.documento import Documento
+
+        migrados = 0
+        while True:
+            documentos = db.query(Documento).options(undefer(Documento.contenido_legacy)).filter(
+                Documento.contenido_legacy.isnot(None)
+            ).order_by(Documento.id).limit(lote).all()
+            if not documentos:
+                break
+            for documento in documentos:
+                documento.contenido_texto = documento.contenido_legacy
+            db.commit()
+            db.expunge_all()
+            migrados += len(documentos)
+            logger.info(f"🗄️ {migrados} documentos migrados al content store")
+        return migrados
+
+    def estadisticas(self) -> dict:
+        """Archivos y bytes en disco (comprimidos)"""
+        archivos = list(self.directorio.glob("*/*.txt.gz")) if self.directorio.exists() else []
+        return {
+            "directorio": str(self.directorio),
+            "archivos": len(archivos),
+            "bytes": sum(a.stat().st_size for a in archivos)
+        }
+
+
+# Instancias globales
+content_store = ContentStore()
+contenido_sesiones = ContentStore(settings.CONTENIDO_SESIONES_DIR)
+
+
+def get_content_store() -> ContentStore:
+    """Obtiene la instancia del almacén de contenido"""
+    return content_store
@@ -0,0 +1,99 @@
+"""
+🧠 CONTEXTOS DE AGENTES PILI - PREFIJOS DE SISTEMA PRECALCULADOS
+📁 RUTA: backend/app/services/contextos_agentes.py
+
+La personalidad, el rol y el prompt especializado de cada agente PILI son
+fijos, pero se volvían a concatenar (y a enviar a Gemini) en cada turno
+junto con el mensaje del usuario. Ahora:
+
+- Cada agente registra su prefijo de sistema una sola vez al importar el
+  módulo que lo define (routers/chat.py → familia "chat",
+  gemini_service.py → familia "pili")
+- El prefijo guarda su estimación de tokens y un hash de versión
+- GeminiService arma un modelo por agente con ese prefijo como
+  system_instruction y, si el prefijo alcanza el mínimo de Gemini para
+  caché explícita, lo sube una vez como CachedContent: por turno solo
+  viaja la parte dinámica (contexto, historial y mensaje)
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Aproximación para texto en español (Gemini no expone el tokenizer offline)
+CARACTERES_POR_TOKEN = 4
+
+
+def estimar_tokens(texto: str) -> int:
+    """Tokens aproximados de un texto (≈ 4 caracteres por token)"""
+    return max(1, round(len(texto) / CARACTERES_POR_TOKEN)) if texto else 0
+
+
+class ContextoAgente:
+    """Prefijo de sistema estático de un agente PILI"""
+
+    def __init__(self, familia: str, tipo_flujo: str, nombre: str, prefijo: str):
+        self.familia = familia
+        self.tipo_flujo = tipo_flujo
+        self.nombre = nombre
+        self.prefijo = prefijo
+        self.tokens = estimar_tokens(prefijo)
+        self.version = hashlib.sha256(prefijo.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def clave(self) -> str:
+        return f"{self.familia}:{self.tipo_flujo}"
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            "nombre": self.nombre,
+            "caracteres": len(self.prefijo),
+            "tokens_estimados": self.tokens,
+            "version": self.version,
+        }
+
+
+class RegistroContextos:
+    """
+    🧠 Registro de prefijos de sistema por (familia, tipo de flujo)
+    """
+
+    def __init__(self):
+        self._contextos: Dict[str, ContextoAgente] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, familia: str, tipo_flujo: str, nombre: str, prefijo: str) -> ContextoAgente:
+        contexto = ContextoAgente(familia, tipo_flujo, nombre, prefijo)
+        with self._lock:
+            self._contextos[contexto.clave] = contexto
+        return contexto
+
+    def obtener(self, familia: str, tipo_flujo: str) -> Optional[ContextoAgente]:
+        return self._contextos.get(f"{familia}:{tipo_flujo}")
+
+    def familia(self, familia: str) -> Dict[str, ContextoAgente]:
+        return {c.tipo_flujo: c for c in self._contextos.values() if c.familia == familia}
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            contextos = list(self._contextos.values())
+        familias: Dict[str, Dict[str, Any]] = {}
+        for contexto in contextos:
+            familias.setdefault(contexto.familia, {})[contexto.tipo_flujo] = contexto.resumen()
+        return {
+            "contextos": len(contextos),
+            "tokens_estimados_total": sum(c.tokens for c in contextos),
+            "familias": familias,
+        }
+
+
+# Instancia global
+registro_contextos = RegistroContextos()
+
+
+def get_registro_contextos() -> RegistroContextos:
+    """Obtiene el registro de contextos de agentes"""
+    return registro_contextos
@@ -0,0 +1,246 @@
+"""
+🧾 COTIZACION ITEMS - ITEMS DE COTIZACIÓN EN LA TABLA `items`
+📁 RUTA: backend/app/services/cotizacion_items.py
+
+Los items de una cotización se guardaban dos veces: en la columna JSON
+`cotizaciones.items` y en la tabla `items`. Ahora la tabla es la única
+fuente: cada item es una fila indexada por `cotizacion_id`.
+
+🎯 CÓMO FUNCIONA:
+- Alta y reemplazo de items con UN INSERT multi-fila (no un db.add por item)
+- Totales y conteos calculados en SQL (SUM/COUNT sobre items), también
+  como subconsultas correlacionadas para los listados
+- Items de una página de cotizaciones en UNA consulta (IN + índice)
+- Analítica entre cotizaciones (precio promedio por código/descripción y
+  periodo) con consultas indexadas en lugar de recorrer blobs JSON
+- migrar_items_legacy() pasa los items que aún están solo en JSON a la tabla
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.cotizacion import Cotizacion
+from app.models.item import Item
+
+logger = logging.getLogger(__name__)
+
+TASA_IGV = 0.18
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📝 ESCRITURA
+# ═══════════════════════════════════════════════════════════════
+
+def filas_items(items: Optional[Iterable[dict]], cotizacion_id: int) -> List[dict]:
+    """Filas para INSERT (en el orden recibido)"""
+    return [
+        Item.fila_desde_dict(datos, orden, cotizacion_id)
+        for orden, datos in enumerate(items or [])
+    ]
+
+
+def sentencias_reemplazo(cotizacion_id: int, items: Optional[Iterable[dict]]):
+    """
+    (DELETE, INSERT, filas) para reemplazar los items de una cotización
+
+    Sirve igual para Session y AsyncSession:
+        db.execute(borrar); db.execute(insertar, filas)
+    """
+    filas = filas_items(items, cotizacion_id)
+    return delete(Item).where(Item.cotizacion_id == cotizacion_id), insert(Item), filas
+
+
+def insertar_items(db: Session, cotizacion_id: int, items: Optional[Iterable[dict]]) -> int:
+    """Inserta los items en una sola sentencia; devuelve cuántos"""
+    from app.services.busqueda import marcar_pendiente
+
+    filas = filas_items(items, cotizacion_id)
+    if filas:
+        db.execute(insert(Item), filas)
+        # INSERT de Core: el ORM no lo ve, el índice de búsqueda sí debe
+        marcar_pendiente(db, "cotizacion", cotizacion_id)
+    return len(filas)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧮 TOTALES EN SQL
+# ═══════════════════════════════════════════════════════════════
+
+def num_items_expr():
+    """COUNT(items) de la cotización de la fila (subconsulta correlacionada)"""
+    return (
+        select(func.count(Item.id))
+        .where(Item.cotizacion_id == Cotizacion.id)
+        .correlate(Cotizacion)
+        .scalar_subquery()
+    )
+
+
+def subtotal_items_expr():
+    """SUM(items.total) de la cotización de la fila (subconsulta correlacionada)"""
+    return (
+        select(func.coalesce(func.sum(Item.total), 0))
+        .where(Item.cotizacion_id == Cotizacion.id)
+        .correlate(Cotizacion)
+        .scalar_subquery()
+    )
+
+
+def consulta_totales(cotizacion_id: int):
+    """SELECT subtotal de los items de una cotización"""
+    return select(func.coalesce(func.sum(Item.total), 0)).where(Item.cotizacion_id == cotizacion_id)
+
+
+def totales_desde_subtotal(subtotal) -> Dict[str, float]:
+    subtotal = round(float(subtotal or 0), 2)
+    igv = round(subtotal * TASA_IGV, 2)
+    return {"subtotal": subtotal, "igv": igv, "total": round(subtotal + igv, 2)}
+
+
+def recalcular_totales(db: Session, cotizacion_id: int) -> Dict[str, float]:
+    """Subtotal, IGV y total desde los items (SUM en SQL), guardados en la cotización"""
+    totales = totales_desde_subtotal(db.execute(consulta_totales(cotizacion_id)).scalar())
+    db.execute(update(Cotizacion).where(Cotizacion.id == cotizacion_id).values(**totales))
+    return totales
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📖 LECTURA
+# ═══════════════════════════════════════════════════════════════
+
+def consulta_items_de(cotizacion_ids: Iterable[int]):
+    """SELECT de los items de varias cotizaciones (índice cotizacion_id, orden)"""
+    return (
+        select(Item)
+        .where(Item.cotizacion_id.in_(list(cotizacion_ids)))
+        .order_by(Item.cotizacion_id, Item.orden, Item.id)
+    )
+
+
+def agrupar_por_cotizacion(items: Iterable[Item]) -> Dict[int, List[dict]]:
+    """{cotizacion_id: [item dict, ...]}"""
+    agrupados: Dict[int, List[dict]] = {}
+    for item in items:
+        agrupados.setdefault(item.cotizacion_id, []).append(item.como_item())
+    return agrupados
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📊 ANALÍTICA ENTRE COTIZACIONES
+# ═══════════════════════════════════════════════════════════════
+
+def consulta_precios(
+    codigo: Optional[str] = None,
+    texto: Optional[str] = None,
+    unidad: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    estado: Optional[str] = None,
+    limite: int = 50
+):
+    """
+    Precio unitario promedio/mínimo/máximo por (código, descripción, unidad)
+
+    Ej.: puntos de iluminación cotizados en 2026 ->
+        consulta_precios(texto="punto de luz", desde=datetime(2026, 1, 1), hasta=datetime(2027, 1, 1))
+    """
+    consulta = (
+        select(
+            Item.codigo,
+            Item.descripcion,
+            Item.unidad,
+            func.count(Item.id).label("veces"),
+            func.count(func.distinct(Item.cotizacion_id)).label("cotizaciones"),
+            func.sum(Item.cantidad).label("cantidad_total"),
+            func.avg(Item.precio_unitario).label("precio_promedio"),
+            func.min(Item.precio_unitario).label("precio_minimo"),
+            func.max(Item.precio_unitario).label("precio_maximo"),
+        )
+        .join(Cotizacion, Cotizacion.id == Item.cotizacion_id)
+        .group_by(Item.codigo, Item.descripcion, Item.unidad)
+        .order_by(func.count(Item.id).desc())
+        .limit(limite)
+    )
+    if codigo:
+        consulta = consulta.where(Item.codigo == codigo)
+    if texto:
+        consulta = consulta.where(Item.descripcion.ilike(f"%{texto}%"))
+    if unidad:
+        consulta = consulta.where(Item.unidad == unidad)
+    if desde:
+        consulta = consulta.where(Cotizacion.fecha_creacion >= desde)
+    if hasta:
+        consulta = consulta.where(Cotizacion.fecha_creacion < hasta)
+    if estado:
+        consulta = consulta.where(Cotizacion.estado == estado)
+    return consulta
+
+
+def filas_precios(filas) -> List[Dict[str, Any]]:
+    return [
+        {
+            "codigo": f.codigo,
+            "descripcion": f.descripcion,
+            "unidad": f.unidad,
+            "veces": f.veces,
+            "cotizaciones": f.cotizaciones,
+            "cantidad_total": float(f.cantidad_total or 0),
+            "precio_promedio": round(float(f.precio_promedio or 0), 2),
+            "precio_minimo": float(f.precio_minimo or 0),
+            "precio_maximo": float(f.precio_maximo or 0),
+        }
+        for f in filas
+    ]
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔄 MIGRACIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def migrar_items_legacy(db: Session, lote: int = 500) -> int:
+    """
+    Pasa a la tabla `items` los items que solo están en la columna JSON y
+    vacía la columna en todas las cotizaciones
+
+    Si una cotización ya tiene filas en `items`, esas mandan (el PUT
+    actualizaba la tabla pero no el JSON).
+
+    Returns:
+        Cotizaciones cuyos items se insertaron en la tabla
+    """
+    con_filas = select(Item.cotizacion_id).distinct()
+    migradas = 0
+    ultimo_id = 0
+    while True:
+        pendientes = db.execute(
+            select(Cotizacion.id, Cotizacion.items_legacy)
+            .where(
+                Cotizacion.id > ultimo_id,
+                Cotizacion.items_legacy.isnot(None),
+                Cotizacion.id.notin_(con_filas)
+            )
+            .order_by(Cotizacion.id)
+            .limit(lote)
+        ).all()
+        if not pendientes:
+            break
+
+        filas = []
+        for cotizacion_id, items in pendientes:
+            if isinstance(items, list) and items:
+                filas.extend(filas_items([i for i in items if isinstance(i, dict)], cotizacion_id))
+                migradas += 1
+        if filas:
+            db.execute(insert(Item), filas)
+        db.commit()
+
+        ultimo_id = pendientes[-1].id
+        logger.info(f"🧾 {migradas} cotizaciones con items migrados a la tabla items")
+
+    db.execute(update(Cotizacion).where(Cotizacion.items_legacy.isnot(None)).values(items_legacy=None))
+    db.commit()
+    return migradas
@@ -19,12 +19,18 @@ inteligente sobre el servicio Gemini existente, especializando respuestas por ag
 - Toda la lógica de parseo JSON ✅
 """
 
+import asyncio
 import google.generativeai as genai
 from typing import List, Dict, Any, Optional
 import json
 import logging
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 from app.core.config import settings
+from app.core.estado_compartido import CacheCompartida
+from app.core.tracing import span
+from app.services.contextos_agentes import ContextoAgente, registro_contextos
 
 # 🧠 Importar PILIBrain para modo demo inteligente
 from app.services.pili_brain import pili_brain
@@ -80,6 +86,76 @@ PILI_AGENTES = {
     }
 }
 
+
+def prefijo_agente_pili(tipo_servicio: str, agente: Dict[str, str]) -> str:
+    """Prefijo de sistema estático del agente PILI (se arma una vez por agente)"""
+
+    prompt = f"""{agente['prompt_base']}
+
+AGENTE:
+- Agente activo: {agente['nombre']}
+- Especialidad: {agente['especialidad']}
+"""
+
+    # Instrucciones específicas por tipo de servicio
+    if "cotizacion" in tipo_servicio:
+        prompt += """
+
+INSTRUCCIONES DE COTIZACIÓN:
+1. Si tienes información suficiente, genera JSON estructurado con items detallados
+2. Si falta información, haz preguntas específicas
+3. Usa precios del mercado peruano 2025
+4. Incluye especificaciones técnicas (CNE)
+5. Calcula correctamente subtotal, IGV (18%) y total
+
+FORMATO DE RESPUESTA:
+Si generas cotización, incluye JSON:
+{
+    "accion": "cotizacion_generada",
+    "datos": {
+        "cliente": "nombre",
+        "proyecto": "descripción",
+        "items": [{"descripcion": "", "cantidad": 1, "precio_unitario": 100}],
+        "observaciones": ""
+    }
+}
+
+Si necesitas más información, responde conversacionalmente.
+"""
+    
+    elif "proyecto" in tipo_servicio:
+        prompt += """
+
+INSTRUCCIONES DE PROYECTO:
+1. Organiza la información del proyecto en fases claras
+2. Define cronograma realista
+3. Identifica recursos necesarios
+4. Establece hitos importantes
+5. Considera riesgos y mitigaciones
+
+FORMATO DE RESPUESTA:
+Estructura la información para gestión eficiente del proyecto.
+"""
+    
+    elif "informe" in tipo_servicio:
+        prompt += """
+
+INSTRUCCIONES DE INFORME:
+1. Estructura información en secciones lógicas
+2. Incluye métricas relevantes
+3. Proporciona conclusiones claras
+4. Sugiere recomendaciones específicas
+5. Mantén formato profesional
+"""
+
+    return prompt
+
+
+# Prefijos precalculados al importar (ver app/services/contextos_agentes.py)
+for _tipo_servicio, _agente in PILI_AGENTES.items():
+    registro_contextos.registrar("pili", _tipo_servicio, _agente["nombre"], prefijo_agente_pili(_tipo_servicio, _agente))
+
+
 class GeminiService:
     """
     🔄 SERVICIO ORIGINAL CONSERVADO + 🤖 PILI INTEGRADA
@@ -95,6 +171,16 @@ class GeminiService:
         self.pili_activa = True
         self.modo_demo = False
         self.aprendizaje_habilitado = False
+
+        # Modelos por agente: clave → (versión del prefijo, modelo, expiración de la caché)
+        self._modelos_agente: Dict[str, tuple] = {}
+        self._lock_modelos = threading.Lock()
+        # Un lock por agente para crear su modelo: la subida a Gemini no
+        # bloquea a los demás agentes ni se repite en paralelo
+        self._locks_creacion: Dict[str, threading.Lock] = {}
+        # Nombre de cada CachedContent, compartido entre workers (Redis):
+        # un prefijo se sube una vez y no una vez por worker
+        self._caches_contexto = CacheCompartida("gemini_contexto", settings.GEMINI_CACHE_TTL_MINUTOS * 60)
         
         # Configuración Gemini original
         try:
@@ -155,8 +241,12 @@ class GeminiService:
                 datos_archivos=datos_archivos
             )
             
-            # 3. Generar respuesta con Gemini
-            response = self.model.generate_content(prompt)
+            # 3. Generar respuesta con Gemini (prefijo del agente como contexto de sistema)
+            contexto_agente = (registro_contextos.obtener("pili", tipo_servicio)
+                               or registro_contextos.obtener("pili", "cotizacion-simple"))
+            modelo = await asyncio.to_thread(self.modelo_agente, contexto_agente)
+            with span("gemini.generate", agente=contexto_agente.nombre, caracteres=len(prompt)):
+                response = await modelo.generate_content_async(prompt)
             respuesta_texto = response.text
             
             # 4. Procesar respuesta PILI
@@ -187,6 +277,115 @@ class GeminiService:
                 "modo_degradado": True
             }
     
+    # ═══════════════════════════════════════════════════════════════
+    # 🧠 PREFIJOS DE SISTEMA Y CACHÉ DE CONTEXTO POR AGENTE
+    # ═══════════════════════════════════════════════════════════════
+
+    def _modelo_vigente(self, contexto: ContextoAgente):
+        """Modelo ya creado para el agente si su prefijo y su caché siguen vigentes"""
+        with self._lock_modelos:
+            guardado = self._modelos_agente.get(contexto.clave)
+        if guardado and guardado[0] == contexto.version and (guardado[2] is None or guardado[2] > time.monotonic()):
+            return guardado[1]
+        return None
+
+    def modelo_agente(self, contexto: ContextoAgente):
+        """
+        Modelo de Gemini con el prefijo del agente ya cargado (uno por agente)
+
+        Si el prefijo alcanza GEMINI_CACHE_MIN_TOKENS se sube una vez como
+        CachedContent y se renueva al expirar; si no, va como
+        system_instruction (prefijo estable al inicio de cada petición).
+        Puede hacer llamadas de red: desde código async usar
+        `await asyncio.to_thread(...)` (ver chat_agente).
+        """
+        modelo = self._modelo_vigente(contexto)
+        if modelo is not None:
+            return modelo
+
+        with self._lock_modelos:
+            lock_agente = self._locks_creacion.setdefault(contexto.clave, threading.Lock())
+
+        # La creación (posible subida a Gemini) corre fuera del lock global
+        with lock_agente:
+            modelo = self._modelo_vigente(contexto)
+            if modelo is not None:
+                return modelo
+
+            modelo, expira = None, None
+            if settings.GEMINI_CACHE_CONTEXTO and contexto.tokens >= settings.GEMINI_CACHE_MIN_TOKENS:
+                try:
+                    # Otro worker ya subió este prefijo: se reutiliza su CachedContent
+                    clave_compartida = [contexto.clave, contexto.version]
+                    compartida = self._caches_contexto.obtener(clave_compartida)
+                    if compartida:
+                        cache = genai.caching.CachedContent.get(compartida["nombre"])
+                        restante = compartida["expira"] - time.time()
+                    else:
+                        ttl = timedelta(minutes=settings.GEMINI_CACHE_TTL_MINUTOS)
+                        with span("gemini.cache_contexto", agente=contexto.nombre, tokens=contexto.tokens):
+                            cache = genai.caching.CachedContent.create(
+                                model=settings.GEMINI_MODEL,
+                                display_name=f"pili-{contexto.familia}-{contexto.tipo_flujo}-{contexto.version}",
+                                system_instruction=contexto.prefijo,
+                                ttl=ttl,
+                            )
+                        # Se renueva antes de que Gemini la borre: un minuto antes,
+                        # o al 90% del TTL si el TTL es muy corto
+                        ttl_s = ttl.total_seconds()
+                        restante = max(ttl_s * 0.9, ttl_s - 60)
+                        self._caches_contexto.guardar(
+                            clave_compartida, {"nombre": cache.name, "expira": time.time() + restante}, ttl_s=restante)
+                        logger.info(f"🧠 Contexto de {contexto.nombre} en caché de Gemini (~{contexto.tokens} tokens)")
+                    modelo = genai.GenerativeModel.from_cached_content(cached_content=cache)
+                    expira = time.monotonic() + restante
+                except Exception as e:
+                    logger.warning(f"⚠️ Sin caché de contexto para {contexto.nombre}: {e}")
+
+            if modelo is None:
+                modelo = genai.GenerativeModel(settings.GEMINI_MODEL, system_instruction=contexto.prefijo)
+
+            with self._lock_modelos:
+                self._modelos_agente[contexto.clave] = (contexto.version, modelo, expira)
+            return modelo
+
+    async def chat_agente(self, contexto: ContextoAgente, mensaje: str) -> Dict[str, Any]:
+        """
+        Turno de chat con un agente registrado: a Gemini solo viaja `mensaje`
+        (la parte dinámica); el prefijo del agente ya está en el modelo
+        """
+        if self.modo_demo:
+            return {
+                "mensaje": f"PILI en modo demo: {mensaje}",
+                "sugerencias": ["Configurar GEMINI_API_KEY", "Usar procesar_con_pili()"],
+                "accion_recomendada": "configurar_gemini"
+            }
+
+        # Crear el modelo puede subir el prefijo a Gemini (bloqueante): en un hilo
+        modelo = await asyncio.to_thread(self.modelo_agente, contexto)
+        with span("gemini.generate", agente=contexto.nombre, caracteres=len(mensaje)):
+            response = await modelo.generate_content_async(mensaje)
+        return {
+            "mensaje": response.text,
+            "agente": contexto.nombre,
+            "tokens_prefijo": contexto.tokens
+        }
+
+    def estado_contextos(self) -> Dict[str, Any]:
+        """Prefijos registrados y modelos/cachés de Gemini activos"""
+        with self._lock_modelos:
+            activos = {
+                clave: {"version": version, "cache_explicita": expira is not None}
+                for clave, (version, _, expira) in self._modelos_agente.items()
+            }
+        return {
+            **registro_contextos.estado(),
+            "gemini_modo_demo": self.modo_demo,
+            "cache_contexto": settings.GEMINI_CACHE_CONTEXTO,
+            "cache_min_tokens": settings.GEMINI_CACHE_MIN_TOKENS,
+            "modelos_agente": activos,
+        }
+
     def _construir_prompt_pili(
         self,
         mensaje: str,
@@ -196,14 +395,14 @@ class GeminiService:
         historial: Optional[List[Dict[str, Any]]],
         datos_archivos: Optional[Dict[str, Any]]
     ) -> str:
-        """Construye prompt especializado para agente PILI específico"""
+        """
+        Construye la parte dinámica del prompt del agente PILI; la estática
+        (prompt base + instrucciones) es el prefijo de sistema registrado
+        en contextos_agentes (ver prefijo_agente_pili)
+        """
         
         prompt = f"""
-{agente['prompt_base']}
-
 INFORMACIÓN DE CONTEXTO:
-- Agente activo: {agente['nombre']}
-- Especialidad: {agente['especialidad']}
 - Tipo de servicio: {tipo_servicio}
 - Mensaje del usuario: {mensaje}
 """
@@ -230,57 +429,6 @@ INFORMACIÓN DE CONTEXTO:
             if texto:
                 prompt += f"\n- Texto extraído: {texto[:500]}..."  # Primeros 500 caracteres
         
-        # Instrucciones específicas por tipo de servicio
-        if "cotizacion" in tipo_servicio:
-            prompt += """
-
-INSTRUCCIONES DE COTIZACIÓN:
-1. Si tienes información suficiente, genera JSON estructurado con items detallados
-2. Si falta información, haz preguntas específicas
-3. Usa precios del mercado peruano 2025
-4. Incluye especificaciones técnicas (CNE)
-5. Calcula correctamente subtotal, IGV (18%) y total
-
-FORMATO DE RESPUESTA:
-Si generas cotización, incluye JSON:
-{
-    "accion": "cotizacion_generada",
-    "datos": {
-        "cliente": "nombre",
-        "proyecto": "descripción",
-        "items": [{"descripcion": "", "cantidad": 1, "precio_unitario": 100}],
-        "observaciones": ""
-    }
-}
-
-Si necesitas más información, responde conversacionalmente.
-"""
-        
-        elif "proyecto" in tipo_servicio:
-            prompt += """
-
-INSTRUCCIONES DE PROYECTO:
-1. Organiza la información del proyecto en fases claras
-2. Define cronograma realista
-3. Identifica recursos necesarios
-4. Establece hitos importantes
-5. Considera riesgos y mitigaciones
-
-FORMATO DE RESPUESTA:
-Estructura la información para gestión eficiente del proyecto.
-"""
-        
-        elif "informe" in tipo_servicio:
-            prompt += """
-
-INSTRUCCIONES DE INFORME:
-1. Estructura información en secciones lógicas
-2. Incluye métricas relevantes
-3. Proporciona conclusiones claras
-4. Sugiere recomendaciones específicas
-5. Mantén formato profesional
-"""
-        
         prompt += f"\n\nRESPONDE COMO {agente['nombre']}:"
         
         return prompt
@@ -583,7 +731,8 @@ Para el informe necesito:
         )
         
         try:
-            response = self.model.generate_content(prompt)
+            with span("gemini.generate", caracteres=len(prompt)):
+                response = self.model.generate_content(prompt)
             
             # Parsear la respuesta
             cotizacion_data = self._parsear_respuesta_cotizacion(response.text)
@@ -622,7 +771,8 @@ Para el informe necesito:
         prompt = self._construir_prompt_chat(mensaje, historial, contexto)
         
         try:
-            response = self.model.generate_content(prompt)
+            with span("gemini.generate", caracteres=len(prompt)):
+                response = self.model.generate_content(prompt)
             
             return {
                 "exito": True,
@@ -681,7 +831,8 @@ RESPONDE EN FORMATO JSON:
 """
         
         try:
-            response = self.model.generate_content(prompt)
+            with span("gemini.generate", caracteres=len(prompt)):
+                response = self.model.generate_content(prompt)
             
             # Intentar parsear JSON
             texto = response.text.strip()
@@ -20,6 +20,8 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 import asyncio
 
+from app.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -150,20 +152,22 @@ class MultiIAProvider:
             try:
                 logger.info(f"🤖 Intentando con {provider['nombre']}...")
 
-                if provider["tipo"] == "gemini":
-                    resultado = await self._usar_gemini(prompt, temperatura, max_tokens)
-                elif provider["tipo"] == "openai":
-                    resultado = await self._usar_openai(prompt, temperatura, max_tokens)
-                elif provider["tipo"] == "anthropic":
-                    resultado = await self._usar_anthropic(prompt, temperatura, max_tokens)
-                elif provider["tipo"] == "groq":
-                    resultado = await self._usar_groq(prompt, temperatura, max_tokens)
-                elif provider["tipo"] == "together":
-                    resultado = await self._usar_together(prompt, temperatura, max_tokens)
-                elif provider["tipo"] == "cohere":
-                    resultado = await self._usar_cohere(prompt, temperatura, max_tokens)
-                else:
-                    continue
+                # Latencia y errores por proveedor en /metrics (app/core/metricas.py)
+                with span(f"llm.{provider['tipo']}"):
+                    if provider["tipo"] == "gemini":
+                        resultado = await self._usar_gemini(prompt, temperatura, max_tokens)
+                    elif provider["tipo"] == "openai":
+                        resultado = await self._usar_openai(prompt, temperatura, max_tokens)
+                    elif provider["tipo"] == "anthropic":
+                        resultado = await self._usar_anthropic(prompt, temperatura, max_tokens)
+                    elif provider["tipo"] == "groq":
+                        resultado = await self._usar_groq(prompt, temperatura, max_tokens)
+                    elif provider["tipo"] == "together":
+                        resultado = await self._usar_together(prompt, temperatura, max_tokens)
+                    elif provider["tipo"] == "cohere":
+                        resultado = await self._usar_cohere(prompt, temperatura, max_tokens)
+                    else:
+                        continue
 
                 # Si funcionó, retornar
                 if resultado.get("exito"):
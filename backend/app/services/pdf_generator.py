@@ -34,6 +34,8 @@ import logging
 import base64
 from io import BytesIO
 
+from app.core.tracing import span, trazado
+
 logger = logging.getLogger(__name__)
 
 class PDFGenerator:
@@ -132,6 +134,7 @@ class PDFGenerator:
     # 🧠 CEREBRO CENTRAL (DISPATCHER)
     # ════════════════════════════════════════════════════════
 
+    @trazado("pdf.generar")
     def generar_desde_json_pili(
         self,
         datos_json: Dict[str, Any],
@@ -228,7 +231,8 @@ class PDFGenerator:
         # Footer
         elementos.extend(self._crear_footer(agente))
         
-        doc.build(elementos)
+        with span("pdf.build", elementos=len(elementos)):
+            doc.build(elementos)
 
     # ════════════════════════════════════════════════════════
     # 2. GENERADOR DE PROYECTOS (GESTIÓN)
@@ -302,7 +306,8 @@ class PDFGenerator:
 
         # Footer
         elementos.extend(self._crear_footer(agente))
-        doc.build(elementos)
+        with span("pdf.build", elementos=len(elementos)):
+            doc.build(elementos)
 
     # ════════════════════════════════════════════════════════
     # 3. GENERADOR DE INFORMES (REPORTING)
@@ -346,7 +351,8 @@ class PDFGenerator:
                 
         # Footer
         elementos.extend(self._crear_footer(agente))
-        doc.build(elementos)
+        with span("pdf.build", elementos=len(elementos)):
+            doc.build(elementos)
 
     # ════════════════════════════════════════════════════════
     # COMPONENTES REUTILIZABLES (UI KIT)
@@ -28,6 +28,8 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 import logging
 
+from .pricing_engine import pricing_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -118,6 +120,49 @@ SERVICIOS_PILI = {
 }
 
 
+# ═══════════════════════════════════════════════════════════════
+# 🔁 GRAFO DEL BORRADOR INCREMENTAL
+# ═══════════════════════════════════════════════════════════════
+# sección: (entradas, método). Entradas sin "@" son valores del contexto
+# (entidades fusionadas, servicio, complejidad del documento, fecha de
+# inicio); con "@" son otras secciones, de las que solo se compara la
+# revisión. Orden topológico: cada sección va después de sus entradas.
+
+GRAFO_BORRADOR = {
+    "cliente": (("cliente",), "_seccion_cliente"),
+    "datos": (("area_m2", "num_pisos", "cantidad_puntos", "potencia_hp",
+               "tipo_instalacion", "indicador_complejo"), "_seccion_datos"),
+    "items": (("servicio", "@datos"), "_seccion_items"),
+    "totales": (("@items",), "_seccion_totales"),
+    "observaciones": (("servicio", "@datos"), "_seccion_observaciones"),
+    "fases": (("servicio", "@datos", "complejidad_fases"), "_seccion_fases"),
+    "duracion": (("@fases",), "_seccion_duracion"),
+    "gantt": (("@fases", "fecha_inicio", "complejidad"), "_seccion_gantt"),
+    "recursos": (("servicio", "complejidad"), "_seccion_recursos"),
+    "riesgos": (("servicio", "complejidad"), "_seccion_riesgos"),
+    "entregables": (("servicio", "complejidad"), "_seccion_entregables"),
+    "alcance": (("servicio", "@datos"), "_seccion_alcance"),
+    "informe": (("servicio", "complejidad", "@datos", "@totales", "@duracion"), "_seccion_informe"),
+    "conversacion": (("tipo", "servicio", "complejidad", "@datos", "@items", "@duracion", "@totales"),
+                     "_seccion_conversacion"),
+}
+
+SECCIONES_POR_TIPO = {
+    "cotizacion": ("cliente", "datos", "items", "totales", "observaciones", "conversacion"),
+    "proyecto": ("cliente", "datos", "items", "totales", "fases", "duracion", "gantt", "recursos",
+                 "riesgos", "entregables", "alcance", "conversacion"),
+    "informe": ("cliente", "datos", "items", "totales", "fases", "duracion", "informe", "conversacion"),
+}
+
+
+def complejidad_flujo(tipo_flujo: str) -> str:
+    """
+    Complejidad del documento según el flujo del chat: cotizacion-compleja,
+    proyecto-complejo e informe-ejecutivo generan la versión "complejo"
+    """
+    return "complejo" if "complej" in tipo_flujo or "ejecutivo" in tipo_flujo else "simple"
+
+
 # ═══════════════════════════════════════════════════════════════
 # 🧠 CLASE PRINCIPAL: PILIBrain
 # ═══════════════════════════════════════════════════════════════
@@ -137,6 +182,7 @@ class PILIBrain:
     def __init__(self):
         """Inicializa el cerebro de PILI"""
         self.servicios = SERVICIOS_PILI
+        self.pricing = pricing_engine
         logger.info("🧠 PILIBrain inicializado - Modo 100% offline")
 
     # ──────────────────────────────────────────────────────────────
@@ -153,6 +199,11 @@ class PILIBrain:
         Returns:
             Código del servicio detectado
         """
+        # Default: eléctrico residencial
+        return self._detectar_servicio_explicito(mensaje) or "electrico-residencial"
+
+    def _detectar_servicio_explicito(self, mensaje: str) -> Optional[str]:
+        """Servicio con más keywords en el mensaje, o None si no menciona ninguno"""
         mensaje_lower = mensaje.lower()
         scores = {}
 
@@ -172,9 +223,8 @@ class PILIBrain:
             servicio_detectado = max(scores, key=scores.get)
             logger.info(f"🎯 Servicio detectado: {servicio_detectado} (score: {scores[servicio_detectado]})")
             return servicio_detectado
-        else:
-            # Default: eléctrico residencial
-            return "electrico-residencial"
+
+        return None
 
     # ──────────────────────────────────────────────────────────────
     # 📊 EXTRACCIÓN DE DATOS DEL MENSAJE
@@ -222,7 +272,7 @@ class PILIBrain:
 
         return None
 
-    def _extraer_pisos(self, mensaje: str) -> int:
+    def _extraer_pisos(self, mensaje: str, por_defecto: Optional[int] = 1) -> Optional[int]:
         """Extrae número de pisos del mensaje"""
         patterns = [
             r'(\d+)\s*pisos?',
@@ -237,7 +287,7 @@ class PILIBrain:
                 logger.info(f"🏢 Pisos detectados: {pisos}")
                 return pisos
 
-        return 1  # Default
+        return por_defecto
 
     def _extraer_cantidad_general(self, mensaje: str) -> Optional[int]:
         """Extrae cantidad general de puntos/elementos"""
@@ -275,7 +325,7 @@ class PILIBrain:
 
         return None
 
-    def _extraer_tipo_instalacion(self, mensaje: str) -> str:
+    def _extraer_tipo_instalacion(self, mensaje: str, por_defecto: Optional[str] = "nueva") -> Optional[str]:
         """Determina tipo de instalación"""
         mensaje_lower = mensaje.lower()
 
@@ -286,10 +336,10 @@ class PILIBrain:
         elif any(word in mensaje_lower for word in ["ampliación", "expansión"]):
             return "ampliacion"
         else:
-            return "nueva"  # Default
+            return por_defecto
 
-    def _determinar_complejidad(self, mensaje: str, servicio: str) -> str:
-        """Determina si el proyecto es simple o complejo"""
+    def _tiene_indicador_complejo(self, mensaje: str) -> bool:
+        """El mensaje pide explícitamente algo complejo"""
         mensaje_lower = mensaje.lower()
 
         # Indicadores de complejidad
@@ -299,9 +349,12 @@ class PILIBrain:
             "análisis", "ejecutivo", "apa"
         ]
 
-        for indicador in indicadores_complejo:
-            if indicador in mensaje_lower:
-                return "complejo"
+        return any(indicador in mensaje_lower for indicador in indicadores_complejo)
+
+    def _determinar_complejidad(self, mensaje: str, servicio: str) -> str:
+        """Determina si el proyecto es simple o complejo"""
+        if self._tiene_indicador_complejo(mensaje):
+            return "complejo"
 
         # Por área
         datos_area = self._extraer_area(mensaje)
@@ -375,384 +428,13 @@ class PILIBrain:
         return cotizacion
 
     def _generar_items_servicio(self, servicio: str, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Genera items específicos según el servicio"""
-
-        if servicio == "electrico-residencial":
-            return self._items_electrico_residencial(datos)
-        elif servicio == "electrico-comercial":
-            return self._items_electrico_comercial(datos)
-        elif servicio == "electrico-industrial":
-            return self._items_electrico_industrial(datos)
-        elif servicio == "contraincendios":
-            return self._items_contraincendios(datos)
-        elif servicio == "domotica":
-            return self._items_domotica(datos)
-        elif servicio == "saneamiento":
-            return self._items_saneamiento(datos)
-        elif servicio == "pozo-tierra":
-            return self._items_pozo_tierra(datos)
-        elif servicio == "redes-cctv":
-            return self._items_redes_cctv(datos)
-        else:
-            # Genérico
-            return self._items_generico(servicio, datos)
-
-    def _items_electrico_residencial(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para instalación eléctrica residencial"""
-        area = datos.get("area_m2") or 100
-
-        # Cálculos según CNE
-        num_circuitos = max(6, int(area / 25))  # 1 circuito por cada 25m²
-        num_luces = int(area / 10)  # 1 luz cada 10m²
-        num_tomacorrientes = int(area / 15)  # 1 tomacorriente cada 15m²
-
-        items = [
-            {
-                "descripcion": "Tablero eléctrico monofásico 12 circuitos con interruptores termomagnéticos",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 450.00,
-                "total": 450.00
-            },
-            {
-                "descripcion": f"Instalación de circuitos eléctricos (cable THW {num_circuitos*20}m + tubería PVC)",
-                "cantidad": num_circuitos,
-                "unidad": "cto",
-                "precio_unitario": 120.00,
-                "total": num_circuitos * 120.00
-            },
-            {
-                "descripcion": "Puntos de iluminación (incluye luminaria LED, cableado y accesorios)",
-                "cantidad": num_luces,
-                "unidad": "pto",
-                "precio_unitario": 45.00,
-                "total": num_luces * 45.00
-            },
-            {
-                "descripcion": "Tomacorrientes dobles (incluye cableado, caja y accesorios)",
-                "cantidad": num_tomacorrientes,
-                "unidad": "pto",
-                "precio_unitario": 35.00,
-                "total": num_tomacorrientes * 35.00
-            },
-            {
-                "descripcion": "Sistema de puesta a tierra (pozo, cable, conectores)",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 850.00,
-                "total": 850.00
-            }
-        ]
-
-        return items
-
-    def _items_electrico_comercial(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para instalación eléctrica comercial"""
-        area = datos.get("area_m2") or 200
-
-        items = [
-            {
-                "descripcion": "Tablero eléctrico trifásico 24 circuitos con protección diferencial",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 1200.00,
-                "total": 1200.00
-            },
-            {
-                "descripcion": "Sistema de iluminación LED comercial con control automático",
-                "cantidad": int(area / 8),
-                "unidad": "pto",
-                "precio_unitario": 85.00,
-                "total": int(area / 8) * 85.00
-            },
-            {
-                "descripcion": "Tomacorrientes industriales dobles con toma tierra",
-                "cantidad": int(area / 12),
-                "unidad": "pto",
-                "precio_unitario": 55.00,
-                "total": int(area / 12) * 55.00
-            },
-            {
-                "descripcion": "Circuitos dedicados para equipos especiales (AA, servidores, etc)",
-                "cantidad": 4,
-                "unidad": "cto",
-                "precio_unitario": 280.00,
-                "total": 1120.00
-            }
-        ]
-
-        return items
+        """Genera items específicos según el servicio (catálogo de precios)"""
+        items = self.pricing.generar_items(servicio, datos)
+        if items:
+            return items
 
-    def _items_electrico_industrial(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para instalación eléctrica industrial"""
-        potencia_hp = datos.get("potencia_hp") or 10
-
-        items = [
-            {
-                "descripcion": "Tablero de fuerza industrial con protección y control",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 3500.00,
-                "total": 3500.00
-            },
-            {
-                "descripcion": f"Sistema de alimentación trifásica para motores ({potencia_hp} HP total)",
-                "cantidad": int(potencia_hp),
-                "unidad": "HP",
-                "precio_unitario": 320.00,
-                "total": int(potencia_hp) * 320.00
-            },
-            {
-                "descripcion": "Arrancador suave electrónico con protección térmica",
-                "cantidad": max(1, int(potencia_hp / 5)),
-                "unidad": "und",
-                "precio_unitario": 1800.00,
-                "total": max(1, int(potencia_hp / 5)) * 1800.00
-            },
-            {
-                "descripcion": "Sistema de compensación de factor de potencia",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 4500.00,
-                "total": 4500.00
-            }
-        ]
-
-        return items
-
-    def _items_contraincendios(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para sistema contraincendios"""
-        area = datos.get("area_m2") or 300
-
-        # Cálculos según NFPA
-        num_rociadores = int(area / 12)  # 1 rociador cada 12m² aprox
-        num_detectores = int(area / 60)  # 1 detector cada 60m²
-
-        items = [
-            {
-                "descripcion": "Central de detección y alarma de incendios direccionable 8 zonas",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 2800.00,
-                "total": 2800.00
-            },
-            {
-                "descripcion": "Detectores de humo fotoeléctricos direccionables (NFPA 72)",
-                "cantidad": num_detectores,
-                "unidad": "und",
-                "precio_unitario": 95.00,
-                "total": num_detectores * 95.00
-            },
-            {
-                "descripcion": "Rociadores automáticos tipo spray (NFPA 13) incluye tubería",
-                "cantidad": num_rociadores,
-                "unidad": "und",
-                "precio_unitario": 120.00,
-                "total": num_rociadores * 120.00
-            },
-            {
-                "descripcion": "Bomba contraincendios eléctrica 10 HP con jockey pump",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 6500.00,
-                "total": 6500.00
-            },
-            {
-                "descripcion": "Gabinetes contraincendios con manguera y accesorios",
-                "cantidad": max(2, int(area / 200)),
-                "unidad": "und",
-                "precio_unitario": 650.00,
-                "total": max(2, int(area / 200)) * 650.00
-            }
-        ]
-
-        return items
-
-    def _items_domotica(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para sistema domótico"""
-        area = datos.get("area_m2") or 150
-
-        items = [
-            {
-                "descripcion": "Central domótica KNX/EIB con programación incluida",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 3200.00,
-                "total": 3200.00
-            },
-            {
-                "descripcion": "Actuadores inteligentes para iluminación (dimmer, on/off)",
-                "cantidad": int(area / 15),
-                "unidad": "und",
-                "precio_unitario": 180.00,
-                "total": int(area / 15) * 180.00
-            },
-            {
-                "descripcion": "Sensores de presencia y luminosidad",
-                "cantidad": int(area / 25),
-                "unidad": "und",
-                "precio_unitario": 120.00,
-                "total": int(area / 25) * 120.00
-            },
-            {
-                "descripcion": "Panel táctil de control mural con interface gráfica",
-                "cantidad": max(2, int(area / 80)),
-                "unidad": "und",
-                "precio_unitario": 850.00,
-                "total": max(2, int(area / 80)) * 850.00
-            },
-            {
-                "descripcion": "App móvil personalizada para control remoto",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 1500.00,
-                "total": 1500.00
-            }
-        ]
-
-        return items
-
-    def _items_saneamiento(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para sistema de saneamiento"""
-        area = datos.get("area_m2", 120)
-
-        # Cálculos según RNE
-        dotacion_diaria = area * 2  # Litros/día estimado
-        volumen_cisterna = int(dotacion_diaria * 0.75 / 1000)  # m³
-        volumen_tanque = int(dotacion_diaria * 0.33 / 1000)  # m³
-
-        items = [
-            {
-                "descripcion": f"Cisterna de concreto armado {volumen_cisterna}m³ con impermeabilización",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": volumen_cisterna * 450.00,
-                "total": volumen_cisterna * 450.00
-            },
-            {
-                "descripcion": f"Tanque elevado {volumen_tanque}m³ con estructura metálica",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": volumen_tanque * 380.00,
-                "total": volumen_tanque * 380.00
-            },
-            {
-                "descripcion": "Sistema de bombeo de agua (bomba + tablero + accesorios)",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 2200.00,
-                "total": 2200.00
-            },
-            {
-                "descripcion": "Red de distribución de agua fría (tubería PVC + accesorios)",
-                "cantidad": int(area / 10),
-                "unidad": "pto",
-                "precio_unitario": 85.00,
-                "total": int(area / 10) * 85.00
-            },
-            {
-                "descripcion": "Red de desagüe y ventilación (tubería PVC + accesorios)",
-                "cantidad": int(area / 12),
-                "unidad": "pto",
-                "precio_unitario": 95.00,
-                "total": int(area / 12) * 95.00
-            }
-        ]
-
-        return items
-
-    def _items_pozo_tierra(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para sistema de puesta a tierra"""
-        items = [
-            {
-                "descripcion": "Excavación y preparación de pozo de tierra (3m profundidad)",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 350.00,
-                "total": 350.00
-            },
-            {
-                "descripcion": "Varilla de cobre electrolítico Ø 5/8\" x 2.4m (3 unidades)",
-                "cantidad": 3,
-                "unidad": "und",
-                "precio_unitario": 85.00,
-                "total": 255.00
-            },
-            {
-                "descripcion": "Thor Gel mejorador de tierra (tratamiento químico)",
-                "cantidad": 3,
-                "unidad": "bls",
-                "precio_unitario": 45.00,
-                "total": 135.00
-            },
-            {
-                "descripcion": "Cable de cobre desnudo Nº 2 AWG (30m)",
-                "cantidad": 30,
-                "unidad": "m",
-                "precio_unitario": 8.50,
-                "total": 255.00
-            },
-            {
-                "descripcion": "Conectores tipo soldadura exotérmica (Cadweld)",
-                "cantidad": 5,
-                "unidad": "und",
-                "precio_unitario": 35.00,
-                "total": 175.00
-            },
-            {
-                "descripcion": "Medición y certificación de resistencia de puesta a tierra",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 280.00,
-                "total": 280.00
-            }
-        ]
-
-        return items
-
-    def _items_redes_cctv(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Items para redes y CCTV"""
-        puntos = datos.get("cantidad_puntos", 8)
-
-        items = [
-            {
-                "descripcion": "Cámaras IP 4MP con visión nocturna 30m (interior/exterior)",
-                "cantidad": puntos,
-                "unidad": "und",
-                "precio_unitario": 320.00,
-                "total": puntos * 320.00
-            },
-            {
-                "descripcion": "NVR 16 canales con disco duro 2TB para grabación",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 1200.00,
-                "total": 1200.00
-            },
-            {
-                "descripcion": "Switch PoE 16 puertos gigabit para alimentación de cámaras",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 650.00,
-                "total": 650.00
-            },
-            {
-                "descripcion": "Cableado estructurado Cat6 con certificación (incluye instalación)",
-                "cantidad": puntos,
-                "unidad": "pto",
-                "precio_unitario": 120.00,
-                "total": puntos * 120.00
-            },
-            {
-                "descripcion": "Configuración y puesta en marcha del sistema",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 450.00,
-                "total": 450.00
-            }
-        ]
-
-        return items
+        # Genérico
+        return self._items_generico(servicio, datos)
 
     def _items_generico(self, servicio: str, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Items genéricos cuando no hay servicio específico"""
@@ -946,7 +628,7 @@ NOTA: Cotización válida por 30 días. Sujeto a verificación en campo."""
     def _generar_fases_proyecto(self, servicio: str, datos: Dict[str, Any], complejidad: str) -> List[Dict[str, Any]]:
         """Genera fases del proyecto según el servicio"""
 
-        area = datos.get("area_m2", 100)
+        area = datos.get("area_m2") or 100
 
         # Fases base para cualquier proyecto
         fases_base = [
@@ -1603,6 +1285,251 @@ DATOS PRINCIPALES:
 
         return mensaje
 
+    # ──────────────────────────────────────────────────────────────
+    # 🔁 BORRADOR INCREMENTAL (chat por sesión)
+    # ──────────────────────────────────────────────────────────────
+
+    def entidades_mensaje(self, mensaje: str) -> Dict[str, Any]:
+        """
+        Entidades mencionadas explícitamente en un mensaje (sin valores por
+        defecto: lo que no se dijo no pisa lo dicho en turnos anteriores)
+        """
+        entidades = {
+            "servicio": self._detectar_servicio_explicito(mensaje),
+            "cliente": self._extraer_cliente(mensaje),
+            "area_m2": self._extraer_area(mensaje),
+            "num_pisos": self._extraer_pisos(mensaje, por_defecto=None),
+            "cantidad_puntos": self._extraer_cantidad_general(mensaje),
+            "potencia_hp": self._extraer_potencia(mensaje),
+            "tipo_instalacion": self._extraer_tipo_instalacion(mensaje, por_defecto=None),
+            # Una vez pedido algo complejo, sigue siéndolo
+            "indicador_complejo": self._tiene_indicador_complejo(mensaje) or None,
+        }
+        return {clave: valor for clave, valor in entidades.items() if valor is not None}
+
+    def actualizar_borrador(
+        self,
+        borrador: Optional[Dict[str, Any]],
+        mensaje: str,
+        tipo_flujo: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+        """
+        Aplica un mensaje nuevo al borrador de la conversación
+
+        Fusiona las entidades del mensaje con las de turnos anteriores y
+        recalcula solo las secciones cuyas entradas cambiaron, siguiendo
+        GRAFO_BORRADOR (datos → items → totales → fases → gantt ...). Una
+        sección recalculada con el mismo resultado no invalida a las que
+        dependen de ella.
+
+        Args:
+            borrador: Estado devuelto en el turno anterior (None = nuevo)
+            mensaje: Mensaje nuevo del usuario
+            tipo_flujo: Flujo del chat (cotizacion-simple, proyecto-complejo, ...)
+
+        Returns:
+            (borrador, documento, secciones cuyo valor cambió). El borrador
+            es el estado a guardar entre turnos (JSON serializable); el
+            documento tiene el formato de generar_cotizacion/proyecto/informe
+            y se arma desde las secciones (no hace falta guardarlo).
+        """
+        tipo = "proyecto" if "proyecto" in tipo_flujo else "informe" if "informe" in tipo_flujo else "cotizacion"
+        complejidad = complejidad_flujo(tipo_flujo)
+
+        if not borrador or borrador.get("tipo") != tipo or borrador.get("complejidad") != complejidad:
+            borrador = {
+                "tipo": tipo,
+                "complejidad": complejidad,
+                "fecha_inicio": datetime.now().strftime("%Y-%m-%d"),
+                "entidades": {},
+                "secciones": {},
+            }
+
+        borrador["entidades"] = {**borrador["entidades"], **self.entidades_mensaje(mensaje)}
+
+        contexto = {
+            **borrador["entidades"],
+            "servicio": borrador["entidades"].get("servicio", "electrico-residencial"),
+            "tipo": tipo,
+            "complejidad": complejidad,
+            # El proyecto base de un informe siempre es simple (como en generar_informe)
+            "complejidad_fases": "simple" if tipo == "informe" else complejidad,
+            "fecha_inicio": borrador["fecha_inicio"],
+        }
+        secciones = borrador["secciones"]
+        recalculadas, cambiadas = [], []
+
+        for nombre in SECCIONES_POR_TIPO[tipo]:
+            entradas, metodo = GRAFO_BORRADOR[nombre]
+            # Secciones: su revisión (None si el tipo no la tiene); contexto: el valor
+            clave = [
+                secciones.get(e[1:], {}).get("rev") if e.startswith("@") else contexto.get(e)
+                for e in entradas
+            ]
+            actual = secciones.get(nombre)
+            if actual is not None and actual["clave"] == clave:
+                contexto[nombre] = actual["valor"]
+                continue
+
+            valor = getattr(self, metodo)(contexto)
+            recalculadas.append(nombre)
+            if actual is None or actual["valor"] != valor:
+                actual = {"rev": (actual["rev"] + 1) if actual else 1, "valor": valor}
+                cambiadas.append(nombre)
+            actual["clave"] = clave
+            secciones[nombre] = actual
+            contexto[nombre] = valor
+
+        if recalculadas:
+            logger.info(f"🔁 Borrador {tipo}: recalculadas {', '.join(recalculadas)}; cambiaron {', '.join(cambiadas) or 'ninguna'}")
+        return borrador, self._ensamblar_borrador(borrador, contexto), cambiadas
+
+    def _seccion_cliente(self, c: Dict[str, Any]) -> str:
+        return c.get("cliente") or "Cliente Demo"
+
+    def _seccion_datos(self, c: Dict[str, Any]) -> Dict[str, Any]:
+        area = c.get("area_m2")
+        return {
+            "area_m2": area,
+            "num_pisos": c.get("num_pisos", 1),
+            "cantidad_puntos": c.get("cantidad_puntos"),
+            "potencia_hp": c.get("potencia_hp"),
+            "tipo_instalacion": c.get("tipo_instalacion", "nueva"),
+            "complejidad": "complejo" if c.get("indicador_complejo") or (area and area > 300) else "simple",
+        }
+
+    def _seccion_items(self, c: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._generar_items_servicio(c["servicio"], c["datos"])
+
+    def _seccion_totales(self, c: Dict[str, Any]) -> Dict[str, float]:
+        subtotal = sum(item["total"] for item in c["items"])
+        igv = subtotal * 0.18
+        return {"subtotal": round(subtotal, 2), "igv": round(igv, 2), "total": round(subtotal + igv, 2)}
+
+    def _seccion_observaciones(self, c: Dict[str, Any]) -> str:
+        return self._generar_observaciones(c["servicio"], c["datos"])
+
+    def _seccion_fases(self, c: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._generar_fases_proyecto(c["servicio"], c["datos"], c["complejidad_fases"])
+
+    def _seccion_duracion(self, c: Dict[str, Any]) -> int:
+        return sum(fase["duracion_dias"] for fase in c["fases"])
+
+    def _seccion_gantt(self, c: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if c["complejidad"] != "complejo":
+            return None
+        return self._generar_datos_gantt(c["fases"], datetime.strptime(c["fecha_inicio"], "%Y-%m-%d"))
+
+    def _seccion_recursos(self, c: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._generar_recursos(c["servicio"], c["complejidad"])
+
+    def _seccion_riesgos(self, c: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._generar_riesgos(c["servicio"], c["complejidad"])
+
+    def _seccion_entregables(self, c: Dict[str, Any]) -> List[str]:
+        return self._generar_entregables(c["servicio"], c["complejidad"])
+
+    def _seccion_alcance(self, c: Dict[str, Any]) -> str:
+        return self._generar_alcance(c["servicio"], c["datos"])
+
+    def _seccion_informe(self, c: Dict[str, Any]) -> Dict[str, Any]:
+        servicio, complejidad = c["servicio"], c["complejidad"]
+        proyecto_base = {"presupuesto_estimado": c["totales"]["total"], "duracion_total_dias": c["duracion"]}
+        return {
+            "resumen_ejecutivo": self._generar_resumen_ejecutivo(servicio, complejidad, proyecto_base),
+            "secciones": self._generar_secciones_informe(servicio, c["datos"], complejidad, proyecto_base),
+            "conclusiones": self._generar_conclusiones(servicio, complejidad, c["datos"]),
+            "recomendaciones": self._generar_recomendaciones(servicio, complejidad),
+            "metricas_clave": self._generar_metricas(proyecto_base) if complejidad == "complejo" else None,
+            "graficos_sugeridos": self._generar_graficos_sugeridos(complejidad),
+            "bibliografia": self._generar_bibliografia(servicio) if complejidad == "complejo" else None,
+        }
+
+    def _seccion_conversacion(self, c: Dict[str, Any]) -> Dict[str, Any]:
+        servicio, complejidad, datos = c["servicio"], c["complejidad"], c["datos"]
+        if c["tipo"] == "proyecto":
+            return {
+                "mensaje_pili": self._generar_mensaje_proyecto(servicio, complejidad, c["duracion"], c["totales"]["total"]),
+                "preguntas_pendientes": self._generar_preguntas_proyecto(datos),
+                "puede_generar": True
+            }
+        if c["tipo"] == "informe":
+            return {
+                "mensaje_pili": self._generar_mensaje_informe(servicio, complejidad),
+                "preguntas_pendientes": [],
+                "puede_generar": True
+            }
+        return {
+            "mensaje_pili": self._generar_mensaje_conversacional(servicio, complejidad, datos),
+            "preguntas_pendientes": self._generar_preguntas_pendientes(datos),
+            "puede_generar": len(c["items"]) > 0
+        }
+
+    def _ensamblar_borrador(self, borrador: Dict[str, Any], c: Dict[str, Any]) -> Dict[str, Any]:
+        """Documento con el mismo formato que generar_cotizacion/proyecto/informe"""
+        tipo, servicio, complejidad = borrador["tipo"], c["servicio"], c["complejidad"]
+        info_servicio = self.servicios[servicio]
+        fecha_inicio = datetime.strptime(borrador["fecha_inicio"], "%Y-%m-%d")
+        sufijo = f"{fecha_inicio.strftime('%Y%m%d')}-{servicio[:3].upper()}"
+        cliente = c["cliente"]
+
+        if tipo == "cotizacion":
+            datos = {
+                "numero": f"COT-{sufijo}",
+                "cliente": cliente,
+                "proyecto": info_servicio["nombre"],
+                "descripcion": f"{info_servicio['nombre']} según {info_servicio['normativa']}",
+                "fecha": fecha_inicio.strftime("%d/%m/%Y"),
+                "vigencia": "30 días calendario",
+                "items": c["items"],
+                **c["totales"],
+                "observaciones": c["observaciones"],
+                "normativa_aplicable": info_servicio["normativa"],
+                "datos_tecnicos": c["datos"]
+            }
+        elif tipo == "proyecto":
+            datos = {
+                "nombre": f"Proyecto {info_servicio['nombre']}",
+                "codigo": f"PROY-{sufijo}",
+                "cliente": cliente,
+                "descripcion": f"Proyecto de {info_servicio['nombre']} con gestión {'PMI avanzada' if complejidad == 'complejo' else 'simplificada'}",
+                "alcance": c["alcance"],
+                "fecha_inicio": fecha_inicio.strftime("%d/%m/%Y"),
+                "fecha_fin": (fecha_inicio + timedelta(days=c["duracion"])).strftime("%d/%m/%Y"),
+                "duracion_total_dias": c["duracion"],
+                "presupuesto_estimado": c["totales"]["total"],
+                "fases": c["fases"],
+                "recursos": c["recursos"],
+                "riesgos": c["riesgos"],
+                "entregables": c["entregables"],
+                "cronograma_gantt": c["gantt"],
+                "normativa_aplicable": info_servicio["normativa"],
+                "datos_tecnicos": c["datos"]
+            }
+        else:
+            datos = {
+                "titulo": f"Informe {'Ejecutivo' if complejidad == 'complejo' else 'Técnico'} - {info_servicio['nombre']}",
+                "codigo": f"INF-{sufijo}",
+                "fecha": fecha_inicio.strftime("%d/%m/%Y"),
+                "autor": "Tesla Electricidad y Automatización S.A.C.",
+                "cliente": cliente,
+                **c["informe"],
+                "formato": "APA 7ma edición" if complejidad == "complejo" else "Técnico estándar",
+                "normativa_aplicable": info_servicio["normativa"],
+                "datos_tecnicos": c["datos"]
+            }
+
+        documento = {
+            "accion": f"{tipo}_generado" if tipo != "cotizacion" else "cotizacion_generada",
+            "tipo_servicio": servicio,
+            "complejidad": complejidad,
+            "datos": datos,
+            "conversacion": c["conversacion"]
+        }
+        if tipo == "informe":
+            documento["tipo_informe"] = "ejecutivo" if complejidad == "complejo" else "tecnico"
+        return documento
+
 
 # ═══════════════════════════════════════════════════════════════
 # 🏭 INSTANCIA SINGLETON
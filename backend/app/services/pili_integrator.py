@@ -27,6 +27,8 @@ from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from app.services import vista_previa
+
 # Imports de servicios existentes
 try:
     from app.services.pili_brain import PILIBrain, pili_brain
@@ -517,152 +519,32 @@ class PILIIntegrator:
             return "<div>Vista previa no disponible</div>"
 
     def _html_preview_cotizacion(self, datos: Dict) -> str:
-        """HTML preview para cotizacion"""
-        items = datos.get("items", [])
-        items_html = ""
-        subtotal = 0
-
-        for item in items:
-            total_item = item.get("total", item.get("cantidad", 0) * item.get("precio_unitario", 0))
-            subtotal += total_item
-            items_html += f"""
-            <tr>
-                <td style="padding: 8px; border: 1px solid #ddd;">{item.get('descripcion', '')}</td>
-                <td style="padding: 8px; border: 1px solid #ddd; text-align: center;">{item.get('cantidad', 0)}</td>
-                <td style="padding: 8px; border: 1px solid #ddd; text-align: right;">${item.get('precio_unitario', 0):.2f}</td>
-                <td style="padding: 8px; border: 1px solid #ddd; text-align: right;">${total_item:.2f}</td>
-            </tr>
-            """
-
+        """HTML preview para cotizacion (app/templates/vista_previa/integrador_cotizacion.html)"""
+        items = [
+            {
+                "descripcion": item.get("descripcion", ""),
+                "cantidad": item.get("cantidad", 0),
+                "precio_unitario": item.get("precio_unitario", 0),
+                "total": item.get("total", item.get("cantidad", 0) * item.get("precio_unitario", 0)),
+            }
+            for item in datos.get("items", [])
+        ]
+        subtotal = sum(item["total"] for item in items)
         igv = datos.get("igv", subtotal * 0.18)
         total = datos.get("total", subtotal + igv)
 
-        return f"""
-        <div style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px;">
-            <div style="text-align: center; margin-bottom: 20px;">
-                <h2 style="color: #c41e3a; margin: 0;">TESLA ELECTRICIDAD</h2>
-                <p style="color: #666; margin: 5px 0;">Automatizacion y Servicios Electricos</p>
-            </div>
-
-            <h3 style="color: #333;">COTIZACION: {datos.get('numero', 'COT-XXXXX')}</h3>
-
-            <table style="width: 100%; margin-bottom: 15px;">
-                <tr>
-                    <td><strong>Cliente:</strong> {datos.get('cliente', 'N/A')}</td>
-                    <td><strong>Fecha:</strong> {datos.get('fecha', 'N/A')}</td>
-                </tr>
-                <tr>
-                    <td colspan="2"><strong>Proyecto:</strong> {datos.get('proyecto', 'N/A')}</td>
-                </tr>
-            </table>
-
-            <table style="width: 100%; border-collapse: collapse; margin-bottom: 20px;">
-                <thead>
-                    <tr style="background: #c41e3a; color: white;">
-                        <th style="padding: 10px; border: 1px solid #ddd;">Descripcion</th>
-                        <th style="padding: 10px; border: 1px solid #ddd;">Cant.</th>
-                        <th style="padding: 10px; border: 1px solid #ddd;">P. Unit.</th>
-                        <th style="padding: 10px; border: 1px solid #ddd;">Total</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {items_html}
-                </tbody>
-            </table>
-
-            <div style="text-align: right;">
-                <p><strong>Subtotal:</strong> ${subtotal:.2f}</p>
-                <p><strong>IGV (18%):</strong> ${igv:.2f}</p>
-                <p style="font-size: 1.2em; color: #c41e3a;"><strong>TOTAL: ${total:.2f}</strong></p>
-            </div>
-
-            <div style="margin-top: 20px; padding: 10px; background: #f5f5f5; font-size: 0.9em;">
-                <strong>Vigencia:</strong> {datos.get('vigencia', '30 dias')}
-            </div>
-        </div>
-        """
+        return vista_previa.renderizar(
+            "integrador_cotizacion", "fragmento",
+            datos=datos, items=items, subtotal=subtotal, igv=igv, total=total
+        )
 
     def _html_preview_proyecto(self, datos: Dict) -> str:
-        """HTML preview para proyecto"""
-        fases = datos.get("fases", [])
-        fases_html = ""
-
-        for fase in fases:
-            fases_html += f"""
-            <tr>
-                <td style="padding: 8px; border: 1px solid #ddd;">{fase.get('nombre', '')}</td>
-                <td style="padding: 8px; border: 1px solid #ddd; text-align: center;">{fase.get('duracion_dias', 0)} dias</td>
-                <td style="padding: 8px; border: 1px solid #ddd;">{fase.get('entregable', '')}</td>
-            </tr>
-            """
-
-        return f"""
-        <div style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px;">
-            <h2 style="color: #c41e3a;">PROYECTO: {datos.get('nombre', 'N/A')}</h2>
-
-            <table style="width: 100%; margin-bottom: 15px;">
-                <tr>
-                    <td><strong>Codigo:</strong> {datos.get('codigo', 'N/A')}</td>
-                    <td><strong>Cliente:</strong> {datos.get('cliente', 'N/A')}</td>
-                </tr>
-                <tr>
-                    <td><strong>Inicio:</strong> {datos.get('fecha_inicio', 'N/A')}</td>
-                    <td><strong>Fin:</strong> {datos.get('fecha_fin', 'N/A')}</td>
-                </tr>
-                <tr>
-                    <td><strong>Duracion:</strong> {datos.get('duracion_total_dias', 0)} dias</td>
-                    <td><strong>Presupuesto:</strong> ${datos.get('presupuesto_estimado', 0):,.2f}</td>
-                </tr>
-            </table>
-
-            <h4>FASES DEL PROYECTO</h4>
-            <table style="width: 100%; border-collapse: collapse;">
-                <thead>
-                    <tr style="background: #333; color: white;">
-                        <th style="padding: 10px;">Fase</th>
-                        <th style="padding: 10px;">Duracion</th>
-                        <th style="padding: 10px;">Entregable</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {fases_html}
-                </tbody>
-            </table>
-        </div>
-        """
+        """HTML preview para proyecto (app/templates/vista_previa/integrador_proyecto.html)"""
+        return vista_previa.renderizar("integrador_proyecto", "fragmento", datos=datos)
 
     def _html_preview_informe(self, datos: Dict) -> str:
-        """HTML preview para informe"""
-        secciones = datos.get("secciones", [])
-        secciones_html = ""
-
-        for seccion in secciones:
-            secciones_html += f"""
-            <div style="margin-bottom: 15px;">
-                <h4 style="color: #333; margin-bottom: 5px;">{seccion.get('titulo', '')}</h4>
-                <p style="color: #666; font-size: 0.9em;">{seccion.get('contenido', '')[:200]}...</p>
-            </div>
-            """
-
-        return f"""
-        <div style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px;">
-            <h2 style="color: #c41e3a;">{datos.get('titulo', 'INFORME')}</h2>
-
-            <table style="width: 100%; margin-bottom: 15px;">
-                <tr>
-                    <td><strong>Codigo:</strong> {datos.get('codigo', 'N/A')}</td>
-                    <td><strong>Fecha:</strong> {datos.get('fecha', 'N/A')}</td>
-                </tr>
-                <tr>
-                    <td><strong>Cliente:</strong> {datos.get('cliente', 'N/A')}</td>
-                    <td><strong>Formato:</strong> {datos.get('formato', 'Tecnico')}</td>
-                </tr>
-            </table>
-
-            <h4>CONTENIDO</h4>
-            {secciones_html}
-        </div>
-        """
+        """HTML preview para informe (app/templates/vista_previa/integrador_informe.html)"""
+        return vista_previa.renderizar("integrador_informe", "fragmento", datos=datos)
 
     def _obtener_botones_contextuales(
         self,
@@ -0,0 +1,356 @@
+"""
+📚 PRICE CATALOG - CATÁLOGO DE PRECIOS EN BASE DE DATOS
+📁 RUTA: backend/app/services/price_catalog.py
+
+Guarda el catálogo de PricingEngine en la tabla `precios_catalogo` para que
+cambiar un precio no requiera redeploy y todos los workers usen los mismos
+valores.
+
+🎯 CÓMO FUNCIONA:
+- `catalogo_version` guarda un contador que se incrementa en cada escritura
+  (importación, edición de precio)
+- Cada proceso mantiene el catálogo en memoria (PricingEngine, búsquedas
+  O(1) por código) y, como mucho cada PRICE_CATALOG_CHECK_S segundos,
+  compara su versión con la de la base de datos: si cambió, recarga
+  (hot reload sin reiniciar workers)
+- Importación masiva desde Excel/CSV con pandas
+- Si la tabla está vacía se siembra con CATALOGO_PRECIOS
+"""
+
+import importlib.util
+import json
+import time
+import logging
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine, SessionLocal
+from app.models.precio import PrecioCatalogo, CatalogoVersion
+from app.services.pricing_engine import (
+    CATALOGO_PRECIOS, COMPLEJIDADES, VARIABLES, PricingEngine, pricing_engine
+)
+
+logger = logging.getLogger(__name__)
+
+# pandas cuesta ~300 ms de import y solo lo usa importar_archivo: se
+# comprueba que esté instalado sin importarlo (arranque del backend)
+PANDAS_AVAILABLE = importlib.util.find_spec("pandas") is not None
+
+
+# Columnas que se pueden importar (además de codigo y precio, obligatorias)
+COLUMNAS = (
+    "servicio", "codigo", "descripcion", "unidad", "precio", "fijo", "variable",
+    "divisor", "factor", "minimo", "complejidad", "precio_en_cantidad",
+    "multiplos", "region", "vigente_desde", "vigente_hasta"
+)
+
+
+class PriceCatalog:
+    """
+    📚 Catálogo de precios persistente con caché en memoria
+
+    La caché es el propio PricingEngine; este servicio solo decide cuándo
+    recargarlo leyendo el contador de versión.
+    """
+
+    def __init__(self, pricing: PricingEngine = None, intervalo: float = None):
+        self.pricing = pricing or pricing_engine
+        self.intervalo = intervalo if intervalo is not None else settings.PRICE_CATALOG_CHECK_S
+        self.version_cargada: Optional[int] = None
+        self._ultimo_chequeo = 0.0
+        self._lock = threading.Lock()
+
+    # ──────────────────────────────────────────────────────────────
+    # 🔄 SINCRONIZACIÓN
+    # ──────────────────────────────────────────────────────────────
+
+    def activar(self) -> bool:
+        """
+        Crea las tablas si faltan, siembra el catálogo si está vacío y
+        engancha el refresco a PricingEngine.
+        """
+        try:
+            PrecioCatalogo.__table__.create(bind=engine, checkfirst=True)
+            CatalogoVersion.__table__.create(bind=engine, checkfirst=True)
+            with SessionLocal() as db:
+                self.sembrar(db)
+            self.refrescar(forzar=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Catálogo de precios en BD no disponible, usando catálogo interno: {e}")
+            return False
+
+        self.pricing.set_refresco(self.refrescar)
+        logger.info(f"✅ Catálogo de precios en BD activo (versión {self.version_cargada})")
+        return True
+
+    def refrescar(self, forzar: bool = False) -> bool:
+        """
+        Recarga el catálogo si la versión en BD cambió.
+
+        Barato cuando no hay cambios: solo consulta la BD una vez cada
+        `intervalo` segundos, y solo un hilo a la vez.
+
+        Returns:
+            True si se recargó
+        """
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_chequeo < self.intervalo:
+            return False
+        if not self._lock.acquire(blocking=forzar):
+            return False
+        try:
+            self._ultimo_chequeo = ahora
+            with SessionLocal() as db:
+                version = self._leer_version(db)
+                if not forzar and version == self.version_cargada:
+                    return False
+                filas = [
+                    p.to_dict() for p in
+                    db.query(PrecioCatalogo).order_by(PrecioCatalogo.id).all()
+                ]
+            if not filas:
+                return False
+            self.pricing.cargar_catalogo(filas, version=version)
+            self.version_cargada = version
+            logger.info(f"🔄 Catálogo de precios recargado (versión {version})")
+            return True
+        finally:
+            self._lock.release()
+
+    def recargar(self) -> Dict[str, Any]:
+        """Fuerza la recarga en este proceso"""
+        self.refrescar(forzar=True)
+        return self.estado()
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "version": self.version_cargada,
+            "servicios": len(self.pricing._catalogo),
+            "codigos": len(self.pricing._por_codigo),
+            "intervalo_chequeo_s": self.intervalo,
+            "pandas": PANDAS_AVAILABLE
+        }
+
+    @staticmethod
+    def _leer_version(db: Session) -> int:
+        fila = db.get(CatalogoVersion, 1)
+        return fila.version if fila else 0
+
+    @staticmethod
+    def _incrementar_version(db: Session) -> int:
+        fila = db.get(CatalogoVersion, 1)
+        if fila is None:
+            fila = CatalogoVersion(id=1, version=0)
+            db.add(fila)
+        fila.version = (fila.version or 0) + 1
+        return fila.version
+
+    def sembrar(self, db: Session) -> int:
+        """Inserta CATALOGO_PRECIOS si la tabla está vacía"""
+        if db.query(PrecioCatalogo.id).first() is not None:
+            return 0
+        db.bulk_insert_mappings(PrecioCatalogo, [self._a_columnas(f) for f in CATALOGO_PRECIOS])
+        self._incrementar_version(db)
+        db.commit()
+        logger.info(f"🌱 Catálogo de precios sembrado con {len(CATALOGO_PRECIOS)} filas")
+        return len(CATALOGO_PRECIOS)
+
+    # ──────────────────────────────────────────────────────────────
+    # 📋 CONSULTAS Y EDICIÓN
+    # ──────────────────────────────────────────────────────────────
+
+    def listar(self, db: Session, servicio: str = None, region: str = None) -> List[Dict[str, Any]]:
+        query = db.query(PrecioCatalogo)
+        if servicio:
+            query = query.filter(PrecioCatalogo.servicio == servicio)
+        if region:
+            query = query.filter(PrecioCatalogo.region == region)
+        return [p.to_dict() for p in query.order_by(PrecioCatalogo.id).all()]
+
+    def actualizar_precio(self, db: Session, codigo: str, precio: float, region: str = "*") -> Dict[str, Any]:
+        """Cambia el precio vigente de un código y publica una nueva versión"""
+        filas = db.query(PrecioCatalogo).filter(
+            PrecioCatalogo.codigo == codigo,
+            PrecioCatalogo.region == region
+        ).all()
+        if not filas:
+            raise KeyError(codigo)
+
+        vigente = max(filas, key=lambda p: p.vigente_desde or date.min)
+        vigente.precio = precio
+        version = self._incrementar_version(db)
+        db.commit()
+        self.refrescar(forzar=True)
+        return {"codigo": codigo, "region": region, "precio": float(precio), "version": version}
+
+    # ──────────────────────────────────────────────────────────────
+    # 📥 IMPORTACIÓN EXCEL / CSV
+    # ──────────────────────────────────────────────────────────────
+
+    def importar_archivo(self, db: Session, ruta: Union[str, Path], hoja: Union[str, int] = 0) -> Dict[str, Any]:
+        """Importa un .xlsx/.xls/.csv (una fila por precio)"""
+        if not PANDAS_AVAILABLE:
+            raise RuntimeError("pandas no instalado")
+        import pandas as pd
+
+        ruta = Path(ruta)
+        if ruta.suffix.lower() == ".csv":
+            df = pd.read_csv(ruta)
+        elif ruta.suffix.lower() in (".xlsx", ".xls"):
+            df = pd.read_excel(ruta, sheet_name=hoja)
+        else:
+            raise ValueError(f"Formato no soportado: {ruta.suffix}")
+        return self.importar_dataframe(db, df)
+
+    def importar_dataframe(self, db: Session, df) -> Dict[str, Any]:
+        """
+        Inserta o actualiza filas por (codigo, region, vigente_desde).
+
+        Columnas obligatorias: codigo, precio. Para códigos nuevos también
+        servicio y descripcion; el resto toma los valores por defecto o los
+        de la fila existente del mismo código.
+        """
+        df = df.rename(columns=lambda c: str(c).strip().lower())
+        faltantes = {"codigo", "precio"} - set(df.columns)
+        if faltantes:
+            raise ValueError(f"Faltan columnas obligatorias: {', '.join(sorted(faltantes))}")
+
+        df = df[[c for c in COLUMNAS if c in df.columns]]
+        registros = df.astype(object).where(df.notna(), None).to_dict("records")
+
+        existentes = {
+            (p.codigo, p.region, p.vigente_desde): p
+            for p in db.query(PrecioCatalogo).all()
+        }
+        por_codigo = {clave[0]: p for clave, p in existentes.items()}
+
+        insertar: List[Dict[str, Any]] = []
+        nuevas = set()
+        actualizados = 0
+        errores: List[Dict[str, Any]] = []
+
+        for i, registro in enumerate(registros, start=2):  # fila 1 = encabezados
+            try:
+                fila = self._normalizar(registro)
+            except (TypeError, ValueError) as e:
+                errores.append({"fila": i, "error": str(e)})
+                continue
+
+            clave = (fila["codigo"], fila["region"], fila["vigente_desde"])
+            if clave in nuevas:
+                errores.append({"fila": i, "error": f"Fila duplicada para {fila['codigo']}"})
+                continue
+            importados = {k: v for k, v in fila.items() if k in registro and v is not None}
+
+            actual = existentes.get(clave)
+            if actual is not None:
+                for campo, valor in importados.items():
+                    setattr(actual, campo, valor)
+                actualizados += 1
+                continue
+
+            base = por_codigo.get(fila["codigo"])
+            nueva = self._a_columnas({
+                **(base.to_dict() if base else {}),
+                **importados,
+                "region": fila["region"],
+                "vigente_desde": fila["vigente_desde"]
+            })
+            if not nueva.get("servicio") or not nueva.get("descripcion"):
+                errores.append({"fila": i, "error": f"Código nuevo {fila['codigo']} sin servicio/descripcion"})
+                continue
+            insertar.append(nueva)
+            nuevas.add(clave)
+
+        if insertar:
+            db.bulk_insert_mappings(PrecioCatalogo, insertar)
+        version = self.version_cargada
+        if insertar or actualizados:
+            version = self._incrementar_version(db)
+        db.commit()
+        self.refrescar(forzar=True)
+
+        logger.info(f"📥 Catálogo importado: {len(insertar)} nuevos, {actualizados} actualizados, {len(errores)} errores")
+        return {
+            "insertados": len(insertar),
+            "actualizados": actualizados,
+            "errores": errores,
+            "version": version
+        }
+
+    @staticmethod
+    def _normalizar(registro: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte una fila importada a tipos del modelo"""
+        codigo = str(registro.get("codigo") or "").strip()
+        if not codigo:
+            raise ValueError("codigo vacío")
+        if registro.get("precio") is None:
+            raise ValueError(f"{codigo}: precio vacío")
+
+        fila = {campo: registro.get(campo) for campo in COLUMNAS}
+        fila["codigo"] = codigo
+        fila["precio"] = float(fila["precio"])
+        fila["region"] = str(fila["region"]).strip() if fila["region"] else "*"
+
+        for campo in ("fijo", "divisor", "factor", "minimo"):
+            if fila[campo] is not None:
+                fila[campo] = float(fila[campo])
+        for campo in ("vigente_desde", "vigente_hasta"):
+            fila[campo] = PriceCatalog._fecha(fila[campo])
+        if fila["precio_en_cantidad"] is not None:
+            fila["precio_en_cantidad"] = str(fila["precio_en_cantidad"]).strip().lower() in ("1", "true", "si", "sí", "x")
+        if isinstance(fila["multiplos"], str):
+            fila["multiplos"] = json.loads(fila["multiplos"]) if fila["multiplos"].strip() else {}
+        if fila["variable"] is not None and fila["variable"] not in VARIABLES:
+            raise ValueError(f"{codigo}: variable no soportada {fila['variable']}")
+        if fila["complejidad"] is not None and fila["complejidad"] not in COMPLEJIDADES:
+            raise ValueError(f"{codigo}: complejidad no soportada {fila['complejidad']}")
+        return fila
+
+    @staticmethod
+    def _fecha(valor) -> Optional[date]:
+        if valor is None or valor == "":
+            return None
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        if hasattr(valor, "to_pydatetime"):
+            return valor.to_pydatetime().date()
+        return date.fromisoformat(str(valor).strip()[:10])
+
+    @staticmethod
+    def _a_columnas(fila: Dict[str, Any]) -> Dict[str, Any]:
+        """Fila de catálogo → columnas de PrecioCatalogo (con defaults)"""
+        return {
+            "servicio": fila.get("servicio"),
+            "codigo": fila.get("codigo"),
+            "descripcion": fila.get("descripcion"),
+            "unidad": fila.get("unidad") or "und",
+            "precio": fila.get("precio"),
+            "fijo": fila.get("fijo"),
+            "variable": fila.get("variable"),
+            "divisor": fila.get("divisor") if fila.get("divisor") is not None else 1,
+            "factor": fila.get("factor") if fila.get("factor") is not None else 1,
+            "minimo": fila.get("minimo") if fila.get("minimo") is not None else 0,
+            "complejidad": fila.get("complejidad") or "simple",
+            "precio_en_cantidad": bool(fila.get("precio_en_cantidad")),
+            "multiplos": fila.get("multiplos") or {},
+            "region": fila.get("region") or "*",
+            "vigente_desde": fila.get("vigente_desde"),
+            "vigente_hasta": fila.get("vigente_hasta"),
+        }
+
+
+# Instancia global
+price_catalog = PriceCatalog()
+
+
+def get_price_catalog() -> PriceCatalog:
+    """Obtiene la instancia del catálogo de precios"""
+    return price_catalog
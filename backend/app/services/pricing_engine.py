@@ -0,0 +1,490 @@
+"""
+💰 PRICING ENGINE - MOTOR DE PRECIOS BASADO EN CATÁLOGO
+📁 RUTA: backend/app/services/pricing_engine.py
+
+Única fuente de verdad para los items y precios de las cotizaciones que
+generan PILIBrain y las plantillas modelo.
+
+🎯 CÓMO FUNCIONA:
+- El catálogo es una tabla de filas (servicio, código, precio, región,
+  vigencia) con la regla de cantidad de cada item
+- Por cada (servicio, región, fecha) el catálogo se compila UNA vez en
+  arrays compactos (precios, divisores, mínimos...)
+- Las cantidades de todos los items de un servicio se calculan en un solo
+  paso vectorizado: cantidad = max(mínimo, floor(variable × factor / divisor))
+- Los barridos "what-if" (ej: 50 áreas × 2 complejidades) se resuelven en
+  una sola llamada, para que los sliders del frontend actualicen totales
+  al instante
+
+🔄 NO REQUIERE numpy (lo usa si está instalado)
+"""
+
+import math
+import logging
+import threading
+from datetime import date, datetime
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📋 VARIABLES DE CÁLCULO
+# ═══════════════════════════════════════════════════════════════
+
+# Variables de las que dependen las cantidades (en este orden en los arrays)
+VARIABLES = ("area_m2", "potencia_hp", "cantidad_puntos")
+
+# Valor por defecto de cada variable cuando el mensaje no la menciona
+VARIABLES_DEFECTO = {
+    "electrico-residencial": {"area_m2": 100},
+    "electrico-comercial": {"area_m2": 200},
+    "electrico-industrial": {"potencia_hp": 10},
+    "contraincendios": {"area_m2": 300},
+    "domotica": {"area_m2": 150},
+    "saneamiento": {"area_m2": 120},
+    "redes-cctv": {"cantidad_puntos": 8},
+}
+
+COMPLEJIDADES = ("simple", "complejo")
+
+IGV = 0.18
+
+
+def _item(servicio, codigo, descripcion, unidad, precio, fijo=None, variable=None,
+          divisor=1, factor=1, minimo=0, complejidad="simple", precio_en_cantidad=False,
+          multiplos=None, region="*", vigente_desde=None, vigente_hasta=None) -> Dict[str, Any]:
+    """
+    Fila del catálogo.
+
+    - fijo: cantidad constante (si no, se calcula con variable/factor/divisor/mínimo)
+    - complejidad: "complejo" = solo en cotizaciones complejas
+    - precio_en_cantidad: la cantidad calculada multiplica el precio y el item
+      se muestra como 1 unidad (ej: cisterna de N m³)
+    - multiplos: {placeholder: k} para textos como "cable THW {metros_cable}m"
+    """
+    return {
+        "servicio": servicio, "codigo": codigo, "descripcion": descripcion,
+        "unidad": unidad, "precio": precio, "fijo": fijo, "variable": variable,
+        "divisor": divisor, "factor": factor, "minimo": minimo,
+        "complejidad": complejidad, "precio_en_cantidad": precio_en_cantidad,
+        "multiplos": multiplos or {}, "region": region,
+        "vigente_desde": vigente_desde, "vigente_hasta": vigente_hasta
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📚 CATÁLOGO DE PRECIOS (mercado peruano 2025, USD)
+# ═══════════════════════════════════════════════════════════════
+
+CATALOGO_PRECIOS: List[Dict[str, Any]] = [
+    # ─── Eléctrico residencial (CNE) ───
+    _item("electrico-residencial", "RES-TAB-01", "Tablero eléctrico monofásico 12 circuitos con interruptores termomagnéticos", "und", 450.00, fijo=1),
+    _item("electrico-residencial", "RES-CTO-01", "Instalación de circuitos eléctricos (cable THW {metros_cable}m + tubería PVC)", "cto", 120.00,
+          variable="area_m2", divisor=25, minimo=6, multiplos={"metros_cable": 20}),  # 1 circuito cada 25m²
+    _item("electrico-residencial", "RES-ILU-01", "Puntos de iluminación (incluye luminaria LED, cableado y accesorios)", "pto", 45.00,
+          variable="area_m2", divisor=10),  # 1 luz cada 10m²
+    _item("electrico-residencial", "RES-TOM-01", "Tomacorrientes dobles (incluye cableado, caja y accesorios)", "pto", 35.00,
+          variable="area_m2", divisor=15),  # 1 tomacorriente cada 15m²
+    _item("electrico-residencial", "RES-SPT-01", "Sistema de puesta a tierra (pozo, cable, conectores)", "glb", 850.00, fijo=1),
+    _item("electrico-residencial", "RES-MED-01", "Tablero de medición y protección", "und", 380.00, fijo=1, complejidad="complejo"),
+    _item("electrico-residencial", "RES-ITM-01", "Interruptores termomagnéticos", "und", 45.00,
+          variable="area_m2", divisor=25, minimo=6, complejidad="complejo"),
+
+    # ─── Eléctrico comercial ───
+    _item("electrico-comercial", "COM-TAB-01", "Tablero eléctrico trifásico 24 circuitos con protección diferencial", "und", 1200.00, fijo=1),
+    _item("electrico-comercial", "COM-ILU-01", "Sistema de iluminación LED comercial con control automático", "pto", 85.00,
+          variable="area_m2", divisor=8),
+    _item("electrico-comercial", "COM-TOM-01", "Tomacorrientes industriales dobles con toma tierra", "pto", 55.00,
+          variable="area_m2", divisor=12),
+    _item("electrico-comercial", "COM-CTO-01", "Circuitos dedicados para equipos especiales (AA, servidores, etc)", "cto", 280.00, fijo=4),
+
+    # ─── Eléctrico industrial ───
+    _item("electrico-industrial", "IND-TAB-01", "Tablero de fuerza industrial con protección y control", "und", 3500.00, fijo=1),
+    _item("electrico-industrial", "IND-ALI-01", "Sistema de alimentación trifásica para motores ({potencia_hp} HP total)", "HP", 320.00,
+          variable="potencia_hp"),
+    _item("electrico-industrial", "IND-ARR-01", "Arrancador suave electrónico con protección térmica", "und", 1800.00,
+          variable="potencia_hp", divisor=5, minimo=1),
+    _item("electrico-industrial", "IND-CFP-01", "Sistema de compensación de factor de potencia", "glb", 4500.00, fijo=1),
+
+    # ─── Contraincendios (NFPA) ───
+    _item("contraincendios", "ACI-CEN-01", "Central de detección y alarma de incendios direccionable 8 zonas", "und", 2800.00, fijo=1),
+    _item("contraincendios", "ACI-DET-01", "Detectores de humo fotoeléctricos direccionables (NFPA 72)", "und", 95.00,
+          variable="area_m2", divisor=60),  # 1 detector cada 60m²
+    _item("contraincendios", "ACI-ROC-01", "Rociadores automáticos tipo spray (NFPA 13) incluye tubería", "und", 120.00,
+          variable="area_m2", divisor=12),  # 1 rociador cada 12m² aprox
+    _item("contraincendios", "ACI-BOM-01", "Bomba contraincendios eléctrica 10 HP con jockey pump", "glb", 6500.00, fijo=1),
+    _item("contraincendios", "ACI-GAB-01", "Gabinetes contraincendios con manguera y accesorios", "und", 650.00,
+          variable="area_m2", divisor=200, minimo=2),
+
+    # ─── Domótica ───
+    _item("domotica", "DOM-CEN-01", "Central domótica KNX/EIB con programación incluida", "und", 3200.00, fijo=1),
+    _item("domotica", "DOM-ACT-01", "Actuadores inteligentes para iluminación (dimmer, on/off)", "und", 180.00,
+          variable="area_m2", divisor=15),
+    _item("domotica", "DOM-SEN-01", "Sensores de presencia y luminosidad", "und", 120.00,
+          variable="area_m2", divisor=25),
+    _item("domotica", "DOM-PAN-01", "Panel táctil de control mural con interface gráfica", "und", 850.00,
+          variable="area_m2", divisor=80, minimo=2),
+    _item("domotica", "DOM-APP-01", "App móvil personalizada para control remoto", "glb", 1500.00, fijo=1),
+
+    # ─── Expedientes / ITSE (servicio global) ───
+    _item("expedientes", "EXP-SRV-01", "Servicio de Expedientes Técnicos de Edificación", "glb", 1500.00, fijo=1),
+    _item("expedientes", "EXP-MAT-01", "Materiales y mano de obra especializada", "glb", 600.00, fijo=1),
+    _item("itse", "ITS-SRV-01", "Servicio de Certificaciones ITSE", "glb", 850.00, fijo=1),
+    _item("itse", "ITS-MAT-01", "Materiales y mano de obra especializada", "glb", 340.00, fijo=1),
+
+    # ─── Saneamiento (RNE) ─── dotación estimada 2 L/m²·día
+    _item("saneamiento", "SAN-CIS-01", "Cisterna de concreto armado {cantidad}m³ con impermeabilización", "und", 450.00,
+          variable="area_m2", factor=2 * 0.75, divisor=1000, precio_en_cantidad=True),
+    _item("saneamiento", "SAN-TAN-01", "Tanque elevado {cantidad}m³ con estructura metálica", "und", 380.00,
+          variable="area_m2", factor=2 * 0.33, divisor=1000, precio_en_cantidad=True),
+    _item("saneamiento", "SAN-BOM-01", "Sistema de bombeo de agua (bomba + tablero + accesorios)", "glb", 2200.00, fijo=1),
+    _item("saneamiento", "SAN-AGF-01", "Red de distribución de agua fría (tubería PVC + accesorios)", "pto", 85.00,
+          variable="area_m2", divisor=10),
+    _item("saneamiento", "SAN-DES-01", "Red de desagüe y ventilación (tubería PVC + accesorios)", "pto", 95.00,
+          variable="area_m2", divisor=12),
+
+    # ─── Pozo a tierra ───
+    _item("pozo-tierra", "SPT-EXC-01", "Excavación y preparación de pozo de tierra (3m profundidad)", "und", 350.00, fijo=1),
+    _item("pozo-tierra", "SPT-VAR-01", "Varilla de cobre electrolítico Ø 5/8\" x 2.4m (3 unidades)", "und", 85.00, fijo=3),
+    _item("pozo-tierra", "SPT-GEL-01", "Thor Gel mejorador de tierra (tratamiento químico)", "bls", 45.00, fijo=3),
+    _item("pozo-tierra", "SPT-CAB-01", "Cable de cobre desnudo Nº 2 AWG (30m)", "m", 8.50, fijo=30),
+    _item("pozo-tierra", "SPT-CON-01", "Conectores tipo soldadura exotérmica (Cadweld)", "und", 35.00, fijo=5),
+    _item("pozo-tierra", "SPT-MED-01", "Medición y certificación de resistencia de puesta a tierra", "glb", 280.00, fijo=1),
+
+    # ─── Redes y CCTV ───
+    _item("redes-cctv", "CCT-CAM-01", "Cámaras IP 4MP con visión nocturna 30m (interior/exterior)", "und", 320.00,
+          variable="cantidad_puntos"),
+    _item("redes-cctv", "CCT-NVR-01", "NVR 16 canales con disco duro 2TB para grabación", "und", 1200.00, fijo=1),
+    _item("redes-cctv", "CCT-SWI-01", "Switch PoE 16 puertos gigabit para alimentación de cámaras", "und", 650.00, fijo=1),
+    _item("redes-cctv", "CCT-CAB-01", "Cableado estructurado Cat6 con certificación (incluye instalación)", "pto", 120.00,
+          variable="cantidad_puntos"),
+    _item("redes-cctv", "CCT-CFG-01", "Configuración y puesta en marcha del sistema", "glb", 450.00, fijo=1),
+
+    # ─── Materiales sueltos (cotizaciones demo / precios por código) ───
+    _item("materiales", "MAT-LUZ-01", "Punto de luz LED 18W empotrado en techo", "pto", 32.00, fijo=1),
+    _item("materiales", "MAT-TOM-01", "Tomacorriente doble con línea a tierra", "pto", 38.00, fijo=1),
+    _item("materiales", "MAT-THW-25", "Cable THW 2.5mm² para circuitos de tomacorrientes", "m", 4.20, fijo=1),
+    _item("materiales", "MAT-TAB-12", "Tablero eléctrico monofásico 12 polos", "und", 420.00, fijo=1),
+    _item("materiales", "SRV-ANA-01", "Análisis técnico y cotización personalizada", "glb", 150.00, fijo=1),
+]
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧮 TABLA COMPILADA
+# ═══════════════════════════════════════════════════════════════
+
+class TablaPrecios:
+    """
+    Items de un servicio resueltos para una región y fecha, en arrays
+    paralelos (un elemento por item) listos para cálculo vectorizado.
+    """
+
+    def __init__(self, servicio: str, filas: List[Dict[str, Any]]):
+        self.servicio = servicio
+        self.codigos = [f["codigo"] for f in filas]
+        self.descripciones = [f["descripcion"] for f in filas]
+        self.unidades = [f["unidad"] for f in filas]
+        self.multiplos = [f["multiplos"] for f in filas]
+        self.n = len(filas)
+
+        # Items con cantidad fija usan la columna 0 y luego se sobrescriben
+        var_idx = [VARIABLES.index(f["variable"]) if f["variable"] else 0 for f in filas]
+        columnas = {
+            "var_idx": var_idx,
+            "factor": [float(f["factor"]) for f in filas],
+            "divisor": [float(f["divisor"]) for f in filas],
+            "minimo": [float(f["minimo"]) for f in filas],
+            "fijo": [float(f["fijo"]) if f["fijo"] is not None else math.nan for f in filas],
+            "es_fijo": [f["fijo"] is not None for f in filas],
+            "precio": [float(f["precio"]) for f in filas],
+            "solo_complejo": [f["complejidad"] == "complejo" for f in filas],
+            "precio_en_cantidad": [bool(f["precio_en_cantidad"]) for f in filas],
+        }
+        if NUMPY_AVAILABLE:
+            columnas = {k: np.asarray(v) for k, v in columnas.items()}
+        for nombre, valores in columnas.items():
+            setattr(self, nombre, valores)
+
+        # Variables de las que depende el servicio (para sliders)
+        self.variables = sorted({f["variable"] for f in filas if f["variable"]}, key=VARIABLES.index)
+
+    def cantidades(self, X: Sequence[Sequence[float]]):
+        """
+        Cantidades de todos los items para N casos.
+
+        Args:
+            X: N filas con los valores de VARIABLES de cada caso
+
+        Returns:
+            Matriz N × items
+        """
+        if NUMPY_AVAILABLE:
+            X = np.asarray(X, dtype=float)
+            base = X[:, self.var_idx] * self.factor / self.divisor
+            q = np.maximum(self.minimo, np.floor(base))
+            return np.where(self.es_fijo, self.fijo, q)
+
+        filas = []
+        for x in X:
+            filas.append([
+                self.fijo[i] if self.es_fijo[i] else
+                max(self.minimo[i], math.floor(x[self.var_idx[i]] * self.factor[i] / self.divisor[i]))
+                for i in range(self.n)
+            ])
+        return filas
+
+    def mascara(self, complejidad: str) -> List[bool]:
+        """Items incluidos para una complejidad"""
+        if complejidad == "complejo":
+            return [True] * self.n
+        return [not c for c in self.solo_complejo]
+
+
+# ═══════════════════════════════════════════════════════════════
+# 💰 MOTOR DE PRECIOS
+# ═══════════════════════════════════════════════════════════════
+
+class PricingEngine:
+    """
+    💰 Motor de precios basado en catálogo
+
+    Compila el catálogo por (servicio, región, fecha) una sola vez y
+    calcula items, totales y barridos what-if de forma vectorizada.
+    """
+
+    def __init__(self, catalogo: List[Dict[str, Any]] = None, region: str = "*"):
+        self.region = region
+        self.version = 0
+        self._lock = threading.Lock()
+        self._tablas: Dict[Tuple[str, str, date], TablaPrecios] = {}
+        self._refrescar: Optional[Callable[[], None]] = None
+        self.cargar_catalogo(catalogo if catalogo is not None else CATALOGO_PRECIOS)
+
+    def cargar_catalogo(self, catalogo: List[Dict[str, Any]], version: int = None):
+        """Reemplaza el catálogo e invalida las tablas compiladas"""
+        por_servicio: Dict[str, List[Dict[str, Any]]] = {}
+        por_codigo: Dict[str, List[Dict[str, Any]]] = {}
+        for fila in catalogo:
+            por_servicio.setdefault(fila["servicio"], []).append(fila)
+            por_codigo.setdefault(fila["codigo"], []).append(fila)
+        with self._lock:
+            self._catalogo = por_servicio
+            self._por_codigo = por_codigo
+            self._tablas = {}
+            if version is not None:
+                self.version = version
+        logger.info(f"💰 Catálogo de precios cargado: {len(catalogo)} filas, {len(por_servicio)} servicios")
+
+    def set_refresco(self, refrescar: Optional[Callable[[], None]]):
+        """
+        Registra la función que mantiene el catálogo al día (ej: el
+        catálogo en base de datos). Se llama antes de cada consulta y debe
+        ser barata cuando no hay cambios.
+        """
+        self._refrescar = refrescar
+
+    def _al_dia(self):
+        if self._refrescar is not None:
+            try:
+                self._refrescar()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo refrescar el catálogo de precios: {e}")
+
+    def servicios(self) -> List[str]:
+        self._al_dia()
+        return list(self._catalogo.keys())
+
+    def fila(self, codigo: str, region: str = None, fecha: date = None) -> Optional[Dict[str, Any]]:
+        """Fila vigente de un código (búsqueda O(1) por código)"""
+        self._al_dia()
+        region = region or self.region
+        fecha = fecha or date.today()
+        if isinstance(fecha, datetime):
+            fecha = fecha.date()
+        filas = self._por_codigo.get(codigo)
+        if not filas:
+            return None
+        elegidas = self._resolver_filas(filas, region, fecha)
+        return elegidas[0] if elegidas else None
+
+    def precio(self, codigo: str, region: str = None, fecha: date = None, defecto: float = None) -> Optional[float]:
+        """Precio unitario vigente de un código"""
+        fila = self.fila(codigo, region, fecha)
+        return float(fila["precio"]) if fila else defecto
+
+    def tabla(self, servicio: str, region: str = None, fecha: date = None) -> Optional[TablaPrecios]:
+        """Tabla compilada del servicio (cacheada por región y fecha)"""
+        self._al_dia()
+        region = region or self.region
+        fecha = fecha or date.today()
+        if isinstance(fecha, datetime):
+            fecha = fecha.date()
+
+        clave = (servicio, region, fecha)
+        tabla = self._tablas.get(clave)
+        if tabla is not None:
+            return tabla
+
+        filas = self._catalogo.get(servicio)
+        if not filas:
+            return None
+
+        tabla = TablaPrecios(servicio, self._resolver_filas(filas, region, fecha))
+        with self._lock:
+            self._tablas[clave] = tabla
+        return tabla
+
+    @staticmethod
+    def _resolver_filas(filas: List[Dict[str, Any]], region: str, fecha: date) -> List[Dict[str, Any]]:
+        """
+        Una fila por código: la de la región pedida si existe (si no, la
+        genérica "*"), vigente en la fecha y con la vigencia más reciente.
+        Se conserva el orden del catálogo.
+        """
+        elegidas: Dict[str, Tuple[Tuple[int, date], Dict[str, Any]]] = {}
+        orden: List[str] = []
+        for fila in filas:
+            if fila["region"] not in (region, "*"):
+                continue
+            desde = fila.get("vigente_desde") or date.min
+            hasta = fila.get("vigente_hasta") or date.max
+            if not (desde <= fecha <= hasta):
+                continue
+            prioridad = (1 if fila["region"] == region and region != "*" else 0, desde)
+            codigo = fila["codigo"]
+            if codigo not in elegidas:
+                orden.append(codigo)
+                elegidas[codigo] = (prioridad, fila)
+            elif prioridad > elegidas[codigo][0]:
+                elegidas[codigo] = (prioridad, fila)
+        return [elegidas[codigo][1] for codigo in orden]
+
+    def _variables(self, servicio: str, datos: Dict[str, Any]) -> Dict[str, Any]:
+        defecto = VARIABLES_DEFECTO.get(servicio, {})
+        return {v: datos.get(v) or defecto.get(v, 0) for v in VARIABLES}
+
+    # ──────────────────────────────────────────────────────────────
+    # 📋 ITEMS DE UNA COTIZACIÓN
+    # ──────────────────────────────────────────────────────────────
+
+    def generar_items(
+        self,
+        servicio: str,
+        datos: Dict[str, Any],
+        complejidad: str = "simple",
+        region: str = None,
+        fecha: date = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Genera los items de cotización de un servicio
+
+        Args:
+            servicio: Código del servicio
+            datos: Datos extraídos (area_m2, potencia_hp, cantidad_puntos)
+            complejidad: "simple" o "complejo" (agrega items detallados)
+
+        Returns:
+            Lista de items {descripcion, cantidad, unidad, precio_unitario, total}
+        """
+        tabla = self.tabla(servicio, region, fecha)
+        if tabla is None:
+            return []
+
+        variables = self._variables(servicio, datos)
+        cantidades = tabla.cantidades([[variables[v] for v in VARIABLES]])[0]
+        mascara = tabla.mascara(complejidad)
+
+        items = []
+        for i in range(tabla.n):
+            if not mascara[i]:
+                continue
+            cantidad = int(cantidades[i])
+            precio = float(tabla.precio[i])
+            textos = {k: cantidad * m for k, m in tabla.multiplos[i].items()}
+            descripcion = tabla.descripciones[i].format(cantidad=cantidad, **variables, **textos)
+
+            if tabla.precio_en_cantidad[i]:
+                precio = cantidad * precio
+                cantidad = 1
+
+            items.append({
+                "codigo": tabla.codigos[i],
+                "descripcion": descripcion,
+                "cantidad": cantidad,
+                "unidad": tabla.unidades[i],
+                "precio_unitario": precio,
+                "total": cantidad * precio
+            })
+        return items
+
+    # ──────────────────────────────────────────────────────────────
+    # 📈 BARRIDOS WHAT-IF
+    # ──────────────────────────────────────────────────────────────
+
+    def simular(
+        self,
+        servicio: str,
+        valores: Sequence[float],
+        variable: str = None,
+        complejidades: Sequence[str] = COMPLEJIDADES,
+        datos: Dict[str, Any] = None,
+        region: str = None,
+        fecha: date = None
+    ) -> Dict[str, Any]:
+        """
+        Calcula totales para muchos valores de una variable en una sola llamada.
+
+        Ej: simular("electrico-residencial", range(50, 550, 10)) devuelve
+        subtotal/igv/total de 50 áreas × cada complejidad.
+
+        Args:
+            valores: Valores de la variable a barrer
+            variable: Variable del slider (por defecto la principal del servicio)
+            complejidades: Complejidades a evaluar
+            datos: Valores fijos para el resto de variables
+        """
+        tabla = self.tabla(servicio, region, fecha)
+        if tabla is None:
+            raise ValueError(f"Servicio sin catálogo de precios: {servicio}")
+
+        variable = variable or (tabla.variables[0] if tabla.variables else VARIABLES[0])
+        if variable not in VARIABLES:
+            raise ValueError(f"Variable no soportada: {variable}")
+
+        base = self._variables(servicio, datos or {})
+        col = VARIABLES.index(variable)
+        X = [[float(v) if j == col else float(base[VARIABLES[j]]) for j in range(len(VARIABLES))]
+             for v in valores]
+        Q = tabla.cantidades(X)
+
+        resultado = {"servicio": servicio, "variable": variable, "valores": list(valores), "complejidades": {}}
+        for complejidad in complejidades:
+            mascara = tabla.mascara(complejidad)
+            if NUMPY_AVAILABLE:
+                subtotales = (Q * (tabla.precio * np.asarray(mascara))).sum(axis=1).tolist()
+            else:
+                subtotales = [
+                    sum(q[i] * tabla.precio[i] for i in range(tabla.n) if mascara[i]) for q in Q
+                ]
+            resultado["complejidades"][complejidad] = {
+                "subtotal": [round(s, 2) for s in subtotales],
+                "igv": [round(s * IGV, 2) for s in subtotales],
+                "total": [round(s * (1 + IGV), 2) for s in subtotales]
+            }
+        return resultado
+
+
+# Instancia global
+pricing_engine = PricingEngine()
+
+
+def get_pricing_engine() -> PricingEngine:
+    """Obtiene la instancia del motor de precios"""
+    return pricing_engine
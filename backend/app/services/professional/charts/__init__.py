@@ -1,2 +1,3 @@
-"""Motor de graficas profesionales con Plotly"""
+"""Motor de graficas profesionales con Plotly y backend nativo ReportLab/Pillow"""
 from .chart_engine import ChartEngine
+from .native_charts import NativeChartRenderer
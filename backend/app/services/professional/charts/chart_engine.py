@@ -10,12 +10,26 @@ Tipos de graficas:
 - Heatmaps (matrices de riesgo)
 - KPI Dashboards
 - Flujo de caja
+
+Rendimiento:
+- Las imagenes se renderizan en un pool de procesos, cada uno con su
+  propio scope de Kaleido reutilizable (sin arrancar Chromium por grafica)
+- Cache por hash del contenido de la grafica -> bytes PNG, asi graficas
+  identicas entre documentos no se vuelven a renderizar
+- Backend "native" (ReportLab/Pillow, ver native_charts.py) para alto
+  volumen sin navegador headless, seleccionable por llamada
 """
 
 import os
+import json
+import hashlib
 import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Callable, Tuple
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -43,6 +57,46 @@ try:
 except ImportError:
     PANDAS_AVAILABLE = False
 
+from app.core.config import settings
+from app.core.metricas import contar_cache, en_cola_render
+from app.core.tracing import anotar, span, trazado
+from .native_charts import NativeChartRenderer
+
+
+# =============================================================================
+# RENDER EN PROCESOS WORKER
+# =============================================================================
+
+# Scope de Kaleido del proceso actual. Se crea una sola vez por proceso
+# y se reutiliza en cada render (el subproceso Chromium queda vivo).
+_KALEIDO_SCOPE = None
+
+
+def _get_kaleido_scope():
+    """Obtiene (o crea) el scope de Kaleido del proceso actual"""
+    global _KALEIDO_SCOPE
+    if _KALEIDO_SCOPE is None:
+        # plotly.io configura el scope con su propio plotly.js; Kaleido >= 1.0
+        # no expone scopes y plotly.io gestiona el navegador internamente
+        import plotly.io as pio
+        _KALEIDO_SCOPE = getattr(getattr(pio, "kaleido", None), "scope", None) or False
+    return _KALEIDO_SCOPE
+
+
+def _render_png(spec_json: str, width: int, height: int, scale: float) -> bytes:
+    """
+    Renderiza una especificacion de figura Plotly (JSON) a PNG.
+
+    Es una funcion de modulo para poder ejecutarse en ProcessPoolExecutor.
+    """
+    figure = json.loads(spec_json)
+    scope = _get_kaleido_scope()
+    if scope:
+        return scope.transform(figure, format="png", width=width, height=height, scale=scale)
+
+    import plotly.io as pio
+    return pio.to_image(figure, format="png", width=width, height=height, scale=scale)
+
 
 class ChartEngine:
     """
@@ -52,16 +106,44 @@ class ChartEngine:
     exportarse a PNG/PDF para embeber en documentos Word.
     """
 
-    def __init__(self, output_dir: str = None):
+    # Dimensiones de exportacion PNG
+    IMAGE_WIDTH = 800
+    IMAGE_HEIGHT = 600
+    IMAGE_SCALE = 2
+
+    def __init__(
+        self,
+        output_dir: str = None,
+        max_workers: int = None,
+        cache_size: int = 128
+    ):
         """
         Inicializa el motor de graficas.
 
         Args:
             output_dir: Directorio para guardar imagenes
+            max_workers: Procesos de render en paralelo (0 = render en el
+                         proceso actual). Por defecto CHART_RENDER_WORKERS o
+                         min(4, CPUs)
+            cache_size: Numero maximo de PNG en la cache en memoria
         """
         self.output_dir = Path(output_dir) if output_dir else Path("backend/storage/temp/charts")
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
+        if max_workers is None:
+            max_workers = settings.CHART_RENDER_WORKERS
+            if max_workers is None:
+                max_workers = min(4, os.cpu_count() or 1)
+        self.max_workers = max(0, max_workers)
+
+        # Pool de procesos (lazy) y cache hash -> PNG
+        self._render_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_size = cache_size
+        self.cache_stats = {"hits": 0, "misses": 0, "renders": 0}
+
         # Colores corporativos Tesla
         self.colors = {
             "primary": "#D4AF37",      # Dorado
@@ -80,10 +162,15 @@ class ChartEngine:
             "#ffc107", "#6f42c1", "#17a2b8", "#fd7e14"
         ]
 
+        # Backend ligero (ReportLab/Pillow)
+        self.native = NativeChartRenderer(self.output_dir, self.colors, self.color_palette)
+
         logger.info(f"ChartEngine inicializado - Plotly: {PLOTLY_AVAILABLE}, Kaleido: {KALEIDO_AVAILABLE}")
 
-    def is_available(self) -> bool:
+    def is_available(self, backend: str = "plotly") -> bool:
         """Verifica si el motor esta disponible"""
+        if backend == "native":
+            return self.native.is_available()
         return PLOTLY_AVAILABLE
 
     # =========================================================================
@@ -143,7 +230,7 @@ class ChartEngine:
             font=dict(family="Arial", size=12)
         )
 
-        return self._save_figure(fig, f"bar_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "bar")
 
     def create_grouped_bar_chart(
         self,
@@ -182,7 +269,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"grouped_bar_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "grouped_bar")
 
     # =========================================================================
     # GRAFICAS DE LINEAS
@@ -229,7 +316,7 @@ class ChartEngine:
             hovermode='x unified'
         )
 
-        return self._save_figure(fig, f"line_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "line")
 
     def create_projection_chart(
         self,
@@ -276,7 +363,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"projection_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "projection")
 
     # =========================================================================
     # GRAFICAS CIRCULARES
@@ -318,7 +405,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"pie_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "pie")
 
     # =========================================================================
     # DIAGRAMA GANTT
@@ -373,7 +460,7 @@ class ChartEngine:
             yaxis_title="Fase/Tarea"
         )
 
-        return self._save_figure(fig, f"gantt_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "gantt")
 
     # =========================================================================
     # HEATMAP / MATRIZ DE RIESGOS
@@ -436,7 +523,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"risk_matrix_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "risk_matrix")
 
     # =========================================================================
     # KPI DASHBOARD
@@ -510,7 +597,7 @@ class ChartEngine:
             height=300 * rows
         )
 
-        return self._save_figure(fig, f"kpi_dashboard_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "kpi_dashboard")
 
     # =========================================================================
     # FLUJO DE CAJA
@@ -579,23 +666,49 @@ class ChartEngine:
         fig.update_yaxes(title_text="Flujo de Caja", secondary_y=False)
         fig.update_yaxes(title_text="Acumulado", secondary_y=True)
 
-        return self._save_figure(fig, f"cashflow_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "cashflow")
 
     # =========================================================================
     # METODOS AUXILIARES
     # =========================================================================
 
     def _save_figure(self, fig, filename: str) -> Optional[str]:
-        """Guarda figura como PNG"""
-        try:
-            filepath = self.output_dir / f"{filename}.png"
+        """
+        Guarda figura como PNG.
 
-            if KALEIDO_AVAILABLE:
-                fig.write_image(str(filepath), width=800, height=600, scale=2)
-            else:
+        El nombre del archivo incluye el hash del contenido de la figura,
+        de modo que una grafica identica reutiliza el PNG ya generado
+        (cache en memoria o archivo existente en disco).
+        """
+        try:
+            if not KALEIDO_AVAILABLE:
                 # Fallback: guardar como HTML
-                filepath = self.output_dir / f"{filename}.html"
+                filepath = self.output_dir / f"{filename}_{datetime.now().strftime('%Y%m%d%H%M%S')}.html"
                 fig.write_html(str(filepath))
+                logger.info(f"Grafica guardada: {filepath}")
+                return str(filepath)
+
+            with span("chart.save", grafica=filename):
+                spec_json = fig.to_json()
+                key = self._cache_key(spec_json)
+                filepath = self.output_dir / f"{filename}_{key[:16]}.png"
+
+                png = self._cache_get(key)
+                origen = "memoria"
+                if png is None and filepath.exists():
+                    png = filepath.read_bytes()
+                    self._cache_put(key, png)
+                    origen = "disco"
+
+                if png is None:
+                    png = self._render(spec_json)
+                    self._cache_put(key, png)
+                    origen = "render"
+                anotar(cache=origen)
+                contar_cache("graficas", origen != "render")
+
+                if not filepath.exists():
+                    filepath.write_bytes(png)
 
             logger.info(f"Grafica guardada: {filepath}")
             return str(filepath)
@@ -604,10 +717,96 @@ class ChartEngine:
             logger.error(f"Error guardando grafica: {e}")
             return None
 
+    def _cache_key(self, spec_json: str) -> str:
+        """Hash del contenido de la figura y parametros de exportacion"""
+        params = f"{self.IMAGE_WIDTH}x{self.IMAGE_HEIGHT}@{self.IMAGE_SCALE}"
+        return hashlib.sha256(f"{params}|{spec_json}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        with self._cache_lock:
+            png = self._cache.get(key)
+            if png is None:
+                self.cache_stats["misses"] += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_stats["hits"] += 1
+            return png
+
+    def _cache_put(self, key: str, png: bytes):
+        with self._cache_lock:
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _get_render_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Crea el pool de procesos de render la primera vez que se usa"""
+        if self.max_workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._render_pool is None:
+                self._render_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._render_pool
+
+    def _render(self, spec_json: str) -> bytes:
+        """Renderiza a PNG en el pool de procesos (o en este proceso)"""
+        args = (spec_json, self.IMAGE_WIDTH, self.IMAGE_HEIGHT, self.IMAGE_SCALE)
+        with self._cache_lock:
+            self.cache_stats["renders"] += 1
+
+        pool = self._get_render_pool()
+        if pool is not None:
+            try:
+                with span("chart.render", pool=True), en_cola_render("grafica"):
+                    return pool.submit(_render_png, *args).result()
+            except Exception as e:
+                # Pool roto (worker muerto, fork no permitido...): render local
+                logger.warning(f"Pool de render no disponible, renderizando en proceso: {e}")
+                with self._pool_lock:
+                    self._render_pool = None
+                    self.max_workers = 0
+
+        with span("chart.render", pool=False):
+            return _render_png(*args)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Estadisticas de la cache de graficas"""
+        with self._cache_lock:
+            return {
+                **self.cache_stats,
+                "entries": len(self._cache),
+                "bytes": sum(len(png) for png in self._cache.values()),
+                "max_entries": self.cache_size
+            }
+
+    def clear_cache(self):
+        """Vacia la cache en memoria de graficas"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _tras_fork(self):
+        """
+        En un worker recién creado: el pool de render y los locks heredados
+        del padre no sirven (los hilos que los manejaban no existen aquí)
+        """
+        self._render_pool = None
+        self._pool_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+    def shutdown(self):
+        """Detiene el pool de procesos de render"""
+        with self._pool_lock:
+            if self._render_pool is not None:
+                self._render_pool.shutdown(wait=False, cancel_futures=True)
+                self._render_pool = None
+
+    @trazado("charts.document")
     def create_charts_for_document(
         self,
         document_type: str,
-        data: Dict[str, Any]
+        data: Dict[str, Any],
+        backend: str = "plotly",
+        output_format: str = "png"
     ) -> Dict[str, str]:
         """
         Genera todas las graficas necesarias para un tipo de documento.
@@ -615,11 +814,17 @@ class ChartEngine:
         Args:
             document_type: "cotizacion", "proyecto", "informe"
             data: Datos del documento
+            backend: "plotly" (Plotly + Kaleido) o "native" (ReportLab/Pillow)
+            output_format: Solo backend native: "png" (Word), "pdf" o "svg"
+                           (vectorial, para PDFs)
+
+        Las graficas se construyen y renderizan en paralelo; el tiempo
+        total es el de la grafica mas lenta y no la suma de todas.
 
         Returns:
             Dict con rutas a las graficas generadas
         """
-        charts = {}
+        jobs: Dict[str, Tuple[str, tuple]] = {}
 
         if document_type == "proyecto":
             # Gantt de fases
@@ -636,7 +841,7 @@ class ChartEngine:
                     })
                     fecha_actual = fecha_fin
 
-                charts["gantt"] = self.create_gantt_chart(tasks)
+                jobs["gantt"] = ("gantt", (tasks,))
 
             # Matriz de riesgos
             if "riesgos" in data:
@@ -651,7 +856,7 @@ class ChartEngine:
                         "probabilidad": prob,
                         "impacto": imp
                     })
-                charts["risk_matrix"] = self.create_risk_matrix(risks)
+                jobs["risk_matrix"] = ("risk_matrix", (risks,))
 
         elif document_type == "informe":
             # KPIs
@@ -664,7 +869,7 @@ class ChartEngine:
                     kpis["Reduccion Costos"] = {"valor": metricas["reduccion_costos_operativos"], "meta": 15, "unidad": "%"}
 
                 if kpis:
-                    charts["kpis"] = self.create_kpi_dashboard(kpis)
+                    jobs["kpis"] = ("kpi_dashboard", (kpis,))
 
         elif document_type == "cotizacion":
             # Distribucion de costos
@@ -675,16 +880,48 @@ class ChartEngine:
                     costs[desc] = item.get("total", 0)
 
                 if costs:
-                    charts["cost_distribution"] = self.create_pie_chart(
-                        costs, "Distribucion de Costos"
-                    )
+                    jobs["cost_distribution"] = ("pie", (costs, "Distribucion de Costos"))
+
+        if backend == "native":
+            # Render en milisegundos: no compensa paralelizar
+            return {
+                name: self.native.render(kind, *args, output_format=output_format)
+                for name, (kind, args) in jobs.items()
+            }
+
+        plotly_builders = {
+            "gantt": self.create_gantt_chart,
+            "risk_matrix": self.create_risk_matrix,
+            "kpi_dashboard": self.create_kpi_dashboard,
+            "pie": self.create_pie_chart
+        }
+        return self._run_chart_jobs({
+            name: (plotly_builders[kind], args) for name, (kind, args) in jobs.items()
+        })
 
-        return charts
+    def _run_chart_jobs(
+        self,
+        jobs: Dict[str, Tuple[Callable[..., Optional[str]], tuple]]
+    ) -> Dict[str, str]:
+        """Ejecuta las graficas en paralelo y devuelve {nombre: ruta}"""
+        if len(jobs) <= 1:
+            return {name: fn(*args) for name, (fn, args) in jobs.items()}
+
+        with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="chart") as executor:
+            # Cada hilo con una copia del contexto: sus spans cuelgan de esta traza
+            futures = {
+                name: executor.submit(contextvars.copy_context().run, fn, *args)
+                for name, (fn, args) in jobs.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
 
 
 # Instancia global
 chart_engine = ChartEngine()
 
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=chart_engine._tras_fork)
+
 def get_chart_engine() -> ChartEngine:
     """Obtiene la instancia del motor de graficas"""
     return chart_engine
@@ -0,0 +1,416 @@
+"""
+BACKEND NATIVO DE GRAFICAS v4.0
+Graficas ligeras sin Plotly/Kaleido (sin navegador headless)
+
+Cada grafica se describe una sola vez como una escena de primitivas
+(rectangulos, lineas, textos, sectores) y se dibuja con:
+- ReportLab graphics -> PDF/SVG vectorial o Drawing embebible en PDFs
+- Pillow -> PNG raster para documentos Word
+
+Tipos soportados (los que usa ChartEngine.create_charts_for_document):
+- Barras
+- Pie/Donut
+- Gantt
+- Matriz de riesgos
+- KPI Dashboard (gauges)
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, date
+
+logger = logging.getLogger(__name__)
+
+# Imports condicionales
+try:
+    from reportlab.graphics.shapes import Drawing, Rect, Line, String, Wedge, Circle
+    from reportlab.graphics import renderPDF, renderSVG
+    from reportlab.lib.colors import HexColor
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+    logger.warning("reportlab no disponible - pip install reportlab")
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logger.warning("Pillow no disponible - pip install pillow")
+
+
+class ChartScene:
+    """
+    Escena de una grafica: lista de primitivas en puntos, origen abajo-izquierda
+    (convencion de ReportLab). Angulos en grados, antihorario desde las 3 en punto.
+    """
+
+    def __init__(self, width: float, height: float):
+        self.width = width
+        self.height = height
+        self.ops: List[Tuple] = []
+
+    def rect(self, x, y, w, h, fill: str = None, stroke: str = None):
+        self.ops.append(("rect", x, y, w, h, fill, stroke))
+
+    def line(self, x1, y1, x2, y2, color: str = "#333333", width: float = 1):
+        self.ops.append(("line", x1, y1, x2, y2, color, width))
+
+    def text(self, x, y, text: str, size: float = 9, color: str = "#333333", anchor: str = "start"):
+        self.ops.append(("text", x, y, str(text), size, color, anchor))
+
+    def wedge(self, cx, cy, r, start: float, end: float, fill: str):
+        self.ops.append(("wedge", cx, cy, r, start, end, fill))
+
+    def circle(self, cx, cy, r, fill: str):
+        self.ops.append(("circle", cx, cy, r, fill))
+
+    def digest(self) -> str:
+        """Hash del contenido de la escena (para nombrar archivos)"""
+        return hashlib.md5(repr((self.width, self.height, self.ops)).encode("utf-8")).hexdigest()[:16]
+
+
+class NativeChartRenderer:
+    """
+    Renderizador de graficas con ReportLab (vectorial) y Pillow (raster).
+
+    Pensado para alto volumen: no arranca procesos externos y cada
+    grafica tarda milisegundos con muy poca memoria.
+    """
+
+    WIDTH = 480
+    HEIGHT = 320
+    PNG_SCALE = 2
+
+    def __init__(self, output_dir: Path, colors: Dict[str, str] = None, palette: List[str] = None):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.colors = colors or {
+            "primary": "#D4AF37",
+            "success": "#28a745",
+            "warning": "#ffc107",
+            "danger": "#dc3545",
+            "dark": "#333333",
+            "light": "#f8f9fa"
+        }
+        self.color_palette = palette or [
+            "#D4AF37", "#8B0000", "#0066CC", "#28a745",
+            "#ffc107", "#6f42c1", "#17a2b8", "#fd7e14"
+        ]
+        self._fonts: Dict[int, Any] = {}
+
+    def is_available(self, output_format: str = "png") -> bool:
+        """Verifica si se puede renderizar en el formato pedido"""
+        if output_format == "png":
+            return PIL_AVAILABLE
+        return REPORTLAB_AVAILABLE
+
+    # =========================================================================
+    # API PUBLICA
+    # =========================================================================
+
+    def render(self, kind: str, *args, output_format: str = "png", **kwargs) -> Optional[str]:
+        """
+        Construye y guarda una grafica.
+
+        Args:
+            kind: "bar", "pie", "gantt", "risk_matrix", "kpi_dashboard"
+            output_format: "png" (Word), "pdf" o "svg" (vectorial)
+
+        Returns:
+            Ruta al archivo generado
+        """
+        if not self.is_available(output_format):
+            return None
+
+        try:
+            scene = self.build_scene(kind, *args, **kwargs)
+            filepath = self.output_dir / f"{kind}_{scene.digest()}.{output_format}"
+
+            if not filepath.exists():
+                if output_format == "png":
+                    # Colores planos: compresion rapida, el archivo apenas crece
+                    self.to_image(scene).save(str(filepath), format="PNG", compress_level=1)
+                elif output_format == "pdf":
+                    renderPDF.drawToFile(self.to_drawing(scene), str(filepath))
+                elif output_format == "svg":
+                    renderSVG.drawToFile(self.to_drawing(scene), str(filepath))
+                else:
+                    raise ValueError(f"Formato no soportado: {output_format}")
+
+            return str(filepath)
+
+        except Exception as e:
+            logger.error(f"Error renderizando grafica nativa {kind}: {e}")
+            return None
+
+    def build_drawing(self, kind: str, *args, **kwargs):
+        """Devuelve un Drawing de ReportLab (Flowable vectorial para PDFs)"""
+        if not REPORTLAB_AVAILABLE:
+            return None
+        return self.to_drawing(self.build_scene(kind, *args, **kwargs))
+
+    def build_scene(self, kind: str, *args, **kwargs) -> ChartScene:
+        """Construye la escena de primitivas de una grafica"""
+        builders = {
+            "bar": self._scene_bar,
+            "pie": self._scene_pie,
+            "gantt": self._scene_gantt,
+            "risk_matrix": self._scene_risk_matrix,
+            "kpi_dashboard": self._scene_kpi_dashboard
+        }
+        if kind not in builders:
+            raise ValueError(f"Tipo de grafica no soportado: {kind}")
+        return builders[kind](*args, **kwargs)
+
+    # =========================================================================
+    # CONSTRUCCION DE ESCENAS
+    # =========================================================================
+
+    def _new_scene(self, title: str, height: float = None) -> ChartScene:
+        scene = ChartScene(self.WIDTH, height or self.HEIGHT)
+        scene.rect(0, 0, scene.width, scene.height, fill="#ffffff")
+        scene.text(scene.width / 2, scene.height - 20, title, size=12, color=self.colors["dark"], anchor="middle")
+        return scene
+
+    def _scene_bar(self, data: Dict[str, float], title: str = "Grafico de Barras", **_) -> ChartScene:
+        scene = self._new_scene(title)
+        left, bottom, top = 50, 50, scene.height - 40
+        right = scene.width - 20
+        values = [float(v or 0) for v in data.values()]
+        max_value = max(values + [0]) or 1
+
+        scene.line(left, bottom, right, bottom)
+        scene.line(left, bottom, left, top)
+
+        slot = (right - left) / max(1, len(values))
+        bar_w = slot * 0.6
+        for i, (label, value) in enumerate(zip(data.keys(), values)):
+            h = (top - bottom) * value / max_value
+            x = left + i * slot + (slot - bar_w) / 2
+            scene.rect(x, bottom, bar_w, h, fill=self.colors["primary"])
+            scene.text(x + bar_w / 2, bottom + h + 4, f"{value:,.0f}", size=7, anchor="middle")
+            scene.text(x + bar_w / 2, bottom - 12, str(label)[:14], size=7, anchor="middle")
+        return scene
+
+    def _scene_pie(self, data: Dict[str, float], title: str = "Distribucion", hole: float = 0.3, **_) -> ChartScene:
+        scene = self._new_scene(title)
+        cx, cy, r = 150, (scene.height - 30) / 2, 110
+        total = sum(float(v or 0) for v in data.values()) or 1
+
+        angle = 90.0
+        legend_y = scene.height - 50
+        for i, (label, value) in enumerate(data.items()):
+            color = self.color_palette[i % len(self.color_palette)]
+            sweep = 360.0 * float(value or 0) / total
+            if sweep > 0:
+                scene.wedge(cx, cy, r, angle - sweep, angle, color)
+            angle -= sweep
+
+            scene.rect(290, legend_y, 9, 9, fill=color)
+            scene.text(304, legend_y + 1, f"{str(label)[:22]} ({100 * float(value or 0) / total:.0f}%)", size=8)
+            legend_y -= 16
+
+        if hole > 0:
+            scene.circle(cx, cy, r * hole, "#ffffff")
+        return scene
+
+    def _scene_gantt(self, tasks: List[Dict[str, Any]], title: str = "Cronograma del Proyecto", **_) -> ChartScene:
+        row_h = 22
+        height = 90 + row_h * len(tasks)
+        scene = self._new_scene(title, height)
+        left, right = 140, scene.width - 20
+        top = scene.height - 45
+
+        spans = []
+        for i, task in enumerate(tasks):
+            start = self._as_date(task.get("inicio", task.get("fecha_inicio")))
+            end = self._as_date(task.get("fin", task.get("fecha_fin")))
+            if start and end:
+                spans.append((task.get("nombre", f"Tarea {i + 1}"), start, end, task.get("progreso", 0)))
+        if not spans:
+            return scene
+
+        first = min(s[1] for s in spans)
+        last = max(s[2] for s in spans)
+        total_days = max(1, (last - first).days)
+        scale = (right - left) / total_days
+
+        for i, (name, start, end, progress) in enumerate(spans):
+            y = top - (i + 1) * row_h
+            x = left + (start - first).days * scale
+            w = max(2, (end - start).days * scale)
+            color = self.color_palette[i % len(self.color_palette)]
+            scene.rect(x, y + 4, w, row_h - 8, fill=color)
+            if progress:
+                scene.rect(x, y + 4, w * min(100, float(progress)) / 100, 3, fill=self.colors["dark"])
+            scene.text(left - 6, y + 8, str(name)[:24], size=8, anchor="end")
+
+        axis_y = top - len(spans) * row_h - 6
+        scene.line(left, axis_y, right, axis_y)
+        scene.text(left, axis_y - 12, first.strftime("%d/%m/%Y"), size=7)
+        scene.text(right, axis_y - 12, last.strftime("%d/%m/%Y"), size=7, anchor="end")
+        return scene
+
+    def _scene_risk_matrix(self, risks: List[Dict[str, Any]], title: str = "Matriz de Riesgos", **_) -> ChartScene:
+        scene = self._new_scene(title)
+        matrix = [[0] * 5 for _ in range(5)]
+        for risk in risks:
+            prob = min(5, max(1, risk.get("probabilidad", 3))) - 1
+            imp = min(5, max(1, risk.get("impacto", 3))) - 1
+            matrix[prob][imp] += 1
+
+        scale_colors = ["#28a745", "#7cb342", "#ffc107", "#ff9800", "#dc3545"]
+        labels_x = ["Muy Bajo", "Bajo", "Medio", "Alto", "Muy Alto"]
+        labels_y = ["Muy Baja", "Baja", "Media", "Alta", "Muy Alta"]
+        left, bottom, cell = 110, 45, 48
+
+        for p in range(5):
+            for i in range(5):
+                score = (p + 1) * (i + 1)
+                color = scale_colors[min(4, (score - 1) // 5)]
+                x, y = left + i * cell, bottom + p * cell
+                scene.rect(x, y, cell, cell, fill=color, stroke="#ffffff")
+                if matrix[p][i]:
+                    scene.text(x + cell / 2, y + cell / 2 - 5, matrix[p][i], size=14, color="#ffffff", anchor="middle")
+            scene.text(left - 6, bottom + p * cell + cell / 2 - 3, labels_y[p], size=8, anchor="end")
+
+        for i in range(5):
+            scene.text(left + i * cell + cell / 2, bottom - 12, labels_x[i], size=7, anchor="middle")
+        scene.text(left + 2.5 * cell, bottom - 30, "Impacto", size=9, anchor="middle")
+        scene.text(20, bottom + 5 * cell + 6, "Probabilidad", size=9)
+        return scene
+
+    def _scene_kpi_dashboard(self, kpis: Dict[str, Dict[str, Any]], title: str = "Dashboard de KPIs", **_) -> ChartScene:
+        n_kpis = max(1, len(kpis))
+        cols = min(3, n_kpis)
+        rows = (n_kpis + cols - 1) // cols
+        cell_h = 150
+        scene = self._new_scene(title, 40 + rows * cell_h)
+        cell_w = scene.width / cols
+
+        for i, (name, data) in enumerate(kpis.items()):
+            valor = float(data.get("valor", 0) or 0)
+            meta = float(data.get("meta", 100) or 0)
+            unidad = data.get("unidad", "")
+            ratio = valor / meta if meta > 0 else 0
+            color = self.colors["success"] if ratio >= 1 else \
+                self.colors["warning"] if ratio >= 0.8 else \
+                self.colors["danger"]
+
+            cx = cell_w * (i % cols) + cell_w / 2
+            cy = scene.height - 40 - (i // cols + 1) * cell_h + 50
+            r = min(cell_w, cell_h) * 0.38
+
+            # Gauge semicircular: fondo, valor (rango 0 - meta*1.2) y centro
+            fill_ratio = min(1.0, valor / (meta * 1.2)) if meta > 0 else 0
+            scene.wedge(cx, cy, r, 0, 180, "#e9ecef")
+            if fill_ratio > 0:
+                scene.wedge(cx, cy, r, 180 - 180 * fill_ratio, 180, color)
+            scene.circle(cx, cy, r * 0.6, "#ffffff")
+            scene.text(cx, cy + 2, f"{valor:g}{unidad}", size=13, color=self.colors["dark"], anchor="middle")
+            scene.text(cx, cy - 16, f"Meta {meta:g}{unidad}", size=7, anchor="middle")
+            scene.text(cx, cy + r + 8, name, size=9, anchor="middle")
+        return scene
+
+    @staticmethod
+    def _as_date(value) -> Optional[date]:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+                try:
+                    return datetime.strptime(value[:10], fmt).date()
+                except ValueError:
+                    continue
+        return None
+
+    # =========================================================================
+    # RENDERIZADORES
+    # =========================================================================
+
+    def to_drawing(self, scene: ChartScene):
+        """Escena -> Drawing de ReportLab (vectorial)"""
+        drawing = Drawing(scene.width, scene.height)
+        for op in scene.ops:
+            kind = op[0]
+            if kind == "rect":
+                _, x, y, w, h, fill, stroke = op
+                drawing.add(Rect(x, y, w, h,
+                                 fillColor=HexColor(fill) if fill else None,
+                                 strokeColor=HexColor(stroke) if stroke else None,
+                                 strokeWidth=0.5 if stroke else 0))
+            elif kind == "line":
+                _, x1, y1, x2, y2, color, width = op
+                drawing.add(Line(x1, y1, x2, y2, strokeColor=HexColor(color), strokeWidth=width))
+            elif kind == "text":
+                _, x, y, text, size, color, anchor = op
+                drawing.add(String(x, y, text, fontName="Helvetica", fontSize=size,
+                                   fillColor=HexColor(color), textAnchor=anchor))
+            elif kind == "wedge":
+                _, cx, cy, r, start, end, fill = op
+                drawing.add(Wedge(cx, cy, r, start, end, fillColor=HexColor(fill), strokeColor=None))
+            elif kind == "circle":
+                _, cx, cy, r, fill = op
+                drawing.add(Circle(cx, cy, r, fillColor=HexColor(fill), strokeColor=None))
+        return drawing
+
+    def to_image(self, scene: ChartScene):
+        """Escena -> imagen Pillow (raster, para Word)"""
+        s = self.PNG_SCALE
+        height = scene.height
+        image = Image.new("RGB", (int(scene.width * s), int(height * s)), "#ffffff")
+        draw = ImageDraw.Draw(image)
+
+        def px(x, y):
+            return x * s, (height - y) * s
+
+        for op in scene.ops:
+            kind = op[0]
+            if kind == "rect":
+                _, x, y, w, h, fill, stroke = op
+                x0, y1 = px(x, y)
+                x1, y0 = px(x + w, y + h)
+                draw.rectangle([x0, y0, x1, y1], fill=fill, outline=stroke)
+            elif kind == "line":
+                _, x1, y1, x2, y2, color, width = op
+                draw.line([px(x1, y1), px(x2, y2)], fill=color, width=max(1, int(width * s)))
+            elif kind == "text":
+                _, x, y, text, size, color, anchor = op
+                font = self._font(int(size * s))
+                tx, ty = px(x, y)
+                text_w = draw.textlength(text, font=font)
+                if anchor == "middle":
+                    tx -= text_w / 2
+                elif anchor == "end":
+                    tx -= text_w
+                draw.text((tx, ty - size * s * 0.8), text, fill=color, font=font)
+            elif kind == "wedge":
+                _, cx, cy, r, start, end, fill = op
+                x0, y0 = px(cx - r, cy + r)
+                x1, y1 = px(cx + r, cy - r)
+                # Pillow mide angulos en sentido horario con el eje Y invertido
+                draw.pieslice([x0, y0, x1, y1], -end, -start, fill=fill)
+            elif kind == "circle":
+                _, cx, cy, r, fill = op
+                x0, y0 = px(cx - r, cy + r)
+                x1, y1 = px(cx + r, cy - r)
+                draw.ellipse([x0, y0, x1, y1], fill=fill)
+        return image
+
+    def _font(self, size: int):
+        font = self._fonts.get(size)
+        if font is None:
+            try:
+                font = ImageFont.truetype("DejaVuSans.ttf", size)
+            except OSError:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:
+                    font = ImageFont.load_default()
+            self._fonts[size] = font
+        return font
@@ -11,13 +11,17 @@ Genera los 6 tipos de documentos:
 6. Informe Ejecutivo (APA)
 """
 
-import os
+import time
+import asyncio
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
 import json
 
+from app.core.config import settings
+from app.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 # Imports de componentes profesionales
@@ -52,8 +56,21 @@ class DocumentGeneratorPro:
     - WordGenerator: Generacion final de documentos
     """
 
-    def __init__(self):
-        """Inicializa el generador con todos los componentes"""
+    # Etapas que se omiten si se supera el deadline
+    OPTIONAL_STAGES = ("rag_indexing", "rag_retrieval", "chart_generation")
+
+    def __init__(self, optional_stage_deadline: float = None):
+        """
+        Inicializa el generador con todos los componentes
+
+        Args:
+            optional_stage_deadline: Segundos desde el inicio de la generacion
+                tras los cuales las etapas opcionales (RAG, graficas) se omiten.
+                Por defecto DOCUMENT_STAGE_DEADLINE_S o 30
+        """
+        if optional_stage_deadline is None:
+            optional_stage_deadline = settings.DOCUMENT_STAGE_DEADLINE_S
+        self.optional_stage_deadline = optional_stage_deadline
 
         # Obtener instancias de componentes
         self.file_processor = get_file_processor() if COMPONENTS_AVAILABLE else None
@@ -90,18 +107,22 @@ class DocumentGeneratorPro:
         complexity: str = "simple",
         uploaded_files: List[str] = None,
         logo_base64: str = None,
-        options: Dict[str, Any] = None
+        options: Dict[str, Any] = None,
+        deadline_seconds: float = None
     ) -> Dict[str, Any]:
         """
         Genera un documento profesional completo.
 
-        Este es el metodo principal que orquesta todo el proceso:
-        1. Procesa archivos subidos (si hay)
-        2. Indexa contenido en RAG
-        3. Analiza mensaje con ML
-        4. Recupera contexto relevante
-        5. Genera graficas si es necesario
-        6. Crea documento final
+        Este es el metodo principal que orquesta todo el proceso como un
+        grafo de etapas; las independientes corren en paralelo:
+
+            file_processing -> rag_indexing
+            file_processing, ml_analysis, rag_retrieval -> structured_data
+            structured_data -> chart_generation | document_generation
+
+        La latencia total queda acotada por la cadena mas lenta y no por la
+        suma de todas las etapas. Cada etapa registra su duracion en
+        processing_steps.
 
         Args:
             message: Mensaje/descripcion del usuario
@@ -110,6 +131,8 @@ class DocumentGeneratorPro:
             uploaded_files: Rutas a archivos subidos
             logo_base64: Logo en base64
             options: Opciones adicionales
+            deadline_seconds: Deadline para etapas opcionales (RAG, graficas);
+                por defecto optional_stage_deadline
 
         Returns:
             Dict con documento generado y metadata
@@ -125,104 +148,71 @@ class DocumentGeneratorPro:
                 "processing_steps": []
             }
 
-            # Paso 1: Procesar archivos subidos
-            context_from_files = ""
-            if uploaded_files and self.file_processor:
-                file_result = self.file_processor.process_multiple(uploaded_files)
-                context_from_files = file_result.get("combined_text", "")
-                result["processing_steps"].append({
-                    "step": "file_processing",
-                    "files_processed": file_result.get("processed", 0),
-                    "success": file_result.get("success", False)
-                })
-
-                # Indexar en RAG
-                if context_from_files and self.rag_engine and self.rag_engine.is_available():
-                    chunks = self.file_processor.chunk_text(context_from_files, chunk_size=300)
-                    rag_result = self.rag_engine.add_chunks(
-                        chunks,
-                        metadata={"source": "user_upload", "document_type": document_type}
-                    )
-                    result["processing_steps"].append({
-                        "step": "rag_indexing",
-                        "chunks_indexed": len(chunks),
-                        "success": rag_result.get("success", False)
-                    })
-
-            # Paso 2: Analizar mensaje con ML
-            analysis = {}
-            if self.ml_engine:
-                analysis = self.ml_engine.analyze_text(message)
-                result["processing_steps"].append({
-                    "step": "ml_analysis",
-                    "service_detected": analysis.get("service", {}).get("service"),
-                    "confidence": analysis.get("service", {}).get("confidence", 0)
-                })
-
-            # Paso 3: Recuperar contexto de RAG
-            rag_context = {}
-            if self.rag_engine and self.rag_engine.is_available():
-                rag_context = self.rag_engine.get_context_for_document(
-                    message,
-                    document_type,
-                    n_results=3
+            rag_available = self.rag_engine is not None and self.rag_engine.is_available()
+
+            # name: (dependencias, funcion(deps) -> (valor, step), habilitada, valor por defecto)
+            stages = {
+                "file_processing": (
+                    (), lambda deps: self._stage_file_processing(uploaded_files),
+                    bool(uploaded_files and self.file_processor), ""
+                ),
+                "rag_indexing": (
+                    ("file_processing",),
+                    lambda deps: self._stage_rag_indexing(deps["file_processing"], document_type),
+                    bool(uploaded_files and self.file_processor and rag_available), None
+                ),
+                "ml_analysis": (
+                    (), lambda deps: self._stage_ml_analysis(message),
+                    self.ml_engine is not None, {}
+                ),
+                "rag_retrieval": (
+                    (), lambda deps: self._stage_rag_retrieval(message, document_type),
+                    rag_available, {}
+                ),
+                "structured_data": (
+                    ("file_processing", "ml_analysis", "rag_retrieval"),
+                    lambda deps: (self._build_structured_data(
+                        message=message,
+                        document_type=document_type,
+                        complexity=complexity,
+                        analysis=deps["ml_analysis"],
+                        rag_context=deps["rag_retrieval"],
+                        file_context=deps["file_processing"],
+                        options=options
+                    ), {}),
+                    True, {}
+                ),
+                "chart_generation": (
+                    ("structured_data",),
+                    lambda deps: self._stage_chart_generation(document_type, deps["structured_data"]),
+                    complexity == "complejo" and self.chart_engine is not None, {}
+                ),
+                "document_generation": (
+                    ("structured_data",),
+                    lambda deps: self._stage_document_generation(
+                        deps["structured_data"], document_type, complexity, options, logo_base64
+                    ),
+                    self.word_generator is not None, None
                 )
-                result["processing_steps"].append({
-                    "step": "rag_retrieval",
-                    "fragments_found": rag_context.get("total_fragments", 0)
-                })
+            }
 
-            # Paso 4: Generar datos estructurados
-            structured_data = self._build_structured_data(
-                message=message,
-                document_type=document_type,
-                complexity=complexity,
-                analysis=analysis,
-                rag_context=rag_context,
-                file_context=context_from_files,
-                options=options
-            )
-            result["structured_data"] = structured_data
-
-            # Paso 5: Generar graficas (para documentos complejos)
-            charts = {}
-            if complexity == "complejo" and self.chart_engine:
-                charts = self.chart_engine.create_charts_for_document(
-                    document_type,
-                    structured_data
-                )
-                result["charts_generated"] = list(charts.keys())
-                result["processing_steps"].append({
-                    "step": "chart_generation",
-                    "charts_created": len(charts)
-                })
+            deadline = self.optional_stage_deadline if deadline_seconds is None else deadline_seconds
+            outputs = await self._run_stages(stages, deadline, result["processing_steps"])
 
-            # Paso 6: Generar documento Word
-            if self.word_generator:
-                # Preparar datos para WordGenerator
-                datos_json = {
-                    "datos_extraidos": structured_data,
-                    "agente_responsable": self._get_agent_name(document_type, complexity),
-                    "graficas": charts
-                }
+            result["structured_data"] = outputs["structured_data"]
 
-                word_result = self.word_generator.generar_desde_json_pili(
-                    datos_json=datos_json,
-                    tipo_documento=document_type,
-                    opciones=options,
-                    logo_base64=logo_base64
-                )
+            # Paso 5: Graficas (para documentos complejos)
+            if stages["chart_generation"][2]:
+                result["charts_generated"] = list(outputs["chart_generation"].keys())
+                result["charts"] = outputs["chart_generation"]
 
+            # Paso 6: Documento Word
+            word_result = outputs["document_generation"]
+            if word_result is not None:
                 result["document_generated"] = word_result.get("exito", False)
                 result["file_path"] = word_result.get("ruta_archivo")
                 result["file_name"] = word_result.get("nombre_archivo")
 
-                result["processing_steps"].append({
-                    "step": "document_generation",
-                    "success": word_result.get("exito", False),
-                    "file": word_result.get("nombre_archivo")
-                })
-
             logger.info(f"Documento generado exitosamente: {result.get('file_name')}")
             return result
 
@@ -234,6 +224,156 @@ class DocumentGeneratorPro:
                 "timestamp": datetime.now().isoformat()
             }
 
+    async def _run_stages(
+        self,
+        stages: Dict[str, Tuple[Tuple[str, ...], Callable, bool, Any]],
+        deadline: Optional[float],
+        steps: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo de etapas.
+
+        Cada etapa espera solo a sus dependencias y corre en un hilo
+        (las etapas son codigo bloqueante: Chroma, spaCy, python-docx).
+        Las etapas opcionales que no terminan antes del deadline se omiten
+        y sus dependientes reciben el valor por defecto.
+        """
+        start = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(name: str):
+            deps_names, fn, enabled, default = stages[name]
+            deps = {dep: await tasks[dep] for dep in deps_names}
+            if not enabled:
+                return default
+
+            optional = name in self.OPTIONAL_STAGES
+            started = time.perf_counter()
+            started_ms = round((started - start) * 1000, 1)
+            try:
+                if optional and deadline is not None:
+                    remaining = deadline - (started - start)
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    with span(f"etapa.{name}", opcional=True):
+                        value, step = await asyncio.wait_for(asyncio.to_thread(fn, deps), timeout=remaining)
+                else:
+                    with span(f"etapa.{name}"):
+                        value, step = await asyncio.to_thread(fn, deps)
+            except asyncio.TimeoutError:
+                logger.warning(f"Etapa {name} omitida: deadline de {deadline}s superado")
+                steps.append({"step": name, "skipped": True, "reason": "deadline", "started_ms": started_ms})
+                return default
+            except Exception as e:
+                if not optional:
+                    raise
+                logger.warning(f"Etapa opcional {name} fallida: {e}")
+                steps.append({"step": name, "skipped": True, "reason": str(e), "started_ms": started_ms})
+                return default
+
+            if step is not None:
+                steps.append({
+                    "step": name,
+                    **step,
+                    "started_ms": started_ms,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+                })
+            return value
+
+        # stages esta en orden topologico: las dependencias ya tienen tarea
+        for name in stages:
+            tasks[name] = asyncio.ensure_future(run(name))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        steps.append({"step": "pipeline", "duration_ms": round((time.perf_counter() - start) * 1000, 1)})
+        return {name: task.result() for name, task in tasks.items()}
+
+    # =========================================================================
+    # ETAPAS DEL PIPELINE
+    # Cada una devuelve (valor, step) donde step va a processing_steps
+    # =========================================================================
+
+    def _stage_file_processing(self, uploaded_files: List[str]) -> Tuple[str, Dict[str, Any]]:
+        """Paso 1: Procesar archivos subidos"""
+        file_result = self.file_processor.process_multiple(uploaded_files)
+        return file_result.get("combined_text", ""), {
+            "files_processed": file_result.get("processed", 0),
+            "success": file_result.get("success", False)
+        }
+
+    def _stage_rag_indexing(self, context_from_files: str, document_type: str):
+        """Paso 1b: Indexar contenido de archivos en RAG"""
+        if not context_from_files:
+            return None, None
+
+        chunks = self.file_processor.chunk_text(context_from_files, chunk_size=300)
+        rag_result = self.rag_engine.add_chunks(
+            chunks,
+            metadata={"source": "user_upload", "document_type": document_type}
+        )
+        return rag_result, {
+            "chunks_indexed": len(chunks),
+            "success": rag_result.get("success", False)
+        }
+
+    def _stage_ml_analysis(self, message: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Paso 2: Analizar mensaje con ML"""
+        analysis = self.ml_engine.analyze_text(message)
+        return analysis, {
+            "service_detected": analysis.get("service", {}).get("service"),
+            "confidence": analysis.get("service", {}).get("confidence", 0)
+        }
+
+    def _stage_rag_retrieval(self, message: str, document_type: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Paso 3: Recuperar contexto de RAG"""
+        rag_context = self.rag_engine.get_context_for_document(
+            message,
+            document_type,
+            n_results=3
+        )
+        return rag_context, {"fragments_found": rag_context.get("total_fragments", 0)}
+
+    def _stage_chart_generation(self, document_type: str, structured_data: Dict[str, Any]):
+        """Paso 5: Generar graficas"""
+        charts = self.chart_engine.create_charts_for_document(document_type, structured_data)
+        return charts, {"charts_created": len(charts)}
+
+    def _stage_document_generation(
+        self,
+        structured_data: Dict[str, Any],
+        document_type: str,
+        complexity: str,
+        options: Dict[str, Any],
+        logo_base64: str
+    ):
+        """
+        Paso 6: Generar documento Word.
+
+        Corre en paralelo con las graficas: WordGenerator no incrusta
+        "graficas", las rutas se devuelven en result["charts"].
+        """
+        datos_json = {
+            "datos_extraidos": structured_data,
+            "agente_responsable": self._get_agent_name(document_type, complexity)
+        }
+
+        word_result = self.word_generator.generar_desde_json_pili(
+            datos_json=datos_json,
+            tipo_documento=document_type,
+            opciones=options,
+            logo_base64=logo_base64
+        )
+        return word_result, {
+            "success": word_result.get("exito", False),
+            "file": word_result.get("nombre_archivo")
+        }
+
     def _build_structured_data(
         self,
         message: str,
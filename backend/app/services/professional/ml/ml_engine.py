@@ -15,6 +15,9 @@ from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import json
 
+from app.core.tracing import span, trazado
+from app.services.pricing_engine import pricing_engine
+
 logger = logging.getLogger(__name__)
 
 # Imports condicionales
@@ -250,6 +253,7 @@ class MLEngine:
         self.classifier.fit(texts, labels)
         logger.info(f"Clasificador entrenado con {len(texts)} ejemplos")
 
+    @trazado("ml.classify")
     def classify_service(self, text: str) -> Dict[str, Any]:
         """
         Clasifica el servicio mencionado en el texto.
@@ -305,6 +309,7 @@ class MLEngine:
             "method": "keyword_matching"
         }
 
+    @trazado("ml.entities")
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """
         Extrae entidades del texto usando patrones y NER.
@@ -350,7 +355,8 @@ class MLEngine:
         # Extraccion con spaCy NER
         if self.nlp:
             try:
-                doc = self.nlp(text)
+                with span("ml.spacy", caracteres=len(text)):
+                    doc = self.nlp(text)
 
                 for ent in doc.ents:
                     entities["raw_entities"].append({
@@ -377,6 +383,7 @@ class MLEngine:
 
         return entities
 
+    @trazado("ml.analyze")
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """
         Analisis completo del texto.
@@ -419,6 +426,7 @@ class MLEngine:
 
         return analysis
 
+    @trazado("ml.structured_data")
     def generate_structured_data(
         self,
         text: str,
@@ -482,31 +490,10 @@ class MLEngine:
 
         area = entities.get("area_principal", 100)
 
-        # Items base por servicio
-        items_templates = {
-            "electrico-residencial": [
-                {"descripcion": "Tablero electrico", "cantidad": 1, "precio": 450},
-                {"descripcion": "Circuitos electricos", "cantidad": max(6, int(area/25)), "precio": 120},
-                {"descripcion": "Puntos de luz", "cantidad": int(area/10), "precio": 45},
-                {"descripcion": "Tomacorrientes", "cantidad": int(area/15), "precio": 35},
-                {"descripcion": "Puesta a tierra", "cantidad": 1, "precio": 850}
-            ],
-            "contraincendios": [
-                {"descripcion": "Central de alarma", "cantidad": 1, "precio": 2500},
-                {"descripcion": "Detectores de humo", "cantidad": int(area/20), "precio": 85},
-                {"descripcion": "Sirena de alarma", "cantidad": max(2, int(area/100)), "precio": 150},
-                {"descripcion": "Pulsadores manuales", "cantidad": max(2, int(area/80)), "precio": 120}
-            ]
-        }
-
-        items = items_templates.get(service, items_templates["electrico-residencial"])
-
-        # Agregar totales
-        for item in items:
-            item["unidad"] = "und"
-            item["precio_unitario"] = item["precio"]
-            item["total"] = item["cantidad"] * item["precio"]
-            del item["precio"]
+        # Precios del catalogo compartido (BD / PricingEngine)
+        items = pricing_engine.generar_items(service, {"area_m2": area})
+        if not items:
+            items = pricing_engine.generar_items("electrico-residencial", {"area_m2": area})
 
         return items
 
@@ -19,6 +19,8 @@ from datetime import datetime
 import tempfile
 import base64
 
+from app.core.tracing import anotar, span, trazado
+
 logger = logging.getLogger(__name__)
 
 # Imports condicionales para manejo de errores
@@ -90,6 +92,7 @@ class FileProcessorPro:
 
         logger.info(f"FileProcessorPro inicializado - Capacidades: {self.capabilities}")
 
+    @trazado("archivo.procesar")
     def process_file(
         self,
         file_path: Union[str, Path],
@@ -119,6 +122,7 @@ class FileProcessorPro:
             }
 
         extension = file_path.suffix.lower()
+        anotar(extension=extension)
 
         try:
             # Seleccionar procesador segun extension
@@ -271,7 +275,8 @@ class FileProcessorPro:
                 elif ocr_enabled and OCR_AVAILABLE:
                     # Intentar OCR si no hay texto
                     img = page.to_image(resolution=300)
-                    ocr_text = pytesseract.image_to_string(img.original, lang='spa')
+                    with span("ocr.tesseract", origen="pdf"):
+                        ocr_text = pytesseract.image_to_string(img.original, lang='spa')
                     if ocr_text.strip():
                         text_content.append(f"--- Pagina {i+1} (OCR) ---\n{ocr_text}")
 
@@ -442,7 +447,8 @@ class FileProcessorPro:
         image = Image.open(file_path)
 
         # Realizar OCR
-        text = pytesseract.image_to_string(image, lang='spa')
+        with span("ocr.tesseract", origen="imagen"):
+            text = pytesseract.image_to_string(image, lang='spa')
 
         return {
             "success": True,
@@ -10,12 +10,15 @@ Usa:
 
 import os
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import json
 import hashlib
 
+from app.core.tracing import span, trazado
+
 logger = logging.getLogger(__name__)
 
 # Imports condicionales
@@ -69,14 +72,57 @@ class RAGEngine:
 
         self.model_name = model_name
         self.model = None
-        self.client = None
-        self.collection = None
+        self._client = None
+        self._collection = None
+        self._pid_chroma = os.getpid()
+        self._lock_chroma = threading.Lock()
 
         # Inicializar componentes
         self._initialize_components()
 
         logger.info(f"RAGEngine inicializado - Collection: {collection_name}")
 
+    # ChromaDB se abre por proceso: un worker creado con fork (gunicorn con
+    # preload_app) descarta la conexion del padre (_tras_fork) y abre la suya
+    # al primer uso. El modelo de embeddings si se comparte (copy-on-write)
+
+    @property
+    def client(self):
+        self._reabrir_tras_fork()
+        return self._client
+
+    @client.setter
+    def client(self, valor):
+        self._client = valor
+
+    @property
+    def collection(self):
+        self._reabrir_tras_fork()
+        return self._collection
+
+    @collection.setter
+    def collection(self, valor):
+        self._collection = valor
+
+    def _reabrir_tras_fork(self):
+        if self._pid_chroma == os.getpid():
+            return
+        with self._lock_chroma:
+            if self._pid_chroma != os.getpid():
+                # El pid va antes: _initialize_chroma() ya lee self.client
+                self._pid_chroma = os.getpid()
+                self._client = self._collection = None
+                self._initialize_chroma()
+
+    def _tras_fork(self):
+        """
+        En un proceso hijo recién creado: el cliente de Chroma del padre y su
+        lock no sirven aquí; se sueltan y el cliente se reabre al primer uso
+        (los hijos que nunca consultan Chroma no abren nada)
+        """
+        self._lock_chroma = threading.Lock()
+        self._client = self._collection = None
+
     def _initialize_components(self):
         """Inicializa modelo de embeddings y ChromaDB"""
 
@@ -91,7 +137,10 @@ class RAGEngine:
         else:
             logger.warning("sentence-transformers no disponible")
 
-        # Inicializar ChromaDB
+        self._initialize_chroma()
+
+    def _initialize_chroma(self):
+        """Abre el cliente de ChromaDB y la coleccion"""
         if CHROMADB_AVAILABLE:
             try:
                 self.client = chromadb.Client(Settings(
@@ -122,6 +171,7 @@ class RAGEngine:
         else:
             logger.warning("ChromaDB no disponible")
 
+    @trazado("rag.add_document")
     def add_document(
         self,
         text: str,
@@ -151,7 +201,8 @@ class RAGEngine:
                 doc_id = hashlib.md5(text.encode()).hexdigest()[:16]
 
             # Generar embedding
-            embedding = self.model.encode(text).tolist()
+            with span("rag.encode", textos=1):
+                embedding = self.model.encode(text).tolist()
 
             # Preparar metadatos
             meta = metadata or {}
@@ -159,12 +210,13 @@ class RAGEngine:
             meta["text_length"] = len(text)
 
             # Agregar a coleccion
-            self.collection.add(
-                documents=[text],
-                embeddings=[embedding],
-                metadatas=[meta],
-                ids=[doc_id]
-            )
+            with span("chroma.add", documentos=1):
+                self.collection.add(
+                    documents=[text],
+                    embeddings=[embedding],
+                    metadatas=[meta],
+                    ids=[doc_id]
+                )
 
             return {
                 "success": True,
@@ -179,6 +231,7 @@ class RAGEngine:
                 "error": str(e)
             }
 
+    @trazado("rag.add_chunks")
     def add_chunks(
         self,
         chunks: List[str],
@@ -208,7 +261,8 @@ class RAGEngine:
             ids = [f"{source_id}_chunk_{i}" for i in range(len(chunks))]
 
             # Generar embeddings para todos los chunks
-            embeddings = self.model.encode(chunks).tolist()
+            with span("rag.encode", textos=len(chunks)):
+                embeddings = self.model.encode(chunks).tolist()
 
             # Preparar metadatos para cada chunk
             metadatas = []
@@ -221,12 +275,13 @@ class RAGEngine:
                 metadatas.append(meta)
 
             # Agregar todos los chunks
-            self.collection.add(
-                documents=chunks,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
+            with span("chroma.add", documentos=len(chunks)):
+                self.collection.add(
+                    documents=chunks,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
 
             return {
                 "success": True,
@@ -242,6 +297,7 @@ class RAGEngine:
                 "error": str(e)
             }
 
+    @trazado("rag.search")
     def search(
         self,
         query: str,
@@ -268,14 +324,16 @@ class RAGEngine:
 
         try:
             # Generar embedding de la consulta
-            query_embedding = self.model.encode(query).tolist()
+            with span("rag.encode", textos=1):
+                query_embedding = self.model.encode(query).tolist()
 
             # Buscar en coleccion
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=filter_metadata
-            )
+            with span("chroma.query", n_results=n_results):
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    where=filter_metadata
+                )
 
             # Formatear resultados
             formatted_results = []
@@ -440,6 +498,9 @@ class RAGEngine:
 # Instancia global
 rag_engine = RAGEngine()
 
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=rag_engine._tras_fork)
+
 def get_rag_engine() -> RAGEngine:
     """Obtiene la instancia del motor RAG"""
     return rag_engine
@@ -0,0 +1,232 @@
+"""
+📊 PROJECT STATS - ESTADÍSTICAS DE PROYECTOS CON AGREGADOS SQL
+📁 RUTA: backend/app/services/project_stats.py
+
+Estadísticas de proyectos calculadas en la base de datos (GROUP BY y
+proyecciones de columnas) en lugar de cargar filas completas en Python.
+
+🎯 CÓMO FUNCIONA:
+- Cada consulta es UNA sentencia SQL (un solo round trip)
+- Los resultados se cachean con un TTL corto (PROJECT_STATS_TTL_S, 10 s
+  por defecto), en Redis si REDIS_URL está definida (compartida entre
+  workers) o en memoria del proceso
+- La caché se invalida sola cuando una sesión confirma cambios en
+  proyectos, cotizaciones o documentos (eventos de SQLAlchemy); con Redis
+  la invalidación llega a todos los workers, sin Redis el TTL limita cuánto
+  pueden quedar desactualizados los demás
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import event, func, case, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, SesionBaseAsync
+from app.core.estado_compartido import CacheCompartida
+from app.core.metricas import contar_cache
+from app.models.proyecto import Proyecto, EstadoProyecto
+from app.models.cotizacion import Cotizacion
+from app.models.documento import Documento
+
+logger = logging.getLogger(__name__)
+
+# Estados de documento (Documento.procesado)
+DOC_PENDIENTE = 0
+DOC_ERROR = 2
+
+ESTADO_COTIZACION_APROBADA = "aprobada"
+
+MODELOS_OBSERVADOS = (Proyecto, Cotizacion, Documento)
+
+
+class ProjectStatsService:
+    """
+    📊 Estadísticas de proyectos con caché TTL
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl if ttl is not None else settings.PROJECT_STATS_TTL_S
+        self._cache = CacheCompartida("estadisticas_proyectos", self.ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ──────────────────────────────────────────────────────────────
+    # 🗃️ CACHÉ
+    # ──────────────────────────────────────────────────────────────
+
+    def _cacheado(self, clave: Tuple, calcular):
+        valor = self._cache.obtener(clave)
+        acierto = valor is not None
+        if not acierto:
+            valor = calcular()
+            self._cache.guardar(clave, valor)
+        with self._lock:
+            if acierto:
+                self.hits += 1
+            else:
+                self.misses += 1
+        contar_cache("estadisticas_proyectos", acierto)
+        return valor
+
+    def invalidar(self):
+        """Descarta todas las estadísticas cacheadas (en todos los workers con Redis)"""
+        self._cache.invalidar()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        estado = self._cache.estado()
+        with self._lock:
+            return {**estado, "hits": self.hits, "misses": self.misses}
+
+    # ──────────────────────────────────────────────────────────────
+    # 📈 CONSULTAS
+    # ──────────────────────────────────────────────────────────────
+
+    def resumen(self, db: Session) -> Dict[str, Any]:
+        """Total de proyectos y conteo por estado (un GROUP BY)"""
+        def calcular():
+            filas = db.query(Proyecto.estado, func.count(Proyecto.id)).group_by(Proyecto.estado).all()
+            conteos = {self._estado(e): n for e, n in filas}
+            por_estado = {estado.value: conteos.get(estado.value, 0) for estado in EstadoProyecto}
+            return {"total_proyectos": sum(por_estado.values()), "por_estado": por_estado}
+
+        return self._cacheado(("resumen",), calcular)
+
+    def estadisticas_proyecto(self, db: Session, proyecto_id: int) -> Dict[str, Any]:
+        """Conteos y valor aprobado de un proyecto, sin cargar sus filas"""
+        def calcular():
+            aprobada = Cotizacion.estado == ESTADO_COTIZACION_APROBADA
+            de_cotizaciones = lambda expr: select(expr).where(Cotizacion.proyecto_id == proyecto_id).scalar_subquery()
+            de_documentos = lambda expr: select(expr).where(Documento.proyecto_id == proyecto_id).scalar_subquery()
+
+            # Un solo SELECT con subconsultas escalares (un round trip)
+            fila = db.execute(select(
+                de_cotizaciones(func.count(Cotizacion.id)),
+                de_cotizaciones(func.coalesce(func.sum(case((aprobada, 1), else_=0)), 0)),
+                de_cotizaciones(func.coalesce(func.sum(case((aprobada, Cotizacion.total), else_=0)), 0)),
+                de_documentos(func.count(Documento.id)),
+                de_documentos(func.coalesce(func.sum(case((Documento.procesado == DOC_PENDIENTE, 1), else_=0)), 0))
+            )).one()
+            return {
+                "total_cotizaciones": int(fila[0]),
+                "total_documentos": int(fila[3]),
+                "cotizaciones_aprobadas": int(fila[1]),
+                "valor_total": float(fila[2]),
+                "documentos_pendientes": int(fila[4])
+            }
+
+        return self._cacheado(("proyecto", proyecto_id), calcular)
+
+    def dashboard(self, db: Session, cliente: Optional[str] = None,
+                  proyecto_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Dashboard multi-proyecto en una sola consulta: por estado de
+        proyecto, cantidad de proyectos, cotizaciones, valor aprobado y
+        backlog de procesamiento de documentos.
+        """
+        clave = ("dashboard", cliente, tuple(sorted(proyecto_ids)) if proyecto_ids else None)
+
+        def calcular():
+            aprobada = Cotizacion.estado == ESTADO_COTIZACION_APROBADA
+            cot = select(
+                Cotizacion.proyecto_id.label("proyecto_id"),
+                func.count(Cotizacion.id).label("n"),
+                func.sum(case((aprobada, 1), else_=0)).label("aprobadas"),
+                func.sum(case((aprobada, Cotizacion.total), else_=0)).label("valor")
+            ).where(Cotizacion.proyecto_id.isnot(None)).group_by(Cotizacion.proyecto_id).subquery()
+            doc = select(
+                Documento.proyecto_id.label("proyecto_id"),
+                func.count(Documento.id).label("n"),
+                func.sum(case((Documento.procesado == DOC_PENDIENTE, 1), else_=0)).label("pendientes"),
+                func.sum(case((Documento.procesado == DOC_ERROR, 1), else_=0)).label("errores")
+            ).where(Documento.proyecto_id.isnot(None)).group_by(Documento.proyecto_id).subquery()
+
+            consulta = select(
+                Proyecto.estado,
+                func.count(Proyecto.id),
+                func.coalesce(func.sum(cot.c.n), 0),
+                func.coalesce(func.sum(cot.c.aprobadas), 0),
+                func.coalesce(func.sum(cot.c.valor), 0),
+                func.coalesce(func.sum(doc.c.n), 0),
+                func.coalesce(func.sum(doc.c.pendientes), 0),
+                func.coalesce(func.sum(doc.c.errores), 0)
+            ).outerjoin(cot, cot.c.proyecto_id == Proyecto.id
+            ).outerjoin(doc, doc.c.proyecto_id == Proyecto.id
+            ).group_by(Proyecto.estado)
+
+            if cliente:
+                consulta = consulta.where(Proyecto.cliente.ilike(f"%{cliente}%"))
+            if proyecto_ids:
+                consulta = consulta.where(Proyecto.id.in_(proyecto_ids))
+
+            vacio = {
+                "proyectos": 0, "cotizaciones": 0, "cotizaciones_aprobadas": 0,
+                "valor_aprobado": 0.0, "documentos": 0,
+                "documentos_pendientes": 0, "documentos_error": 0
+            }
+            por_estado = {estado.value: dict(vacio) for estado in EstadoProyecto}
+            for estado, proyectos, n_cot, aprobadas, valor, n_doc, pendientes, errores in db.execute(consulta):
+                por_estado[self._estado(estado)] = {
+                    "proyectos": int(proyectos),
+                    "cotizaciones": int(n_cot),
+                    "cotizaciones_aprobadas": int(aprobadas),
+                    "valor_aprobado": round(float(valor), 2),
+                    "documentos": int(n_doc),
+                    "documentos_pendientes": int(pendientes),
+                    "documentos_error": int(errores)
+                }
+
+            totales = {k: sum(e[k] for e in por_estado.values()) for k in vacio}
+            totales["valor_aprobado"] = round(totales["valor_aprobado"], 2)
+            return {
+                "total_proyectos": totales["proyectos"],
+                "por_estado": por_estado,
+                "totales": totales,
+                "generado": datetime.utcnow().isoformat()
+            }
+
+        return self._cacheado(clave, calcular)
+
+    @staticmethod
+    def _estado(estado) -> str:
+        return estado.value if isinstance(estado, EstadoProyecto) else str(estado)
+
+
+# Instancia global
+project_stats = ProjectStatsService()
+
+
+def get_project_stats() -> ProjectStatsService:
+    """Obtiene la instancia del servicio de estadísticas"""
+    return project_stats
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔄 INVALIDACIÓN EN ESCRITURAS
+# ═══════════════════════════════════════════════════════════════
+
+def _marcar_cambios(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, MODELOS_OBSERVADOS):
+            session.info["stats_proyectos_sucias"] = True
+            return
+
+
+def _invalidar_tras_commit(session):
+    if session.info.pop("stats_proyectos_sucias", False):
+        project_stats.invalidar()
+
+
+def _limpiar_tras_rollback(session):
+    session.info.pop("stats_proyectos_sucias", None)
+
+
+# Sesiones síncronas y las internas de AsyncSession (routers async)
+for _objetivo in (SessionLocal, SesionBaseAsync):
+    event.listen(_objetivo, "after_flush", _marcar_cambios)
+    event.listen(_objetivo, "after_commit", _invalidar_tras_commit)
+    event.listen(_objetivo, "after_rollback", _limpiar_tras_rollback)
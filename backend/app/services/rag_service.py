@@ -4,6 +4,8 @@ Compatible con ChromaDB 0.4.x+
 """
 
 import logging
+import os
+import threading
 from typing import List, Dict, Any, Optional
 import chromadb
 from chromadb.config import Settings as ChromaSettings
@@ -20,9 +22,15 @@ class RAGService:
     def __init__(self):
         """Inicializar el servicio RAG con manejo de errores"""
         self.collection_name = "tesla_cotizador_docs"
-        self.client = None
-        self.collection = None
-        
+        self._client = None
+        self._collection = None
+        self._pid_chroma = os.getpid()
+        self._lock_chroma = threading.Lock()
+
+        self._inicializar_chroma()
+
+    def _inicializar_chroma(self):
+        """Abre el cliente persistente de ChromaDB y la colección"""
         try:
             # <<< CORRECCIÓN: Usar la ruta de settings en lugar de hardcodearla
             # Esto soluciona el Problema #3
@@ -44,6 +52,43 @@ class RAGService:
             logger.warning("⚠️ RAG Service funcionará en modo degradado")
             self.client = None
             self.collection = None
+
+    # El cliente de ChromaDB es por proceso: con gunicorn + preload_app el
+    # maestro lo crea al importar routers/documentos; cada worker descarta
+    # el heredado (_tras_fork) y abre el suyo al primer uso
+
+    @property
+    def client(self):
+        self._reabrir_tras_fork()
+        return self._client
+
+    @client.setter
+    def client(self, valor):
+        self._client = valor
+
+    @property
+    def collection(self):
+        self._reabrir_tras_fork()
+        return self._collection
+
+    @collection.setter
+    def collection(self, valor):
+        self._collection = valor
+
+    def _reabrir_tras_fork(self):
+        if self._pid_chroma == os.getpid():
+            return
+        with self._lock_chroma:
+            if self._pid_chroma != os.getpid():
+                # El pid va antes: _inicializar_chroma() ya lee self.client
+                self._pid_chroma = os.getpid()
+                self._client = self._collection = None
+                self._inicializar_chroma()
+
+    def _tras_fork(self):
+        """En un proceso hijo: suelta el cliente y el lock heredados del padre"""
+        self._lock_chroma = threading.Lock()
+        self._client = self._collection = None
     
     def _get_or_create_collection(self):
         """
@@ -211,4 +256,7 @@ try:
     rag_service = RAGService()
 except Exception as e:
     logger.error(f"❌ Fallo al crear la instancia global de RAGService: {e}")
-    rag_service = None # Dejarlo como None para que is_available() falle
\ No newline at end of file
+    rag_service = None # Dejarlo como None para que is_available() falle
+
+if rag_service is not None and hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=rag_service._tras_fork)
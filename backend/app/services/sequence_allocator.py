@@ -0,0 +1,142 @@
+"""
+🔢 SEQUENCE ALLOCATOR - NUMERACIÓN DE COTIZACIONES SIN CARRERAS
+📁 RUTA: backend/app/services/sequence_allocator.py
+
+Reemplaza el patrón "LIKE 'COT-YYYYMM%' ORDER BY numero DESC LIMIT 1 + 1",
+que con creaciones concurrentes repetía números (violando el índice único
+de `numero`) y se volvía más lento a medida que crecía la tabla.
+
+🎯 CÓMO FUNCIONA:
+- Tabla `secuencias`: una fila por prefijo con el último número reservado
+- Cada reserva es UNA sentencia atómica en su propia transacción:
+  UPDATE ... SET ultimo = ultimo + N RETURNING ultimo
+  (INSERT la primera vez que aparece un prefijo; si dos procesos lo crean
+  a la vez, el que pierde reintenta el UPDATE)
+- Cada proceso reserva bloques de NUMERACION_BLOQUE números (10 por
+  defecto) y los entrega desde memoria: O(1) y sin ir a la BD en cada
+  cotización. Un bloque a medio usar al reiniciar deja huecos en la
+  numeración, nunca duplicados
+- Al estrenar un prefijo el contador arranca después del mayor número ya
+  existente en `cotizaciones` (migración transparente de datos previos)
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine as default_engine
+from app.models.secuencia import Secuencia
+from app.models.cotizacion import Cotizacion
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceAllocator:
+    """
+    🔢 Reserva números consecutivos por prefijo, por bloques
+    """
+
+    def __init__(self, engine: Engine = None, bloque: int = None):
+        self.engine = engine or default_engine
+        self.bloque = max(1, bloque if bloque is not None else settings.NUMERACION_BLOQUE)
+        self._lock = threading.Lock()
+        # prefijo -> [siguiente, limite] (rango reservado en memoria)
+        self._rangos: Dict[str, List[int]] = {}
+        self._tabla_lista = False
+
+    def siguiente(self, prefijo: str) -> int:
+        """Siguiente número del prefijo (único entre procesos)"""
+        with self._lock:
+            rango = self._rangos.get(prefijo)
+            if rango is None or rango[0] > rango[1]:
+                limite = self._reservar(prefijo, self.bloque)
+                rango = [limite - self.bloque + 1, limite]
+                self._rangos[prefijo] = rango
+            numero = rango[0]
+            rango[0] += 1
+            return numero
+
+    def _reservar(self, prefijo: str, cantidad: int) -> int:
+        """
+        Reserva `cantidad` números en la BD y devuelve el último del bloque
+        """
+        if not self._tabla_lista:
+            Secuencia.__table__.create(bind=self.engine, checkfirst=True)
+            self._tabla_lista = True
+
+        # Camino rápido: el prefijo ya existe
+        with self.engine.begin() as conn:
+            ultimo = self._incrementar(conn, prefijo, cantidad)
+        if ultimo is not None:
+            return ultimo
+
+        # Primera vez: arrancar después de lo que ya exista en cotizaciones
+        inicial = self._maximo_existente(prefijo)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(Secuencia.__table__.insert().values(prefijo=prefijo, ultimo=inicial + cantidad))
+            logger.info(f"🔢 Secuencia {prefijo} creada (desde {inicial + 1})")
+            return inicial + cantidad
+        except IntegrityError:
+            # Otro proceso la creó a la vez: reservar sobre la suya
+            with self.engine.begin() as conn:
+                return self._incrementar(conn, prefijo, cantidad)
+
+    def _incrementar(self, conn, prefijo: str, cantidad: int) -> Optional[int]:
+        tabla = Secuencia.__table__
+        sentencia = update(tabla).where(tabla.c.prefijo == prefijo).values(ultimo=tabla.c.ultimo + cantidad)
+
+        if self.engine.dialect.update_returning:
+            return conn.execute(sentencia.returning(tabla.c.ultimo)).scalar_one_or_none()
+
+        # Sin RETURNING: el UPDATE bloquea la fila hasta el fin de la transacción
+        if conn.execute(sentencia).rowcount == 0:
+            return None
+        return conn.execute(select(tabla.c.ultimo).where(tabla.c.prefijo == prefijo)).scalar_one()
+
+    def _maximo_existente(self, prefijo: str) -> int:
+        """Mayor número ya usado con el prefijo (solo al estrenar el prefijo)"""
+        maximo = 0
+        with self.engine.connect() as conn:
+            numeros = conn.execute(
+                select(Cotizacion.numero).where(Cotizacion.numero.like(f"{prefijo}-%"))
+            ).scalars()
+            for numero in numeros:
+                try:
+                    maximo = max(maximo, int(numero.rsplit("-", 1)[-1]))
+                except ValueError:
+                    continue
+        return maximo
+
+    def reiniciar_cache(self):
+        """Descarta los bloques reservados en memoria (quedan como huecos)"""
+        with self._lock:
+            self._rangos.clear()
+
+
+# Instancia global
+sequence_allocator = SequenceAllocator()
+
+
+def get_sequence_allocator() -> SequenceAllocator:
+    """Obtiene la instancia del asignador de secuencias"""
+    return sequence_allocator
+
+
+def generar_numero_cotizacion(db: Session = None) -> str:
+    """
+    Generar número único de cotización
+    Formato: COT-YYYYMM-XXXX
+
+    `db` se mantiene por compatibilidad: la reserva usa su propia
+    transacción, así un rollback del llamador no libera el número.
+    """
+    prefijo = f"COT-{datetime.now().strftime('%Y%m')}"
+    return f"{prefijo}-{sequence_allocator.siguiente(prefijo):04d}"
@@ -0,0 +1,342 @@
+"""
+💬 SESIONES DE CHAT - ESTADO DE LAS CONVERSACIONES DE PILI EN EL SERVIDOR
+📁 RUTA: backend/app/services/sesiones_chat.py
+
+Antes el cliente reenviaba en cada turno todo el historial, el contexto y
+los archivos procesados (con su texto de OCR). Ahora envía solo el
+`sesion_id` y el mensaje nuevo; el servidor guarda:
+
+- historial (últimos MAX_HISTORIAL mensajes)
+- contexto adicional y adjuntos: los textos largos de los adjuntos van al
+  content store de sesiones (gzip por hash, aparte del de documentos) y la
+  sesión guarda solo la referencia; caducan con las sesiones
+- entidades extraídas y borrador incremental del documento (+ su id en BD)
+
+🎯 CÓMO FUNCIONA:
+- LRU en memoria por proceso con la sesión serializada y su `version`
+- Persistencia: Redis si REDIS_URL está configurada (compartida entre
+  workers, expira sola) o la tabla `chat_sesiones` (SQLite/PostgreSQL)
+- Lectura: si la sesión está en memoria solo se consulta su versión en
+  el backend (una clave / una columna); el estado completo se lee solo si
+  otro worker la modificó
+- Escritura: write-through, `version + 1` y TTL deslizante
+  (CHAT_SESIONES_TTL_HORAS desde el último turno)
+"""
+
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.metricas import contar_cache
+from app.models.chat_sesion import ChatSesion
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+MAX_HISTORIAL = 50
+# Campos de texto de adjuntos más largos que esto van al content store
+UMBRAL_CONTENT_STORE = 2000
+# Purga de sesiones expiradas en BD (como mucho una vez por intervalo)
+INTERVALO_PURGA_S = 600
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🗄️ BACKENDS DE PERSISTENCIA
+# ═══════════════════════════════════════════════════════════════
+
+class BackendBD:
+    """Tabla chat_sesiones (funciona igual en SQLite y PostgreSQL)"""
+
+    nombre = "bd"
+
+    def __init__(self):
+        ChatSesion.__table__.create(bind=engine, checkfirst=True)
+        self._ultima_purga = 0.0
+
+    def version(self, sesion_id: str) -> Optional[int]:
+        with SessionLocal() as db:
+            return db.execute(
+                select(ChatSesion.version).where(ChatSesion.id == sesion_id, ChatSesion.expira_en > _ahora())
+            ).scalar()
+
+    def leer(self, sesion_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with SessionLocal() as db:
+            fila = db.execute(
+                select(ChatSesion.version, ChatSesion.estado)
+                .where(ChatSesion.id == sesion_id, ChatSesion.expira_en > _ahora())
+            ).first()
+            return (fila.version, fila.estado) if fila else None
+
+    def escribir(self, sesion: Dict[str, Any], ttl: timedelta):
+        with SessionLocal() as db:
+            fila = db.get(ChatSesion, sesion["id"])
+            if fila is None:
+                fila = ChatSesion(id=sesion["id"], tipo_flujo=sesion["tipo_flujo"])
+                db.add(fila)
+            fila.version = sesion["version"]
+            fila.estado = sesion
+            fila.expira_en = _ahora() + ttl
+            db.commit()
+        self._purgar_si_toca()
+
+    def borrar(self, sesion_id: str):
+        with SessionLocal() as db:
+            db.execute(delete(ChatSesion).where(ChatSesion.id == sesion_id))
+            db.commit()
+
+    def _purgar_si_toca(self):
+        if time.monotonic() - self._ultima_purga < INTERVALO_PURGA_S:
+            return
+        self._ultima_purga = time.monotonic()
+        with SessionLocal() as db:
+            borradas = db.execute(delete(ChatSesion).where(ChatSesion.expira_en <= _ahora())).rowcount
+            db.commit()
+        if borradas:
+            logger.info(f"🧹 {borradas} sesiones de chat expiradas eliminadas")
+
+
+class BackendRedis:
+    """Hash por sesión: version + estado (JSON); Redis expira las claves"""
+
+    nombre = "redis"
+
+    def __init__(self, url: str):
+        self.cliente = redis.Redis.from_url(url, socket_timeout=2)
+        self.cliente.ping()
+
+    @staticmethod
+    def _clave(sesion_id: str) -> str:
+        return f"pili:sesion:{sesion_id}"
+
+    def version(self, sesion_id: str) -> Optional[int]:
+        valor = self.cliente.hget(self._clave(sesion_id), "version")
+        return int(valor) if valor is not None else None
+
+    def leer(self, sesion_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        version, estado = self.cliente.hmget(self._clave(sesion_id), "version", "estado")
+        if version is None or estado is None:
+            return None
+        return int(version), json.loads(estado)
+
+    def escribir(self, sesion: Dict[str, Any], ttl: timedelta):
+        clave = self._clave(sesion["id"])
+        with self.cliente.pipeline() as pipe:
+            pipe.hset(clave, mapping={"version": sesion["version"], "estado": json.dumps(sesion, default=str)})
+            pipe.expire(clave, ttl)
+            pipe.execute()
+
+    def borrar(self, sesion_id: str):
+        self.cliente.delete(self._clave(sesion_id))
+
+
+# ═══════════════════════════════════════════════════════════════
+# 💬 ALMACÉN DE SESIONES
+# ═══════════════════════════════════════════════════════════════
+
+class AlmacenSesiones:
+    """
+    💬 Sesiones de chat: LRU en memoria + Redis o BD
+    """
+
+    def __init__(self, backend=None, max_memoria: int = None, ttl_horas: int = None):
+        self.max_memoria = max_memoria or settings.CHAT_SESIONES_MEMORIA
+        self.ttl = timedelta(hours=ttl_horas or settings.CHAT_SESIONES_TTL_HORAS)
+        self._backend = backend
+        # sesion_id → (version, estado serializado): cada lectura devuelve una copia
+        self._memoria: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._ultima_purga_adjuntos = 0.0
+
+    @property
+    def backend(self):
+        """Redis si está configurado y responde; si no, la base de datos"""
+        if self._backend is None:
+            if settings.REDIS_URL and REDIS_AVAILABLE:
+                try:
+                    self._backend = BackendRedis(settings.REDIS_URL)
+                    logger.info("✅ Sesiones de chat en Redis")
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis no disponible ({e}), sesiones de chat en BD")
+            if self._backend is None:
+                self._backend = BackendBD()
+        return self._backend
+
+    def _recordar(self, sesion_id: str, version: int, serializada: str):
+        with self._lock:
+            self._memoria[sesion_id] = (version, serializada)
+            self._memoria.move_to_end(sesion_id)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    # ──────────────────────────────────────────────────────────────
+    # 📝 CICLO DE VIDA
+    # ──────────────────────────────────────────────────────────────
+
+    def crear(self, tipo_flujo: str, contexto_adicional: str = "",
+              historial: Optional[List[Dict]] = None,
+              archivos: Optional[List[Dict]] = None) -> Dict[str, Any]:
+        """Sesión nueva (opcionalmente sembrada con lo que el cliente ya tenía)"""
+        ahora = _ahora().isoformat()
+        sesion = {
+            "id": uuid.uuid4().hex,
+            "tipo_flujo": tipo_flujo,
+            "version": 0,
+            "creada": ahora,
+            "actualizada": ahora,
+            "contexto_adicional": contexto_adicional or "",
+            "historial": [],
+            "archivos": [],
+            "entidades": {},
+            "borrador": None,
+            "documento_id": None,
+            # Modelo de la última vista previa enviada (base de los JSON Patch)
+            "vista_previa": None,
+        }
+        for mensaje in historial or []:
+            self.agregar_mensaje(sesion, mensaje.get("role", "user"),
+                                 mensaje.get("content", mensaje.get("mensaje", "")))
+        self.agregar_archivos(sesion, archivos or [])
+        self.guardar(sesion)
+        return sesion
+
+    def obtener(self, sesion_id: str) -> Optional[Dict[str, Any]]:
+        """Sesión vigente o None (no existe o expiró)"""
+        with self._lock:
+            en_memoria = self._memoria.get(sesion_id)
+        if en_memoria is not None:
+            if self.backend.version(sesion_id) == en_memoria[0]:
+                self.hits += 1
+                contar_cache("sesiones_chat", True)
+                return json.loads(en_memoria[1])
+
+        self.misses += 1
+        contar_cache("sesiones_chat", False)
+        leida = self.backend.leer(sesion_id)
+        if leida is None:
+            with self._lock:
+                self._memoria.pop(sesion_id, None)
+            return None
+        version, sesion = leida
+        self._recordar(sesion_id, version, json.dumps(sesion, default=str))
+        return sesion
+
+    def guardar(self, sesion: Dict[str, Any]):
+        """Write-through: versión + 1, backend y memoria"""
+        sesion["version"] = sesion.get("version", 0) + 1
+        sesion["actualizada"] = _ahora().isoformat()
+        self.backend.escribir(sesion, self.ttl)
+        self._recordar(sesion["id"], sesion["version"], json.dumps(sesion, default=str))
+        self._renovar_adjuntos(sesion)
+
+    def _renovar_adjuntos(self, sesion: Dict[str, Any]):
+        """
+        Los adjuntos de una sesión viva no caducan (su TTL es deslizante como
+        el de la sesión); los que nadie renovó en un TTL se purgan
+        """
+        from app.services.content_store import contenido_sesiones
+
+        for archivo in sesion["archivos"]:
+            for campo, valor in archivo.items():
+                if campo.endswith("_hash"):
+                    contenido_sesiones.tocar(valor)
+
+        if time.monotonic() - self._ultima_purga_adjuntos < INTERVALO_PURGA_S:
+            return
+        self._ultima_purga_adjuntos = time.monotonic()
+        borrados = contenido_sesiones.purgar_antiguos(self.ttl.total_seconds() + INTERVALO_PURGA_S)
+        if borrados:
+            logger.info(f"🧹 {borrados} adjuntos de sesiones expiradas eliminados")
+
+    def eliminar(self, sesion_id: str):
+        self.backend.borrar(sesion_id)
+        with self._lock:
+            self._memoria.pop(sesion_id, None)
+
+    # ──────────────────────────────────────────────────────────────
+    # 🧩 CONTENIDO DE LA SESIÓN
+    # ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def agregar_mensaje(sesion: Dict[str, Any], role: str, content: str):
+        sesion["historial"].append({"role": role, "content": content, "timestamp": _ahora().isoformat()})
+        del sesion["historial"][:-MAX_HISTORIAL]
+
+    @staticmethod
+    def agregar_archivos(sesion: Dict[str, Any], archivos: List[Dict]) -> int:
+        """
+        Agrega adjuntos procesados; los textos largos se guardan en el
+        content store de sesiones y en la sesión queda `<campo>_hash`.
+        Devuelve cuántos adjuntos eran nuevos.
+        """
+        from app.services.content_store import contenido_sesiones
+
+        nuevos = 0
+        for archivo in archivos:
+            compacto = {}
+            for campo, valor in archivo.items():
+                if isinstance(valor, str) and len(valor) > UMBRAL_CONTENT_STORE:
+                    compacto[f"{campo}_hash"], compacto[f"{campo}_longitud"] = contenido_sesiones.guardar(valor)
+                else:
+                    compacto[campo] = valor
+            if compacto not in sesion["archivos"]:
+                sesion["archivos"].append(compacto)
+                nuevos += 1
+        return nuevos
+
+    @staticmethod
+    def resumen(sesion: Dict[str, Any]) -> Dict[str, Any]:
+        """Estado de la sesión sin el borrador completo ni textos de adjuntos"""
+        return {
+            "sesion_id": sesion["id"],
+            "tipo_flujo": sesion["tipo_flujo"],
+            "version": sesion["version"],
+            "creada": sesion["creada"],
+            "actualizada": sesion["actualizada"],
+            "mensajes": len(sesion["historial"]),
+            "archivos": [a.get("nombre") for a in sesion["archivos"]],
+            "entidades": sesion["entidades"],
+            "documento_id": sesion["documento_id"],
+            "tiene_borrador": sesion["borrador"] is not None,
+        }
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            en_memoria = len(self._memoria)
+        return {
+            "backend": self.backend.nombre,
+            "en_memoria": en_memoria,
+            "max_memoria": self.max_memoria,
+            "ttl_horas": self.ttl.total_seconds() / 3600,
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis": REDIS_AVAILABLE,
+        }
+
+
+# Instancia global
+sesiones_chat = AlmacenSesiones()
+
+
+def get_sesiones_chat() -> AlmacenSesiones:
+    """Obtiene el almacén de sesiones de chat"""
+    return sesiones_chat
@@ -0,0 +1,242 @@
+"""
+🖼️ VISTA PREVIA HTML - PLANTILLAS COMPILADAS (JINJA2)
+📁 RUTA: backend/app/services/vista_previa.py
+
+Las vistas previas del chat de PILI y de PILIIntegrator se armaban con
+f-strings gigantes (con el <style> completo) en cada turno. Ahora:
+
+- Plantillas en app/templates/vista_previa/, compiladas una vez por proceso
+  (caché de bytecode en disco entre reinicios, sin stat por render)
+- CSS estático en app/static/vista_previa/, servido como asset cacheable
+  (GET /api/chat/vista-previa/estilos/{nombre}.css?v=<hash>)
+- Tres formatos de respuesta:
+    "documento": HTML completo con el CSS en línea (compatible con lo anterior)
+    "fragmento": solo el <div> de la vista previa; el CSS va por su URL
+    "patch": operaciones JSON Patch (RFC 6902) sobre el modelo de la vista
+             previa anterior: solo campos, filas y totales que cambiaron
+"""
+
+import hashlib
+import logging
+from functools import lru_cache
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+    from markupsafe import Markup
+    JINJA2_AVAILABLE = True
+except ImportError:
+    JINJA2_AVAILABLE = False
+    logger.warning("⚠️ Jinja2 no instalado: vistas previas HTML deshabilitadas")
+
+DIRECTORIO_PLANTILLAS = Path(__file__).resolve().parent.parent / "templates" / "vista_previa"
+DIRECTORIO_ESTILOS = Path(__file__).resolve().parent.parent / "static" / "vista_previa"
+
+FORMATOS = ("documento", "fragmento", "patch")
+
+# Plantilla → hoja de estilos (las del integrador llevan estilos en línea)
+ESTILOS_PLANTILLA = {
+    "cotizacion": "cotizacion",
+    "informe": "informe",
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🎨 HOJAS DE ESTILO (cargadas una vez, versionadas por hash)
+# ═══════════════════════════════════════════════════════════════
+
+class HojaEstilos:
+    """CSS estático con su hash (ETag y parámetro ?v= de la URL)"""
+
+    def __init__(self, nombre: str, contenido: str):
+        self.nombre = nombre
+        self.contenido = contenido
+        self.version = hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def url(self) -> str:
+        return f"/api/chat/vista-previa/estilos/{self.nombre}.css?v={self.version}"
+
+
+ESTILOS: Dict[str, HojaEstilos] = {
+    ruta.stem: HojaEstilos(ruta.stem, ruta.read_text(encoding="utf-8"))
+    for ruta in sorted(DIRECTORIO_ESTILOS.glob("*.css"))
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧩 ENTORNO JINJA2
+# ═══════════════════════════════════════════════════════════════
+
+def _crear_entorno() -> Optional["Environment"]:
+    if not JINJA2_AVAILABLE:
+        return None
+
+    cache_bytecode = None
+    try:
+        directorio_cache = Path(settings.CACHE_DIR) / "jinja"
+        directorio_cache.mkdir(parents=True, exist_ok=True)
+        cache_bytecode = FileSystemBytecodeCache(str(directorio_cache))
+    except OSError as e:
+        logger.warning(f"⚠️ Sin caché de bytecode para plantillas: {e}")
+
+    return Environment(
+        loader=FileSystemLoader(str(DIRECTORIO_PLANTILLAS)),
+        autoescape=select_autoescape(["html"]),
+        bytecode_cache=cache_bytecode,
+        # Las plantillas no cambian en caliente: sin stat() por render
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+
+
+entorno = _crear_entorno()
+
+
+@lru_cache(maxsize=4096)
+def _fila_item(indice: int, descripcion: str, cantidad: float, unidad: str, precio_unitario: float) -> "Markup":
+    """
+    HTML de una fila de ítem (macro de _filas.html), memoizado: entre turnos
+    casi todas las filas se repiten y el macro es lo caro del render
+    """
+    fila = entorno.get_template("_filas.html").module.fila_item
+    return Markup(fila(indice, {
+        "descripcion": descripcion, "cantidad": cantidad,
+        "unidad": unidad, "precio_unitario": precio_unitario,
+    }))
+
+
+def fila_item(indice: int, item: Dict[str, Any]) -> "Markup":
+    """Fila `indice` de la tabla de ítems (desde la caché si ya se renderizó)"""
+    try:
+        return _fila_item(indice, item["descripcion"], item["cantidad"], item["unidad"], item["precio_unitario"])
+    except TypeError:
+        # Valores no hashables (listas, dicts): se renderiza sin caché
+        return _fila_item.__wrapped__(indice, item["descripcion"], item["cantidad"],
+                                      item["unidad"], item["precio_unitario"])
+
+
+def renderizar(plantilla: str, formato: str = "documento", titulo: str = "Vista Previa", **contexto) -> Optional[str]:
+    """
+    Renderiza app/templates/vista_previa/<plantilla>.html
+
+    "documento" envuelve el fragmento en un HTML completo con su CSS en
+    línea; "fragmento" devuelve solo el fragmento.
+    """
+    if entorno is None:
+        return None
+
+    fragmento = entorno.get_template(f"{plantilla}.html").render(fila_item=fila_item, **contexto)
+    if formato != "documento":
+        return fragmento
+
+    hoja = ESTILOS.get(ESTILOS_PLANTILLA.get(plantilla, ""))
+    return entorno.get_template("documento.html").render(
+        titulo=titulo,
+        css=Markup(hoja.contenido if hoja else ""),
+        contenido=Markup(fragmento),
+    )
+
+
+def url_estilos(plantilla: str) -> Optional[str]:
+    """URL versionada del CSS de la plantilla (None si no usa hoja de estilos)"""
+    hoja = ESTILOS.get(ESTILOS_PLANTILLA.get(plantilla, ""))
+    return hoja.url if hoja else None
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧾 MODELO DE LA VISTA PREVIA Y JSON PATCH
+# ═══════════════════════════════════════════════════════════════
+
+def _soles(valor: float) -> str:
+    return f"S/ {valor:.2f}"
+
+
+def modelo_cotizacion(datos: Dict[str, Any], agente: str) -> Dict[str, Any]:
+    """Lo que muestra la vista previa editable de cotización/proyecto"""
+    items = [
+        {
+            "descripcion": item.get('descripcion', ''),
+            "cantidad": item.get('cantidad', 0),
+            "unidad": item.get('unidad', 'und'),
+            "precio_unitario": item.get('precio_unitario', 0),
+        }
+        for item in datos.get('items', [])
+    ]
+    # Como antes: subtotal desde cantidad × precio de cada fila
+    subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items)
+    igv = subtotal * 0.18
+    return {
+        "campos": {
+            "cliente": datos.get('cliente', 'Cliente'),
+            "proyecto": datos.get('proyecto', 'Proyecto Eléctrico'),
+            "fecha": datetime.now().strftime('%d/%m/%Y'),
+            "agente": agente,
+        },
+        "items": items,
+        "totales": {"subtotal": _soles(subtotal), "igv": _soles(igv), "total": _soles(subtotal + igv)},
+    }
+
+
+def modelo_informe(datos: Dict[str, Any], agente: str) -> Dict[str, Any]:
+    """Lo que muestra la vista previa de informe"""
+    return {
+        "campos": {
+            "titulo": datos.get('titulo', 'Informe Técnico'),
+            "cliente": datos.get('cliente', 'Cliente'),
+            "fecha": datetime.now().strftime('%d/%m/%Y'),
+        },
+        "items": [],
+        "totales": {},
+    }
+
+
+def renderizar_modelo(plantilla: str, modelo: Dict[str, Any], agente: str, formato: str = "documento") -> Optional[str]:
+    """HTML completo o fragmento a partir del modelo"""
+    titulo = f"Vista Previa Informe - {agente}" if plantilla == "informe" else f"Vista Previa - {agente}"
+    return renderizar(
+        plantilla,
+        formato,
+        titulo=titulo,
+        agente=agente,
+        generado=datetime.now().strftime('%d/%m/%Y %H:%M'),
+        **modelo,
+    )
+
+
+def patch_vista_previa(plantilla: str, anterior: Dict[str, Any], nuevo: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Operaciones JSON Patch para pasar de la vista previa `anterior` a `nueva`
+
+    Rutas: /campos/<campo> y /totales/<total> (texto del elemento con
+    data-campo / data-total), /items/<i> (HTML de la fila data-fila=i).
+    Solo se renderizan las filas que cambiaron (y las ya vistas salen de la
+    caché de filas).
+    """
+    if entorno is None:
+        return []
+
+    operaciones = []
+    for grupo in ("campos", "totales"):
+        for clave, valor in nuevo[grupo].items():
+            if anterior[grupo].get(clave) != valor:
+                operaciones.append({"op": "replace", "path": f"/{grupo}/{clave}", "value": valor})
+
+    items_anteriores, items_nuevos = anterior["items"], nuevo["items"]
+    for indice, item in enumerate(items_nuevos):
+        if indice >= len(items_anteriores):
+            operaciones.append({"op": "add", "path": "/items/-", "value": str(fila_item(indice, item))})
+        elif items_anteriores[indice] != item:
+            operaciones.append({"op": "replace", "path": f"/items/{indice}", "value": str(fila_item(indice, item))})
+    # Filas sobrantes, de la última a la primera (los índices siguen válidos)
+    for indice in range(len(items_anteriores) - 1, len(items_nuevos) - 1, -1):
+        operaciones.append({"op": "remove", "path": f"/items/{indice}"})
+
+    return operaciones
@@ -35,6 +35,8 @@ from io import BytesIO
 import json
 import tempfile
 
+from app.core.tracing import span, trazado
+
 logger = logging.getLogger(__name__)
 
 class WordGenerator:
@@ -69,6 +71,7 @@ class WordGenerator:
     # 🤖 NUEVOS MÉTODOS PILI v3.0
     # ═══════════════════════════════════════════════════════════════
     
+    @trazado("word.generar")
     def generar_desde_json_pili(
         self,
         datos_json: Dict[str, Any],
@@ -760,7 +763,8 @@ class WordGenerator:
                 ruta_archivo = output_dir / nombre_archivo
 
             # Guardar documento
-            doc.save(str(ruta_archivo))
+            with span("docx.save", tipo=tipo):
+                doc.save(str(ruta_archivo))
 
             # Información del archivo generado
             return {
@@ -793,6 +797,7 @@ class WordGenerator:
     # 🔄 MÉTODOS ORIGINALES CONSERVADOS (COMPATIBILIDAD)
     # ═══════════════════════════════════════════════════════════════
     
+    @trazado("word.generar_cotizacion")
     def generar_cotizacion(
         self,
         datos_cotizacion: Optional[Dict[str, Any]] = None,
@@ -837,6 +842,7 @@ class WordGenerator:
                 "mensaje": f"Error generando cotización: {str(e)}"
             }
     
+    @trazado("word.generar_informe_proyecto")
     def generar_informe_proyecto(
         self,
         datos_proyecto: Optional[Dict[str, Any]] = None,
@@ -878,6 +884,7 @@ class WordGenerator:
                 "mensaje": f"Error generando informe proyecto: {str(e)}"
             }
     
+    @trazado("word.generar_informe_simple")
     def generar_informe_simple(
         self,
         datos_informe: Optional[Dict[str, Any]] = None,
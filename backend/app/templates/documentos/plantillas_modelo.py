@@ -31,6 +31,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 import logging
 
+from app.services.pricing_engine import pricing_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -906,72 +908,21 @@ SERVICIOS_INFO = {
 # ============================================================================
 
 def _obtener_items_por_servicio(servicio: str, area_m2: float, expandido: bool = False) -> List[Dict]:
-    """Genera items de cotizacion segun servicio y area"""
-
-    if servicio == "electrico-residencial":
-        num_circuitos = max(6, int(area_m2 / 25))
-        num_luces = int(area_m2 / 10)
-        num_tomacorrientes = int(area_m2 / 15)
-
-        items = [
-            {
-                "descripcion": "Tablero electrico monofasico 12 circuitos",
-                "cantidad": 1,
-                "unidad": "und",
-                "precio_unitario": 450.00,
-                "total": 450.00
-            },
-            {
-                "descripcion": "Circuitos electricos (cable THW + tuberia PVC)",
-                "cantidad": num_circuitos,
-                "unidad": "cto",
-                "precio_unitario": 120.00,
-                "total": num_circuitos * 120.00
-            },
-            {
-                "descripcion": "Puntos de iluminacion LED",
-                "cantidad": num_luces,
-                "unidad": "pto",
-                "precio_unitario": 45.00,
-                "total": num_luces * 45.00
-            },
-            {
-                "descripcion": "Tomacorrientes dobles con toma tierra",
-                "cantidad": num_tomacorrientes,
-                "unidad": "pto",
-                "precio_unitario": 35.00,
-                "total": num_tomacorrientes * 35.00
-            },
-            {
-                "descripcion": "Sistema de puesta a tierra",
-                "cantidad": 1,
-                "unidad": "glb",
-                "precio_unitario": 850.00,
-                "total": 850.00
-            }
-        ]
-
-        if expandido:
-            items.extend([
-                {
-                    "descripcion": "Tablero de medicion y proteccion",
-                    "cantidad": 1,
-                    "unidad": "und",
-                    "precio_unitario": 380.00,
-                    "total": 380.00
-                },
-                {
-                    "descripcion": "Interruptores termo-magneticos",
-                    "cantidad": num_circuitos,
-                    "unidad": "und",
-                    "precio_unitario": 45.00,
-                    "total": num_circuitos * 45.00
-                }
-            ])
+    """
+    Genera items de cotizacion segun servicio y area.
 
+    Usa el mismo catalogo de precios que PILIBrain (pricing_engine);
+    expandido agrega los items de cotizacion compleja.
+    """
+    items = pricing_engine.generar_items(
+        servicio,
+        {"area_m2": area_m2},
+        complejidad="complejo" if expandido else "simple"
+    )
+    if items:
         return items
 
-    # Default para otros servicios
+    # Default para servicios sin catalogo
     info = SERVICIOS_INFO.get(servicio, SERVICIOS_INFO["electrico-residencial"])
     total_base = area_m2 * info["precio_base_m2"]
 
@@ -0,0 +1,132 @@
+"""
+BENCHMARK DE AUTOCOMPLETADO DE CLIENTES - ILIKE vs índice de prefijos
+Simula usuarios escribiendo nombres de clientes tecla a tecla (desde 2
+caracteres) en una BD SQLite temporal y mide la latencia por pulsación.
+
+Ejecutar: python benchmark_autocompletado.py [--clientes 20000] [--sesiones 500]
+
+- "ilike": lo que hacía /clientes/search (ILIKE '%q%' en nombre y RUC)
+- "indice": autocompletado_clientes.refrescar + buscar (lo que hace ahora)
+Objetivo: p99 < 5 ms por pulsación.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# BD temporal ANTES de importar la app
+os.environ["DEV_DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='bench_autocompletado_')) / 'bench.db'}"
+os.environ["ENVIRONMENT"] = "development"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import logging
+logging.disable(logging.INFO)
+
+from sqlalchemy import or_, select  # noqa: E402
+
+from app.core.database import SessionLocal, init_db  # noqa: E402
+from app.models import Cliente, Cotizacion  # noqa: E402
+from app.services.autocompletado_clientes import AutocompletadoClientes  # noqa: E402
+
+PREFIJOS = ["Constructora", "Inversiones", "Corporación", "Minera", "Inmobiliaria", "Servicios",
+            "Ingeniería", "Distribuidora", "Agroindustrial", "Transportes", "Grupo", "Comercial"]
+NUCLEOS = ["Andina", "del Sur", "Pacífico", "Los Andes", "San Martín", "Santa Rosa", "El Sol",
+           "Norte Chico", "Miraflores", "Huallaga", "Ñaña", "Costa Verde", "Arequipa", "Cusco"]
+SUFIJOS = ["S.A.C.", "S.A.", "E.I.R.L.", "S.R.L.", ""]
+
+
+def sembrar(db, clientes: int, rnd: random.Random):
+    nombres = []
+    for i in range(clientes):
+        nombre = f"{rnd.choice(PREFIJOS)} {rnd.choice(NUCLEOS)} {i} {rnd.choice(SUFIJOS)}".strip()
+        nombres.append(nombre)
+    db.bulk_insert_mappings(Cliente, [
+        {"nombre": nombre, "ruc": f"20{i:09d}", "industria": "construccion"}
+        for i, nombre in enumerate(nombres)
+    ])
+    db.bulk_insert_mappings(Cotizacion, [
+        {"numero": f"COT-{i:07d}", "cliente": "x", "proyecto": "y", "subtotal": 0, "igv": 0,
+         "total": 0, "estado": "borrador", "cliente_id": rnd.randint(1, clientes)}
+        for i in range(clientes * 2)
+    ])
+    db.commit()
+    return nombres
+
+
+def pulsaciones(nombres, sesiones: int, rnd: random.Random):
+    """Prefijos que escribe cada usuario: 2, 3, ... caracteres (hasta 12)"""
+    for _ in range(sesiones):
+        objetivo = rnd.choice(nombres)
+        # La mitad escribe desde una palabra interna ("andina", "pacif")
+        if rnd.random() < 0.5:
+            objetivo = objetivo.split(" ", 1)[1]
+        yield [objetivo[:n] for n in range(2, min(len(objetivo), 12) + 1)]
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    def p(x):
+        return round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * x))], 3)
+    return {"p50_ms": p(0.50), "p95_ms": p(0.95), "p99_ms": p(0.99), "max_ms": round(tiempos[-1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de autocompletado de clientes")
+    parser.add_argument("--clientes", type=int, default=20_000)
+    parser.add_argument("--sesiones", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    init_db()
+    db = SessionLocal()
+    nombres = sembrar(db, args.clientes, rnd)
+    escritura = list(pulsaciones(nombres, args.sesiones, rnd))
+    total = sum(map(len, escritura))
+
+    def ilike(q):
+        return db.execute(
+            select(Cliente).where(or_(Cliente.nombre.ilike(f"%{q}%"), Cliente.ruc.ilike(f"%{q}%"))).limit(args.limit)
+        ).scalars().all()
+
+    indice = AutocompletadoClientes()
+    t = time.perf_counter()
+    indice.refrescar(db)
+    carga_ms = (time.perf_counter() - t) * 1000
+
+    resultados = {}
+    for nombre, funcion in (("ilike", ilike), ("indice", None)):
+        tiempos = []
+        for sesion in escritura:
+            for q in sesion:
+                t = time.perf_counter()
+                if funcion:
+                    funcion(q)
+                else:
+                    indice.refrescar(db)
+                    indice.buscar(q, args.limit)
+                tiempos.append((time.perf_counter() - t) * 1000)
+            db.expunge_all()
+        resultados[nombre] = percentiles(tiempos)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE AUTOCOMPLETADO ({args.clientes} clientes, {args.sesiones} sesiones, {total} pulsaciones)")
+    print("=" * 80)
+    print(f"Carga inicial del índice: {carga_ms:.1f} ms")
+    for nombre, r in resultados.items():
+        marca = "✅" if r["p99_ms"] < 5 else "⚠️"
+        print(f"{marca} {nombre:<7} p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  "
+              f"p99 {r['p99_ms']:>8} ms  max {r['max_ms']:>8} ms")
+    print(json.dumps({"carga_ms": round(carga_ms, 1), **resultados, "indice_estado": indice.estado()},
+                     indent=2, ensure_ascii=False))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+BENCHMARK DEL BORRADOR DE PILI - regeneración completa vs incremental
+Simula conversaciones largas de chat (un dato nuevo cada pocos turnos) y
+mide el costo por turno de mantener el documento al día.
+
+Ejecutar: python benchmark_borrador.py [--turnos 60] [--flujo proyecto-complejo]
+
+- "regeneracion": generar_* sobre todo el texto de la conversación (la única
+  forma de no perder lo dicho antes sin estado entre turnos)
+- "incremental": pili_brain.actualizar_borrador + ida y vuelta JSON del
+  borrador (lo que hace /chat-contextualizado con la sesión)
+Objetivo: el costo del turno incremental no crece con la conversación.
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+logging.disable(logging.INFO)
+
+from app.services.pili_brain import pili_brain  # noqa: E402
+
+MENSAJES_DATOS = [
+    "Necesito instalación eléctrica industrial para una planta de {n} m2",
+    "cliente: Minera Andina",
+    "son {p} pisos",
+    "serán {n} puntos",
+    "un motor de {p}0 hp",
+    "es una ampliación",
+]
+MENSAJES_CHARLA = [
+    "ok", "gracias", "perfecto, sigamos", "¿cuánto demora la entrega?",
+    "déjame revisarlo con mi jefe", "¿incluye materiales?",
+]
+
+
+def conversacion(turnos: int, rnd: random.Random):
+    """Un dato nuevo cada ~4 turnos; el resto es charla sin entidades"""
+    for i in range(turnos):
+        if i % 4 == 0:
+            yield rnd.choice(MENSAJES_DATOS).format(n=rnd.randint(1, 20) * 50, p=rnd.randint(1, 9))
+        else:
+            yield rnd.choice(MENSAJES_CHARLA)
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    def p(x):
+        return round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * x))], 3)
+    return {"p50_ms": p(0.50), "p99_ms": p(0.99), "max_ms": round(tiempos[-1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del borrador incremental de PILI")
+    parser.add_argument("--turnos", type=int, default=60)
+    parser.add_argument("--conversaciones", type=int, default=20)
+    parser.add_argument("--flujo", default="proyecto-complejo")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    complejidad = "complejo" if "complej" in args.flujo else "simple"
+    generar = (pili_brain.generar_proyecto if "proyecto" in args.flujo
+               else pili_brain.generar_informe if "informe" in args.flujo
+               else pili_brain.generar_cotizacion)
+
+    tiempos = {"regeneracion": [], "incremental": []}
+    # Costo por turno según la posición en la conversación (primer vs último cuarto)
+    por_tramo = {nombre: {"inicio": [], "final": []} for nombre in tiempos}
+
+    for _ in range(args.conversaciones):
+        mensajes = list(conversacion(args.turnos, rnd))
+        borrador = None
+        for i, mensaje in enumerate(mensajes):
+            tramo = "inicio" if i < args.turnos // 4 else "final" if i >= args.turnos * 3 // 4 else None
+
+            t = time.perf_counter()
+            texto = "\n".join(reversed(mensajes[:i + 1]))
+            generar(texto, pili_brain.detectar_servicio(texto), complejidad)
+            ms = (time.perf_counter() - t) * 1000
+            tiempos["regeneracion"].append(ms)
+            if tramo:
+                por_tramo["regeneracion"][tramo].append(ms)
+
+            t = time.perf_counter()
+            borrador, _, _ = pili_brain.actualizar_borrador(borrador, mensaje, args.flujo)
+            borrador = json.loads(json.dumps(borrador))
+            ms = (time.perf_counter() - t) * 1000
+            tiempos["incremental"].append(ms)
+            if tramo:
+                por_tramo["incremental"][tramo].append(ms)
+
+    print("=" * 80)
+    print(f"BENCHMARK DEL BORRADOR ({args.flujo}, {args.conversaciones} conversaciones x {args.turnos} turnos)")
+    print("=" * 80)
+    resultados = {}
+    for nombre, lista in tiempos.items():
+        inicio = sum(por_tramo[nombre]["inicio"]) / len(por_tramo[nombre]["inicio"])
+        final = sum(por_tramo[nombre]["final"]) / len(por_tramo[nombre]["final"])
+        resultados[nombre] = {**percentiles(lista), "media_inicio_ms": round(inicio, 3),
+                              "media_final_ms": round(final, 3)}
+        r = resultados[nombre]
+        print(f"{nombre:<13} p50 {r['p50_ms']:>8} ms  p99 {r['p99_ms']:>8} ms  "
+              f"turnos iniciales {r['media_inicio_ms']:>8} ms  turnos finales {r['media_final_ms']:>8} ms")
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+BENCHMARK DE BÚSQUEDA - índice de texto completo vs ILIKE
+Siembra documentos con texto extraído y cotizaciones con items en una BD
+SQLite temporal, construye el índice (FTS5) y mide consultas típicas.
+
+Ejecutar: python benchmark_busqueda.py [--documentos 100000] [--limit 20]
+
+- "indice": BusquedaService.buscar (ranking + resaltado de la página)
+- "ilike": LIKE '%término%' sobre el texto de documentos (lo que había)
+Objetivo: < 50 ms por consulta con 100k documentos.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# BD temporal ANTES de importar la app
+os.environ["DEV_DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='bench_busqueda_')) / 'bench.db'}"
+os.environ["ENVIRONMENT"] = "development"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import logging
+logging.disable(logging.INFO)
+
+from sqlalchemy import func, or_, select  # noqa: E402
+
+from app.core.database import SessionLocal, engine, init_db  # noqa: E402
+from app.models import Cotizacion, Documento  # noqa: E402
+from app.services.busqueda import busqueda_service  # noqa: E402
+from app.services.cotizacion_items import filas_items  # noqa: E402
+from app.models.item import Item  # noqa: E402
+
+LOTE = 5000
+
+VOCABULARIO = (
+    "instalación eléctrica tablero distribución interruptor termomagnético diferencial "
+    "cable conductor tubería conduit puesta tierra pozo luminaria iluminación tomacorriente "
+    "medidor acometida subestación transformador media tensión baja potencia motor bomba "
+    "arrancador variador frecuencia sistema contra incendios detector alarma rociador "
+    "cámara videovigilancia cableado estructurado red datos rack fibra óptica "
+    "automatización PLC sensor control mantenimiento preventivo correctivo inspección "
+    "certificado protocolo pruebas expediente técnico memoria descriptiva planos"
+).split()
+
+CONSULTAS = [
+    ("común", "instalacion electrica"),
+    ("rara", "subestacion transformador"),
+    ("prefijo", "termomag"),
+    ("tres términos", "tablero interruptor diferencial"),
+    ("sin resultados", "zzyzx"),
+]
+
+
+def vocabulario_zipf(rnd: random.Random, tamano: int = 5000):
+    """
+    Vocabulario con frecuencias tipo Zipf (como el texto real): los términos
+    técnicos quedan repartidos entre muy comunes (rango 0) y raros
+    """
+    silabas = ["ca", "me", "ri", "to", "sa", "lu", "ne", "po", "di", "gra", "ten", "cor", "mi", "fa"]
+    relleno = set()
+    while len(relleno) < tamano - len(VOCABULARIO):
+        relleno.add("".join(rnd.choice(silabas) for _ in range(rnd.randint(2, 4))))
+    palabras = sorted(relleno)
+    rnd.shuffle(palabras)
+    for rango, termino in enumerate(VOCABULARIO):
+        palabras.insert(rango * 40, termino)
+    pesos = [1 / (r + 1) for r in range(len(palabras))]
+    return palabras, list(itertools.accumulate(pesos))
+
+
+VOCABULARIO_ZIPF = vocabulario_zipf(random.Random(7))
+
+
+def parrafo(rnd: random.Random, palabras: int) -> str:
+    vocabulario, acumulados = VOCABULARIO_ZIPF
+    return " ".join(rnd.choices(vocabulario, cum_weights=acumulados, k=palabras))
+
+
+def sembrar(db, documentos: int, cotizaciones: int):
+    """Documentos con ~2 KB de texto (columna legacy) y cotizaciones con 5 items"""
+    rnd = random.Random(42)
+    for base in range(0, documentos, LOTE):
+        rango = range(base, min(base + LOTE, documentos))
+        db.bulk_insert_mappings(Documento, [
+            {"nombre": f"doc_{i}.pdf", "nombre_original": f"Informe {parrafo(rnd, 3)} {i}.pdf",
+             "ruta_archivo": f"/tmp/doc_{i}.pdf", "tipo_mime": "application/pdf", "tamano": 123456,
+             "contenido_legacy": parrafo(rnd, 300), "procesado": 1}
+            for i in rango
+        ])
+        db.commit()
+    for base in range(0, cotizaciones, LOTE):
+        rango = range(base, min(base + LOTE, cotizaciones))
+        db.bulk_insert_mappings(Cotizacion, [
+            {"id": i + 1, "numero": f"COT-{i:07d}", "cliente": f"Cliente {i % 500}",
+             "proyecto": parrafo(rnd, 3), "descripcion": parrafo(rnd, 20),
+             "subtotal": 1000, "igv": 180, "total": 1180, "estado": "borrador"}
+            for i in rango
+        ])
+        db.bulk_insert_mappings(Item, [
+            fila for i in rango
+            for fila in filas_items([
+                {"descripcion": parrafo(rnd, 4), "cantidad": 1, "precio_unitario": 100} for _ in range(5)
+            ], i + 1)
+        ])
+        db.commit()
+
+
+def medir(funcion, repeticiones: int = 7) -> float:
+    """Mediana en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de texto completo")
+    parser.add_argument("--documentos", type=int, default=100_000)
+    parser.add_argument("--cotizaciones", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--sin-ilike", action="store_true", help="No medir la línea base LIKE")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    t = time.perf_counter()
+    sembrar(db, args.documentos, args.cotizaciones)
+    print(f"🌱 {args.documentos} documentos y {args.cotizaciones} cotizaciones en {time.perf_counter() - t:.1f}s")
+
+    t = time.perf_counter()
+    totales = busqueda_service.reindexar()
+    print(f"🔎 Índice construido en {time.perf_counter() - t:.1f}s: {totales}")
+
+    def ilike(consulta):
+        condiciones = [
+            or_(Documento.nombre_original.ilike(f"%{p}%"), Documento.contenido_legacy.ilike(f"%{p}%"))
+            for p in consulta.split()
+        ]
+        return db.execute(
+            select(Documento.id).where(*condiciones).order_by(Documento.id.desc()).limit(args.limit)
+        ).all()
+
+    resultados = []
+    with engine.connect() as conn:
+        for nombre, consulta in CONSULTAS:
+            fila = {
+                "consulta": nombre,
+                "texto": consulta,
+                "resultados": len(busqueda_service.buscar(conn, consulta, limite=args.limit)),
+                "indice_ms": round(medir(lambda: busqueda_service.buscar(conn, consulta, limite=args.limit)), 2),
+                "indice_documentos_ms": round(medir(
+                    lambda: busqueda_service.buscar(conn, consulta, ["documento"], limite=args.limit)), 2),
+            }
+            if not args.sin_ilike:
+                fila["ilike_ms"] = round(medir(lambda: ilike(consulta), repeticiones=3), 2)
+            resultados.append(fila)
+
+    print("=" * 90)
+    print(f"BENCHMARK DE BÚSQUEDA ({args.documentos} documentos, limit {args.limit})")
+    print("=" * 90)
+    for r in resultados:
+        marca = "✅" if r["indice_ms"] < 50 else "⚠️"
+        base = f"  | ilike {r['ilike_ms']:>8} ms" if "ilike_ms" in r else ""
+        print(f"{marca} {r['consulta']:<15} índice {r['indice_ms']:>7} ms  "
+              f"(solo documentos {r['indice_documentos_ms']:>7} ms){base}")
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    total_docs = db.execute(select(func.count(Documento.id))).scalar()
+    print(f"Documentos en BD: {total_docs} · entradas en índice: {busqueda_service.estado()['entradas']}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
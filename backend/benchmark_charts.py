@@ -0,0 +1,131 @@
+"""
+BENCHMARK DE GRAFICAS - Plotly/Kaleido vs backend nativo (ReportLab/Pillow)
+Mide tiempo de render y memoria (RSS maximo) de las graficas que usa
+ChartEngine.create_charts_for_document
+
+Ejecutar: python benchmark_charts.py [--n 200]
+
+Cada backend corre en un subproceso separado para que el RSS medido
+sea solo el suyo.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Agregar path del proyecto
+sys.path.insert(0, str(Path(__file__).parent))
+
+DOCUMENTOS = {
+    "proyecto": {
+        "fases": [
+            {"nombre": "Ingenieria", "duracion_dias": 10},
+            {"nombre": "Adquisiciones", "duracion_dias": 15},
+            {"nombre": "Instalacion", "duracion_dias": 30},
+            {"nombre": "Pruebas", "duracion_dias": 7},
+            {"nombre": "Cierre", "duracion_dias": 3}
+        ],
+        "riesgos": [
+            {"riesgo": "Retraso de materiales", "probabilidad": "Alta", "impacto": "Alto"},
+            {"riesgo": "Cambios de alcance", "probabilidad": "Media", "impacto": "Medio"},
+            {"riesgo": "Clima", "probabilidad": "Baja", "impacto": "Medio"}
+        ]
+    },
+    "informe": {
+        "metricas_clave": {"roi_estimado": 25, "reduccion_costos_operativos": 12}
+    },
+    "cotizacion": {
+        "items": [
+            {"descripcion": "Cable THW 2.5mm2", "total": 1250},
+            {"descripcion": "Interruptor termomagnetico", "total": 840},
+            {"descripcion": "Tablero electrico", "total": 650},
+            {"descripcion": "Mano de obra", "total": 2100}
+        ]
+    }
+}
+
+
+def _run_backend(backend: str, output_format: str, n: int) -> dict:
+    """Renderiza n veces cada documento (sin cache) y devuelve metricas"""
+    from app.services.professional.charts.chart_engine import ChartEngine
+
+    engine = ChartEngine(output_dir=tempfile.mkdtemp(prefix=f"bench_{backend}_"))
+    if not engine.is_available(backend):
+        return {"backend": backend, "error": "no disponible"}
+
+    latencias = []
+    total_charts = 0
+    inicio = time.perf_counter()
+    for i in range(n):
+        for doc_type, data in DOCUMENTOS.items():
+            # Variar los datos para que ninguna cache evite el render
+            data = json.loads(json.dumps(data))
+            data.setdefault("items", []).append({"descripcion": f"Item {i}", "total": i + 1})
+            data["metricas_clave"] = {**data.get("metricas_clave", {}), "roi_estimado": 10 + i % 50}
+            if doc_type == "proyecto":
+                data["fases"][0]["duracion_dias"] = 5 + i
+
+            t = time.perf_counter()
+            charts = engine.create_charts_for_document(
+                doc_type, data, backend=backend, output_format=output_format
+            )
+            latencias.append(time.perf_counter() - t)
+            total_charts += sum(1 for path in charts.values() if path)
+    duracion = time.perf_counter() - inicio
+    engine.shutdown()
+
+    latencias.sort()
+    return {
+        "backend": backend,
+        "formato": output_format,
+        "documentos": len(latencias),
+        "graficas": total_charts,
+        "graficas_por_segundo": round(total_charts / duracion, 1),
+        "p50_ms": round(latencias[len(latencias) // 2] * 1000, 2),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 2),
+        # ru_maxrss esta en KB en Linux
+        "rss_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de graficas")
+    parser.add_argument("--n", type=int, default=50, help="Repeticiones por tipo de documento")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "FORMATO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_run_backend(args.worker[0], args.worker[1], args.n)))
+        return
+
+    casos = [("plotly", "png"), ("native", "png"), ("native", "pdf")]
+    resultados = []
+    for backend, formato in casos:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--n", str(args.n), "--worker", backend, formato],
+            capture_output=True, text=True
+        )
+        lineas = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        resultados.append(json.loads(lineas[-1]) if lineas else {"backend": backend, "error": proc.stderr[-300:]})
+
+    print("=" * 70)
+    print("BENCHMARK DE GRAFICAS")
+    print("=" * 70)
+    for r in resultados:
+        if "error" in r:
+            print(f"❌ {r['backend']}: {r['error']}")
+            continue
+        print(f"✅ {r['backend']:<7} {r['formato']:<4} "
+              f"{r['graficas_por_segundo']:>8} graficas/s  "
+              f"p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  "
+              f"RSS {r['rss_max_mb']:>7} MB")
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
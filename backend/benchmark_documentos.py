@@ -0,0 +1,504 @@
+"""
+BENCHMARK DE DOCUMENTOS - suite de extremo a extremo (offline, solo CPU)
+Mide las rutas que arman los 6 tipos de documento de PILI:
+
+- pili_brain: generar_cotizacion/proyecto/informe (simple y complejo) para
+  los 10 servicios
+- word / pdf: WordGenerator y PDFGenerator con esas salidas de PILIBrain
+- plantilla: TemplateProcessor sobre una plantilla .docx con marcadores
+- rag: indexar fragmentos y buscar con RAGEngine (Chroma en un directorio
+  temporal)
+- ocr: FileProcessorPro sobre una página escaneada (PNG) y un PDF sin capa
+  de texto, generados al vuelo
+
+Ejecutar:
+    python benchmark_documentos.py                       # todas las suites
+    python benchmark_documentos.py --suites word pdf --n 10
+    python benchmark_documentos.py --guardar-baseline    # acepta los números actuales
+
+Cada suite corre en un subproceso (RSS máximo solo suyo) con la red
+cortada para los modelos (HF_HUB_OFFLINE) y sin GPU, --repeticiones veces
+(se queda la mejor corrida de cada caso). Por caso se reportan p50/p95/p99,
+throughput y, por suite, el RSS máximo. Los resultados se
+escriben en JSON y se comparan con la línea base: si p50, p95 o el RSS
+empeoran más que la tolerancia, el script sale con código 1 (2 si no hay
+línea base). Los números solo son comparables en la misma máquina: la
+línea base se graba con --guardar-baseline en la máquina de referencia
+(la de CI o el servidor de staging) y no se versiona. Las suites sin sus dependencias (chromadb, sentence-transformers,
+tesseract) se marcan como omitidas, no como fallidas.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+DIRECTORIO = Path(__file__).parent
+BASELINE = DIRECTORIO / "benchmark_documentos_baseline.json"
+RESULTADOS = DIRECTORIO / "benchmark_documentos_resultados.json"
+
+SUITES = ("pili_brain", "word", "pdf", "plantilla", "rag", "ocr")
+
+# Los 6 tipos de documento: (generador de PILIBrain, complejidad)
+TIPOS_DOCUMENTO = {
+    "cotizacion-simple": ("generar_cotizacion", "simple"),
+    "cotizacion-compleja": ("generar_cotizacion", "complejo"),
+    "proyecto-simple": ("generar_proyecto", "simple"),
+    "proyecto-complejo": ("generar_proyecto", "complejo"),
+    "informe-simple": ("generar_informe", "simple"),
+    "informe-ejecutivo": ("generar_informe", "complejo"),
+}
+
+MENSAJES = [
+    "Necesito instalación eléctrica para una vivienda de 150 m2 de 2 pisos",
+    "cliente: Minera Andina, planta de 1200 m2, 3 pisos, 80 puntos, ampliación",
+    "Local comercial de 400 m2 con 45 puntos y un motor de 30 hp",
+]
+
+TEXTO_OCR = [
+    "TESLA ELECTRICIDAD Y AUTOMATIZACION S.A.C.",
+    "COTIZACION COT-2025-0142",
+    "Cliente: Minera Andina S.A.",
+    "Instalacion electrica industrial - 1200 m2",
+    "Item  Descripcion                     Cant.  P. Unit.",
+    "1     Cable THW 2.5 mm2                 300     2.80",
+    "2     Interruptor termomagnetico 2x20A   24    45.00",
+    "3     Tablero de distribucion 18 polos    2   650.00",
+    "4     Pozo a tierra segun CNE             1  1200.00",
+    "Subtotal: S/ 5,620.00   IGV: S/ 1,011.60",
+    "Total: S/ 6,631.60",
+]
+
+
+class SuiteOmitida(Exception):
+    """La suite no puede correr en esta máquina (falta una dependencia)"""
+
+
+# =============================================================================
+# MEDICION
+# =============================================================================
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    def p(x):
+        return round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * x))], 3)
+    return {"p50_ms": p(0.50), "p95_ms": p(0.95), "p99_ms": p(0.99), "max_ms": round(tiempos[-1], 3)}
+
+
+def medir(llamadas, n, calentamiento=1):
+    """
+    Ejecuta n rondas de `llamadas` (cada una recibe el número de llamada)
+    y devuelve percentiles por llamada y llamadas por segundo
+    """
+    contador = 0
+    for _ in range(calentamiento):
+        for llamada in llamadas:
+            llamada(contador)
+            contador += 1
+
+    tiempos = []
+    inicio = time.perf_counter()
+    for _ in range(n):
+        for llamada in llamadas:
+            t = time.perf_counter()
+            llamada(contador)
+            tiempos.append((time.perf_counter() - t) * 1000)
+            contador += 1
+    duracion = time.perf_counter() - inicio
+    return {**percentiles(tiempos), "llamadas": len(tiempos), "por_segundo": round(len(tiempos) / duracion, 2)}
+
+
+def _exigir(resultado, que):
+    """Una llamada que falla no es una medición válida"""
+    if isinstance(resultado, dict) and not resultado.get("exito", True):
+        raise RuntimeError(f"{que}: {resultado.get('error')}")
+    return resultado
+
+
+def _salidas_pili():
+    """Una salida de PILIBrain por (tipo de documento, servicio), con semilla fija"""
+    from app.services.pili_brain import pili_brain, SERVICIOS_PILI
+
+    random.seed(42)
+    salidas = {}
+    for tipo, (generador, complejidad) in TIPOS_DOCUMENTO.items():
+        salidas[tipo] = [
+            getattr(pili_brain, generador)(MENSAJES[i % len(MENSAJES)], servicio, complejidad)
+            for i, servicio in enumerate(SERVICIOS_PILI)
+        ]
+    return salidas
+
+
+# =============================================================================
+# SUITES (cada una corre en su propio subproceso)
+# =============================================================================
+
+def suite_pili_brain(n, directorio):
+    from app.services.pili_brain import pili_brain, SERVICIOS_PILI
+
+    random.seed(42)
+    casos = {}
+    for tipo, (generador, complejidad) in TIPOS_DOCUMENTO.items():
+        funcion = getattr(pili_brain, generador)
+        llamadas = [
+            (lambda i, s=servicio, f=funcion, c=complejidad: f(MENSAJES[i % len(MENSAJES)], s, c))
+            for servicio in SERVICIOS_PILI
+        ]
+        casos[tipo] = medir(llamadas, n)
+    return casos
+
+
+def _suite_generador(generador, extension, n, directorio):
+    casos = {}
+    for tipo, salidas in _salidas_pili().items():
+        llamadas = [
+            (lambda i, s=salida, t=tipo: _exigir(generador.generar_desde_json_pili(
+                {"datos_extraidos": s["datos"], "agente_responsable": "PILI"},
+                tipo_documento=t,
+                ruta_salida=str(directorio / f"{t}_{i}.{extension}"),
+            ), f"{extension} {t}"))
+            for salida in salidas
+        ]
+        casos[tipo] = medir(llamadas, n)
+    return casos
+
+
+def suite_word(n, directorio):
+    from app.services.word_generator import word_generator
+    if word_generator is None:
+        raise SuiteOmitida("WordGenerator no disponible (python-docx)")
+    return _suite_generador(word_generator, "docx", n, directorio)
+
+
+def suite_pdf(n, directorio):
+    from app.services.pdf_generator import pdf_generator
+    return _suite_generador(pdf_generator, "pdf", n, directorio)
+
+
+def _crear_plantilla(ruta: Path):
+    """Plantilla .docx con los marcadores estándar y de PILI"""
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading("{{empresa_nombre}}", level=1)
+    doc.add_paragraph("Cotización N° {{numero_cotizacion}} - {{fecha}}")
+    doc.add_paragraph("Cliente: {{cliente}}")
+    doc.add_paragraph("Proyecto: {{proyecto}}")
+    doc.add_paragraph("{{descripcion}}")
+    doc.add_paragraph("{{items_tabla}}")
+    tabla = doc.add_table(rows=3, cols=2)
+    for fila, (etiqueta, marcador) in enumerate((("Subtotal", "{{subtotal}}"), ("IGV", "{{igv}}"), ("Total", "{{total}}"))):
+        tabla.cell(fila, 0).text = etiqueta
+        tabla.cell(fila, 1).text = marcador
+    doc.add_paragraph("Observaciones: {{observaciones}}")
+    doc.add_paragraph("Vigencia: {{vigencia}}")
+    doc.add_paragraph("Atendido por {{agente_pili}} ({{tipo_servicio}})")
+    doc.save(str(ruta))
+
+
+def suite_plantilla(n, directorio):
+    from app.services.template_processor import template_processor
+    if template_processor is None:
+        raise SuiteOmitida("TemplateProcessor no disponible (python-docx)")
+
+    plantilla = directorio / "plantilla_benchmark.docx"
+    _crear_plantilla(plantilla)
+    salidas = _salidas_pili()
+    cotizaciones = [s["datos"] for s in salidas["cotizacion-simple"] + salidas["cotizacion-compleja"]]
+
+    def procesar(i, datos):
+        return template_processor.procesar_plantilla(
+            ruta_plantilla=str(plantilla),
+            datos_cotizacion=datos,
+            ruta_salida=str(directorio / f"plantilla_{i}.docx"),
+        )
+
+    def procesar_pili(i, datos):
+        return template_processor.procesar_plantilla_con_pili(
+            ruta_plantilla=str(plantilla),
+            datos_json={"datos_extraidos": datos, "agente_responsable": "PILI", "tipo_servicio": "cotizacion"},
+            ruta_salida=str(directorio / f"plantilla_pili_{i}.docx"),
+        )
+
+    return {
+        "procesar_plantilla": medir([lambda i, d=d: procesar(i, d) for d in cotizaciones], n),
+        "procesar_plantilla_con_pili": medir([lambda i, d=d: procesar_pili(i, d) for d in cotizaciones], n),
+    }
+
+
+def suite_rag(n, directorio):
+    from app.services.professional.rag.rag_engine import RAGEngine, CHROMADB_AVAILABLE, EMBEDDINGS_AVAILABLE
+    if not (CHROMADB_AVAILABLE and EMBEDDINGS_AVAILABLE):
+        raise SuiteOmitida("chromadb / sentence-transformers no instalados")
+
+    rag = RAGEngine(collection_name="benchmark", persist_directory=str(directorio / "embeddings"))
+    if not rag.is_available():
+        raise SuiteOmitida("modelo de embeddings no descargado (la suite no usa la red)")
+
+    # Corpus: secciones de los informes de PILIBrain, en fragmentos de 20
+    fragmentos = []
+    salidas = _salidas_pili()
+    for salida in salidas["informe-simple"] + salidas["informe-ejecutivo"]:
+        for seccion in salida["datos"].get("secciones", []):
+            contenido = seccion.get("contenido")
+            if isinstance(contenido, str) and contenido:
+                fragmentos.append(f"{seccion.get('titulo', '')}: {contenido}")
+    lotes = [fragmentos[i:i + 20] for i in range(0, len(fragmentos), 20)] or [["Instalación eléctrica"]]
+    consultas = [
+        "normativa CNE para instalaciones industriales",
+        "presupuesto de pozo a tierra",
+        "riesgos del proyecto de domótica",
+        "cronograma de ejecución de obra",
+        "sistema contra incendios NFPA",
+    ]
+
+    return {
+        "add_chunks_20": medir([lambda i, l=lote: _exigir(rag.add_chunks(l, source_id=f"bench-{i}"), "add_chunks")
+                                for lote in lotes], n),
+        "search_k5": medir([lambda i, q=consulta: _exigir(rag.search(q, n_results=5), "search")
+                            for consulta in consultas], n),
+    }
+
+
+def _pagina_escaneada(numero: int):
+    """Página A4 a 150 dpi con texto negro sobre blanco (como un escaneo)"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    imagen = Image.new("L", (1240, 1754), color=255)
+    dibujo = ImageDraw.Draw(imagen)
+    fuente = ImageFont.load_default(size=28)
+    y = 120
+    for linea in TEXTO_OCR + [f"Pagina {numero}"]:
+        dibujo.text((100, y), linea, fill=0, font=fuente)
+        y += 60
+    return imagen
+
+
+def suite_ocr(n, directorio):
+    from app.services.professional.processors.file_processor_pro import FileProcessorPro
+
+    procesador = FileProcessorPro(upload_dir=str(directorio / "uploads"))
+    if not procesador.capabilities["ocr"]:
+        raise SuiteOmitida("pytesseract / Pillow no instalados")
+    if shutil.which("tesseract") is None:
+        raise SuiteOmitida("binario tesseract no instalado (apt-get install tesseract-ocr tesseract-ocr-spa)")
+
+    def procesar(ruta):
+        resultado = _exigir(procesador.process_file(ruta), f"ocr {ruta.name}")
+        if not resultado.get("text", "").strip():
+            raise RuntimeError(f"OCR sin texto en {ruta.name}")
+        return resultado
+
+    png = directorio / "escaneo.png"
+    _pagina_escaneada(1).save(str(png))
+    casos = {"imagen_1_pagina": medir([lambda i: procesar(png)], n)}
+    casos["imagen_1_pagina"]["paginas_por_segundo"] = casos["imagen_1_pagina"]["por_segundo"]
+
+    if procesador.capabilities["pdf"]:
+        paginas = 3
+        pdf = directorio / "escaneo.pdf"
+        imagenes = [_pagina_escaneada(i + 1) for i in range(paginas)]
+        imagenes[0].save(str(pdf), save_all=True, append_images=imagenes[1:], resolution=150)
+        casos["pdf_escaneado_3_paginas"] = medir([lambda i: procesar(pdf)], n)
+        casos["pdf_escaneado_3_paginas"]["paginas_por_segundo"] = round(
+            casos["pdf_escaneado_3_paginas"]["por_segundo"] * paginas, 2)
+    return casos
+
+
+FUNCIONES_SUITE = {
+    "pili_brain": suite_pili_brain,
+    "word": suite_word,
+    "pdf": suite_pdf,
+    "plantilla": suite_plantilla,
+    "rag": suite_rag,
+    "ocr": suite_ocr,
+}
+
+
+def correr_suite(suite: str, n: int) -> dict:
+    """Dentro del subproceso: corre la suite y mide el RSS máximo del proceso"""
+    import logging
+    logging.disable(logging.INFO)
+
+    directorio = Path(tempfile.mkdtemp(prefix=f"bench_{suite}_"))
+    try:
+        inicio = time.perf_counter()
+        casos = FUNCIONES_SUITE[suite](n, directorio)
+        resultado = {"casos": casos, "duracion_s": round(time.perf_counter() - inicio, 2)}
+    except SuiteOmitida as e:
+        resultado = {"omitida": str(e)}
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    # ru_maxrss está en KB en Linux
+    resultado["rss_max_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return resultado
+
+
+# =============================================================================
+# COMPARACION CON LA LINEA BASE
+# =============================================================================
+
+def comparar(actual: dict, base: dict, tolerancia: float, margen_ms: float) -> list:
+    """
+    Regresiones: p50/p95 o RSS mayores que la línea base más la tolerancia
+    (el throughput sale de las mismas latencias y no se compara aparte)
+    """
+    regresiones = []
+    for suite, datos in actual["suites"].items():
+        datos_base = base.get("suites", {}).get(suite)
+        if not datos_base or "casos" not in datos or "casos" not in datos_base:
+            continue
+
+        for caso, metricas in datos["casos"].items():
+            metricas_base = datos_base["casos"].get(caso)
+            if not metricas_base:
+                continue
+            for clave in ("p50_ms", "p95_ms"):
+                limite = metricas_base[clave] * (1 + tolerancia) + margen_ms
+                if metricas[clave] > limite:
+                    regresiones.append(f"{suite}/{caso} {clave}: {metricas[clave]} ms "
+                                       f"(línea base {metricas_base[clave]} ms, límite {limite:.3f} ms)")
+
+        limite_rss = datos_base["rss_max_mb"] * (1 + tolerancia)
+        if datos["rss_max_mb"] > limite_rss:
+            regresiones.append(f"{suite} rss_max_mb: {datos['rss_max_mb']} MB "
+                               f"(línea base {datos_base['rss_max_mb']} MB, límite {limite_rss:.1f} MB)")
+    return regresiones
+
+
+def mejor_corrida(corridas: list) -> dict:
+    """
+    Por caso, la corrida con menor p50 (como timeit: el ruido de la máquina
+    solo suma tiempo); el RSS es el máximo de todas
+    """
+    if "casos" not in corridas[-1]:
+        return corridas[-1]
+    mejor = {
+        "casos": {},
+        "duracion_s": min(c["duracion_s"] for c in corridas),
+        "rss_max_mb": max(c["rss_max_mb"] for c in corridas),
+        "repeticiones": len(corridas),
+    }
+    for caso in corridas[0]["casos"]:
+        mejor["casos"][caso] = min((c["casos"][caso] for c in corridas), key=lambda m: m["p50_ms"])
+    return mejor
+
+
+def maquina() -> dict:
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extremo a extremo de los documentos de PILI")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--n", type=int, default=5, help="Rondas por caso (cada ronda recorre los 10 servicios)")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Corridas por suite (se toma la mejor)")
+    parser.add_argument("--salida", type=Path, default=RESULTADOS, help="JSON de resultados")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="JSON de la línea base")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guarda estos resultados como línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.30, help="Empeoramiento relativo permitido")
+    parser.add_argument("--margen-ms", type=float, default=0.5, help="Holgura absoluta para latencias muy cortas")
+    parser.add_argument("--worker", choices=SUITES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(correr_suite(args.worker, args.n)))
+        return
+
+    # Sin red para modelos ni telemetría, sin GPU, sin IA externa
+    entorno = {
+        **os.environ,
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        "ANONYMIZED_TELEMETRY": "False",
+        "CUDA_VISIBLE_DEVICES": "",
+        "GEMINI_API_KEY": "",
+    }
+
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "maquina": maquina(),
+        "parametros": {"n": args.n, "repeticiones": args.repeticiones},
+        "suites": {},
+    }
+    for suite in args.suites:
+        corridas = []
+        for _ in range(args.repeticiones):
+            proc = subprocess.run(
+                [sys.executable, __file__, "--n", str(args.n), "--worker", suite],
+                capture_output=True, text=True, env=entorno
+            )
+            lineas = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+            corridas.append(json.loads(lineas[-1]) if lineas else {"error": proc.stderr[-500:]})
+            if "casos" not in corridas[-1]:
+                break
+        resultados["suites"][suite] = mejor_corrida(corridas)
+
+    print("=" * 96)
+    print(f"BENCHMARK DE DOCUMENTOS (n={args.n}, {resultados['maquina']['cpus']} CPUs, "
+          f"Python {resultados['maquina']['python']})")
+    print("=" * 96)
+    for suite, datos in resultados["suites"].items():
+        if "error" in datos:
+            print(f"❌ {suite}: {datos['error']}")
+            continue
+        if "omitida" in datos:
+            print(f"⏭️  {suite}: omitida ({datos['omitida']})")
+            continue
+        print(f"✅ {suite}  ({datos['duracion_s']} s, RSS máx {datos['rss_max_mb']} MB)")
+        for caso, m in datos["casos"].items():
+            extra = f"  {m['paginas_por_segundo']:>7} pág/s" if "paginas_por_segundo" in m else ""
+            print(f"   {caso:<28} p50 {m['p50_ms']:>9} ms  p95 {m['p95_ms']:>9} ms  "
+                  f"p99 {m['p99_ms']:>9} ms  {m['por_segundo']:>9}/s{extra}")
+
+    args.salida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados: {args.salida}")
+
+    errores = [suite for suite, datos in resultados["suites"].items() if "error" in datos]
+
+    if args.guardar_baseline:
+        args.baseline.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Línea base guardada: {args.baseline}")
+        sys.exit(1 if errores else 0)
+
+    if not args.baseline.exists():
+        print(f"❌ Sin línea base ({args.baseline}): crearla en esta máquina con --guardar-baseline")
+        sys.exit(2)
+
+    base = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if base.get("maquina", {}).get("cpus") != resultados["maquina"]["cpus"] or \
+            base.get("parametros", {}).get("n") != args.n:
+        print(f"⚠️ La línea base es de otra máquina o con otro --n ({base.get('maquina')}, "
+              f"n={base.get('parametros', {}).get('n')}): comparar con cuidado")
+
+    regresiones = comparar(resultados, base, args.tolerancia, args.margen_ms)
+    if regresiones:
+        print("\n" + "!" * 96)
+        print(f"❌ {len(regresiones)} REGRESIONES frente a la línea base (tolerancia {args.tolerancia:.0%}):")
+        for regresion in regresiones:
+            print(f"   - {regresion}")
+        print("!" * 96)
+        sys.exit(1)
+    if errores:
+        sys.exit(1)
+    print(f"✅ Sin regresiones frente a la línea base ({base.get('fecha')})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+BENCHMARK DE LISTADOS - OFFSET + filas completas vs cursor (keyset) + proyección
+Mide la primera página y la página 500 de cotizaciones, proyectos y
+documentos con 100k filas por tabla en una BD SQLite temporal.
+
+Ejecutar: python benchmark_listados.py [--filas 100000] [--limit 20]
+
+- "offset": como antes (query(Modelo).offset().limit(), schema completo)
+- "keyset": listar_keyset con los campos por defecto del listado
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# BD temporal ANTES de importar la app
+os.environ["DEV_DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='bench_listados_')) / 'bench.db'}"
+os.environ["ENVIRONMENT"] = "development"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import logging
+logging.disable(logging.INFO)
+
+from app.core.database import SessionLocal, init_db  # noqa: E402
+from app.core.paginacion import listar_keyset  # noqa: E402
+from app.models import Cotizacion, Proyecto, Documento  # noqa: E402
+from app.models.proyecto import EstadoProyecto  # noqa: E402
+from app.services.cotizacion_items import num_items_expr  # noqa: E402
+from app.schemas.cotizacion import CotizacionResponse, CotizacionListItem  # noqa: E402
+from app.schemas.proyecto import ProyectoResponse, ProyectoListItem  # noqa: E402
+from app.schemas.documento import DocumentoResponse, DocumentoListItem  # noqa: E402
+
+LOTE = 5000
+
+
+def por_defecto(schema, pesados):
+    """Campos por defecto del listado (mismo criterio que los routers)"""
+    return [c for c in schema.model_fields if c not in pesados]
+
+
+def sembrar(db, filas: int):
+    """Inserta `filas` cotizaciones, proyectos y documentos con columnas pesadas realistas"""
+    inicio = datetime(2024, 1, 1)
+    items = [
+        {"descripcion": f"Item {i} " + "x" * 60, "cantidad": i + 1, "unidad": "und",
+         "precio_unitario": 45.0, "total": 45.0 * (i + 1)}
+        for i in range(15)
+    ]
+    metadata = {"servicio": "electrico-residencial", "notas": "y" * 400}
+    texto = "Contenido extraído del documento. " * 60  # ~2 KB
+    estados = list(EstadoProyecto)
+
+    for base in range(0, filas, LOTE):
+        rango = range(base, min(base + LOTE, filas))
+        # Varias filas por segundo para que haya empates de fecha
+        fechas = [inicio + timedelta(seconds=i // 3) for i in rango]
+        db.bulk_insert_mappings(Proyecto, [
+            {"nombre": f"Proyecto {i}", "cliente": f"Cliente {i % 500}", "estado": estados[i % 4],
+             "metadata_adicional": metadata, "fecha_creacion": f, "fecha_modificacion": f}
+            for i, f in zip(rango, fechas)
+        ])
+        db.bulk_insert_mappings(Cotizacion, [
+            {"numero": f"COT-{i:07d}", "cliente": f"Cliente {i % 500}", "proyecto": "Proyecto",
+             "subtotal": 1000, "igv": 180, "total": 1180, "estado": "borrador",
+             "items_legacy": items, "metadata_adicional": metadata,
+             "fecha_creacion": f, "fecha_modificacion": f}
+            for i, f in zip(rango, fechas)
+        ])
+        db.bulk_insert_mappings(Documento, [
+            {"nombre": f"doc_{i}.pdf", "nombre_original": f"doc_{i}.pdf", "ruta_archivo": f"/tmp/doc_{i}.pdf",
+             "tipo_mime": "application/pdf", "tamano": 123456, "contenido_texto": texto,
+             "metadata_extraida": metadata, "procesado": random.choice([0, 1, 2]), "fecha_subida": f}
+            for i, f in zip(rango, fechas)
+        ])
+        db.commit()
+
+
+def medir(funcion, repeticiones: int = 5) -> float:
+    """Mediana en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de paginación de listados")
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pagina", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    t = time.perf_counter()
+    sembrar(db, args.filas)
+    print(f"🌱 {args.filas} filas por tabla sembradas en {time.perf_counter() - t:.1f}s")
+
+    casos = [
+        ("cotizaciones", Cotizacion, Cotizacion.fecha_creacion, CotizacionResponse, CotizacionListItem,
+         por_defecto(CotizacionListItem, ("items", "subtotal_items", "metadata_adicional"))),
+        ("proyectos", Proyecto, Proyecto.fecha_creacion, ProyectoResponse, ProyectoListItem,
+         por_defecto(ProyectoListItem, ("metadata_adicional",))),
+        ("documentos", Documento, Documento.fecha_subida, DocumentoResponse, DocumentoListItem,
+         por_defecto(DocumentoListItem, ("contenido_texto", "metadata_extraida", "mensaje_error"))),
+    ]
+
+    resultados = []
+    offset = (args.pagina - 1) * args.limit
+    for nombre, modelo, fecha, schema_completo, schema_lista, campos in casos:
+        def offset_completo(skip):
+            filas = db.query(modelo).order_by(fecha.desc(), modelo.id.desc()).offset(skip).limit(args.limit).all()
+            cuerpo = json.dumps([schema_completo.model_validate(f).model_dump(mode="json") for f in filas])
+            db.expunge_all()
+            return len(cuerpo)
+
+        def keyset(cursor):
+            filas, _ = listar_keyset(db, modelo, campos, fecha, cursor=cursor, limit=args.limit,
+                                     expresiones={"num_items": num_items_expr()})
+            return len(json.dumps([schema_lista(**f).model_dump(mode="json", exclude_unset=True) for f in filas]))
+
+        # Cursor de la página N (la clave de la última fila de la página N-1)
+        _, cursor = listar_keyset(db, modelo, [], fecha, limit=offset, skip=0) if offset else (None, None)
+
+        fila = {
+            "listado": nombre,
+            "offset_p1_ms": round(medir(lambda: offset_completo(0)), 2),
+            f"offset_p{args.pagina}_ms": round(medir(lambda: offset_completo(offset)), 2),
+            "keyset_p1_ms": round(medir(lambda: keyset(None)), 2),
+            f"keyset_p{args.pagina}_ms": round(medir(lambda: keyset(cursor)), 2),
+            "bytes_completo": offset_completo(0),
+            "bytes_ligero": keyset(None),
+        }
+        resultados.append(fila)
+
+    print("=" * 90)
+    print(f"BENCHMARK DE LISTADOS ({args.filas} filas, limit {args.limit}, página {args.pagina})")
+    print("=" * 90)
+    for r in resultados:
+        valores = list(r.values())
+        print(f"✅ {r['listado']:<13} offset p1 {valores[1]:>8} ms  p{args.pagina} {valores[2]:>8} ms  | "
+              f"keyset p1 {valores[3]:>7} ms  p{args.pagina} {valores[4]:>7} ms  | "
+              f"{r['bytes_completo']:>7} B → {r['bytes_ligero']:>6} B")
+    print(json.dumps(resultados, indent=2))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
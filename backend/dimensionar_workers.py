@@ -0,0 +1,276 @@
+"""
+DIMENSIONAMIENTO DE WORKERS - genera GUIA_DIMENSIONAMIENTO.md
+A partir de los resultados de benchmark_documentos.py y de una medición de
+memoria con el mismo esquema que gunicorn.conf.py (preload + fork):
+
+1. Un proceso importa la app y precarga los modelos (como el maestro),
+   congela el GC y mide su RSS: lo que los workers comparten
+2. Un hijo creado con fork corre las suites del benchmark (los 6 tipos de
+   documento, Word/PDF, plantillas y RAG si está disponible) y mide su
+   memoria privada en /proc/self/smaps_rollup: lo que cuesta cada worker
+
+Con eso y las latencias del benchmark calcula cuántos workers caben en los
+límites del contenedor (por defecto los del backend en
+docker-compose.production.yml: 2 CPU / 4 GB) y cuántos documentos por
+segundo se pueden esperar.
+
+Ejecutar:
+    python benchmark_documentos.py --suites pili_brain word pdf plantilla
+    python dimensionar_workers.py                         # 2 CPU / 4096 MB
+    python dimensionar_workers.py --cpus 4 --memoria-mb 8192
+
+Los MB dependen poco de la máquina; los documentos/s sí: conviene
+regenerar la guía con un benchmark corrido en la máquina de producción.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+DIRECTORIO = Path(__file__).parent
+RESULTADOS = DIRECTORIO / "benchmark_documentos_resultados.json"
+GUIA = DIRECTORIO / "GUIA_DIMENSIONAMIENTO.md"
+
+# Suites que corre el worker de prueba antes de medir su memoria privada
+SUITES_TRABAJO = ("pili_brain", "word", "pdf", "plantilla", "rag")
+
+# Suites cuyos casos son un documento por llamada (tabla de capacidad)
+SUITES_CAPACIDAD = ("pili_brain", "word", "pdf", "plantilla")
+
+# Límites típicos para la tabla de otros tamaños: (CPUs, MB)
+LIMITES_REFERENCIA = ((1, 2048), (2, 4096), (4, 8192), (8, 16384))
+
+# Holgura sobre la memoria privada medida para SERVIDOR_MB_POR_WORKER
+# (fragmentación, documentos más grandes que los del benchmark)
+MARGEN_MEMORIA = 1.25
+
+# max_connections por defecto de PostgreSQL
+PG_MAX_CONNECTIONS = 100
+
+
+# =============================================================================
+# MEDICION DE MEMORIA (PRELOAD + FORK)
+# =============================================================================
+
+def _memoria_proceso() -> dict:
+    """RSS, PSS y memoria privada del proceso actual en MB"""
+    campos = {}
+    try:
+        for linea in Path("/proc/self/smaps_rollup").read_text().splitlines():
+            partes = linea.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                campos[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {"rss_mb": round(rss, 1), "privado_mb": round(rss, 1), "aproximado": True}
+    return {
+        "rss_mb": round(campos.get("Rss", 0), 1),
+        "pss_mb": round(campos.get("Pss", 0), 1),
+        "privado_mb": round(campos.get("Private_Clean", 0) + campos.get("Private_Dirty", 0), 1),
+    }
+
+
+def medir_memoria(n: int) -> dict:
+    """Dentro del subproceso: maestro con preload y un worker hijo con trabajo"""
+    import logging
+    logging.disable(logging.WARNING)
+
+    from app.core.servidor import precargar_modelos
+
+    datos = {}
+    try:
+        import app.main  # noqa: F401  (la app completa, como preload_app)
+    except Exception as e:
+        datos["error_app"] = str(e)
+    precargar_modelos()
+    gc.collect()
+    gc.freeze()
+    datos["maestro"] = _memoria_proceso()
+
+    lectura, escritura = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(lectura)
+        hijo = {"suites": [], "omitidas": {}}
+        directorio = Path(tempfile.mkdtemp(prefix="dimensionar_"))
+        try:
+            import benchmark_documentos as bench
+            for suite in SUITES_TRABAJO:
+                try:
+                    bench.FUNCIONES_SUITE[suite](n, directorio)
+                    hijo["suites"].append(suite)
+                except bench.SuiteOmitida as e:
+                    hijo["omitidas"][suite] = str(e)
+            hijo.update(_memoria_proceso())
+        except BaseException as e:
+            hijo["error"] = str(e)
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+        os.write(escritura, json.dumps(hijo).encode())
+        os._exit(0)
+
+    os.close(escritura)
+    with os.fdopen(lectura) as f:
+        datos["worker"] = json.loads(f.read() or '{"error": "el worker no respondió"}')
+    os.waitpid(pid, 0)
+    return datos
+
+
+# =============================================================================
+# GUIA
+# =============================================================================
+
+def _capacidad(resultados: dict) -> list:
+    """(suite, caso, p50, p95, documentos/s en un proceso) de cada caso medido"""
+    filas = []
+    for suite in SUITES_CAPACIDAD:
+        for caso, m in resultados.get("suites", {}).get(suite, {}).get("casos", {}).items():
+            filas.append((suite, caso, m["p50_ms"], m["p95_ms"], m["por_segundo"]))
+    return filas
+
+
+def generar_guia(resultados: dict, memoria: dict, cpus: float, memoria_mb: int) -> str:
+    from app.core.config import settings
+    from app.core.servidor import FRACCION_MEMORIA, calcular_workers
+
+    mb_maestro = memoria["maestro"]["rss_mb"]
+    mb_privado = memoria["worker"]["privado_mb"]
+    mb_por_worker = math.ceil(mb_privado * MARGEN_MEMORIA / 50) * 50
+
+    def workers_para(c, m):
+        return calcular_workers(c, m, mb_por_worker, mb_compartidos=mb_maestro)
+
+    calculo = workers_para(cpus, memoria_mb)
+    workers = calculo["workers"]
+    # Cada worker tiene dos pools: el engine síncrono y el async
+    por_worker = 2 * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    pool_sugerido = max(1, PG_MAX_CONNECTIONS * 8 // 10 // (2 * workers))
+
+    maquina = resultados.get("maquina", {})
+    lineas = [
+        "# Guía de dimensionamiento del backend (gunicorn)",
+        "",
+        f"Generada con `python dimensionar_workers.py --cpus {cpus:g} --memoria-mb {memoria_mb}` "
+        f"el {datetime.now().strftime('%Y-%m-%d')} ({platform.python_implementation()} "
+        f"{platform.python_version()}, {os.cpu_count()} CPUs) a partir de "
+        f"`benchmark_documentos_resultados.json` ({resultados.get('fecha', 'sin fecha')}, "
+        f"{maquina.get('cpus', '?')} CPUs). Regenerarla tras cambios de modelos o dependencias; "
+        "los documentos/s solo valen para la máquina donde corrió el benchmark.",
+        "",
+        "## Memoria medida (preload + fork, como gunicorn.conf.py)",
+        "",
+        "| | MB |",
+        "|---|---:|",
+        f"| Maestro tras importar la app y precargar modelos (compartido por copy-on-write) | {mb_maestro} |",
+        f"| Privado por worker tras generar los documentos del benchmark | {mb_privado} |",
+        f"| RSS de ese worker (cuenta también lo compartido) | {memoria['worker'].get('rss_mb', '?')} |",
+        "",
+        f"Suites ejecutadas por el worker: {', '.join(memoria['worker'].get('suites', [])) or 'ninguna'}.",
+    ]
+    for suite, motivo in memoria["worker"].get("omitidas", {}).items():
+        lineas.append(f"Omitida: {suite} ({motivo}); con ella la memoria privada será mayor.")
+    if "error_app" in memoria:
+        lineas.append(f"La app no se importó completa ({memoria['error_app']}): el maestro real pesa más.")
+
+    lineas += [
+        "",
+        f"## Workers para {cpus:g} CPU / {memoria_mb} MB",
+        "",
+        f"- Por CPU (2 × CPUs + 1; los workers esperan al LLM y a la BD): {calculo['por_cpu']}",
+        f"- Por memoria ({FRACCION_MEMORIA:.0%} de {memoria_mb} MB − {mb_maestro} MB del maestro, "
+        f"entre {mb_por_worker} MB por worker): {calculo['por_memoria']}",
+        f"- **Recomendado: `WEB_CONCURRENCY={workers}`** (o `WEB_CONCURRENCY=0` con "
+        f"`SERVIDOR_MB_POR_WORKER={mb_por_worker}` para que gunicorn lo calcule con los límites del contenedor)",
+        f"- Gráficas: `CHART_RENDER_WORKERS={max(1, int(cpus) // workers)}` procesos de render por worker "
+        "(gunicorn.conf.py lo fija si no está definido)",
+        "",
+        "## Capacidad por tipo de documento",
+        "",
+        "Generación en CPU: con al menos un worker por CPU el techo es "
+        "documentos/s de un proceso × CPUs. Las llamadas a Gemini no consumen CPU "
+        "y no entran en este cálculo.",
+        "",
+        f"| Suite | Caso | p50 ms | p95 ms | docs/s (1 proceso) | docs/s ({cpus:g} CPUs) |",
+        "|---|---|---:|---:|---:|---:|",
+    ]
+    filas = _capacidad(resultados)
+    for suite, caso, p50, p95, por_segundo in filas:
+        techo = por_segundo * min(workers, cpus)
+        lineas.append(f"| {suite} | {caso} | {p50} | {p95} | {por_segundo} | {techo:.1f} |")
+    if not filas:
+        lineas.append("| (sin resultados: correr benchmark_documentos.py) | | | | | |")
+
+    lineas += [
+        "",
+        "## Conexiones a PostgreSQL",
+        "",
+        f"Cada worker abre hasta 2 × (DB_POOL_SIZE + DB_MAX_OVERFLOW) = {por_worker} conexiones "
+        f"(engine síncrono y async): con {workers} workers, {workers * por_worker} "
+        f"frente a max_connections = {PG_MAX_CONNECTIONS} por defecto."
+        + ("" if workers * por_worker <= PG_MAX_CONNECTIONS * 0.8 else
+           f" Bajar a DB_POOL_SIZE + DB_MAX_OVERFLOW ≤ {pool_sugerido} o poner PgBouncer delante."),
+        "",
+        "## Otros límites de contenedor",
+        "",
+        "| CPUs | Memoria MB | Por CPU | Por memoria | Workers |",
+        "|---:|---:|---:|---:|---:|",
+    ]
+    for c, m in LIMITES_REFERENCIA:
+        otro = workers_para(c, m)
+        lineas.append(f"| {c} | {m} | {otro['por_cpu']} | {otro['por_memoria']} | {otro['workers']} |")
+    return "\n".join(lineas) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guía de workers de gunicorn a partir del benchmark")
+    parser.add_argument("--resultados", type=Path, default=RESULTADOS, help="JSON de benchmark_documentos.py")
+    parser.add_argument("--cpus", type=float, default=2, help="CPUs del contenedor")
+    parser.add_argument("--memoria-mb", type=int, default=4096, help="Memoria del contenedor")
+    parser.add_argument("--n", type=int, default=2, help="Rondas de cada suite en el worker de prueba")
+    parser.add_argument("--salida", type=Path, default=GUIA, help="Markdown de la guía")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir_memoria(args.n)))
+        return
+
+    if not args.resultados.exists():
+        print(f"❌ No existe {args.resultados}: correr antes benchmark_documentos.py")
+        sys.exit(2)
+    resultados = json.loads(args.resultados.read_text(encoding="utf-8"))
+
+    # Proceso aparte: el maestro medido no arrastra lo que este script importó
+    entorno = {**os.environ, "HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1",
+               "CUDA_VISIBLE_DEVICES": "", "GEMINI_API_KEY": ""}
+    proc = subprocess.run([sys.executable, __file__, "--medir", "--n", str(args.n)],
+                          capture_output=True, text=True, env=entorno)
+    lineas = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if not lineas:
+        print(f"❌ Medición de memoria fallida:\n{proc.stderr[-1500:]}")
+        sys.exit(1)
+    memoria = json.loads(lineas[-1])
+    if "error" in memoria["worker"]:
+        print(f"❌ El worker de prueba falló: {memoria['worker']['error']}")
+        sys.exit(1)
+
+    guia = generar_guia(resultados, memoria, args.cpus, args.memoria_mb)
+    args.salida.write_text(guia, encoding="utf-8")
+    print(guia)
+    print(f"📄 Guía escrita en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
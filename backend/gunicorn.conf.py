@@ -0,0 +1,98 @@
+"""
+🚀 GUNICORN - SERVIDOR DE PRODUCCIÓN MULTI-WORKER
+📁 RUTA: backend/gunicorn.conf.py
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+`python app/main.py` sigue siendo el modo desarrollo (un proceso, reload).
+
+🎯 CÓMO FUNCIONA:
+- El maestro importa la app (preload_app) y precarga los modelos
+  (app/core/servidor.py); después congela el heap con gc.freeze() y crea
+  los workers con fork. Lo que no se escribe después queda compartido por
+  copy-on-write: N workers no cuestan N veces los modelos
+- Workers: WEB_CONCURRENCY o, si es 0, el mínimo entre 2 × CPUs + 1 y lo
+  que cabe en la memoria del contenedor (GUIA_DIMENSIONAMIENTO.md)
+- Estado compartido entre workers en Redis (REDIS_URL): sesiones de chat y
+  cachés (app/core/estado_compartido.py); sin Redis cada worker usa el
+  suyo en memoria
+- Métricas: PROMETHEUS_MULTIPROC_DIR se vacía al arrancar y los datos de
+  cada worker muerto se descartan (child_exit)
+"""
+
+import gc
+import os
+import shutil
+
+from app.core.config import settings
+from app.core.servidor import calcular_workers, precargar_modelos, recursos_disponibles
+
+_cpus, _memoria_mb = recursos_disponibles()
+
+bind = f"{settings.BACKEND_HOST}:{settings.BACKEND_PORT}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.WEB_CONCURRENCY or calcular_workers(_cpus, _memoria_mb)["workers"]
+preload_app = True
+
+# Las llamadas LLM y los renders largos superan los 30 s por defecto
+timeout = settings.SERVIDOR_TIMEOUT_S
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar workers acota fugas de memoria; con preload el reemplazo es un
+# fork del maestro (no recarga modelos). El jitter evita reinicios en bloque
+max_requests = 1000
+max_requests_jitter = 100
+
+# Heartbeat de los workers en memoria (en Docker /tmp puede ser overlayfs)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Cada worker atiende requests en paralelo: el pool de render de gráficas
+# de cada uno se reparte las CPUs en vez de crear min(4, CPUs) procesos
+if settings.CHART_RENDER_WORKERS is None:
+    settings.CHART_RENDER_WORKERS = max(1, int(_cpus) // workers)
+
+
+def on_starting(server):
+    """Métricas de una ejecución anterior: los pids ya no existen"""
+    directorio = settings.PROMETHEUS_MULTIPROC_DIR or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directorio and os.path.isdir(directorio):
+        for nombre in os.listdir(directorio):
+            ruta = os.path.join(directorio, nombre)
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta, ignore_errors=True)
+            else:
+                os.remove(ruta)
+    server.log.info(f"🚀 {workers} workers ({_cpus:g} CPUs, {_memoria_mb} MB)")
+
+
+def when_ready(server):
+    """Último paso en el maestro antes del primer fork"""
+    # Como `python app/main.py`: tablas creadas una vez, no por worker.
+    # Los workers descartan las conexiones heredadas (app/core/database.py)
+    from app.core.database import check_db_connection, init_db
+    if check_db_connection():
+        init_db()
+    else:
+        server.log.warning("⚠️ No se pudo conectar a la base de datos")
+
+    if settings.SERVIDOR_PRECARGA_MODELOS:
+        # Con ARRANQUE_DIFERIDO los routers también se cargan aquí: el
+        # maestro no recibe tráfico y los workers nacen con todo importado
+        from app.core.arranque import cargador_routers
+        cargador_routers.cargar_todos()
+        precargar_modelos()
+    # Los objetos ya creados salen del GC: sus recorridos no escriben en
+    # sus páginas y estas siguen compartidas entre los workers
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from app.core.metricas import marcar_proceso_terminado
+
+    marcar_proceso_terminado(worker.pid)
@@ -0,0 +1,237 @@
+"""
+PRUEBA DE CARGA - Routers con Session síncrona vs AsyncSession
+50 clientes concurrentes contra los endpoints CRUD de cotizaciones,
+clientes y proyectos; reporta requests/segundo y latencias.
+
+Ejecutar:
+    python load_test_async.py                       # antes vs después, en proceso
+    python load_test_async.py --url http://localhost:8000   # servidor ya levantado
+
+En proceso, "antes" son los routers de la revisión previa a la capa async
+(se leen con `git show`) y "después" los del árbol actual, ambos sobre la
+misma BD SQLite temporal. Cada escenario corre en su propio proceso con un
+límite de tiempo: con Session síncrona en handlers `async def`, más
+clientes que conexiones en el pool (5 + 10) bloquean el event loop en el
+checkout hasta el timeout del pool (30 s).
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# BD temporal ANTES de importar la app (los procesos de cada escenario heredan la misma)
+if "LOAD_TEST_DIR" not in os.environ:
+    os.environ["LOAD_TEST_DIR"] = tempfile.mkdtemp(prefix="load_async_")
+DIR_TMP = Path(os.environ["LOAD_TEST_DIR"])
+os.environ["DEV_DATABASE_URL"] = f"sqlite:///{DIR_TMP / 'load.db'}"
+os.environ["ENVIRONMENT"] = "development"
+
+BACKEND = Path(__file__).parent
+sys.path.insert(0, str(BACKEND))
+
+import logging  # noqa: E402
+logging.disable(logging.INFO)
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+ROUTERS = {
+    # archivo: prefijo (clientes define el suyo)
+    "cotizaciones": "/api/cotizaciones",
+    "proyectos": "/api/proyectos",
+    "clientes": "",
+}
+
+
+def sembrar(n_cotizaciones: int = 2000, n_clientes: int = 200, n_proyectos: int = 300):
+    from app.core.database import SessionLocal, init_db
+    from app.models import Cliente, Cotizacion, Proyecto
+
+    init_db()
+    db = SessionLocal()
+    db.bulk_insert_mappings(Cliente, [
+        {"nombre": f"Cliente {i}", "ruc": f"20{i:09d}"} for i in range(n_clientes)
+    ])
+    db.bulk_insert_mappings(Proyecto, [
+        {"nombre": f"Proyecto {i}", "cliente": f"Cliente {i % n_clientes}"} for i in range(n_proyectos)
+    ])
+    db.bulk_insert_mappings(Cotizacion, [
+        {"numero": f"COT-LOAD-{i:05d}", "cliente": f"Cliente {i % n_clientes}", "proyecto": "Proyecto",
+         "cliente_id": i % n_clientes + 1, "subtotal": 100, "igv": 18, "total": 118,
+         "items_legacy": [{"descripcion": "Item", "cantidad": 1, "precio_unitario": 100}]}
+        for i in range(n_cotizaciones)
+    ])
+    db.commit()
+    db.close()
+    return n_cotizaciones, n_clientes, n_proyectos
+
+
+def revision_antes() -> str:
+    """Commit anterior a la capa async (o HEAD si aún no está confirmada)"""
+    try:
+        commit = subprocess.run(
+            ["git", "log", "-n1", "--format=%H", "-S", "get_async_db", "--", "app/routers/cotizaciones.py"],
+            cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return f"{commit}^" if commit else "HEAD"
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "HEAD"
+
+
+def cargar_router(nombre: str, revision: str = None):
+    """Carga app/routers/<nombre>.py del árbol actual o de una revisión de git"""
+    ruta = BACKEND / "app" / "routers" / f"{nombre}.py"
+    if revision:
+        fuente = subprocess.run(
+            ["git", "show", f"{revision}:./app/routers/{nombre}.py"],
+            cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout
+        ruta = DIR_TMP / f"{nombre}_{revision.replace('^', '_')[:12]}.py"
+        ruta.write_text(fuente, encoding="utf-8")
+
+    spec = importlib.util.spec_from_file_location(f"router_{nombre}_{revision or 'actual'}", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo.router
+
+
+def crear_app(revision: str = None) -> FastAPI:
+    app = FastAPI()
+    for nombre, prefijo in ROUTERS.items():
+        app.include_router(cargar_router(nombre, revision), prefix=prefijo)
+    return app
+
+
+def rutas(totales):
+    n_cot, n_cli, n_proy = totales
+    return [
+        # fields explícitos: los mismos campos con los routers de cualquier revisión
+        lambda: "/api/cotizaciones/?limit=20&fields=id,numero,cliente,estado,total,fecha_creacion",
+        lambda: f"/api/cotizaciones/{random.randint(1, n_cot)}",
+        lambda: f"/api/clientes/{random.randint(1, n_cli)}",
+        lambda: "/api/clientes/?limit=20",
+        lambda: f"/api/proyectos/{random.randint(1, n_proy)}",
+        lambda: "/api/proyectos/?limit=20",
+    ]
+
+
+async def cargar(cliente: httpx.AsyncClient, totales, concurrencia: int, duracion: float):
+    generadores = rutas(totales)
+    latencias, errores = [], 0
+    fin = time.perf_counter() + duracion
+
+    async def trabajador():
+        nonlocal errores
+        while time.perf_counter() < fin:
+            t = time.perf_counter()
+            r = await cliente.get(random.choice(generadores)())
+            latencias.append((time.perf_counter() - t) * 1000)
+            if r.status_code >= 400:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    transcurrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requests": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / transcurrido, 1),
+        "p50_ms": round(statistics.median(latencias), 2),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1], 2),
+    }
+
+
+async def ejecutar(app_o_url, totales, concurrencia, duracion):
+    if isinstance(app_o_url, str):
+        cliente = httpx.AsyncClient(base_url=app_o_url, timeout=30)
+    else:
+        cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_o_url), base_url="http://test", timeout=30)
+    try:
+        async with cliente:
+            await cargar(cliente, totales, concurrencia, 1.0)  # calentamiento (pool, cachés)
+            return await cargar(cliente, totales, concurrencia, duracion)
+    finally:
+        if not isinstance(app_o_url, str):
+            # Sin esto los hilos de las conexiones aiosqlite impiden salir al proceso
+            from app.core.database import async_engine
+            if async_engine is not None:
+                await async_engine.dispose()
+
+
+def imprimir(nombre, r):
+    if r is None:
+        print(f"❌ {nombre:<28} sin terminar: event loop bloqueado esperando conexión del pool")
+        return
+    icono = "✅" if not r["errores"] else "⚠️"
+    print(f"{icono} {nombre:<28} {r['rps']:>8} req/s   p50 {r['p50_ms']:>7} ms   p95 {r['p95_ms']:>7} ms"
+          f"   ({r['requests']} requests, {r['errores']} errores)")
+
+
+def escenario_en_proceso(nombre: str, args):
+    """Corre un escenario en un proceso aparte; None si no termina a tiempo"""
+    comando = [sys.executable, __file__, "--escenario", nombre,
+               "--concurrencia", str(args.concurrencia), "--duracion", str(args.duracion)]
+    if nombre == "antes":
+        comando += ["--antes", args.antes]
+    try:
+        salida = subprocess.run(
+            comando, capture_output=True, text=True, env=os.environ.copy(),
+            timeout=args.duracion * 2 + 60
+        ).stdout
+    except subprocess.TimeoutExpired:
+        return None
+    lineas = [l for l in salida.splitlines() if l.startswith("{")]
+    return json.loads(lineas[-1]) if lineas else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga sync vs async")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por escenario")
+    parser.add_argument("--url", help="Probar un servidor ya levantado en lugar de en proceso")
+    parser.add_argument("--antes", help="Revisión de git para 'antes' (por defecto, la previa a la capa async)")
+    parser.add_argument("--escenario", choices=["antes", "despues"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.escenario:
+        # Proceso hijo: un solo escenario, resultado en JSON por stdout
+        app = crear_app(args.antes if args.escenario == "antes" else None)
+        totales = tuple(json.loads((DIR_TMP / "totales.json").read_text()))
+        print(json.dumps(asyncio.run(ejecutar(app, totales, args.concurrencia, args.duracion))))
+        return
+
+    print("=" * 90)
+    print(f"PRUEBA DE CARGA - {args.concurrencia} clientes concurrentes, {args.duracion:.0f}s por escenario")
+    print("=" * 90)
+
+    if args.url:
+        totales = (200, 50, 50)
+        imprimir(args.url, asyncio.run(ejecutar(args.url, totales, args.concurrencia, args.duracion)))
+        return
+
+    (DIR_TMP / "totales.json").write_text(json.dumps(sembrar()))
+    args.antes = args.antes or revision_antes()
+
+    antes = escenario_en_proceso("antes", args)
+    imprimir(f"antes (Session, {args.antes[:10]})", antes)
+
+    despues = escenario_en_proceso("despues", args)
+    imprimir("después (AsyncSession)", despues)
+
+    if antes and despues:
+        print(f"\n   req/s: {antes['rps']} -> {despues['rps']} ({despues['rps'] / antes['rps']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+🗄️ MIGRACIÓN - Texto extraído de documentos al content store
+Mueve `documentos.contenido_texto` (texto en línea, varios MB por PDF) a
+archivos gzip direccionados por hash y compacta la base de datos.
+
+Ejecutar: python migrar_contenido_documentos.py [--sin-vacuum]
+
+Es idempotente: las filas ya migradas no se tocan.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.core.database import SessionLocal, engine, init_db  # noqa: E402
+from app.services.content_store import content_store  # noqa: E402
+import app.models  # noqa: E402,F401 - registrar modelos
+
+
+def tamano_bd() -> int:
+    """Bytes de la BD (solo SQLite; 0 en otros motores)"""
+    if engine.dialect.name != "sqlite" or not engine.url.database:
+        return 0
+    return os.path.getsize(engine.url.database)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrar texto de documentos al content store")
+    parser.add_argument("--sin-vacuum", action="store_true", help="No compactar la BD al terminar")
+    parser.add_argument("--lote", type=int, default=200)
+    args = parser.parse_args()
+
+    init_db()  # agrega contenido_hash / contenido_longitud si faltan
+    antes = tamano_bd()
+
+    db = SessionLocal()
+    try:
+        migrados = content_store.migrar_legacy(db, lote=args.lote)
+    finally:
+        db.close()
+
+    if migrados and not args.sin_vacuum:
+        if engine.dialect.name == "sqlite":
+            with engine.connect() as conn:
+                conn.execute(text("VACUUM"))
+        elif engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM ANALYZE documentos"))
+
+    despues = tamano_bd()
+    store = content_store.estadisticas()
+
+    print(f"✅ Documentos migrados: {migrados}")
+    if antes:
+        print(f"   BD: {antes / 1e6:.1f} MB -> {despues / 1e6:.1f} MB")
+    print(f"   Content store: {store['archivos']} archivos, {store['bytes'] / 1e6:.1f} MB en {store['directorio']}")
+
+
+if __name__ == "__main__":
+    main()
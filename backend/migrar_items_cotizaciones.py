@@ -0,0 +1,44 @@
+"""
+🧾 MIGRACIÓN - Items de cotizaciones de la columna JSON a la tabla items
+Inserta en `items` los items que solo estaban en `cotizaciones.items`
+(JSON) y vacía esa columna: la tabla queda como única fuente.
+
+Ejecutar: python migrar_items_cotizaciones.py
+
+Es idempotente: las cotizaciones que ya tienen filas en `items` no se tocan.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.database import SessionLocal, init_db  # noqa: E402
+from app.models.item import Item  # noqa: E402
+from app.services.cotizacion_items import migrar_items_legacy  # noqa: E402
+import app.models  # noqa: E402,F401 - registrar modelos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrar items de cotizaciones a la tabla items")
+    parser.add_argument("--lote", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()  # agrega unidad / codigo / orden / datos_extra si faltan
+
+    db = SessionLocal()
+    try:
+        migradas = migrar_items_legacy(db, lote=args.lote)
+        total_items = db.execute(select(func.count(Item.id))).scalar()
+    finally:
+        db.close()
+
+    print(f"✅ Cotizaciones migradas: {migradas}")
+    print(f"   Filas en items: {total_items}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+PERFIL DE IMPORTACION - qué hace lento el arranque del backend
+Corre `python -X importtime -c "import app.main"` en un proceso limpio y
+resume el reporte:
+
+- tiempo total hasta tener la app importada
+- paquetes de primer nivel por tiempo acumulado (google, chromadb,
+  plotly, pandas, reportlab, docx, spacy, torch...)
+- módulos de la app (app.*) por tiempo acumulado: qué router o servicio
+  arrastra cada librería pesada
+- módulos por tiempo propio (lo que cuesta ejecutar su cuerpo, p. ej.
+  instanciar singletons)
+
+Con --arranque además levanta uvicorn y mide cuánto tarda en responder
+/health (tiempo hasta aceptar conexiones) y, si ARRANQUE_DIFERIDO está
+activo, hasta terminar el precalentamiento.
+
+Ejecutar:
+    python perfil_importacion.py                        # import app.main
+    python perfil_importacion.py --top 40
+    python perfil_importacion.py --arranque             # + tiempo hasta /health
+    ARRANQUE_DIFERIDO=true python perfil_importacion.py --arranque
+    python perfil_importacion.py --modulo app.routers.chat --json perfil.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+DIRECTORIO = Path(__file__).parent
+
+
+# =============================================================================
+# -X importtime
+# =============================================================================
+
+def perfilar(modulo: str) -> dict:
+    """Importa `modulo` con -X importtime y devuelve los módulos con sus tiempos"""
+    inicio = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=DIRECTORIO,
+        env={**os.environ, "PYTHONPATH": str(DIRECTORIO)},
+    )
+    total_s = time.perf_counter() - inicio
+
+    modulos = []
+    for linea in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append({
+            "modulo": nombre.strip(),
+            "nivel": (len(nombre) - len(nombre.lstrip())) // 2,
+            "propio_ms": int(propio) / 1000,
+            "acumulado_ms": int(acumulado) / 1000,
+        })
+
+    errores = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+    return {
+        "modulo": modulo,
+        "total_s": round(total_s, 3),
+        "codigo_salida": proc.returncode,
+        "modulos": modulos,
+        "error": "\n".join(errores[-5:]) if proc.returncode else None,
+    }
+
+
+def por_paquete(modulos: list) -> list:
+    """
+    Tiempo acumulado por paquete de primer nivel. El reporte está en
+    post-orden (los hijos antes que el padre, con más sangría): se suma el
+    acumulado de cada módulo cuyo padre es de otro paquete, así los
+    submódulos no se cuentan dos veces
+    """
+    raiz = lambda nombre: nombre.split(".")[0]
+    paquetes = {}
+    pendientes = []
+    for m in modulos:
+        while pendientes and pendientes[-1]["nivel"] > m["nivel"]:
+            hijo = pendientes.pop()
+            if raiz(hijo["modulo"]) != raiz(m["modulo"]):
+                paquetes[raiz(hijo["modulo"])] = paquetes.get(raiz(hijo["modulo"]), 0.0) + hijo["acumulado_ms"]
+        pendientes.append(m)
+    for m in pendientes:
+        paquetes[raiz(m["modulo"])] = paquetes.get(raiz(m["modulo"]), 0.0) + m["acumulado_ms"]
+    return sorted(paquetes.items(), key=lambda p: p[1], reverse=True)
+
+
+# =============================================================================
+# TIEMPO HASTA ESCUCHAR
+# =============================================================================
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get_json(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.status, json.loads(r.read() or b"null")
+    except Exception:
+        return None, None
+
+
+def medir_arranque(limite_s: float = 120) -> dict:
+    """Levanta uvicorn y mide cuándo responde /health y cuándo termina el precalentamiento"""
+    puerto = _puerto_libre()
+    inicio = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(puerto),
+         "--log-level", "warning"],
+        cwd=DIRECTORIO, env={**os.environ, "PYTHONPATH": str(DIRECTORIO)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    resultado = {"escuchando_s": None, "precalentado_s": None}
+    try:
+        while time.perf_counter() - inicio < limite_s and proc.poll() is None:
+            estado, cuerpo = _get_json(f"http://127.0.0.1:{puerto}/health")
+            if estado == 200:
+                transcurrido = round(time.perf_counter() - inicio, 3)
+                if resultado["escuchando_s"] is None:
+                    resultado["escuchando_s"] = transcurrido
+                arranque = (cuerpo or {}).get("arranque") or {}
+                if arranque.get("listo", True):
+                    resultado["precalentado_s"] = transcurrido
+                    resultado["arranque"] = arranque
+                    break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de importación (-X importtime) del backend")
+    parser.add_argument("--modulo", default="app.main", help="Módulo a importar")
+    parser.add_argument("--top", type=int, default=25, help="Filas por tabla")
+    parser.add_argument("--arranque", action="store_true", help="Medir también el tiempo hasta /health con uvicorn")
+    parser.add_argument("--json", type=Path, help="Guardar el reporte completo en JSON")
+    args = parser.parse_args()
+
+    perfil = perfilar(args.modulo)
+    modulos = perfil["modulos"]
+    if perfil["error"]:
+        print(f"❌ import {args.modulo} falló:\n{perfil['error']}")
+
+    print("=" * 78)
+    print(f"PERFIL DE IMPORTACION: import {args.modulo}  ({perfil['total_s']} s de proceso, "
+          f"{len(modulos)} módulos)")
+    print("=" * 78)
+
+    print(f"\n📦 Paquetes por tiempo acumulado")
+    for nombre, ms in por_paquete(modulos)[:args.top]:
+        print(f"   {ms:>10.1f} ms  {nombre}")
+
+    print(f"\n🧩 Módulos de la app por tiempo acumulado (qué arrastra cada uno)")
+    propios = sorted((m for m in modulos if m["modulo"].startswith("app.")),
+                     key=lambda m: m["acumulado_ms"], reverse=True)
+    for m in propios[:args.top]:
+        print(f"   {m['acumulado_ms']:>10.1f} ms  {m['modulo']}  (propio {m['propio_ms']:.1f} ms)")
+
+    print(f"\n⏱️  Módulos por tiempo propio (cuerpo del módulo: singletons, cargas)")
+    for m in sorted(modulos, key=lambda m: m["propio_ms"], reverse=True)[:args.top]:
+        print(f"   {m['propio_ms']:>10.1f} ms  {m['modulo']}")
+
+    if args.arranque:
+        arranque = medir_arranque()
+        perfil["arranque"] = arranque
+        print(f"\n🚀 uvicorn app.main:app")
+        print(f"   /health responde en     {arranque['escuchando_s']} s")
+        print(f"   precalentamiento listo  {arranque['precalentado_s']} s")
+
+    if args.json:
+        args.json.write_text(json.dumps(perfil, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n📄 Reporte en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+🔎 REINDEXAR - Índice de búsqueda de texto completo
+Reconstruye `busqueda_fts` (SQLite) / `busqueda_indice` (PostgreSQL) desde
+cotizaciones, proyectos, documentos y clientes.
+
+Ejecutar: python reindexar_busqueda.py [--tipos documento,cliente]
+
+Necesario tras cargas masivas que no pasan por el ORM (bulk inserts,
+restauraciones de backup, migraciones); el día a día se sincroniza solo.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.database import init_db  # noqa: E402
+from app.services.busqueda import busqueda_service, TIPOS  # noqa: E402
+import app.models  # noqa: E402,F401 - registrar modelos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el índice de búsqueda")
+    parser.add_argument("--tipos", default="", help=f"Tipos separados por coma ({','.join(TIPOS)}); vacío = todo")
+    args = parser.parse_args()
+
+    tipos = [t.strip() for t in args.tipos.split(",") if t.strip()]
+    desconocidos = [t for t in tipos if t not in TIPOS]
+    if desconocidos:
+        parser.error(f"Tipos no válidos: {', '.join(desconocidos)}")
+
+    init_db()
+    t = time.perf_counter()
+    totales = busqueda_service.reindexar(tipos or None)
+
+    for tipo, total in totales.items():
+        print(f"✅ {tipo}: {total} entradas")
+    estado = busqueda_service.estado()
+    print(f"   Motor: {estado['motor']} · total en índice: {estado['entradas']} · {time.perf_counter() - t:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
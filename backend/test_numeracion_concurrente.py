@@ -0,0 +1,86 @@
+"""
+🧪 TEST DE CONCURRENCIA - Numeración de cotizaciones
+Crea 50 cotizaciones en paralelo (hilos y procesos) sobre una BD SQLite
+temporal y verifica que no haya números duplicados ni reintentos.
+
+Ejecutar: python test_numeracion_concurrente.py
+"""
+
+import os
+import sys
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+
+# BD temporal ANTES de importar la app (los procesos hijos heredan la misma)
+if "NUMERACION_TEST_DB" not in os.environ:
+    os.environ["NUMERACION_TEST_DB"] = str(Path(tempfile.mkdtemp(prefix="numeracion_")) / "test.db")
+os.environ["DEV_DATABASE_URL"] = f"sqlite:///{os.environ['NUMERACION_TEST_DB']}"
+os.environ["ENVIRONMENT"] = "development"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+PARALELAS = 50
+
+
+def crear_cotizacion(i: int) -> str:
+    """Crea una cotización con su propia sesión; falla si hay que reintentar"""
+    from app.core.database import SessionLocal
+    from app.models.cotizacion import Cotizacion
+    from app.services.sequence_allocator import generar_numero_cotizacion
+
+    db = SessionLocal()
+    try:
+        cotizacion = Cotizacion(
+            numero=generar_numero_cotizacion(db),
+            cliente=f"Cliente {i}",
+            proyecto="Prueba de concurrencia",
+            total=100
+        )
+        db.add(cotizacion)
+        db.commit()  # IntegrityError aquí = número duplicado
+        return cotizacion.numero
+    finally:
+        db.close()
+
+
+def crear_lote(inicio: int) -> list:
+    """Un proceso 'worker' creando varias cotizaciones con hilos"""
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        return list(pool.map(crear_cotizacion, range(inicio, inicio + 10)))
+
+
+def verificar(nombre: str, numeros: list) -> bool:
+    duplicados = len(numeros) - len(set(numeros))
+    ok = len(numeros) == PARALELAS and duplicados == 0
+    print(f"{'✅' if ok else '❌'} {nombre}: {len(numeros)} cotizaciones, {duplicados} duplicados")
+    print(f"   {min(numeros)} … {max(numeros)}")
+    return ok
+
+
+if __name__ == "__main__":
+    from app.core.database import init_db
+    import app.models  # noqa: F401 - registrar modelos
+    init_db()
+
+    print("=" * 70)
+    print("🧪 NUMERACIÓN DE COTIZACIONES - 50 CREACIONES EN PARALELO")
+    print("=" * 70)
+
+    # 1) 50 hilos en un mismo proceso
+    with ThreadPoolExecutor(max_workers=PARALELAS) as pool:
+        numeros_hilos = list(pool.map(crear_cotizacion, range(PARALELAS)))
+    ok_hilos = verificar("Hilos (1 proceso)", numeros_hilos)
+
+    # 2) 5 procesos x 10 (como varios workers de uvicorn)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=5, mp_context=ctx) as pool:
+        numeros_procesos = [n for lote in pool.map(crear_lote, range(0, PARALELAS, 10)) for n in lote]
+    ok_procesos = verificar("Procesos (5 workers)", numeros_procesos)
+
+    todos = numeros_hilos + numeros_procesos
+    ok_global = len(set(todos)) == len(todos)
+    print(f"{'✅' if ok_global else '❌'} Sin duplicados entre ambas tandas ({len(todos)} números)")
+
+    sys.exit(0 if (ok_hilos and ok_procesos and ok_global) else 1)